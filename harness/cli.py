@@ -64,11 +64,20 @@ def main():
 @click.option("--arch", required=True, help="Architecture name (e.g., single_agent)")
 @click.option("--problem", required=True, help="Problem name (e.g., kalshi)")
 @click.option("--name", required=True, help="Run name (e.g., baseline_test)")
-def scaffold(arch: str, problem: str, name: str):
+@click.option(
+    "--split",
+    "splits",
+    type=click.Choice(["train", "validation"]),
+    multiple=True,
+    default=["train"],
+    show_default=True,
+    help="Data split to mount in the run (repeatable).",
+)
+def scaffold(arch: str, problem: str, name: str, splits: tuple[str, ...]):
     """Create an isolated run workspace."""
     from harness.scaffold import create_run
 
-    create_run(arch=arch, problem=problem, name=name)
+    create_run(arch=arch, problem=problem, name=name, splits=tuple(splits))
 
 
 @main.command()
@@ -18,6 +18,8 @@ from harness.run_logging import RunLogger
 
 WORKER_RUN_DIR = "/workspace/run"
 WORKER_DATA_DIR = "/workspace/data"
+WORKER_VALIDATION_DATA_DIR = "/workspace/data_validation"
+DATA_MOUNT_DIRS = {"data": WORKER_DATA_DIR, "data_validation": WORKER_VALIDATION_DATA_DIR}
 DEFAULT_CONTAINER_IMAGE = "kalshi-lab-claude-runner:latest"
 PERMISSION_BYPASS = "bypassPermissions"
 ANTHROPIC_API_KEY_ENV = "ANTHROPIC_API_KEY"
@@ -161,20 +163,22 @@ def resolve_execution_config(run_dir: Path, overrides: ExecutionOverrides) -> Ex
 
 
 def _resolve_data_mounts(run_dir: Path) -> list[BindMount]:
-    """Resolve data mounts so run-local `data/` access remains functional."""
-    data_path = run_dir / "data"
-    if not data_path.exists():
-        return []
-
-    source = data_path.resolve()
-    mounts = [BindMount(source=source, target=WORKER_DATA_DIR, read_only=True)]
-
-    # Scaffold currently creates an absolute symlink from run/data -> problems/<problem>/data.
-    # Mirror that target path in container so existing symlink continues to work.
-    if data_path.is_symlink():
-        link_target = data_path.resolve()
-        if str(link_target) != WORKER_DATA_DIR:
-            mounts.append(BindMount(source=source, target=str(link_target), read_only=True))
+    """Resolve data mounts so run-local `data/` and `data_validation/` access remains functional."""
+    mounts: list[BindMount] = []
+    for name, worker_dir in DATA_MOUNT_DIRS.items():
+        data_path = run_dir / name
+        if not data_path.exists():
+            continue
+
+        source = data_path.resolve()
+        mounts.append(BindMount(source=source, target=worker_dir, read_only=True))
+
+        # Scaffold creates absolute symlinks from run/<name> -> problems/<problem>/splits/<split>.
+        # Mirror that target path in container so existing symlinks continue to work.
+        if data_path.is_symlink():
+            link_target = data_path.resolve()
+            if str(link_target) != worker_dir:
+                mounts.append(BindMount(source=source, target=str(link_target), read_only=True))
 
     return mounts
 
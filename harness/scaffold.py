@@ -1,5 +1,6 @@
 """Scaffold isolated run workspaces for experiment runs."""
 
+import json
 import shutil
 
 import click
@@ -8,6 +9,12 @@ from pathlib import Path
 from harness.manifest import load_architecture, write_run_manifest
 from harness.paths import PROBLEMS_DIR, RUNS_DIR
 
+SPLITS_DIR_NAME = "splits"
+SPLITS_FILE = "splits.json"
+
+# Run-local directory each materialized data split is mounted at.
+SPLIT_MOUNTS = {"train": "data", "validation": "data_validation"}
+
 
 def _next_run_number() -> int:
     """Find the next available run number."""
@@ -57,15 +64,40 @@ testpaths = ["tests"]
     (run_dir / "pyproject.toml").write_text(content)
 
 
-def _generate_claude_md(run_dir: Path, problem_name: str) -> None:
+def _load_splits(problem_dir: Path) -> dict:
+    """Read the split cutoffs written by `kalshi-download split` (splits.json)."""
+    splits_file = problem_dir / SPLITS_DIR_NAME / SPLITS_FILE
+    if not splits_file.exists():
+        raise click.ClickException(
+            f"No data splits in {splits_file.parent}; materialize them first "
+            "(e.g. `kalshi-download split --validation-start ... --test-start ...`)"
+        )
+    return json.loads(splits_file.read_text())
+
+
+def _generate_claude_md(
+    run_dir: Path,
+    problem_name: str,
+    splits: tuple[str, ...] = (),
+    split_meta: dict | None = None,
+) -> None:
     """Generate workspace-level CLAUDE.md instructions."""
+    validation_note = ""
+    if "validation" in splits and split_meta is not None:
+        validation_start = split_meta["validation_start"][:10]
+        test_start = split_meta["test_start"][:10]
+        validation_note = (
+            f"\n- `data/` holds data before {validation_start}. Validation data"
+            f" (everything before {test_start}) is in `data_validation/`;"
+            " use it only to evaluate strategies found on `data/`"
+        )
     content = f"""\
 # {problem_name.title()} Analysis Workspace
 
 You are analyzing prediction market data to discover profitable trading strategies.
 
 ## Data Access
-- All data is in `data/` as Parquet files, queryable via DuckDB glob patterns
+- All data is in `data/` as Parquet files, queryable via DuckDB glob patterns{validation_note}
 - See `brief.md` for dataset schema and analysis guidelines
 - A `queries.py` scaffold is available in `src/util/` if present
 
@@ -85,13 +117,33 @@ strategy_name, taker_side, category, fee_type, time_bucket, price_min, price_max
     (claude_dir / "CLAUDE.md").write_text(content)
 
 
-def create_run(arch: str, problem: str, name: str) -> Path:
+def _link_data(run_dir: Path, problem_dir: Path, splits: tuple[str, ...]) -> None:
+    """Symlink the allowed data splits into the run workspace.
+
+    Splits are materialized per problem under problems/<problem>/splits/
+    (e.g. `kalshi-download split`); the full data directory is never linked.
+    """
+    splits_dir = problem_dir / SPLITS_DIR_NAME
+    for split in splits:
+        data_target = splits_dir / split
+        if not data_target.exists():
+            raise click.ClickException(f"Data split not found: {data_target}")
+        data_link = run_dir / SPLIT_MOUNTS[split]
+        data_link.symlink_to(data_target.resolve())
+        click.echo(f"  Linked {data_link.name} -> {data_target}")
+
+
+def create_run(
+    arch: str, problem: str, name: str, splits: tuple[str, ...] = ("train",)
+) -> Path:
     """Create an isolated run workspace.
 
     Args:
         arch: Architecture name (must exist in architectures/).
         problem: Problem name (must exist in problems/).
         name: Human-readable run name.
+        splits: Data splits the run may see; "train" is mounted at data/ and
+            "validation" at data_validation/. Held-out test data is never mounted.
 
     Returns:
         Path to the created run directory.
@@ -99,6 +151,16 @@ def create_run(arch: str, problem: str, name: str) -> Path:
     problem_dir = PROBLEMS_DIR / problem
     if not problem_dir.exists():
         raise click.ClickException(f"Problem not found: {problem_dir}")
+    if "train" not in splits:
+        raise click.ClickException("Runs must include the train split")
+    unknown = set(splits) - set(SPLIT_MOUNTS)
+    if unknown:
+        raise click.ClickException(f"Unknown data splits: {', '.join(sorted(unknown))}")
+
+    split_meta = _load_splits(problem_dir)
+    missing = [s for s in splits if not (problem_dir / SPLITS_DIR_NAME / s).exists()]
+    if missing:
+        raise click.ClickException(f"Data split not found: {', '.join(missing)}")
 
     try:
         arch_file, arch_config = load_architecture(arch)
@@ -112,11 +174,8 @@ def create_run(arch: str, problem: str, name: str) -> Path:
     click.echo(f"Creating run workspace: {run_dir}")
     run_dir.mkdir(parents=True)
 
-    # Symlink data
-    data_link = run_dir / "data"
-    data_target = problem_dir / "data"
-    data_link.symlink_to(data_target.resolve())
-    click.echo(f"  Linked data -> {data_target}")
+    # Symlink the allowed data splits
+    _link_data(run_dir, problem_dir, splits)
 
     # Copy problem brief
     problem_md = problem_dir / "problem.md"
@@ -145,7 +204,7 @@ def create_run(arch: str, problem: str, name: str) -> Path:
     click.echo("  Generated pyproject.toml")
 
     # Generate CLAUDE.md
-    _generate_claude_md(run_dir, problem)
+    _generate_claude_md(run_dir, problem, splits, split_meta)
     click.echo("  Generated .claude/CLAUDE.md")
 
     # Create empty strategies.csv with header
@@ -0,0 +1,206 @@
+"""Offline throughput benchmark for the download clients.
+
+Runs the real KalshiClient and AuthenticatedClient against the mock API
+(download.mock_api) in-process, through httpx.ASGITransport, so changes to
+rate limiting, retries, concurrency or storage can be measured without
+network access or API keys:
+
+    python -m download.benchmark --trades 50000 --latency-ms 50 --error-rate 0.01
+
+Each scenario reports records/s, successful requests/s and retry overhead
+(requests the server saw beyond the pages that succeeded), along with the
+client's telemetry (download.telemetry).
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import click
+import httpx
+
+from download.candlesticks import AuthenticatedClient
+from download.client import DEFAULT_BURST, DEFAULT_RATE_LIMIT, KalshiClient
+from download.mock_api import API_PREFIX, FaultProfile, MockKalshiAPI, SyntheticData
+from download.telemetry import Telemetry
+
+MOCK_ORIGIN = "http://mock-kalshi"
+
+
+@dataclass
+class BenchmarkResult:
+    scenario: str
+    records: int
+    seconds: float
+    requests: int
+    ok: int
+    telemetry: dict[str, Any]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "scenario": self.scenario,
+            "records": self.records,
+            "seconds": round(self.seconds, 2),
+            "records_per_second": round(self.records / self.seconds, 1) if self.seconds else 0.0,
+            "requests_per_second": round(self.ok / self.seconds, 2) if self.seconds else 0.0,
+            "retry_overhead": round((self.requests - self.ok) / self.ok, 3) if self.ok else 0.0,
+            "telemetry": self.telemetry,
+        }
+
+
+def _result(
+    scenario: str, app: MockKalshiAPI, client: Any, records: int, start: float
+) -> BenchmarkResult:
+    return BenchmarkResult(
+        scenario=scenario,
+        records=records,
+        seconds=time.perf_counter() - start,
+        requests=app.stats.requests,
+        ok=app.stats.statuses[200],
+        telemetry=client.telemetry.as_dict(),
+    )
+
+
+def _public_client(app: MockKalshiAPI, rate_limit: float, burst: float) -> KalshiClient:
+    return KalshiClient(
+        base_url=MOCK_ORIGIN + API_PREFIX,
+        rate_limit=rate_limit,
+        burst=burst,
+        transport=httpx.ASGITransport(app=app),
+        telemetry=Telemetry(),
+    )
+
+
+async def bench_markets(
+    data: SyntheticData, faults: FaultProfile, rate_limit: float, burst: float
+) -> BenchmarkResult:
+    """Paginate every market with one client, as download.markets does."""
+    app = MockKalshiAPI(data, faults)
+    start = time.perf_counter()
+    records = 0
+    async with _public_client(app, rate_limit, burst) as client:
+        async for batch, _ in client.get_markets():
+            records += len(batch)
+    return _result("markets", app, client, records, start)
+
+
+async def bench_trades(
+    data: SyntheticData, faults: FaultProfile, rate_limit: float, burst: float, windows: int
+) -> BenchmarkResult:
+    """Paginate every trade over `windows` concurrent time slices, as backfill does."""
+    app = MockKalshiAPI(data, faults)
+    bounds = [
+        int(data.start.timestamp() + i * (data.end - data.start).total_seconds() / windows)
+        for i in range(windows + 1)
+    ]
+    start = time.perf_counter()
+    async with _public_client(app, rate_limit, burst) as client:
+
+        async def window(lo: int, hi: int) -> int:
+            count = 0
+            async for batch, _ in client.get_trades(min_ts=lo, max_ts=hi - 1):
+                count += len(batch)
+            return count
+
+        counts = await asyncio.gather(*(window(lo, hi) for lo, hi in itertools.pairwise(bounds)))
+    return _result(f"trades windows={windows}", app, client, sum(counts), start)
+
+
+async def bench_candlesticks(
+    data: SyntheticData,
+    faults: FaultProfile,
+    rate_limit: float,
+    burst: float,
+    concurrency: int,
+) -> BenchmarkResult:
+    """Fetch candlesticks for every market with signed requests and a worker pool."""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    app = MockKalshiAPI(data, faults, public_key=private_key.public_key())
+    tickers = iter(range(data.markets))
+    records = 0
+
+    async def worker(client: AuthenticatedClient) -> None:
+        nonlocal records
+        for i in tickers:
+            series = data.series_ticker(i // data.markets_per_event // data.events_per_series)
+            resp = await client.get(
+                f"/series/{series}/markets/{data.market_ticker(i)}/candlesticks",
+                params={"period_interval": 1440},
+            )
+            records += len(resp.get("candlesticks", []))
+
+    start = time.perf_counter()
+    async with AuthenticatedClient(
+        rate_limit=rate_limit,
+        burst=burst,
+        base_url=MOCK_ORIGIN,
+        transport=httpx.ASGITransport(app=app),
+        api_key_id="benchmark",
+        private_key=private_key,
+        telemetry=Telemetry(),
+    ) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return _result(f"candlesticks concurrency={concurrency}", app, client, records, start)
+
+
+@click.command()
+@click.option("--markets", type=int, default=500, help="Synthetic markets.")
+@click.option("--trades", type=int, default=50_000, help="Synthetic trades.")
+@click.option("--latency-ms", type=float, default=50.0, help="Server delay per response.")
+@click.option("--jitter-ms", type=float, default=20.0, help="Random extra delay per response.")
+@click.option("--server-rate-limit", type=float, default=None, help="Server-side req/s (429 above).")
+@click.option("--throttle-rate", type=float, default=0.0, help="Probability of a random 429.")
+@click.option("--error-rate", type=float, default=0.0, help="Probability of a random 5xx.")
+@click.option("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT, help="Client req/s.")
+@click.option("--burst", type=float, default=DEFAULT_BURST, help="Client burst.")
+@click.option("--windows", type=int, default=4, help="Concurrent trade time slices.")
+@click.option("--concurrency", type=int, default=8, help="Candlestick workers.")
+@click.option(
+    "--scenario",
+    "scenarios",
+    type=click.Choice(["markets", "trades", "candlesticks"]),
+    multiple=True,
+    help="Scenarios to run (default: all).",
+)
+def main(
+    markets: int,
+    trades: int,
+    latency_ms: float,
+    jitter_ms: float,
+    server_rate_limit: float | None,
+    throttle_rate: float,
+    error_rate: float,
+    rate_limit: float,
+    burst: float,
+    windows: int,
+    concurrency: int,
+    scenarios: tuple[str, ...],
+) -> None:
+    """Benchmark download throughput against the local mock API."""
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s %(message)s")
+    data = SyntheticData(markets=markets, trades=trades)
+    faults = FaultProfile(
+        latency_ms=latency_ms,
+        jitter_ms=jitter_ms,
+        rate_limit=server_rate_limit,
+        throttle_rate=throttle_rate,
+        error_rate=error_rate,
+    )
+    runs = {
+        "markets": lambda: bench_markets(data, faults, rate_limit, burst),
+        "trades": lambda: bench_trades(data, faults, rate_limit, burst, windows),
+        "candlesticks": lambda: bench_candlesticks(data, faults, rate_limit, burst, concurrency),
+    }
+    for name in scenarios or runs:
+        result = asyncio.run(runs[name]())
+        click.echo(json.dumps(result.as_dict()))
+
+
+if __name__ == "__main__":
+    main()
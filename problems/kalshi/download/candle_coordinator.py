@@ -0,0 +1,569 @@
+"""Lease-based sharding of the candlestick download across processes.
+
+A single process with one API key needs days for every market. The
+coordinator splits the work so that several processes can share it, each
+with its own credentials and rate budget, on one machine or several:
+
+- plan: schedule markets (download.candle_schedule) and store them, in
+  volume order, as work units of unit_size markets
+- work: a worker leases units, downloads their markets and renews its
+  leases with a heartbeat. A unit is done once every market in it is
+  committed as completed. A worker that dies stops renewing; when its
+  leases expire the units go to other workers, which skip the markets
+  already committed and resume partly fetched ones from their last window.
+- status: aggregate unit and worker progress into download_status.json
+
+Units and worker reports live in the candle checkpoint database, next to
+the completed markets and window progress, so a unit's completion and the
+records it depends on are read from one place. Each worker writes its own
+chunk files, candles-<worker>_<n>.parquet, to the shared output directory.
+SQLite in WAL mode needs all processes on one host; workers on several
+machines sharing a network filesystem must all pass --no-wal.
+
+    python -m download.candle_coordinator plan --coverage 0.9
+    KEY2_ID=... KEY2_PEM=... python -m download.candle_coordinator work \\
+        --worker-id key2 --api-key-env KEY2_ID --private-key-env KEY2_PEM
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import click
+import httpx
+
+from download.candle_schedule import (
+    DEFAULT_MINUTE_VOLUME,
+    CandleTask,
+    load_candle_tasks,
+    select_coverage,
+)
+from download.candlesticks import (
+    BASE_URL,
+    COMPLETED_NAMESPACE,
+    DEFAULT_CONCURRENCY,
+    OUTPUT_DIR,
+    STATUS_FILE,
+    AuthenticatedClient,
+    CandleWriter,
+    ProgressTracker,
+    download_market,
+    load_private_key,
+    open_checkpoints,
+    progress_key,
+)
+from download.checkpoint import BUSY_TIMEOUT_SECONDS, CHECKPOINT_FILE
+from download.client import DEFAULT_BURST, create_http_client
+from download.http_cache import DEFAULT_MODE, HTTP_CACHE_DIR, MODES, ResponseCache
+from download.telemetry import TELEMETRY, Telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNIT_SIZE = 50
+# A lease not renewed for this long is handed to another worker.
+DEFAULT_LEASE_SECONDS = 300.0
+HEARTBEAT_SECONDS = 30.0
+# Leases of one unit before it is left for inspection (e.g. a market that
+# always fails).
+MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    tasks TEXT NOT NULL,
+    markets INTEGER NOT NULL,
+    volume REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS units_status ON units (status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    report TEXT NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class Lease:
+    """A unit of markets held by one worker."""
+
+    unit_id: int
+    tasks: list[CandleTask]
+
+
+class LeaseQueue:
+    """Work units and worker reports, shared by processes through SQLite.
+
+    Leasing runs in an immediate transaction, so two workers never take the
+    same unit. Safe to share between the event loop and the heartbeat thread.
+
+    Args:
+        path: Database file (normally the candle checkpoints.db).
+        wal: Use WAL mode; see download.checkpoint.CheckpointStore.
+    """
+
+    def __init__(self, path: Path, wal: bool = True):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def plan(self, tasks: Iterable[CandleTask], unit_size: int = DEFAULT_UNIT_SIZE) -> int:
+        """Add units for the tasks not already in one; returns units added.
+
+        Units are numbered in task order and leased lowest first, so a
+        volume-ordered task list is downloaded largest markets first.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            planned = {
+                task["ticker"]
+                for (payload,) in self._conn.execute("SELECT tasks FROM units")
+                for task in json.loads(payload)
+            }
+            new = [t for t in tasks if t.ticker not in planned]
+            units = [new[i : i + unit_size] for i in range(0, len(new), unit_size)]
+            self._conn.executemany(
+                "INSERT INTO units (tasks, markets, volume) VALUES (?, ?, ?)",
+                [
+                    (json.dumps([asdict(t) for t in unit]), len(unit), sum(t.volume for t in unit))
+                    for unit in units
+                ],
+            )
+        return len(units)
+
+    def lease(self, worker: str, seconds: float = DEFAULT_LEASE_SECONDS) -> Lease | None:
+        """Take the first pending or expired unit, or None if there is none."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                """
+                SELECT id, tasks FROM units
+                WHERE attempts < ?
+                  AND (status = ? OR (status = ? AND lease_expires < ?))
+                ORDER BY id LIMIT 1
+                """,
+                (MAX_ATTEMPTS, PENDING, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                """
+                UPDATE units SET status = ?, worker = ?, lease_expires = ?,
+                    attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (LEASED, worker, now + seconds, row[0]),
+            )
+        return Lease(row[0], [CandleTask(**t) for t in json.loads(row[1])])
+
+    def renew(
+        self, worker: str, unit_ids: Iterable[int], seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> set[int]:
+        """Extend the worker's leases; returns the units it no longer holds."""
+        lost = set()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for unit_id in unit_ids:
+                cursor = self._conn.execute(
+                    "UPDATE units SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+                    (time.time() + seconds, unit_id, worker, LEASED),
+                )
+                if cursor.rowcount == 0:
+                    lost.add(unit_id)
+        return lost
+
+    def complete_finished(self, worker: str, leases: Iterable[Lease]) -> list[int]:
+        """Mark done the leased units whose markets are all committed as completed."""
+        done = []
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for lease in leases:
+                tickers = {t.ticker for t in lease.tasks}
+                (count,) = self._conn.execute(
+                    f"""
+                    SELECT COUNT(*) FROM completed
+                    WHERE namespace = ? AND key IN ({", ".join("?" * len(tickers))})
+                    """,
+                    (COMPLETED_NAMESPACE, *tickers),
+                ).fetchone()
+                if count < len(tickers):
+                    continue
+                cursor = self._conn.execute(
+                    "UPDATE units SET status = ?, lease_expires = NULL "
+                    "WHERE id = ? AND worker = ? AND status = ?",
+                    (DONE, lease.unit_id, worker, LEASED),
+                )
+                if cursor.rowcount:
+                    done.append(lease.unit_id)
+        return done
+
+    def release(self, worker: str, unit_ids: Iterable[int]) -> None:
+        """Return the worker's unfinished units to the queue."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "UPDATE units SET status = ?, worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                [(PENDING, unit_id, worker, LEASED) for unit_id in unit_ids],
+            )
+
+    def report(self, worker: str, report: dict[str, Any]) -> None:
+        """Store a worker's ProgressTracker status."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers VALUES (?, ?, ?)",
+                (worker, json.dumps(report), time.time()),
+            )
+
+    def unit_summary(self) -> dict[str, dict[str, float]]:
+        """Units, markets and volume by state: pending, leased, done, failed."""
+        summary = {
+            state: {"units": 0, "markets": 0, "volume": 0.0}
+            for state in (PENDING, LEASED, DONE, "failed")
+        }
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT
+                    CASE
+                        WHEN status != ? AND attempts >= ?
+                             AND (status = ? OR lease_expires < ?) THEN 'failed'
+                        ELSE status
+                    END,
+                    COUNT(*), SUM(markets), SUM(volume)
+                FROM units GROUP BY 1
+                """,
+                (DONE, MAX_ATTEMPTS, PENDING, time.time()),
+            ).fetchall()
+        for state, units, markets, volume in rows:
+            summary[state] = {"units": units, "markets": markets, "volume": volume}
+        return summary
+
+    def worker_reports(self) -> dict[str, tuple[dict[str, Any], float]]:
+        """Latest report and heartbeat time of every worker."""
+        with self._lock:
+            rows = self._conn.execute("SELECT worker, report, heartbeat_at FROM workers").fetchall()
+        return {worker: (json.loads(report), at) for worker, report, at in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def aggregate_status(queue: LeaseQueue, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> dict:
+    """Overall progress in the download_status.json format.
+
+    Markets and volume count as completed once their unit is done; request
+    and candle counters are summed over workers. Workers that have not
+    reported within lease_seconds are left out of the rates.
+    """
+    units = queue.unit_summary()
+    reports = queue.worker_reports()
+    now = time.time()
+    live = [r for r, at in reports.values() if r["status"] == "running" and now - at < lease_seconds]
+    total_markets = sum(u["markets"] for u in units.values())
+    total_volume = sum(u["volume"] for u in units.values())
+    completed_markets = units[DONE]["markets"]
+    completed_volume = units[DONE]["volume"]
+    rate = sum(r["markets_per_second"] for r in live)
+    remaining = units[PENDING]["markets"] + units[LEASED]["markets"]
+    latest = max(reports.values(), key=lambda item: item[1], default=({}, 0.0))[0]
+
+    def total(field: str) -> float:
+        return sum(r[field] for r, _ in reports.values())
+
+    return {
+        "status": "running" if remaining else "completed",
+        "total_markets": total_markets,
+        "completed_markets": completed_markets,
+        "total_candles": total("total_candles"),
+        "empty_markets": total("empty_markets"),
+        "failed_markets": total("failed_markets"),
+        "percent_complete": round(completed_markets / total_markets * 100, 2) if total_markets > 0 else 0,
+        "total_volume": total_volume,
+        "completed_volume": completed_volume,
+        "volume_percent_complete": round(completed_volume / total_volume * 100, 2) if total_volume > 0 else 0,
+        "elapsed_seconds": max((r["elapsed_seconds"] for r, _ in reports.values()), default=0.0),
+        "eta_seconds": round(remaining / rate, 1) if rate > 0 else 0,
+        "markets_per_second": round(rate, 1),
+        "requests": total("requests"),
+        "errors": total("errors"),
+        "rate_limits": total("rate_limits"),
+        "request_rate": round(sum(r["request_rate"] for r in live), 1),
+        "writes": None,
+        "telemetry": None,
+        "current_ticker": latest.get("current_ticker", ""),
+        "started_at": min((r["started_at"] for r, _ in reports.values()), default=None),
+        "updated_at": max((r["updated_at"] for r, _ in reports.values()), default=None),
+        "units": {state: u["units"] for state, u in units.items()},
+        "workers": {
+            worker: {
+                "status": r["status"],
+                "heartbeat_age_seconds": round(now - at, 1),
+                "completed_markets": r["completed_markets"],
+                "request_rate": r["request_rate"],
+                "current_ticker": r["current_ticker"],
+            }
+            for worker, (r, at) in reports.items()
+        },
+    }
+
+
+def write_status(path: Path, status: dict) -> None:
+    """Replace path atomically, since every worker writes it."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(status, indent=2))
+    os.replace(tmp, path)
+
+
+async def run_worker(
+    worker_id: str,
+    output_dir: Path = OUTPUT_DIR,
+    data_dir: Path = OUTPUT_DIR.parent,
+    rate_limit: float = 18.0,
+    burst: float = DEFAULT_BURST,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    api_key_id: str | None = None,
+    private_key: Any = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    heartbeat_seconds: float = HEARTBEAT_SECONDS,
+    cache_mode: str = DEFAULT_MODE,
+    wal: bool = True,
+    base_url: str = BASE_URL,
+    transport: httpx.AsyncBaseTransport | None = None,
+    telemetry: Telemetry = TELEMETRY,
+) -> ProgressTracker:
+    """Lease and download units until none are left.
+
+    Markets of several units may be in flight at once: the next unit is
+    leased as soon as the previous one's last market is taken. A unit is
+    completed by the heartbeat once its candles are committed, and units
+    with failed markets are released at exit for another attempt. Each
+    heartbeat also writes the worker's metrics-<worker>.prom. Heartbeats run
+    in a thread so their SQLite writes do not stall the downloads.
+    """
+    checkpoints = open_checkpoints(output_dir, wal=wal)
+    queue = LeaseQueue(output_dir / CHECKPOINT_FILE, wal=wal)
+    writer = CandleWriter(
+        checkpoints, output_dir, prefix=f"candles-{worker_id}", telemetry=telemetry
+    )
+    tracker = ProgressTracker(total_markets=0, status_file=None)
+    tracker.write_stats = writer.write_queue.stats
+    # The cache log is single-writer, so each worker keeps its own.
+    cache = await asyncio.to_thread(
+        ResponseCache, data_dir / HTTP_CACHE_DIR / f"worker-{worker_id}", cache_mode
+    )
+    status_file = output_dir / STATUS_FILE.name
+    held: dict[int, Lease] = {}
+
+    def leased_tasks() -> Iterator[CandleTask]:
+        while (lease := queue.lease(worker_id, lease_seconds)) is not None:
+            logger.info("Leased unit %d (%d markets)", lease.unit_id, len(lease.tasks))
+            held[lease.unit_id] = lease
+            for task in lease.tasks:
+                if lease.unit_id not in held:
+                    break  # Lease lost to another worker.
+                if not checkpoints.is_completed(COMPLETED_NAMESPACE, task.ticker):
+                    yield task
+
+    def heartbeat() -> None:
+        for unit_id in queue.renew(worker_id, list(held), lease_seconds):
+            logger.warning("Lost lease on unit %d", unit_id)
+            held.pop(unit_id, None)
+        for unit_id in queue.complete_finished(worker_id, list(held.values())):
+            held.pop(unit_id)
+        queue.report(worker_id, tracker.as_dict())
+        write_status(status_file, aggregate_status(queue, lease_seconds))
+        telemetry.write_prometheus(output_dir / f"metrics-{worker_id}.prom")
+
+    async def beat() -> None:
+        while True:
+            await asyncio.sleep(heartbeat_seconds)
+            await asyncio.to_thread(heartbeat)
+
+    tasks = leased_tasks()
+
+    async def worker(client: AuthenticatedClient) -> None:
+        # Workers share one iterator; each next() happens between awaits.
+        for task in tasks:
+            progress = checkpoints.get_state(progress_key(task.ticker))
+            resume_ts = progress["start_ts"] if progress else None
+            await download_market(client, writer, tracker, task, resume_ts)
+
+    async with (
+        create_http_client(transport=transport) as http_client,
+        AuthenticatedClient(
+            rate_limit=rate_limit,
+            burst=burst,
+            base_url=base_url,
+            api_key_id=api_key_id,
+            private_key=private_key,
+            http_client=http_client,
+            cache=cache,
+            telemetry=telemetry,
+        ) as client,
+    ):
+        heartbeats = asyncio.create_task(beat())
+        try:
+            await asyncio.gather(*(worker(client) for _ in range(max(1, concurrency))))
+        finally:
+            heartbeats.cancel()
+
+    await writer.finish()
+    tracker.finish("completed")
+    await asyncio.to_thread(heartbeat)
+    if held:
+        logger.warning("Releasing %d units with failed markets", len(held))
+        queue.release(worker_id, list(held))
+        write_status(status_file, aggregate_status(queue, lease_seconds))
+    await asyncio.to_thread(cache.close)
+    checkpoints.close()
+    queue.close()
+    logger.info(
+        "Worker %s done: %d markets, %d candles, %d requests",
+        worker_id,
+        tracker.completed_markets,
+        tracker.total_candles,
+        tracker.requests,
+    )
+    return tracker
+
+
+@click.group()
+@click.option(
+    "--output-dir",
+    type=click.Path(path_type=Path),
+    default=OUTPUT_DIR,
+    help="Shared candle directory holding the queue, checkpoints and chunk files.",
+)
+@click.option("--no-wal", is_flag=True, help="Rollback journal, for workers on several machines.")
+@click.pass_context
+def main(ctx: click.Context, output_dir: Path, no_wal: bool) -> None:
+    """Share the candlestick download between worker processes."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)-8s %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    ctx.obj = {"output_dir": output_dir, "wal": not no_wal}
+
+
+@main.command()
+@click.option(
+    "--data-dir", type=click.Path(path_type=Path), default=OUTPUT_DIR.parent, help="Market data."
+)
+@click.option("--min-volume", type=int, default=0, help="Minimum market volume to include.")
+@click.option("--open-after", default=None, help="Only markets opened on or after YYYY-MM-DD.")
+@click.option("--period", type=click.Choice(["1", "60", "1440"]), default=None, help="Candle period for every market.")
+@click.option("--coverage", type=float, default=1.0, help="Share of total volume to schedule.")
+@click.option("--minute-volume", type=float, default=DEFAULT_MINUTE_VOLUME, help="Volume for 1-minute candles.")
+@click.option("--unit-size", type=int, default=DEFAULT_UNIT_SIZE, help="Markets per work unit.")
+@click.pass_obj
+def plan(
+    obj: dict,
+    data_dir: Path,
+    min_volume: int,
+    open_after: str | None,
+    period: str | None,
+    coverage: float,
+    minute_volume: float,
+    unit_size: int,
+) -> None:
+    """Add work units for scheduled markets not yet completed or planned."""
+    tasks = select_coverage(
+        load_candle_tasks(
+            data_dir,
+            min_volume=min_volume,
+            open_after=open_after,
+            minute_volume=minute_volume,
+            period_interval=int(period) if period else None,
+        ),
+        coverage,
+    )
+    checkpoints = open_checkpoints(obj["output_dir"], wal=obj["wal"])
+    completed = checkpoints.completed(COMPLETED_NAMESPACE)
+    checkpoints.close()
+    queue = LeaseQueue(obj["output_dir"] / CHECKPOINT_FILE, wal=obj["wal"])
+    units = queue.plan([t for t in tasks if t.ticker not in completed], unit_size)
+    click.echo(f"Planned {units} units from {len(tasks)} scheduled markets")
+    queue.close()
+
+
+@main.command()
+@click.option("--worker-id", default=None, help="Stable name for chunk files (default: host-pid).")
+@click.option(
+    "--data-dir", type=click.Path(path_type=Path), default=OUTPUT_DIR.parent, help="HTTP cache root."
+)
+@click.option("--rate-limit", type=float, default=18.0, help="Requests per second for this key.")
+@click.option("--burst", type=float, default=DEFAULT_BURST, help="Requests an idle client may send at once.")
+@click.option("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests kept in flight.")
+@click.option("--api-key-env", default="KALSHI_API_KEY_ID", help="Variable holding the API key ID.")
+@click.option("--private-key-env", default="KALSHI_PRIVATE_KEY", help="Variable holding the PEM key.")
+@click.option("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS, help="Lease timeout.")
+@click.option(
+    "--http-cache", type=click.Choice(MODES), default=DEFAULT_MODE, help="Response cache mode."
+)
+@click.pass_obj
+def work(
+    obj: dict,
+    worker_id: str | None,
+    data_dir: Path,
+    rate_limit: float,
+    burst: float,
+    concurrency: int,
+    api_key_env: str,
+    private_key_env: str,
+    lease_seconds: float,
+    http_cache: str,
+) -> None:
+    """Download leased units until the queue is empty."""
+    asyncio.run(run_worker(
+        worker_id or f"{socket.gethostname()}-{os.getpid()}",
+        output_dir=obj["output_dir"],
+        data_dir=data_dir,
+        rate_limit=rate_limit,
+        burst=burst,
+        concurrency=concurrency,
+        api_key_id=os.environ[api_key_env],
+        private_key=load_private_key(private_key_env),
+        lease_seconds=lease_seconds,
+        cache_mode=http_cache,
+        wal=obj["wal"],
+    ))
+
+
+@main.command()
+@click.pass_obj
+def status(obj: dict) -> None:
+    """Write and print the aggregated download_status.json."""
+    queue = LeaseQueue(obj["output_dir"] / CHECKPOINT_FILE, wal=obj["wal"])
+    data = aggregate_status(queue)
+    queue.close()
+    write_status(obj["output_dir"] / STATUS_FILE.name, data)
+    click.echo(json.dumps(data, indent=2))
+
+
+if __name__ == "__main__":
+    main()
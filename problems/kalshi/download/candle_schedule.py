@@ -0,0 +1,136 @@
+"""Priority scheduling for the candlestick download.
+
+Walking every market with the same daily period over the same 2021-to-now
+window spends most of a 60-hour run on markets nobody trades. Each market
+instead becomes a CandleTask:
+
+- priority: contract volume; tasks run largest first, so the markets that
+  hold most of the volume arrive in the first minutes
+- resolution: 1-minute candles for high-volume non-sports markets, daily
+  for everything else
+- window: the market's own open-to-close range (to now while it is open),
+  split into requests of at most MAX_CANDLES_PER_REQUEST candles
+
+select_coverage() keeps the smallest prefix of tasks that reaches a target
+share of total volume, so a run can fetch the useful 90% now and the long
+tail later (a later run with a higher target skips completed markets).
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import duckdb
+
+from download.http_cache import FINAL_MARKET_STATUSES
+from download.markets import markets_table_sql
+
+DAILY = 1440
+MINUTE = 1
+# The candlesticks endpoint returns at most this many candles per request.
+MAX_CANDLES_PER_REQUEST = 5000
+# Contracts traded above which a non-sports market gets 1-minute candles.
+DEFAULT_MINUTE_VOLUME = 1_000_000
+# Sports markets are numerous and short-lived; they stay daily at any volume.
+DAILY_ONLY_CATEGORIES = frozenset({"Sports"})
+# Window start for markets without an open_time (2021-01-01 UTC).
+DEFAULT_START_TS = 1609459200
+
+
+@dataclass(frozen=True)
+class CandleTask:
+    """Candlesticks to fetch for one market."""
+
+    series_ticker: str
+    ticker: str
+    volume: float
+    period_interval: int
+    start_ts: int
+    end_ts: int
+    final: bool
+
+    def windows(self, start_ts: int | None = None) -> list[tuple[int, int]]:
+        """(start_ts, end_ts) of each request, from start_ts (default: the market open).
+
+        The API's bounds are inclusive, so each window ends one second before
+        the next starts; a candle never falls in two windows.
+        """
+        span = MAX_CANDLES_PER_REQUEST * self.period_interval * 60
+        start = self.start_ts if start_ts is None else max(start_ts, self.start_ts)
+        bounds = list(range(start, self.end_ts + 1, span))
+        return [(lo, min(lo + span - 1, self.end_ts)) for lo in bounds]
+
+
+def resolution(volume: float, category: str | None, minute_volume: float) -> int:
+    """Candle period in minutes for a market."""
+    if volume >= minute_volume and category not in DAILY_ONLY_CATEGORIES:
+        return MINUTE
+    return DAILY
+
+
+def load_candle_tasks(
+    data_dir: Path,
+    min_volume: float = 0,
+    open_after: str | None = None,
+    minute_volume: float = DEFAULT_MINUTE_VOLUME,
+    period_interval: int | None = None,
+) -> list[CandleTask]:
+    """One task per market with a series ticker, highest volume first.
+
+    period_interval forces one resolution for every market instead.
+    """
+    where = f"m.volume >= {min_volume}"
+    if open_after:
+        where += f" AND m.open_time >= '{open_after}'"
+    rows = duckdb.connect().execute(f"""
+        WITH m AS (
+            SELECT
+                ticker,
+                event_ticker,
+                status,
+                open_time,
+                COALESCE(TRY_CAST(volume_fp AS DOUBLE), volume, 0) AS volume,
+                epoch(TRY_CAST(open_time AS TIMESTAMPTZ)) AS open_ts,
+                epoch(TRY_CAST(close_time AS TIMESTAMPTZ)) AS close_ts
+            FROM {markets_table_sql(data_dir)}
+        )
+        SELECT DISTINCT ON (m.ticker)
+            e.series_ticker, m.ticker, e.category, m.volume, m.open_ts, m.close_ts, m.status
+        FROM m
+        JOIN '{data_dir}/events/*.parquet' e ON m.event_ticker = e.event_ticker
+        WHERE e.series_ticker IS NOT NULL AND e.series_ticker != ''
+          AND {where}
+    """).fetchall()
+
+    now = int(time.time())
+    tasks = []
+    for series_ticker, ticker, category, volume, open_ts, close_ts, status in rows:
+        period = period_interval or resolution(volume, category, minute_volume)
+        step = period * 60
+        start = DEFAULT_START_TS if open_ts is None else int(open_ts) // step * step
+        end = now if close_ts is None else min(now, int(close_ts))
+        tasks.append(CandleTask(
+            series_ticker=series_ticker,
+            ticker=ticker,
+            volume=float(volume),
+            period_interval=period,
+            start_ts=start,
+            end_ts=math.ceil(max(end, start + 1) / step) * step,
+            final=status in FINAL_MARKET_STATUSES,
+        ))
+    tasks.sort(key=lambda t: (-t.volume, t.ticker))
+    return tasks
+
+
+def select_coverage(tasks: list[CandleTask], target: float) -> list[CandleTask]:
+    """Shortest prefix of volume-ordered tasks holding target (0-1] of their volume."""
+    if target >= 1:
+        return tasks
+    total = sum(t.volume for t in tasks)
+    covered = 0.0
+    for i, task in enumerate(tasks):
+        if covered >= target * total:
+            return tasks[:i]
+        covered += task.volume
+    return tasks
@@ -1,7 +1,8 @@
-"""Download daily candlestick (OHLC) data for all traded markets.
+"""Download candlestick (OHLC) data for all traded markets.
 
 Reads market/event data from existing parquet files to build the
-(series_ticker, market_ticker) pairs needed for the candlestick endpoint.
+candlestick tasks (series ticker, market ticker, resolution and time
+window) scheduled by download.candle_schedule, highest volume first.
 
 Progress is written to a JSON status file that can be polled by a dashboard.
 """
@@ -13,16 +14,41 @@ import json
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import accumulate
 from pathlib import Path
 from typing import Any
 
 import httpx
 import pyarrow as pa
-import pyarrow.parquet as pq
+import pyarrow.compute as pc
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 
+from download.candle_schedule import (
+    DEFAULT_MINUTE_VOLUME,
+    MINUTE,
+    CandleTask,
+    load_candle_tasks,
+    select_coverage,
+)
+from download.checkpoint import CHECKPOINT_FILE, CheckpointStore, import_completed_file
+from download.client import (
+    DEFAULT_BURST,
+    MAX_ATTEMPTS,
+    RateLimiter,
+    backoff_seconds,
+    create_http_client,
+    retry_after_seconds,
+)
+from download.http_cache import DEFAULT_MODE, MODES, ResponseCache, open_cache
+from download.schemas import CANDLES_COLUMNS, records_to_batch
+from download.telemetry import METRICS_FILE, TELEMETRY, Telemetry
+from download.write_queue import WriteQueue, WriteStats
+from download.writer_config import DEFAULT_WRITER_CONFIG
+
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.elections.kalshi.com"
@@ -30,10 +56,18 @@ API_PREFIX = "/trade-api/v2"
 STATUS_FILE = Path("/home/workspace/kalshi-analysis/data/candles/download_status.json")
 OUTPUT_DIR = Path("/home/workspace/kalshi-analysis/data/candles")
 CHUNK_SIZE = 10_000
+# Namespace of finished tickers in the checkpoint store.
+COMPLETED_NAMESPACE = "candles"
+
+# Requests kept in flight. At 18 req/s and 50-200 ms round trips, ~4 are
+# needed to saturate the rate limit; the rest absorb slow responses.
+DEFAULT_CONCURRENCY = 8
+# Threads computing RSA-PSS signatures; one signature takes ~1 ms of CPU.
+DEFAULT_SIGN_WORKERS = 2
 
 
-def load_private_key() -> Any:
-    pk_raw = os.environ["KALSHI_PRIVATE_KEY"]
+def load_private_key(env_var: str = "KALSHI_PRIVATE_KEY") -> Any:
+    pk_raw = os.environ[env_var]
     if "\n" not in pk_raw and "-----" in pk_raw:
         parts = pk_raw.split()
         header = " ".join(parts[:5])
@@ -49,27 +83,60 @@ def load_private_key() -> Any:
     )
 
 
-class AuthenticatedClient:
-    """Async HTTP client with Kalshi RSA-PSS auth and rate limiting."""
+class CandleRequestError(RuntimeError):
+    """A request failed for good (retries exhausted or an unexpected status)."""
 
-    def __init__(self, rate_limit: float = 18.0):
-        self.api_key_id = os.environ["KALSHI_API_KEY_ID"]
-        self.private_key = load_private_key()
+
+class AuthenticatedClient:
+    """Async HTTP client with Kalshi RSA-PSS auth and rate limiting.
+
+    Signatures are computed on a small thread pool so RSA work does not
+    stall the event loop at high request rates. Uses http_client if given
+    (see download.client.create_http_client), otherwise opens its own pool,
+    and rate_limiter if given, e.g. one shared with a KalshiClient. Responses are looked up in and stored to cache, if given. Requests are
+    recorded in telemetry (see download.telemetry).
+    """
+
+    def __init__(
+        self,
+        rate_limit: float = 18.0,
+        burst: float = DEFAULT_BURST,
+        base_url: str = BASE_URL,
+        transport: httpx.AsyncBaseTransport | None = None,
+        api_key_id: str | None = None,
+        private_key: Any = None,
+        http_client: httpx.AsyncClient | None = None,
+        sign_workers: int = DEFAULT_SIGN_WORKERS,
+        cache: ResponseCache | None = None,
+        telemetry: Telemetry = TELEMETRY,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.api_key_id = api_key_id or os.environ["KALSHI_API_KEY_ID"]
+        self.private_key = private_key or load_private_key()
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
         self.rate_limit = rate_limit
-        self._min_interval = 1.0 / rate_limit
-        self._last_request = 0.0
-        self._lock = asyncio.Lock()
+        self.rate_limiter = rate_limiter or RateLimiter(rate_limit, burst=burst)
+        self.sign_workers = sign_workers
+        self.cache = cache
+        self.telemetry = telemetry
+        self._shared_client = http_client
         self._client: httpx.AsyncClient | None = None
+        self._sign_pool: ThreadPoolExecutor | None = None
         self.request_count = 0
         self.error_count = 0
         self.rate_limit_count = 0
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0))
+        self._client = self._shared_client or create_http_client(transport=self.transport)
+        self._sign_pool = ThreadPoolExecutor(self.sign_workers, thread_name_prefix="kalshi-sign")
         return self
 
     async def __aexit__(self, *args):
-        if self._client:
+        if self._sign_pool:
+            self._sign_pool.shutdown()
+            self._sign_pool = None
+        if self._client and self._client is not self._shared_client:
             await self._client.aclose()
 
     def _sign(self, timestamp: str, method: str, path: str) -> str:
@@ -84,65 +151,136 @@ class AuthenticatedClient:
         )
         return base64.b64encode(sig).decode("utf-8")
 
-    async def get(self, path: str, params: dict | None = None, retries: int = 5) -> dict:
+    async def get(
+        self, path: str, params: dict | None = None, retries: int = MAX_ATTEMPTS, final: bool = False
+    ) -> dict:
+        """GET path, retrying throttles and server errors.
+
+        Retries wait as long as KalshiClient's (download.client.backoff_seconds):
+        the server's Retry-After, else exponential backoff.
+
+        A 404 is an empty result. Any other failure, including running out of
+        retries, raises CandleRequestError, so no window is taken as empty
+        when it was never fetched.
+
+        final marks the response as never changing (e.g. candlesticks of a
+        finalized market), so the cache keeps it indefinitely.
+        """
+        if self.cache is not None and (cached := await self.cache.aget(path, params)) is not None:
+            self.telemetry.record_records(path, len(cached.get("candlesticks", [])))
+            return cached
         full_path = API_PREFIX + path
+        loop = asyncio.get_running_loop()
         for attempt in range(retries):
-            async with self._lock:
-                now = time.monotonic()
-                wait = self._min_interval - (now - self._last_request)
-                if wait > 0:
-                    await asyncio.sleep(wait)
-                self._last_request = time.monotonic()
+            start = time.perf_counter()
+            await self.rate_limiter.acquire()
+            queued = time.perf_counter()
 
             ts = str(int(datetime.datetime.now().timestamp() * 1000))
+            signature = await loop.run_in_executor(
+                self._sign_pool, self._sign, ts, "GET", full_path
+            )
             headers = {
                 "KALSHI-ACCESS-KEY": self.api_key_id,
-                "KALSHI-ACCESS-SIGNATURE": self._sign(ts, "GET", full_path),
+                "KALSHI-ACCESS-SIGNATURE": signature,
                 "KALSHI-ACCESS-TIMESTAMP": ts,
             }
+            signed = time.perf_counter()
             try:
                 resp = await self._client.get(
-                    BASE_URL + full_path, headers=headers, params=params
+                    self.base_url + full_path, headers=headers, params=params
                 )
+                received = time.perf_counter()
                 self.request_count += 1
 
                 if resp.status_code == 200:
-                    return resp.json()
-                elif resp.status_code == 429:
+                    self.rate_limiter.succeeded()
+                    data = resp.json()
+                    self.telemetry.record_request(
+                        path,
+                        resp.status_code,
+                        limiter=queued - start,
+                        sign=signed - queued,
+                        network=received - signed,
+                        decode=time.perf_counter() - received,
+                        nbytes=resp.num_bytes_downloaded,
+                    )
+                    self.telemetry.record_records(path, len(data.get("candlesticks", [])))
+                    if self.cache is not None:
+                        await self.cache.aput(path, params, data, final=final)
+                    return data
+                self.telemetry.record_request(
+                    path,
+                    resp.status_code,
+                    limiter=queued - start,
+                    sign=signed - queued,
+                    network=received - signed,
+                    nbytes=resp.num_bytes_downloaded,
+                )
+                if resp.status_code == 429:
+                    # The limiter slows every worker down; this one also waits.
                     self.rate_limit_count += 1
-                    wait_time = min(2 ** attempt, 30)
-                    logger.warning("Rate limited (attempt %d), waiting %ds", attempt + 1, wait_time)
+                    self.rate_limiter.throttled(retry_after_seconds(resp))
+                    wait_time = backoff_seconds(attempt + 1, resp)
+                    logger.warning("Rate limited (attempt %d), rate now %.1f/s, waiting %.1fs", attempt + 1, self.rate_limiter.rate, wait_time)
                     await asyncio.sleep(wait_time)
                 elif resp.status_code in (500, 502, 503, 504):
                     self.error_count += 1
-                    wait_time = min(2 ** attempt, 60)
-                    logger.warning("Server error %d (attempt %d), waiting %ds", resp.status_code, attempt + 1, wait_time)
+                    self.rate_limiter.throttled(retry_after_seconds(resp))
+                    wait_time = backoff_seconds(attempt + 1, resp)
+                    logger.warning("Server error %d (attempt %d), waiting %.1fs", resp.status_code, attempt + 1, wait_time)
                     await asyncio.sleep(wait_time)
                 elif resp.status_code == 404:
+                    if self.cache is not None:
+                        await self.cache.aput(path, params, {"candlesticks": []}, final=final)
                     return {"candlesticks": []}
                 else:
                     self.error_count += 1
-                    logger.error("Unexpected status %d: %s", resp.status_code, resp.text[:200])
-                    return {"candlesticks": []}
+                    raise CandleRequestError(
+                        f"Unexpected status {resp.status_code} for {path}: {resp.text[:200]}"
+                    )
             except (httpx.ConnectError, httpx.ReadTimeout, httpx.WriteTimeout) as e:
                 self.error_count += 1
-                wait_time = min(2 ** attempt, 60)
-                logger.warning("Connection error (attempt %d): %s, waiting %ds", attempt + 1, e, wait_time)
+                self.telemetry.record_request(
+                    path,
+                    "error",
+                    limiter=queued - start,
+                    sign=signed - queued,
+                    network=time.perf_counter() - signed,
+                )
+                wait_time = backoff_seconds(attempt + 1)
+                logger.warning("Connection error (attempt %d): %s, waiting %.1fs", attempt + 1, e, wait_time)
                 await asyncio.sleep(wait_time)
 
-        logger.error("All retries exhausted for %s", path)
-        return {"candlesticks": []}
+        raise CandleRequestError(f"All {retries} retries exhausted for {path}")
 
 
 class ProgressTracker:
-    """Tracks download progress and writes status to a JSON file."""
-
-    def __init__(self, total_markets: int, resumed_markets: int = 0):
+    """Tracks download progress and writes status to a JSON file.
+
+    Coverage is reported both as a share of markets and as a share of the
+    scheduled markets' contract volume. With status_file=None the status is
+    only kept in memory (see as_dict), as coordinated workers do. The
+    client's telemetry is included and also written next to the status
+    file in Prometheus format (metrics.prom).
+    """
+
+    def __init__(
+        self,
+        total_markets: int,
+        resumed_markets: int = 0,
+        total_volume: float = 0.0,
+        resumed_volume: float = 0.0,
+        status_file: Path | None = STATUS_FILE,
+    ):
         self.total_markets = total_markets
         self.completed_markets = resumed_markets
         self.resumed_markets = resumed_markets
+        self.total_volume = total_volume
+        self.completed_volume = resumed_volume
         self.total_candles = 0
         self.empty_markets = 0
+        self.failed_markets = 0
         self.start_time = time.time()
         self.last_update = time.time()
         self.status = "running"
@@ -150,11 +288,19 @@ class ProgressTracker:
         self.errors = 0
         self.rate_limits = 0
         self.requests = 0
-        STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        self.request_rate = 0.0
+        self.write_stats: WriteStats | None = None
+        self.telemetry: Telemetry | None = None
+        self.status_file = status_file
+        if status_file is not None:
+            status_file.parent.mkdir(parents=True, exist_ok=True)
         self._write()
 
-    def update(self, ticker: str, candle_count: int, client: AuthenticatedClient):
+    def update(
+        self, ticker: str, candle_count: int, client: AuthenticatedClient, volume: float = 0.0
+    ):
         self.completed_markets += 1
+        self.completed_volume += volume
         self.total_candles += candle_count
         if candle_count == 0:
             self.empty_markets += 1
@@ -162,171 +308,333 @@ class ProgressTracker:
         self.errors = client.error_count
         self.rate_limits = client.rate_limit_count
         self.requests = client.request_count
+        self.request_rate = client.rate_limiter.rate
+        self.telemetry = client.telemetry
         now = time.time()
         if now - self.last_update > 1.0 or self.completed_markets == self.total_markets:
             self.last_update = now
             self._write()
 
+    def fail(self, ticker: str, client: AuthenticatedClient):
+        """Count a market left incomplete; it is fetched again by the next run."""
+        self.failed_markets += 1
+        self.current_ticker = ticker
+        self.errors = client.error_count
+        self.requests = client.request_count
+
     def finish(self, status: str = "completed"):
         self.status = status
         self._write()
 
     def _write(self):
+        if self.status_file is not None:
+            self.status_file.write_text(json.dumps(self.as_dict(), indent=2))
+            if self.telemetry is not None:
+                self.telemetry.write_prometheus(self.status_file.with_name(METRICS_FILE))
+
+    def as_dict(self) -> dict[str, Any]:
         elapsed = time.time() - self.start_time
         downloaded_this_session = self.completed_markets - self.resumed_markets
         rate = downloaded_this_session / elapsed if elapsed > 0 else 0
         remaining = self.total_markets - self.completed_markets
         eta_seconds = remaining / rate if rate > 0 else 0
 
-        data = {
+        return {
             "status": self.status,
             "total_markets": self.total_markets,
             "completed_markets": self.completed_markets,
             "total_candles": self.total_candles,
             "empty_markets": self.empty_markets,
+            "failed_markets": self.failed_markets,
             "percent_complete": round(self.completed_markets / self.total_markets * 100, 2) if self.total_markets > 0 else 0,
+            "total_volume": self.total_volume,
+            "completed_volume": self.completed_volume,
+            "volume_percent_complete": round(self.completed_volume / self.total_volume * 100, 2) if self.total_volume > 0 else 0,
             "elapsed_seconds": round(elapsed, 1),
             "eta_seconds": round(eta_seconds, 1),
             "markets_per_second": round(rate, 1),
             "requests": self.requests,
             "errors": self.errors,
             "rate_limits": self.rate_limits,
+            "request_rate": round(self.request_rate, 1),
+            "writes": self.write_stats.as_dict() if self.write_stats else None,
+            "telemetry": self.telemetry.as_dict() if self.telemetry else None,
             "current_ticker": self.current_ticker,
             "started_at": datetime.datetime.fromtimestamp(self.start_time).isoformat(),
             "updated_at": datetime.datetime.now().isoformat(),
         }
-        STATUS_FILE.write_text(json.dumps(data, indent=2))
 
 
-class CandleWriter:
-    """Buffers and writes candlestick records to chunked parquet files."""
+@dataclass
+class MarketSpan:
+    """Consecutive candles of one market in a CandleWriter buffer.
 
-    def __init__(self):
-        self.output_dir = OUTPUT_DIR
+    next_start_ts is where the market's next request window starts, or None
+    once these are its last candles.
+    """
+
+    ticker: str
+    series_ticker: str
+    period_interval: int
+    count: int
+    next_start_ts: int | None = None
+
+
+class CandleWriter:
+    """Buffers and writes candlestick records to chunked parquet files.
+
+    A ticker is only committed as completed in the checkpoint store once all
+    of its candles are in a parquet file, so an interrupted download
+    re-fetches any market that was still buffered. Buffers are flushed at
+    request-window boundaries, which keeps this true however markets
+    arrive. A market fetched over several windows has its progress (the
+    next window start) committed with each file, so a resumed run picks up
+    after the last window on disk. Files are encoded and written on a
+    background thread, which commits the file and its tickers in one
+    transaction after each write.
+
+    Files are named <prefix>_<n>.parquet; processes sharing output_dir
+    need distinct prefixes.
+    """
+
+    def __init__(
+        self,
+        checkpoints: CheckpointStore,
+        output_dir: Path = OUTPUT_DIR,
+        prefix: str = "candles",
+        telemetry: Telemetry = TELEMETRY,
+    ):
+        self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.checkpoints = checkpoints
         self._buffer: list[dict] = []
+        self._markets: list[MarketSpan] = []
         self._file_counter = 0
         self._total = 0
+        self.write_queue = WriteQueue(name="candles-writer", telemetry=telemetry)
 
-        existing = sorted(self.output_dir.glob("candles_*.parquet"))
+        existing = sorted(self.output_dir.glob(f"{prefix}_*.parquet"))
         if existing:
             last_num = int(existing[-1].stem.split("_")[-1])
             self._file_counter = last_num + 1
 
-    def add(self, ticker: str, series_ticker: str, records: list[dict]):
-        for r in records:
-            r["ticker"] = ticker
-            r["series_ticker"] = series_ticker
+    async def add(
+        self,
+        ticker: str,
+        series_ticker: str,
+        records: list[dict],
+        period_interval: int = 1440,
+        next_start_ts: int | None = None,
+    ):
+        """Buffer one request window of a market's candles.
+
+        next_start_ts is the start of the market's next window, or None if
+        this was its last.
+        """
+        if not records and next_start_ts is not None:
+            return
+        # An empty last window still gets a span, so the market is only
+        # marked completed with the file holding its earlier windows.
         self._buffer.extend(records)
-        while len(self._buffer) >= CHUNK_SIZE:
-            self._flush(self._buffer[:CHUNK_SIZE])
-            self._buffer = self._buffer[CHUNK_SIZE:]
-
-    def finish(self):
+        self._markets.append(
+            MarketSpan(ticker, series_ticker, period_interval, len(records), next_start_ts)
+        )
+        if len(self._buffer) >= CHUNK_SIZE:
+            await self._flush_buffer()
+
+    async def finish(self):
+        if self._markets:
+            await self._flush_buffer()
+        await self.write_queue.drain()
+        self.checkpoints.commit()
+        logger.info("Candle write stats: %s", self.write_queue.stats.as_dict())
+
+    async def _flush_buffer(self):
+        path = None
         if self._buffer:
-            self._flush(self._buffer)
-            self._buffer = []
-
-    def _flush(self, records: list[dict]):
-        flat = []
-        for r in records:
-            row = {
-                "ticker": r["ticker"],
-                "series_ticker": r["series_ticker"],
-                "end_period_ts": r.get("end_period_ts"),
-                "volume": r.get("volume"),
-                "volume_fp": r.get("volume_fp"),
-                "open_interest": r.get("open_interest"),
-                "open_interest_fp": r.get("open_interest_fp"),
-            }
-            for section in ("price", "yes_bid", "yes_ask"):
-                s = r.get(section, {}) or {}
-                for field in ("open", "high", "low", "close", "open_dollars", "high_dollars", "low_dollars", "close_dollars"):
-                    row[f"{section}_{field}"] = s.get(field)
-            price = r.get("price", {}) or {}
-            for field in ("mean", "mean_dollars", "previous", "previous_dollars", "min", "min_dollars", "max", "max_dollars"):
-                row[f"price_{field}"] = price.get(field)
-            flat.append(row)
-
-        table = pa.Table.from_pylist(flat)
-        path = self.output_dir / f"candles_{self._file_counter:06d}.parquet"
-        pq.write_table(table, path, compression="snappy")
-        self._file_counter += 1
-        self._total += len(flat)
-        logger.debug("Wrote %d candle records to %s (total: %d)", len(flat), path, self._total)
-
-
-def load_market_list(min_volume: int = 0, open_after: str | None = None) -> list[tuple[str, str]]:
-    """Load (series_ticker, market_ticker) pairs from parquet files."""
-    import duckdb
-    con = duckdb.connect()
-    where = f"m.volume >= {min_volume}"
-    if open_after:
-        where += f" AND m.open_time >= '{open_after}'"
-    df = con.execute(f"""
-        SELECT DISTINCT e.series_ticker, m.ticker
-        FROM 'data/markets/*.parquet' m
-        JOIN 'data/events/*.parquet' e ON m.event_ticker = e.event_ticker
-        WHERE e.series_ticker IS NOT NULL AND e.series_ticker != ''
-          AND {where}
-        ORDER BY m.volume DESC
-    """).df()
-    return list(zip(df["series_ticker"], df["ticker"]))
-
-
-def load_completed_tickers() -> set[str]:
-    """Load tickers already downloaded from existing parquet files."""
-    completed_file = OUTPUT_DIR / "completed_tickers.txt"
-    if completed_file.exists():
-        return set(completed_file.read_text().strip().split("\n"))
-    return set()
-
-
-def save_completed_ticker(ticker: str):
-    completed_file = OUTPUT_DIR / "completed_tickers.txt"
-    with open(completed_file, "a") as f:
-        f.write(ticker + "\n")
+            path = self.output_dir / f"{self.prefix}_{self._file_counter:06d}.parquet"
+            self._file_counter += 1
+        await self.write_queue.submit(self._write, self._buffer, self._markets, path)
+        self._buffer = []
+        self._markets = []
+
+    def _write(self, records: list[dict], markets: list[MarketSpan], path: Path | None):
+        if path is not None:
+            self._flush(records, markets, path)
+            self.checkpoints.record_files(COMPLETED_NAMESPACE, [(path, len(records))])
+        for span in markets:
+            if span.next_start_ts is None:
+                self.checkpoints.mark_completed(COMPLETED_NAMESPACE, [span.ticker])
+                self.checkpoints.delete_state(progress_key(span.ticker))
+            else:
+                self.checkpoints.set_state(
+                    progress_key(span.ticker), {"start_ts": span.next_start_ts}
+                )
+        self.checkpoints.commit()
+
+    def _flush(self, records: list[dict], markets: list[MarketSpan], path: Path):
+        table = flatten_candles(records, markets)
+        DEFAULT_WRITER_CONFIG.write_table(table, path)
+        self._total += table.num_rows
+        logger.debug("Wrote %d candle records to %s (total: %d)", table.num_rows, path, self._total)
+
+
+def progress_key(ticker: str) -> str:
+    """Checkpoint state key of a partly downloaded market."""
+    return f"{COMPLETED_NAMESPACE}/{ticker}"
+
+
+def flatten_candles(records: list[dict], markets: list[MarketSpan]) -> pa.Table:
+    """Convert nested API candles to a flat table with CANDLES_COLUMNS.
+
+    records are the candles of consecutive spans, in the order of markets.
+    The payloads are converted in one call with the declared struct schema
+    and the struct columns are flattened by Arrow. A fractional price or
+    volume is nulled and logged by records_to_batch rather than truncated
+    into its integer column.
+    """
+    table = pa.Table.from_batches([records_to_batch(records, "candles")]).flatten()
+    table = table.rename_columns([name.replace(".", "_") for name in table.column_names])
+    markets = [m for m in markets if m.count]
+    run_ends = pa.array(list(accumulate(m.count for m in markets)), pa.int32())
+    columns = {
+        "ticker": pa.array([m.ticker for m in markets], pa.string()),
+        "series_ticker": pa.array([m.series_ticker for m in markets], pa.string()),
+        "period_interval": pa.array([m.period_interval for m in markets], pa.int16()),
+    }
+    for name, values in columns.items():
+        runs = pa.RunEndEncodedArray.from_arrays(run_ends, values)
+        table = table.append_column(name, pc.run_end_decode(runs))
+    # Fields the candles schema does not declare follow the declared columns.
+    extra = [name for name in table.column_names if name not in CANDLES_COLUMNS]
+    return table.select(CANDLES_COLUMNS + extra)
+
+
+def open_checkpoints(output_dir: Path = OUTPUT_DIR, wal: bool = True) -> CheckpointStore:
+    """Open the candle checkpoint store, importing a legacy completed_tickers.txt."""
+    store = CheckpointStore(output_dir / CHECKPOINT_FILE, wal=wal)
+    import_completed_file(store, COMPLETED_NAMESPACE, output_dir / "completed_tickers.txt")
+    return store
+
+
+async def download_market(
+    client: AuthenticatedClient,
+    writer: CandleWriter,
+    tracker: ProgressTracker,
+    task: CandleTask,
+    resume_ts: int | None = None,
+):
+    """Fetch a market's candles window by window, from resume_ts if given.
+
+    If a request fails, the windows fetched so far are still committed with
+    the failed window as the market's resume point, and the market is
+    counted as failed rather than completed.
+    """
+    path = f"/series/{task.series_ticker}/markets/{task.ticker}/candlesticks"
+    windows = task.windows(resume_ts)
+    count = 0
+    try:
+        for i, (start_ts, end_ts) in enumerate(windows):
+            data = await client.get(
+                path,
+                params={
+                    "start_ts": start_ts,
+                    "end_ts": end_ts,
+                    "period_interval": task.period_interval,
+                },
+                final=task.final,
+            )
+            candles = data.get("candlesticks", [])
+            next_start = windows[i + 1][0] if i + 1 < len(windows) else None
+            await writer.add(
+                task.ticker, task.series_ticker, candles, task.period_interval, next_start
+            )
+            count += len(candles)
+        if not windows:
+            await writer.add(task.ticker, task.series_ticker, [], task.period_interval)
+        tracker.update(task.ticker, count, client, task.volume)
+    except Exception as e:
+        logger.error("Error downloading %s: %s", task.ticker, e)
+        tracker.fail(task.ticker, client)
 
 
 async def download_candlesticks(
     min_volume: int = 0,
     rate_limit: float = 18.0,
-    period_interval: int = 1440,
+    period_interval: int | None = None,
     open_after: str | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    burst: float = DEFAULT_BURST,
+    cache_mode: str = DEFAULT_MODE,
+    coverage: float = 1.0,
+    minute_volume: float = DEFAULT_MINUTE_VOLUME,
 ):
-    """Main download loop."""
+    """Main download loop.
+
+    Markets are scheduled by download.candle_schedule: highest volume first,
+    each at its own resolution over its own open-to-close window, up to the
+    coverage share of total volume. concurrency workers pull markets from a
+    shared queue, so up to that many requests are in flight while the
+    client's limiter spaces their starts to rate_limit per second.
+    With cache_mode "use", responses go through the HTTP cache in
+    data/.http_cache (see download.http_cache); finalized markets' candles
+    are cached for good, so re-runs only fetch markets still trading.
+    """
     os.chdir("/home/workspace/kalshi-analysis")
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
     logger.info("Loading market list (min_volume=%d, open_after=%s)...", min_volume, open_after)
-    all_pairs = load_market_list(min_volume, open_after=open_after)
-    logger.info("Found %d markets with series tickers", len(all_pairs))
-
-    completed = load_completed_tickers()
-    pairs = [(s, t) for s, t in all_pairs if t not in completed]
-    logger.info("Resuming: %d already done, %d remaining", len(completed), len(pairs))
-
-    resumed = len(completed & set(t for _, t in all_pairs))
-    tracker = ProgressTracker(total_markets=len(all_pairs), resumed_markets=resumed)
-    writer = CandleWriter()
+    all_tasks = load_candle_tasks(
+        Path("data"),
+        min_volume=min_volume,
+        open_after=open_after,
+        minute_volume=minute_volume,
+        period_interval=period_interval,
+    )
+    scheduled = select_coverage(all_tasks, coverage)
+    logger.info(
+        "Found %d markets with series tickers; scheduling %d (%d at 1-minute resolution)",
+        len(all_tasks),
+        len(scheduled),
+        sum(t.period_interval == MINUTE for t in scheduled),
+    )
 
-    async with AuthenticatedClient(rate_limit=rate_limit) as client:
-        for series_ticker, ticker in pairs:
-            try:
-                data = await client.get(
-                    f"/series/{series_ticker}/markets/{ticker}/candlesticks",
-                    params={"start_ts": 1609459200, "end_ts": int(time.time()), "period_interval": period_interval},
-                )
-                candles = data.get("candlesticks", [])
-                if candles:
-                    writer.add(ticker, series_ticker, candles)
-                tracker.update(ticker, len(candles), client)
-                save_completed_ticker(ticker)
-            except Exception as e:
-                logger.error("Error downloading %s: %s", ticker, e)
-                tracker.update(ticker, 0, client)
-
-    writer.finish()
+    checkpoints = open_checkpoints()
+    completed = checkpoints.completed(COMPLETED_NAMESPACE)
+    tasks = [t for t in scheduled if t.ticker not in completed]
+    logger.info("Resuming: %d already done, %d remaining", len(scheduled) - len(tasks), len(tasks))
+
+    total_volume = sum(t.volume for t in scheduled)
+    tracker = ProgressTracker(
+        total_markets=len(scheduled),
+        resumed_markets=len(scheduled) - len(tasks),
+        total_volume=total_volume,
+        resumed_volume=total_volume - sum(t.volume for t in tasks),
+    )
+    writer = CandleWriter(checkpoints)
+    tracker.write_stats = writer.write_queue.stats
+    cache = await asyncio.to_thread(open_cache, Path("data"), cache_mode)
+    queue = iter(tasks)
+
+    async def worker(client: AuthenticatedClient):
+        # Workers share one iterator; each next() happens between awaits.
+        for task in queue:
+            progress = checkpoints.get_state(progress_key(task.ticker))
+            resume_ts = progress["start_ts"] if progress else None
+            await download_market(client, writer, tracker, task, resume_ts)
+
+    async with (
+        create_http_client() as http_client,
+        AuthenticatedClient(
+            rate_limit=rate_limit, burst=burst, http_client=http_client, cache=cache
+        ) as client,
+    ):
+        await asyncio.gather(*(worker(client) for _ in range(max(1, concurrency))))
+
+    await asyncio.to_thread(cache.close)
+    await writer.finish()
+    checkpoints.close()
     tracker.finish("completed")
     logger.info(
         "Done! %d markets, %d candles, %d requests",
@@ -344,11 +652,16 @@ def main():
         datefmt="%H:%M:%S",
     )
 
-    parser = argparse.ArgumentParser(description="Download Kalshi daily candlestick data")
+    parser = argparse.ArgumentParser(description="Download Kalshi candlestick data")
     parser.add_argument("--min-volume", type=int, default=0, help="Minimum market volume to include")
     parser.add_argument("--rate-limit", type=float, default=18.0, help="Requests per second")
-    parser.add_argument("--period", type=int, default=1440, choices=[1, 60, 1440], help="Candle period in minutes")
+    parser.add_argument("--burst", type=float, default=DEFAULT_BURST, help="Requests an idle client may send at once")
+    parser.add_argument("--period", type=int, default=None, choices=[1, 60, 1440], help="Candle period in minutes for every market (default: by volume and category)")
+    parser.add_argument("--coverage", type=float, default=1.0, help="Share of total volume to download, largest markets first")
+    parser.add_argument("--minute-volume", type=float, default=DEFAULT_MINUTE_VOLUME, help="Volume from which non-sports markets get 1-minute candles")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests kept in flight")
     parser.add_argument("--open-after", type=str, default=None, help="Only include markets opened on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--http-cache", choices=MODES, default=DEFAULT_MODE, help="Response cache mode (see download.http_cache)")
     args = parser.parse_args()
 
     asyncio.run(download_candlesticks(
@@ -356,6 +669,11 @@ def main():
         rate_limit=args.rate_limit,
         period_interval=args.period,
         open_after=args.open_after,
+        concurrency=args.concurrency,
+        burst=args.burst,
+        cache_mode=args.http_cache,
+        coverage=args.coverage,
+        minute_volume=args.minute_volume,
     ))
 
 
@@ -0,0 +1,167 @@
+"""SQLite checkpoint store for download progress.
+
+CheckpointStore keeps all download progress in one SQLite database in WAL
+mode:
+
+- state: JSON per key (pagination cursors, sync high-water marks)
+- completed: finished keys per namespace (e.g. candlestick tickers), with an
+  indexed membership check
+- files: chunk files written, by dataset, with their row counts
+
+Writes are staged in memory and applied in one transaction by commit(), so
+callers commit at points where the matching data is on disk: after a writer
+flush for cursors, after a file write for completed tickers.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "checkpoints.db"
+# How long a write waits for another process's transaction to finish.
+BUSY_TIMEOUT_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completed (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    dataset TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    written_at REAL NOT NULL,
+    PRIMARY KEY (dataset, path)
+) WITHOUT ROWID;
+"""
+
+
+class CheckpointStore:
+    """Batched, crash-safe progress store backed by SQLite (WAL mode).
+
+    Safe to share between the event loop and background writer threads, and
+    between processes (see download.candle_coordinator).
+
+    Args:
+        path: Database file; created along with its directory if missing.
+        wal: Use WAL mode. WAL needs every process on one host; pass False
+            for a rollback journal when processes on several machines share
+            the file over a network filesystem.
+    """
+
+    def __init__(self, path: Path, wal: bool = True):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+        # WAL with synchronous=NORMAL survives process crashes; only an OS
+        # crash can lose the last commits, which are then re-downloaded.
+        self._conn.execute(f"PRAGMA synchronous = {'NORMAL' if wal else 'FULL'}")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._state: dict[str, dict[str, Any] | None] = {}
+        self._completed: list[tuple[str, str]] = []
+        self._files: list[tuple[str, str, int]] = []
+
+    def set_state(self, key: str, value: dict[str, Any]) -> None:
+        """Stage a JSON state value for key."""
+        with self._lock:
+            self._state[key] = value
+
+    def delete_state(self, key: str) -> None:
+        """Stage removal of key's state."""
+        with self._lock:
+            self._state[key] = None
+
+    def get_state(self, key: str) -> dict[str, Any] | None:
+        """State for key, including staged but uncommitted changes."""
+        with self._lock:
+            if key in self._state:
+                return self._state[key]
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_completed(self, namespace: str, keys: Iterable[str]) -> None:
+        """Stage keys as completed in namespace."""
+        with self._lock:
+            self._completed.extend((namespace, k) for k in keys)
+
+    def is_completed(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            if (namespace, key) in self._completed:
+                return True
+            row = self._conn.execute(
+                "SELECT 1 FROM completed WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row is not None
+
+    def completed(self, namespace: str) -> set[str]:
+        """All committed keys in namespace."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM completed WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def record_files(self, dataset: str, files: Iterable[tuple[Path, int]]) -> None:
+        """Stage (path, rows) entries for chunk files written to dataset."""
+        with self._lock:
+            self._files.extend((dataset, str(path), rows) for path, rows in files)
+
+    def commit(self) -> None:
+        """Apply every staged change in one transaction."""
+        with self._lock:
+            if not (self._state or self._completed or self._files):
+                return
+            now = time.time()
+            with self._conn:
+                self._conn.execute("BEGIN")
+                for key, value in self._state.items():
+                    if value is None:
+                        self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+                    else:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO state VALUES (?, ?, ?)",
+                            (key, json.dumps(value), now),
+                        )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO completed VALUES (?, ?)", self._completed
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    [(*f, now) for f in self._files],
+                )
+            self._state.clear()
+            self._completed.clear()
+            self._files.clear()
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+
+def import_completed_file(store: CheckpointStore, namespace: str, path: Path) -> int:
+    """Import a legacy one-key-per-line completion file, then rename it away."""
+    if not path.exists():
+        return 0
+    keys = [k for k in path.read_text().split("\n") if k]
+    store.mark_completed(namespace, keys)
+    store.commit()
+    path.rename(path.with_name(path.name + ".imported"))
+    logger.info("Imported %d completed %s from %s", len(keys), namespace, path)
+    return len(keys)
@@ -3,15 +3,36 @@
 import asyncio
 import logging
 import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
 from pathlib import Path
 
 import click
 
-from download.client import KalshiClient
+from download.client import DEFAULT_BURST, KalshiClient, RateLimiter, create_http_client
+from download.compact import (
+    DEFAULT_ROW_GROUP_SIZE,
+    DEFAULT_ROWS_PER_FILE,
+    PARTITION_FIELDS,
+    SORT_KEYS,
+    compact_dataset,
+)
 from download.events import download_events
-from download.markets import download_markets
+from download.http_cache import DEFAULT_MODE, MODES, CacheMissError, open_cache
+from download.manifest import sync_manifest
+from download.markets import download_markets, refresh_markets
+from download.normalize import normalize_dataset
 from download.series import download_series
-from download.trades import download_trades
+from download.splits import materialize_splits
+from download.telemetry import METRICS_FILE, MetricsExporter
+from download.trades import (
+    BACKFILL_START,
+    DEFAULT_BACKFILL_WINDOWS,
+    backfill_trades,
+    download_trades,
+    sync_trades,
+)
 
 DEFAULT_DATA_DIR = Path("data")
 
@@ -31,14 +52,58 @@ def setup_logging(verbose: bool = False) -> None:
               help="Directory to store downloaded data.")
 @click.option("--rate-limit", type=float, default=20.0,
               help="API requests per second (default: 20 for basic tier).")
+@click.option("--burst", type=float, default=DEFAULT_BURST,
+              help="Requests an idle client may send back to back before the rate applies.")
+@click.option("--http-cache", type=click.Choice(MODES), default=DEFAULT_MODE,
+              help="Response cache in DATA_DIR/.http_cache: off (default), use, replay "
+                   "(offline), record.")
+@click.option("--metrics-file", type=click.Path(path_type=Path), default=None,
+              help="Prometheus metrics written during downloads (default: DATA_DIR/metrics.prom).")
 @click.option("-v", "--verbose", is_flag=True, help="Enable debug logging.")
 @click.pass_context
-def cli(ctx: click.Context, data_dir: Path, rate_limit: float, verbose: bool) -> None:
+def cli(
+    ctx: click.Context,
+    data_dir: Path,
+    rate_limit: float,
+    burst: float,
+    http_cache: str,
+    metrics_file: Path | None,
+    verbose: bool,
+) -> None:
     """Download Kalshi market data for analysis."""
     setup_logging(verbose)
     ctx.ensure_object(dict)
     ctx.obj["data_dir"] = data_dir
-    ctx.obj["rate_limit"] = rate_limit
+    # One limiter for every client of the command: the API limit is per account.
+    ctx.obj["rate_limiter"] = RateLimiter(rate_limit, burst=burst)
+    ctx.obj["http_cache"] = http_cache
+    ctx.obj["metrics_file"] = metrics_file or data_dir / METRICS_FILE
+
+
+@asynccontextmanager
+async def _open_client(config: dict) -> AsyncIterator[KalshiClient]:
+    """KalshiClient for the group options, with the response cache open around it.
+
+    The client runs on one pooled HTTP client (create_http_client) and the
+    group's rate limiter, both shared by every download of the command. Telemetry is exported to the metrics file
+    while the client is open.
+    """
+    cache = await asyncio.to_thread(open_cache, config["data_dir"], config["http_cache"])
+    try:
+        async with (
+            MetricsExporter(config["metrics_file"]),
+            create_http_client() as http_client,
+            KalshiClient(
+                http_client=http_client,
+                cache=cache,
+                rate_limiter=config["rate_limiter"],
+            ) as client,
+        ):
+            yield client
+    except CacheMissError as e:
+        raise click.ClickException(f"Replay mode: {e}") from e
+    finally:
+        await asyncio.to_thread(cache.close)
 
 
 @cli.command()
@@ -51,9 +116,8 @@ def all(ctx: click.Context, no_resume: bool) -> None:
 
 async def _download_all(config: dict, resume: bool = True) -> None:
     data_dir = config["data_dir"]
-    rate_limit = config["rate_limit"]
 
-    async with KalshiClient(rate_limit=rate_limit) as client:
+    async with _open_client(config) as client:
         # Small datasets first
         n = await download_series(client, data_dir)
         click.echo(f"Series: {n} records")
@@ -88,10 +152,18 @@ def events(ctx: click.Context, no_resume: bool) -> None:
 
 @cli.command()
 @click.option("--no-resume", is_flag=True, help="Start fresh, ignoring saved cursors.")
+@click.option("--refresh", is_flag=True,
+              help="Only re-fetch open and new markets, into a delta file.")
 @click.pass_context
-def markets(ctx: click.Context, no_resume: bool) -> None:
+def markets(ctx: click.Context, no_resume: bool, refresh: bool) -> None:
     """Download market metadata."""
-    asyncio.run(_download_one(ctx.obj, "markets", resume=not no_resume))
+    if not refresh:
+        asyncio.run(_download_one(ctx.obj, "markets", resume=not no_resume))
+        return
+    try:
+        asyncio.run(_download_one(ctx.obj, "markets_refresh"))
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
 
 
 @cli.command()
@@ -102,20 +174,179 @@ def trades(ctx: click.Context, no_resume: bool) -> None:
     asyncio.run(_download_one(ctx.obj, "trades", resume=not no_resume))
 
 
+@cli.command()
+@click.pass_context
+def sync(ctx: click.Context) -> None:
+    """Append trades newer than the stored ones (incremental refresh)."""
+    try:
+        asyncio.run(_sync_trades(ctx.obj))
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+
+
+async def _sync_trades(config: dict) -> None:
+    async with _open_client(config) as client:
+        n = await sync_trades(client, config["data_dir"])
+    click.echo(f"Trades: {n} new records")
+
+
+@cli.command()
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), default=BACKFILL_START.strftime("%Y-%m-%d"),
+              help="First day to download (UTC).")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Day to stop before (UTC, default: now).")
+@click.option("--windows", type=int, default=DEFAULT_BACKFILL_WINDOWS,
+              help="Time windows paged concurrently.")
+@click.option("--no-resume", is_flag=True, help="Start fresh, ignoring saved window cursors.")
+@click.pass_context
+def backfill(
+    ctx: click.Context, start: datetime, end: datetime | None, windows: int, no_resume: bool
+) -> None:
+    """Download historical trades as concurrent time windows."""
+    try:
+        asyncio.run(_backfill_trades(
+            ctx.obj,
+            start.replace(tzinfo=UTC),
+            end.replace(tzinfo=UTC) if end else None,
+            windows,
+            resume=not no_resume,
+        ))
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+
+
+async def _backfill_trades(
+    config: dict, start: datetime, end: datetime | None, windows: int, resume: bool
+) -> None:
+    async with _open_client(config) as client:
+        n = await backfill_trades(
+            client, config["data_dir"], start=start, end=end, windows=windows, resume=resume
+        )
+    click.echo(f"Trades: {n} records")
+
+
+@cli.command()
+@click.option("--dataset", type=click.Choice(sorted(SORT_KEYS)), default="trades",
+              help="Dataset directory to compact (default: trades).")
+@click.option("--rows-per-file", type=int, default=DEFAULT_ROWS_PER_FILE,
+              help="Target rows per compacted file.")
+@click.option("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE,
+              help="Rows per Parquet row group.")
+@click.option("--memory-limit", type=str, default=None,
+              help="DuckDB memory limit for the sort (e.g. '8GB').")
+@click.pass_context
+def compact(
+    ctx: click.Context,
+    dataset: str,
+    rows_per_file: int,
+    row_group_size: int,
+    memory_limit: str | None,
+) -> None:
+    """Merge small chunk files into large files sorted by (ticker, created_time).
+
+    Trades are compacted per year=YYYY/month=MM/ partition; running this on a
+    flat trades directory migrates it to the partitioned layout.
+    """
+    dataset_dir = ctx.obj["data_dir"] / dataset
+    if not dataset_dir.exists():
+        raise click.ClickException(f"Dataset directory not found: {dataset_dir}")
+    result = compact_dataset(
+        dataset_dir,
+        sort_keys=SORT_KEYS[dataset],
+        partition_field=PARTITION_FIELDS.get(dataset),
+        rows_per_file=rows_per_file,
+        row_group_size=row_group_size,
+        memory_limit=memory_limit,
+    )
+    click.echo(
+        f"Compacted {dataset}: {result.input_files} files -> {result.output_files} files "
+        f"({result.rows} rows)"
+    )
+
+
+@cli.command()
+@click.pass_context
+def normalize(ctx: click.Context) -> None:
+    """Convert stored trades to typed columns (cents, fixed-point counts, timestamps)."""
+    dataset_dir = ctx.obj["data_dir"] / "trades"
+    if not dataset_dir.exists():
+        raise click.ClickException(f"Dataset directory not found: {dataset_dir}")
+    files, rows = normalize_dataset(dataset_dir)
+    click.echo(f"Normalized trades: {files} files ({rows} rows)")
+
+
+@cli.command()
+@click.option("--dataset", type=click.Choice(["events", "markets", "series", "trades"]),
+              default="trades", help="Dataset directory to index (default: trades).")
+@click.pass_context
+def index(ctx: click.Context, dataset: str) -> None:
+    """Rebuild the per-file statistics manifest for a dataset directory.
+
+    Only files without a current manifest entry are read, so this is cheap to
+    re-run; it is needed once for data downloaded before manifests existed.
+    """
+    dataset_dir = ctx.obj["data_dir"] / dataset
+    if not dataset_dir.exists():
+        raise click.ClickException(f"Dataset directory not found: {dataset_dir}")
+    indexed = sync_manifest(dataset_dir)
+    click.echo(f"Indexed {dataset}: {indexed} files")
+
+
+@cli.command()
+@click.option("--validation-start", type=click.DateTime(["%Y-%m-%d"]), required=True,
+              help="First day of the validation split (UTC); train ends here.")
+@click.option("--test-start", type=click.DateTime(["%Y-%m-%d"]), required=True,
+              help="First day of the held-out test split (UTC); validation ends here.")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Drop trades before this day (UTC) from every split.")
+@click.option("--output-dir", type=click.Path(path_type=Path), default=None,
+              help="Where to write the splits (default: <data-dir>/../splits).")
+@click.pass_context
+def split(
+    ctx: click.Context,
+    validation_start: datetime,
+    test_start: datetime,
+    start: datetime | None,
+    output_dir: Path | None,
+) -> None:
+    """Write train and validation data directories that end at the given cutoffs.
+
+    Files entirely inside a split are hard-linked; only files straddling a
+    cutoff are rewritten.
+    """
+    data_dir = ctx.obj["data_dir"]
+    splits_dir = output_dir or data_dir.resolve().parent / "splits"
+    try:
+        results = materialize_splits(
+            data_dir,
+            splits_dir,
+            validation_start=validation_start.replace(tzinfo=UTC),
+            test_start=test_start.replace(tzinfo=UTC),
+            start=start.replace(tzinfo=UTC) if start else None,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    for r in results:
+        click.echo(
+            f"{r.name} (before {r.cutoff}): {r.linked} files linked, "
+            f"{r.rewritten} rewritten, {r.skipped} skipped"
+        )
+
+
 async def _download_one(config: dict, kind: str, resume: bool = True) -> None:
     data_dir = config["data_dir"]
-    rate_limit = config["rate_limit"]
 
     downloaders = {
         "series": lambda c, d: download_series(c, d),
         "events": lambda c, d: download_events(c, d, resume=resume),
         "markets": lambda c, d: download_markets(c, d, resume=resume),
+        "markets_refresh": lambda c, d: refresh_markets(c, d),
         "trades": lambda c, d: download_trades(c, d, resume=resume),
     }
 
-    async with KalshiClient(rate_limit=rate_limit) as client:
+    async with _open_client(config) as client:
         n = await downloaders[kind](client, data_dir)
-        click.echo(f"{kind.capitalize()}: {n} records")
+        click.echo(f"{kind.replace('_', ' ').capitalize()}: {n} records")
 
 
 def main() -> None:
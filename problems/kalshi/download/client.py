@@ -1,25 +1,45 @@
 """Kalshi API v2 client with rate limiting, retry, and cursor pagination."""
 
 import asyncio
+import importlib.util
 import logging
 import time
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Sequence
 from typing import Any
 
 import httpx
 from tenacity import (
+    RetryCallState,
     retry,
     retry_if_exception,
     stop_after_attempt,
-    wait_exponential,
 )
 
+from download.http_cache import ResponseCache
+from download.telemetry import TELEMETRY, Telemetry
+
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.elections.kalshi.com/trade-api/v2"
 
 # Basic tier: 20 reads/sec
 DEFAULT_RATE_LIMIT = 20
+# Requests an idle client may send back to back.
+DEFAULT_BURST = 5
+# Floor for adaptive backoff.
+MIN_RATE = 1.0
+# Attempts per request, and the longest wait between two of them.
+MAX_ATTEMPTS = 5
+MAX_BACKOFF = 60.0
+
+# Connections kept open for reuse. Sized for a few hundred req/s at typical
+# round trips; with HTTP/2 most requests multiplex over one connection.
+DEFAULT_POOL_LIMITS = httpx.Limits(
+    max_connections=32, max_keepalive_connections=32, keepalive_expiry=60.0
+)
+# HTTP/2 needs h2, installed with the httpx[http2] dependency; an environment
+# without it falls back to HTTP/1.1.
+HTTP2_SUPPORTED = importlib.util.find_spec("h2") is not None
 
 
 def _is_retryable(exc: BaseException) -> bool:
@@ -32,63 +52,217 @@ def _is_retryable(exc: BaseException) -> bool:
 
 
 class RateLimiter:
-    """Token-bucket rate limiter for API requests."""
+    """Token-bucket rate limiter with AIMD rate adaptation.
+
+    Tokens refill at `rate` per second up to `burst`, so an idle client may
+    send `burst` requests at once before settling to the steady rate. Each
+    acquire() takes a token immediately and, if the bucket is in debt, sleeps
+    until its slot comes up; no lock is held while sleeping, so concurrent
+    tasks reserve consecutive slots instead of queueing behind each other.
+
+    Callers report outcomes: throttled() (429 or 5xx) multiplies the rate by
+    `decrease` and empties the bucket; succeeded() adds back about
+    `increase` req/s per second of traffic, up to the configured maximum.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = DEFAULT_RATE_LIMIT,
+        burst: float = DEFAULT_BURST,
+        min_rate: float = MIN_RATE,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ):
+        self.max_rate = requests_per_second
+        self.min_rate = min(min_rate, requests_per_second)
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self._rate = requests_per_second
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._last_decrease = float("-inf")
 
-    def __init__(self, requests_per_second: float = DEFAULT_RATE_LIMIT):
-        self.rps = requests_per_second
-        self.min_interval = 1.0 / requests_per_second
-        self._lock = asyncio.Lock()
-        self._last_request: float = 0.0
+    @property
+    def rate(self) -> float:
+        """Current allowed requests per second."""
+        return self._rate
+
+    @property
+    def tokens(self) -> float:
+        """Tokens available now; negative while reservations are pending."""
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
 
     async def acquire(self) -> None:
-        async with self._lock:
-            now = time.monotonic()
-            elapsed = now - self._last_request
-            if elapsed < self.min_interval:
-                await asyncio.sleep(self.min_interval - elapsed)
-            self._last_request = time.monotonic()
+        self._refill()
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._rate)
+
+    def succeeded(self) -> None:
+        """Additively raise the rate after a successful request."""
+        if self._rate < self.max_rate:
+            self._refill()
+            self._rate = min(self.max_rate, self._rate + self.increase / self._rate)
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """Multiplicatively lower the rate after a 429 or 5xx response.
+
+        Responses to requests that were already in flight arrive together,
+        so the rate is cut at most once per second. retry_after, if the
+        server sent one, holds every caller back for that many seconds.
+        """
+        self._refill()
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self._last_decrease = now
+            self._rate = max(self.min_rate, self._rate * self.decrease)
+            logger.info("Rate limited; lowering request rate to %.1f/s", self._rate)
+        self._tokens = min(self._tokens, 0.0)
+        if retry_after:
+            self._tokens = min(self._tokens, -retry_after * self._rate)
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a numeric Retry-After header, if present."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, response: httpx.Response | None = None) -> float:
+    """Wait before retrying after failed attempt number `attempt` (1-based).
+
+    The server's Retry-After if it sent one, else 1, 2, 4, ... seconds, both
+    capped at MAX_BACKOFF.
+    """
+    retry_after = retry_after_seconds(response) if response is not None else None
+    if retry_after is not None:
+        return min(retry_after, MAX_BACKOFF)
+    return min(2.0 ** (attempt - 1), MAX_BACKOFF)
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    response = exc.response if isinstance(exc, httpx.HTTPStatusError) else None
+    return backoff_seconds(retry_state.attempt_number, response)
+
+
+def create_http_client(
+    timeout: float = 30.0,
+    transport: httpx.AsyncBaseTransport | None = None,
+    limits: httpx.Limits = DEFAULT_POOL_LIMITS,
+) -> httpx.AsyncClient:
+    """Pooled keep-alive HTTP client, using HTTP/2 when h2 is installed.
+
+    Pass one to both KalshiClient and the candlestick AuthenticatedClient to
+    share connections; whoever creates it closes it.
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout),
+        limits=limits,
+        http2=HTTP2_SUPPORTED,
+        headers={"Accept": "application/json"},
+        transport=transport,
+    )
 
 
 class KalshiClient:
-    """Async HTTP client for the Kalshi public API v2."""
+    """Async HTTP client for the Kalshi public API v2.
+
+    Uses http_client if given (see create_http_client), otherwise opens its
+    own pool for the duration of the async with block. Likewise uses
+    rate_limiter if given, so clients of one account can share it, otherwise
+    builds one from rate_limit and burst. With a cache (see
+    download.http_cache), cached responses are returned without a request.
+    Requests are recorded in telemetry (see download.telemetry).
+    """
 
     def __init__(
         self,
         base_url: str = BASE_URL,
         rate_limit: float = DEFAULT_RATE_LIMIT,
         timeout: float = 30.0,
+        burst: float = DEFAULT_BURST,
+        transport: httpx.AsyncBaseTransport | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        cache: ResponseCache | None = None,
+        telemetry: Telemetry = TELEMETRY,
+        rate_limiter: RateLimiter | None = None,
     ):
         self.base_url = base_url.rstrip("/")
-        self.rate_limiter = RateLimiter(rate_limit)
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter(rate_limit, burst=burst)
         self.timeout = timeout
+        self.transport = transport
+        self.telemetry = telemetry
+        self._shared_client = http_client
         self._client: httpx.AsyncClient | None = None
 
     async def __aenter__(self) -> "KalshiClient":
-        self._client = httpx.AsyncClient(
-            base_url=self.base_url,
-            timeout=httpx.Timeout(self.timeout),
-            headers={"Accept": "application/json"},
-        )
+        self._client = self._shared_client or create_http_client(self.timeout, self.transport)
         return self
 
     async def __aexit__(self, *args: Any) -> None:
-        if self._client:
+        if self._client and self._client is not self._shared_client:
             await self._client.aclose()
-            self._client = None
+        self._client = None
+        logger.debug("Telemetry: %s", self.telemetry.as_dict())
 
     @retry(
         retry=retry_if_exception(_is_retryable),
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=1, max=60),
+        stop=stop_after_attempt(MAX_ATTEMPTS),
+        wait=_retry_wait,
         reraise=True,
     )
     async def _get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         """Make a rate-limited GET request with retry."""
         assert self._client is not None, "Client not initialized. Use async with."
+        if self.cache is not None and (cached := await self.cache.aget(path, params)) is not None:
+            return cached
+        start = time.perf_counter()
         await self.rate_limiter.acquire()
-        response = await self._client.get(path, params=params)
-        response.raise_for_status()
-        return response.json()
+        sent = time.perf_counter()
+        try:
+            response = await self._client.get(self.base_url + path, params=params)
+        except httpx.TransportError:
+            self.telemetry.record_request(
+                path, "error", limiter=sent - start, network=time.perf_counter() - sent
+            )
+            raise
+        received = time.perf_counter()
+        if response.status_code in (429, 500, 502, 503, 504):
+            self.rate_limiter.throttled(retry_after_seconds(response))
+        elif response.is_success:
+            self.rate_limiter.succeeded()
+        if response.is_error:
+            self.telemetry.record_request(
+                path,
+                response.status_code,
+                limiter=sent - start,
+                network=received - sent,
+                nbytes=response.num_bytes_downloaded,
+            )
+            response.raise_for_status()
+        data = response.json()
+        self.telemetry.record_request(
+            path,
+            response.status_code,
+            limiter=sent - start,
+            network=received - sent,
+            decode=time.perf_counter() - received,
+            nbytes=response.num_bytes_downloaded,
+        )
+        if self.cache is not None:
+            await self.cache.aput(path, params, data)
+        return data
 
     async def paginate(
         self,
@@ -112,6 +286,7 @@ class KalshiClient:
             data = await self._get(path, params=request_params)
             records = data.get(response_key, [])
             cursor = data.get("cursor", "")
+            self.telemetry.record_records(path, len(records))
 
             if records:
                 yield records, cursor or None
@@ -125,10 +300,21 @@ class KalshiClient:
         self,
         limit: int = 1000,
         resume_cursor: str | None = None,
+        tickers: Sequence[str] | None = None,
+        min_created_ts: int | None = None,
     ) -> AsyncIterator[tuple[list[dict[str, Any]], str | None]]:
-        """Paginate through all markets."""
+        """Paginate through all markets.
+
+        tickers restricts the results to those markets; min_created_ts (unix
+        seconds) to markets created at or after it.
+        """
+        params: dict[str, Any] = {}
+        if tickers:
+            params["tickers"] = ",".join(tickers)
+        if min_created_ts is not None:
+            params["min_created_ts"] = min_created_ts
         async for batch, cursor in self.paginate(
-            "/markets", "markets", limit=limit, resume_cursor=resume_cursor
+            "/markets", "markets", params=params, limit=limit, resume_cursor=resume_cursor
         ):
             yield batch, cursor
 
@@ -153,11 +339,21 @@ class KalshiClient:
         ticker: str | None = None,
         limit: int = 1000,
         resume_cursor: str | None = None,
+        min_ts: int | None = None,
+        max_ts: int | None = None,
     ) -> AsyncIterator[tuple[list[dict[str, Any]], str | None]]:
-        """Paginate through trades. If ticker is provided, gets trades for that market."""
+        """Paginate through trades. If ticker is provided, gets trades for that market.
+
+        min_ts and max_ts (unix seconds, inclusive) restrict the results to
+        trades created in that range.
+        """
         params: dict[str, Any] = {}
         if ticker:
             params["ticker"] = ticker
+        if min_ts is not None:
+            params["min_ts"] = min_ts
+        if max_ts is not None:
+            params["max_ts"] = max_ts
         async for batch, cursor in self.paginate(
             "/markets/trades", "trades", params=params, limit=limit,
             resume_cursor=resume_cursor,
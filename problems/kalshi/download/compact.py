@@ -0,0 +1,221 @@
+"""Compact small chunk files into large, sorted Parquet files.
+
+The downloaders flush one 10K-row file per chunk, which leaves tens of
+thousands of tiny files behind. Every DuckDB glob over the dataset then pays
+for opening each footer. Compaction rewrites the chunks into a few hundred
+large files sorted by (ticker, created_time) and swaps them in atomically.
+
+Trades are compacted per month partition (year=YYYY/month=MM/). Running the
+compaction over a legacy flat trades directory therefore doubles as the
+one-time migration to the partitioned layout. Partition keys live only in
+the directory names; files are read with hive_partitioning off so they do
+not also end up as columns in the compacted files.
+
+Directories whose names start with an underscore are left alone. Market
+refreshes write updated rows to markets/_delta/, and readers let those win
+over the base files by path; merging them into the base files would leave
+two indistinguishable rows per refreshed ticker.
+
+Compaction is idempotent: running it again after new chunks land only
+rewrites the partitions that received new chunks. The dataset manifest is
+synced afterwards, indexing only the rewritten files.
+"""
+
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+import duckdb
+
+from download.manifest import sync_manifest
+
+logger = logging.getLogger(__name__)
+
+COMPACT_PREFIX = "compact"
+STAGING_SUFFIX = ".compacting"
+BACKUP_SUFFIX = ".precompact"
+SPLIT_DIR = "_split"
+
+DEFAULT_ROWS_PER_FILE = 1_000_000
+DEFAULT_ROW_GROUP_SIZE = 250_000
+DEFAULT_SORT_KEYS = ("ticker", "created_time")
+
+# Sort order per dataset directory.
+SORT_KEYS: dict[str, tuple[str, ...]] = {
+    "trades": DEFAULT_SORT_KEYS,
+    "markets": ("ticker",),
+    "events": ("event_ticker",),
+}
+
+# Timestamp column used for month partitioning, per dataset directory.
+PARTITION_FIELDS: dict[str, str] = {
+    "trades": "created_time",
+}
+
+
+@dataclass
+class CompactionResult:
+    """Summary of a compaction run."""
+
+    input_files: int
+    output_files: int
+    rows: int
+
+
+def _recover_interrupted_swap(dataset_dir: Path) -> None:
+    """Restore the dataset if a previous compaction died between renames."""
+    backup = dataset_dir.with_name(dataset_dir.name + BACKUP_SUFFIX)
+    if not backup.exists():
+        return
+    if dataset_dir.exists():
+        shutil.rmtree(backup)
+    else:
+        logger.warning("Restoring %s from interrupted compaction backup", dataset_dir)
+        backup.rename(dataset_dir)
+
+
+def _file_list_sql(paths: list[Path]) -> str:
+    return "[" + ", ".join(f"'{p}'" for p in paths) + "]"
+
+
+def _split_by_month(
+    con: duckdb.DuckDBPyConnection, files: list[Path], partition_field: str, out_dir: Path
+) -> None:
+    """Write unpartitioned files into year=YYYY/month=MM/ directories under out_dir."""
+    con.execute(f"""
+        COPY (
+            SELECT
+                *,
+                CAST(year(CAST({partition_field} AS TIMESTAMPTZ)) AS VARCHAR) AS year,
+                lpad(CAST(month(CAST({partition_field} AS TIMESTAMPTZ)) AS VARCHAR), 2, '0')
+                    AS month
+            FROM read_parquet(
+                {_file_list_sql(files)}, union_by_name = true, hive_partitioning = false
+            )
+        ) TO '{out_dir}' (FORMAT parquet, COMPRESSION snappy, PARTITION_BY (year, month))
+    """)
+
+
+def _group_by_partition(files: list[Path]) -> dict[str, list[Path]]:
+    """Group files by their Hive partition path (e.g. "year=2025/month=01")."""
+    groups: dict[str, list[Path]] = {}
+    for path in files:
+        key = "/".join(p for p in path.parent.parts if "=" in p)
+        groups.setdefault(key, []).append(path)
+    return groups
+
+
+def compact_dataset(
+    dataset_dir: Path,
+    sort_keys: tuple[str, ...] = DEFAULT_SORT_KEYS,
+    partition_field: str | None = None,
+    rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    memory_limit: str | None = None,
+) -> CompactionResult:
+    """Merge the Parquet files in dataset_dir into large sorted files.
+
+    If partition_field is set, output is written per month partition and any
+    files sitting directly in dataset_dir are first split into partitions.
+    Partitions that contain only previously compacted files are carried over
+    without rewriting. Files under underscore directories (e.g. _delta/) are
+    not merged and are carried over as they are.
+
+    The merged output is written to a sibling staging directory and then
+    swapped in with two renames. Files that appear in dataset_dir while the
+    merge runs (e.g. from a concurrent download) are carried over untouched
+    and picked up by the next compaction.
+    """
+    _recover_interrupted_swap(dataset_dir)
+
+    inputs = sorted(
+        p
+        for p in dataset_dir.rglob("*.parquet")
+        if not any(part.startswith("_") for part in p.relative_to(dataset_dir).parent.parts)
+    )
+    if not inputs:
+        logger.info("Nothing to compact in %s", dataset_dir)
+        return CompactionResult(input_files=0, output_files=0, rows=0)
+
+    staging = dataset_dir.with_name(dataset_dir.name + STAGING_SUFFIX)
+    backup = dataset_dir.with_name(dataset_dir.name + BACKUP_SUFFIX)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    order_by = ", ".join(sort_keys)
+    row_groups_per_file = max(1, rows_per_file // row_group_size)
+
+    logger.info("Compacting %d files in %s...", len(inputs), dataset_dir)
+    con = duckdb.connect()
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        con.execute(f"SET temp_directory = '{dataset_dir.parent / '.duckdb_tmp'}'")
+        if memory_limit:
+            con.execute(f"SET memory_limit = '{memory_limit}'")
+
+        sources = inputs
+        if partition_field:
+            flat = [p for p in inputs if p.parent == dataset_dir]
+            if flat:
+                logger.info("Splitting %d unpartitioned files by month...", len(flat))
+                _split_by_month(con, flat, partition_field, staging / SPLIT_DIR)
+                sources = [p for p in inputs if p.parent != dataset_dir]
+                sources += sorted((staging / SPLIT_DIR).rglob("*.parquet"))
+
+        rewritten = 0
+        for partition, files in sorted(_group_by_partition(sources).items()):
+            out_dir = staging / partition
+            out_dir.mkdir(parents=True, exist_ok=True)
+            if all(p.name.startswith(COMPACT_PREFIX) for p in files):
+                for path in files:
+                    os.link(path, out_dir / path.name)
+                continue
+            con.execute(f"""
+                COPY (
+                    SELECT * FROM read_parquet(
+                        {_file_list_sql(files)}, union_by_name = true, hive_partitioning = false
+                    )
+                    ORDER BY {order_by}
+                ) TO '{out_dir}' (
+                    FORMAT parquet,
+                    COMPRESSION snappy,
+                    ROW_GROUP_SIZE {row_group_size},
+                    ROW_GROUPS_PER_FILE {row_groups_per_file},
+                    FILENAME_PATTERN '{COMPACT_PREFIX}_{{i}}'
+                )
+            """)
+            rewritten += 1
+
+        shutil.rmtree(staging / SPLIT_DIR, ignore_errors=True)
+        outputs = sorted(staging.rglob(f"{COMPACT_PREFIX}_*.parquet"))
+        rows = con.execute(
+            f"SELECT COUNT(*) FROM read_parquet({_file_list_sql(outputs)})"
+        ).fetchone()[0]
+    finally:
+        con.close()
+
+    # Carry over anything that was not merged or landed during the merge.
+    merged = set(inputs)
+    for path in dataset_dir.rglob("*"):
+        if path.is_file() and path not in merged:
+            target = staging / path.relative_to(dataset_dir)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(path), target)
+
+    os.rename(dataset_dir, backup)
+    os.rename(staging, dataset_dir)
+    shutil.rmtree(backup)
+    sync_manifest(dataset_dir)
+
+    logger.info(
+        "Compacted %d files into %d (%d rows, %d partitions rewritten) in %s",
+        len(inputs),
+        len(outputs),
+        rows,
+        rewritten,
+        dataset_dir,
+    )
+    return CompactionResult(input_files=len(inputs), output_files=len(outputs), rows=rows)
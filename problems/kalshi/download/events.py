@@ -17,7 +17,9 @@ async def download_events(client: KalshiClient, data_dir: Path, resume: bool = T
     Returns the number of records downloaded in this run.
     """
     output_dir = data_dir / "events"
-    writer = ParquetChunkWriter(output_dir, chunk_size=10_000, name_prefix="events")
+    writer = ParquetChunkWriter(
+        output_dir, chunk_size=10_000, name_prefix="events", dataset="events"
+    )
     cursor_store = CursorStore(data_dir)
 
     resume_cursor = None
@@ -32,18 +34,29 @@ async def download_events(client: KalshiClient, data_dir: Path, resume: bool = T
 
     logger.info("Downloading events metadata...")
     total = records_so_far
+    unsaved = 0
 
     async for batch, cursor in client.get_events(resume_cursor=resume_cursor):
-        writer.add_records(batch)
+        await writer.add_records(batch)
         total += len(batch)
-
-        if cursor:
-            cursor_store.save(CURSOR_KEY, cursor, total)
+        unsaved += len(batch)
+
+        # Checkpoint once a chunk is on disk, so the cursor never runs ahead
+        # of the data.
+        if cursor and unsaved >= writer.chunk_size:
+            await writer.flush()
+            cursor_store.checkpoint(
+                CURSOR_KEY,
+                {"cursor": cursor, "records_so_far": total},
+                "events",
+                writer.take_written(),
+            )
+            unsaved = 0
 
         if total % 5000 == 0 or total < 100:
             logger.info("Events progress: %d records downloaded", total)
 
-    writer.flush()
-    cursor_store.clear(CURSOR_KEY)
+    await writer.flush()
+    cursor_store.finish(CURSOR_KEY, "events", writer.take_written())
     logger.info("Events download complete: %d total records", total)
     return writer.total_written
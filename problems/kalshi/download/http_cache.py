@@ -0,0 +1,321 @@
+"""On-disk cache of API responses, with record/replay.
+
+ResponseCache stores each decoded JSON response under data/.http_cache,
+keyed by a hash of the endpoint path and its query parameters, so
+KalshiClient and the candlestick AuthenticatedClient can answer repeat
+requests (e.g. a re-run after a config change) locally.
+
+How long an entry stays fresh depends on the endpoint (see POLICIES):
+
+- responses that can no longer change never expire: pages of markets that
+  are all settled, trade windows that ended in the past, candlesticks of
+  finalized markets
+- everything else gets the endpoint's TTL (0 means never cached)
+- responses that are still filling in are never cached: candlestick windows
+  that end within the last period
+
+Entries are appended to one log file, responses.log: a fixed header (key
+digest, stored time, expiry, body length) then the zlib-compressed JSON
+body. The index is rebuilt on open by reading headers only; the newest
+entry for a key wins. compact() rewrites the log without superseded and
+expired entries.
+
+Modes:
+
+- use: serve fresh entries, fetch and store misses
+- replay: serve only from the cache, whatever the age; a miss raises
+  CacheMissError. This makes a recorded run a deterministic offline fixture.
+- record: always fetch and store, refreshing the cache
+- off: no cache (the default; the cache is opt-in with --http-cache)
+
+The clients call aget()/aput(), which do the file IO, compression and JSON
+work on a worker thread so cache hits never block the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = ".http_cache"
+LOG_FILE = "responses.log"
+MODES = ("use", "replay", "record", "off")
+DEFAULT_MODE = "off"
+
+HOUR = 3600.0
+NEVER = float("inf")
+# Market statuses after which a market record no longer changes. A
+# "determined" market can still be disputed or amended, so it is not final.
+FINAL_MARKET_STATUSES = frozenset({"settled", "finalized"})
+# Trades may still be published shortly after their created_time.
+TRADE_SETTLE_SECONDS = 3600
+
+# key digest, stored_at, expires_at, body length
+_HEADER = struct.Struct("<32sddI")
+# Compact once superseded entries are over half the log and it is this big.
+_COMPACT_MIN_BYTES = 64 * 1024 * 1024
+
+
+class CacheMissError(LookupError):
+    """A replay-mode request had no cached response."""
+
+
+Params = dict[str, Any]
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Caching rules for one endpoint.
+
+    Attributes:
+        ttl: Seconds a response stays fresh; 0 disables caching.
+        ignore_params: Query parameters left out of the key (e.g. an end_ts
+            that is always "now").
+        fresh_params: Query parameters whose presence means the caller wants
+            current data (e.g. a refresh of open markets): such responses
+            are only cached if final.
+        final: Returns True if a response can never change, given the
+            request parameters and the response body.
+        live: Returns True if the request reaches into data still being
+            written, given its parameters; such responses are not cached.
+    """
+
+    ttl: float
+    ignore_params: tuple[str, ...] = ()
+    fresh_params: tuple[str, ...] = ()
+    final: Callable[[Params, dict[str, Any]], bool] | None = None
+    live: Callable[[Params], bool] | None = None
+
+
+def _markets_final(params: Params, body: dict[str, Any]) -> bool:
+    markets = body.get("markets") or []
+    return bool(markets) and all(m.get("status") in FINAL_MARKET_STATUSES for m in markets)
+
+
+def _trades_final(params: Params, body: dict[str, Any]) -> bool:
+    max_ts = params.get("max_ts")
+    return max_ts is not None and int(max_ts) < time.time() - TRADE_SETTLE_SECONDS
+
+
+def _candles_live(params: Params) -> bool:
+    end_ts = params.get("end_ts")
+    period_seconds = int(params.get("period_interval", 1)) * 60
+    return end_ts is None or int(end_ts) > time.time() - period_seconds
+
+
+NO_CACHE = CachePolicy(ttl=0)
+
+# Keyed by the first path segments; candlestick paths are matched by suffix.
+POLICIES: dict[str, CachePolicy] = {
+    "/series": CachePolicy(ttl=24 * HOUR),
+    "/events": CachePolicy(ttl=HOUR),
+    "/markets": CachePolicy(
+        ttl=HOUR, fresh_params=("tickers", "min_created_ts"), final=_markets_final
+    ),
+    "/markets/trades": CachePolicy(ttl=0, final=_trades_final),
+    "candlesticks": CachePolicy(ttl=HOUR, ignore_params=("end_ts",), live=_candles_live),
+}
+
+
+def policy_for(path: str) -> CachePolicy:
+    if path.rstrip("/").endswith("/candlesticks"):
+        return POLICIES["candlesticks"]
+    return POLICIES.get(path.rstrip("/"), NO_CACHE)
+
+
+def cache_key(path: str, params: Params | None, ignore: tuple[str, ...] = ()) -> bytes:
+    """SHA-256 of the path and its query parameters, in sorted order."""
+    query = sorted((k, str(v)) for k, v in (params or {}).items() if k not in ignore)
+    return hashlib.sha256(json.dumps([path, query]).encode()).digest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores}
+
+
+class ResponseCache:
+    """Append-only store of JSON responses, keyed by request.
+
+    Args:
+        directory: Cache directory (normally data/.http_cache).
+        mode: One of MODES.
+    """
+
+    def __init__(self, directory: Path, mode: str = DEFAULT_MODE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.directory = directory
+        self.mode = mode
+        self.stats = CacheStats()
+        self._path = directory / LOG_FILE
+        # key -> (body offset, body length, expires_at)
+        self._index: dict[bytes, tuple[int, int, float]] = {}
+        self._dead_bytes = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if mode != "off":
+            directory.mkdir(parents=True, exist_ok=True)
+            self._file = open(self._path, "a+b")  # noqa: SIM115 - closed by close()
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def _load_index(self) -> None:
+        self._file.seek(0)
+        offset = 0
+        size = os.fstat(self._file.fileno()).st_size
+        while offset + _HEADER.size <= size:
+            key, _, expires_at, length = _HEADER.unpack(self._file.read(_HEADER.size))
+            body = offset + _HEADER.size
+            if body + length > size:
+                break  # Torn final write; truncated below.
+            if key in self._index:
+                self._dead_bytes += _HEADER.size + self._index[key][1]
+            self._index[key] = (body, length, expires_at)
+            offset = body + length
+            self._file.seek(offset)
+        if offset < size:
+            logger.warning("Dropping %d bytes of incomplete cache entry", size - offset)
+            self._file.truncate(offset)
+        logger.debug("HTTP cache: %d entries in %s", len(self._index), self._path)
+
+    def get(self, path: str, params: Params | None = None) -> dict[str, Any] | None:
+        """Cached response for the request, or None if it must be fetched.
+
+        In replay mode a miss raises CacheMissError instead.
+        """
+        if not self.enabled or self.mode == "record":
+            return None
+        policy = policy_for(path)
+        key = cache_key(path, params, policy.ignore_params)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and (self.mode == "replay" or entry[2] > time.time()):
+                self._file.seek(entry[0])
+                raw = self._file.read(entry[1])
+            else:
+                raw = None
+        if raw is None:
+            self.stats.misses += 1
+            if self.mode == "replay":
+                raise CacheMissError(f"No cached response for {path} {params or {}}")
+            return None
+        self.stats.hits += 1
+        return json.loads(zlib.decompress(raw))
+
+    def put(
+        self,
+        path: str,
+        params: Params | None,
+        body: dict[str, Any],
+        final: bool = False,
+    ) -> None:
+        """Store a fetched response; final marks it as never changing."""
+        if not self.enabled or self.mode == "replay":
+            return
+        policy = policy_for(path)
+        params = params or {}
+        if policy.live is not None and policy.live(params):
+            return
+        if final or (policy.final is not None and policy.final(params, body)):
+            ttl = NEVER
+        elif any(p in params for p in policy.fresh_params):
+            ttl = 0
+        else:
+            ttl = policy.ttl
+        if ttl <= 0:
+            return
+        key = cache_key(path, params, policy.ignore_params)
+        data = zlib.compress(json.dumps(body, separators=(",", ":")).encode())
+        now = time.time()
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(_HEADER.pack(key, now, now + ttl, len(data)))
+            self._file.write(data)
+            self._file.flush()
+            if key in self._index:
+                self._dead_bytes += _HEADER.size + self._index[key][1]
+            self._index[key] = (offset + _HEADER.size, len(data), now + ttl)
+        self.stats.stores += 1
+
+    async def aget(self, path: str, params: Params | None = None) -> dict[str, Any] | None:
+        """get() on a worker thread, for use from the event loop."""
+        if not self.enabled or self.mode == "record":
+            return None
+        return await asyncio.to_thread(self.get, path, params)
+
+    async def aput(
+        self,
+        path: str,
+        params: Params | None,
+        body: dict[str, Any],
+        final: bool = False,
+    ) -> None:
+        """put() on a worker thread, for use from the event loop."""
+        if not self.enabled or self.mode == "replay":
+            return
+        await asyncio.to_thread(self.put, path, params, body, final)
+
+    def compact(self) -> int:
+        """Rewrite the log with only current, unexpired entries; returns bytes freed."""
+        if not self.enabled:
+            return 0
+        tmp = self._path.with_suffix(".tmp")
+        now = time.time()
+        with self._lock:
+            before = os.fstat(self._file.fileno()).st_size
+            index = {}
+            with open(tmp, "wb") as out:
+                for key, (offset, length, expires_at) in self._index.items():
+                    if expires_at <= now and self.mode != "replay":
+                        continue
+                    self._file.seek(offset - _HEADER.size)
+                    entry = self._file.read(_HEADER.size + length)
+                    index[key] = (out.tell() + _HEADER.size, length, expires_at)
+                    out.write(entry)
+                out.flush()
+                os.fsync(out.fileno())
+            self._file.close()
+            os.replace(tmp, self._path)
+            self._file = open(self._path, "a+b")  # noqa: SIM115 - closed by close()
+            self._index = index
+            self._dead_bytes = 0
+            after = os.fstat(self._file.fileno()).st_size
+        logger.info("Compacted HTTP cache from %d to %d bytes", before, after)
+        return before - after
+
+    def close(self) -> None:
+        """Close the log, compacting it first if it is mostly superseded entries."""
+        if not self.enabled:
+            return
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= _COMPACT_MIN_BYTES and self._dead_bytes * 2 > size:
+            self.compact()
+        self._file.close()
+        self._file = None
+        logger.info("HTTP cache %s: %s", self.mode, self.stats.as_dict())
+
+
+def open_cache(data_dir: Path, mode: str = DEFAULT_MODE) -> ResponseCache:
+    """Open the response cache in data_dir/.http_cache."""
+    return ResponseCache(data_dir / HTTP_CACHE_DIR, mode)
@@ -0,0 +1,199 @@
+"""Per-file statistics for each dataset directory.
+
+Planning a DuckDB scan over a glob means opening the footer of every file
+(17K trades files, 3K markets files). Each dataset directory instead keeps a
+manifest, _manifest.jsonl, with one JSON line per Parquet file:
+
+- path: file path relative to the dataset directory
+- size / mtime_ns: file size in bytes and modification time (an entry is only
+  trusted while both match, see entry_is_current)
+- rows: row count
+- min_created_time / max_created_time: ISO UTC timestamps, if the column exists
+- min_ticker / max_ticker: sorted range of the ticker column, if it exists
+- bloom / bloom_bits / bloom_hashes: base64 bloom filter over the tickers
+- schema_hash: hash of the Arrow schema
+
+ParquetChunkWriter appends an entry on every flush. Later lines override
+earlier lines for the same path, so appending never rewrites the file.
+Commands that rewrite files in place (compaction, normalization) call
+sync_manifest() afterwards to drop stale entries and index new files.
+
+The analysis code reads the manifest to build explicit file lists for date
+and ticker predicates, probing the bloom filters with bloom_positions() from
+this module.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "_manifest.jsonl"
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+MIN_BLOOM_BITS = 64
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def bloom_positions(key: str, bits: int, hashes: int) -> list[int]:
+    """Bit positions for key in a bloom filter of the given size (double hashing)."""
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+def build_bloom(keys: list[str]) -> tuple[str, int, int]:
+    """Build a bloom filter over keys. Returns (base64 bits, bit count, hash count)."""
+    n = max(1, len(keys))
+    bits = math.ceil(-n * math.log(BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2)
+    bits = max(MIN_BLOOM_BITS, (bits + 7) // 8 * 8)
+    hashes = max(1, round(-math.log2(BLOOM_FALSE_POSITIVE_RATE)))
+    data = bytearray(bits // 8)
+    for key in keys:
+        for pos in bloom_positions(key, bits, hashes):
+            data[pos >> 3] |= 1 << (pos & 7)
+    return base64.b64encode(bytes(data)).decode(), bits, hashes
+
+
+def schema_hash(schema: pa.Schema) -> str:
+    """Short stable hash of a schema's field names and types."""
+    text = schema.remove_metadata().to_string(show_schema_metadata=False)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def _iso(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def file_entry(table: pa.Table, path: Path, root: Path) -> dict[str, Any]:
+    """Manifest entry for a Parquet file at path holding table."""
+    stat = path.stat()
+    entry: dict[str, Any] = {
+        "path": str(path.relative_to(root)),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "rows": table.num_rows,
+        "schema_hash": schema_hash(table.schema),
+    }
+    if "created_time" in table.column_names and table.num_rows:
+        created = pc.cast(table.column("created_time"), pa.timestamp("us", tz="UTC"))
+        bounds = pc.min_max(pc.cast(created, pa.int64()))
+        if bounds["min"].is_valid:
+            entry["min_created_time"] = _iso(bounds["min"].as_py())
+            entry["max_created_time"] = _iso(bounds["max"].as_py())
+    if "ticker" in table.column_names and table.num_rows:
+        tickers = sorted(
+            t for t in pc.unique(pc.cast(table.column("ticker"), pa.string())).to_pylist() if t
+        )
+        if tickers:
+            bloom, bits, hashes = build_bloom(tickers)
+            entry["min_ticker"] = tickers[0]
+            entry["max_ticker"] = tickers[-1]
+            entry["bloom"] = bloom
+            entry["bloom_bits"] = bits
+            entry["bloom_hashes"] = hashes
+    return entry
+
+
+def index_file(path: Path, root: Path) -> dict[str, Any]:
+    """Manifest entry for an existing Parquet file, reading only the indexed columns."""
+    schema = pq.read_schema(path)
+    columns = [c for c in ("ticker", "created_time") if c in schema.names]
+    table = pq.read_table(path, columns=columns)
+    entry = file_entry(table, path, root)
+    entry["schema_hash"] = schema_hash(schema)
+    return entry
+
+
+def entry_is_current(entry: dict[str, Any], path: Path) -> bool:
+    """True if entry still describes path (same size and modification time)."""
+    stat = path.stat()
+    return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+
+_APPEND_LOCK = threading.Lock()
+
+
+class DatasetManifest:
+    """Append-only manifest of per-file statistics for one dataset directory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.path = root / MANIFEST_FILE
+
+    def record(self, path: Path, table: pa.Table) -> None:
+        """Append the entry for a file just written from table."""
+        self._append(file_entry(table, path, self.root))
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Background writers for one dataset may append concurrently, and a
+        # line with a large bloom filter is more than one write() call.
+        with _APPEND_LOCK, self.path.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def entries(self) -> dict[str, dict[str, Any]]:
+        """Current entry per relative path (later lines win)."""
+        entries: dict[str, dict[str, Any]] = {}
+        if not self.path.exists():
+            return entries
+        with self.path.open() as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping truncated manifest line in %s", self.path)
+                    continue
+                entries[entry["path"]] = entry
+        return entries
+
+    def rewrite(self, entries: list[dict[str, Any]]) -> None:
+        """Replace the manifest with exactly these entries."""
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+        with tmp_path.open("w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+def sync_manifest(dataset_dir: Path) -> int:
+    """Bring dataset_dir's manifest in line with the files on disk.
+
+    Entries for missing or rewritten files are dropped and files without a
+    current entry are indexed from their contents. Returns the number of files
+    indexed.
+    """
+    manifest = DatasetManifest(dataset_dir)
+    existing = manifest.entries()
+    entries = []
+    indexed = 0
+    for path in sorted(dataset_dir.rglob("*.parquet")):
+        rel = str(path.relative_to(dataset_dir))
+        entry = existing.get(rel)
+        if entry is None or not entry_is_current(entry, path):
+            entry = index_file(path, dataset_dir)
+            indexed += 1
+            if indexed % 1000 == 0:
+                logger.info("Indexed %d files...", indexed)
+        entries.append(entry)
+    manifest.rewrite(entries)
+    logger.info(
+        "Manifest for %s: %d files (%d indexed)", dataset_dir, len(entries), indexed
+    )
+    return indexed
@@ -1,14 +1,74 @@
-"""Download all Kalshi market metadata."""
+"""Download all Kalshi market metadata.
+
+download_markets pages every market. refresh_markets updates an existing
+download in seconds: it re-fetches only the markets stored as not yet
+finalized, plus markets created since the last refresh, and writes them as
+a delta file in markets/_delta/. Readers merge deltas over the base files
+with latest-wins per ticker (markets_table_sql); a later full download
+supersedes and removes them.
+"""
 
 import logging
+import shutil
+import time
+from datetime import UTC, datetime
 from pathlib import Path
 
+import duckdb
+
 from download.client import KalshiClient
+from download.http_cache import FINAL_MARKET_STATUSES
 from download.storage import CursorStore, ParquetChunkWriter
 
 logger = logging.getLogger(__name__)
 
 CURSOR_KEY = "markets"
+REFRESH_KEY = "markets_refresh"
+DELTA_DIR = "_delta"
+# Tickers per request when re-fetching open markets (the tickers filter).
+REFRESH_BATCH_SIZE = 100
+# Overlap with the previous refresh, for markets published late.
+REFRESH_OVERLAP_SECONDS = 3600
+
+
+def markets_table_sql(data_dir: Path) -> str:
+    """DuckDB table expression for markets with refresh deltas applied.
+
+    Each ticker keeps its row from the newest delta file, else a base-file
+    row, preferring a finalized one if the market was downloaded twice. This
+    is the one definition of the merge; the analysis code imports it too.
+    """
+    files = [f"'{data_dir}/markets/*.parquet'"]
+    delta_dir = data_dir / "markets" / DELTA_DIR
+    if any(delta_dir.glob("*.parquet")):
+        files.append(f"'{delta_dir}/*.parquet'")
+    return f"""(
+        SELECT * EXCLUDE (filename)
+        FROM read_parquet([{", ".join(files)}], union_by_name = true, filename = true)
+        QUALIFY row_number() OVER (
+            PARTITION BY ticker
+            ORDER BY CASE WHEN contains(filename, '/{DELTA_DIR}/') THEN filename END DESC NULLS LAST,
+                     status = 'finalized' DESC
+        ) = 1
+    )"""
+
+
+def _stored_open_markets(data_dir: Path) -> tuple[list[str], str | None]:
+    """Tickers of stored markets not yet finalized, and the latest created_time."""
+    statuses = ", ".join(f"'{s}'" for s in sorted(FINAL_MARKET_STATUSES))
+    con = duckdb.connect()
+    try:
+        con.execute(f"CREATE TEMP VIEW markets AS SELECT * FROM {markets_table_sql(data_dir)}")
+        tickers = [
+            row[0]
+            for row in con.execute(
+                f"SELECT ticker FROM markets WHERE status NOT IN ({statuses}) ORDER BY ticker"
+            ).fetchall()
+        ]
+        latest = con.execute("SELECT max(CAST(created_time AS VARCHAR)) FROM markets").fetchone()[0]
+    finally:
+        con.close()
+    return tickers, latest
 
 
 async def download_markets(client: KalshiClient, data_dir: Path, resume: bool = True) -> int:
@@ -18,7 +78,9 @@ async def download_markets(client: KalshiClient, data_dir: Path, resume: bool =
     Returns the number of records downloaded in this run.
     """
     output_dir = data_dir / "markets"
-    writer = ParquetChunkWriter(output_dir, chunk_size=10_000, name_prefix="markets")
+    writer = ParquetChunkWriter(
+        output_dir, chunk_size=10_000, name_prefix="markets", dataset="markets"
+    )
     cursor_store = CursorStore(data_dir)
 
     resume_cursor = None
@@ -33,18 +95,97 @@ async def download_markets(client: KalshiClient, data_dir: Path, resume: bool =
 
     logger.info("Downloading market metadata...")
     total = records_so_far
+    unsaved = 0
 
     async for batch, cursor in client.get_markets(resume_cursor=resume_cursor):
-        writer.add_records(batch)
+        await writer.add_records(batch)
         total += len(batch)
+        unsaved += len(batch)
 
-        if cursor:
-            cursor_store.save(CURSOR_KEY, cursor, total)
+        # Checkpoint once a chunk is on disk, so the cursor never runs ahead
+        # of the data.
+        if cursor and unsaved >= writer.chunk_size:
+            await writer.flush()
+            cursor_store.checkpoint(
+                CURSOR_KEY,
+                {"cursor": cursor, "records_so_far": total},
+                "markets",
+                writer.take_written(),
+            )
+            unsaved = 0
 
         if total % 50_000 == 0:
             logger.info("Markets progress: %d records downloaded", total)
 
-    writer.flush()
-    cursor_store.clear(CURSOR_KEY)
+    await writer.flush()
+    cursor_store.finish(CURSOR_KEY, "markets", writer.take_written())
+    clear_deltas(output_dir)
     logger.info("Markets download complete: %d total records", total)
     return writer.total_written
+
+
+def clear_deltas(output_dir: Path) -> None:
+    """Remove refresh deltas, e.g. once a full download has superseded them."""
+    delta_dir = output_dir / DELTA_DIR
+    if delta_dir.exists():
+        shutil.rmtree(delta_dir)
+        logger.info("Removed market deltas superseded by the full download")
+
+
+async def refresh_markets(client: KalshiClient, data_dir: Path) -> int:
+    """Re-fetch open and newly created markets into a delta file.
+
+    Open markets are the stored ones not in a final status; new markets are
+    those created since the last refresh (or the newest stored market).
+    Returns the number of records written.
+    """
+    output_dir = data_dir / "markets"
+    if not any(output_dir.glob("*.parquet")):
+        raise ValueError(f"No stored markets in {output_dir}; run a full download first")
+
+    cursor_store = CursorStore(data_dir)
+    started = int(time.time())
+    open_tickers, latest_created = _stored_open_markets(data_dir)
+    state = cursor_store.load_state(REFRESH_KEY)
+    if state is not None:
+        since = state["refreshed_at"] - REFRESH_OVERLAP_SECONDS
+    elif latest_created is not None:
+        since = int(datetime.fromisoformat(latest_created).astimezone(UTC).timestamp())
+    else:
+        since = None
+    logger.info(
+        "Refreshing %d open markets and markets created since %s",
+        len(open_tickers),
+        datetime.fromtimestamp(since, UTC).isoformat() if since is not None else "the start",
+    )
+
+    stamp = datetime.fromtimestamp(started, UTC).strftime("%Y%m%dT%H%M%S")
+    writer = ParquetChunkWriter(
+        output_dir / DELTA_DIR,
+        chunk_size=10_000,
+        name_prefix=f"delta-{stamp}",
+        dataset="markets",
+    )
+    seen: set[str] = set()
+
+    async def add(batch: list[dict]) -> None:
+        fresh = [m for m in batch if m.get("ticker") not in seen]
+        seen.update(m.get("ticker") for m in fresh)
+        await writer.add_records(fresh)
+
+    async for batch, _ in client.get_markets(min_created_ts=since):
+        await add(batch)
+    new = len(seen)
+    for i in range(0, len(open_tickers), REFRESH_BATCH_SIZE):
+        tickers = open_tickers[i : i + REFRESH_BATCH_SIZE]
+        async for batch, _ in client.get_markets(tickers=tickers):
+            await add(batch)
+
+    await writer.flush()
+    cursor_store.checkpoint(
+        REFRESH_KEY, {"refreshed_at": started}, "markets", writer.take_written()
+    )
+    logger.info(
+        "Markets refresh complete: %d new, %d open re-fetched", new, len(seen) - new
+    )
+    return writer.total_written
@@ -0,0 +1,423 @@
+"""Local stand-in for the Kalshi API, for offline load tests and benchmarks.
+
+MockKalshiAPI is a plain ASGI app serving synthetic data under
+/trade-api/v2 with the endpoints the downloaders use:
+
+- /series, /events, /markets (cursor-paginated)
+- /markets/trades (cursor-paginated, newest first, min_ts/max_ts/ticker)
+- /series/{series}/markets/{ticker}/candlesticks and
+  /markets/{ticker}/candlesticks
+
+Data is generated from the record index, so any size costs no memory.
+FaultProfile injects latency, a server-side rate limit that answers 429 like
+the real API, and random 429/5xx responses. Given a public key, every
+request must carry a valid KALSHI-ACCESS-* RSA-PSS signature.
+
+Clients talk to the app in-process through httpx.ASGITransport (see
+download.benchmark); `python -m download.mock_api` serves it over HTTP if
+uvicorn is installed.
+"""
+
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+from urllib.parse import parse_qs
+
+import click
+
+API_PREFIX = "/trade-api/v2"
+DEFAULT_START = datetime(2024, 1, 1, tzinfo=UTC)
+DEFAULT_END = datetime(2025, 1, 1, tzinfo=UTC)
+MAX_PAGE_SIZE = 1000
+
+
+@dataclass
+class SyntheticData:
+    """Sizes and time range of the generated dataset."""
+
+    markets: int = 1_000
+    markets_per_event: int = 5
+    events_per_series: int = 20
+    trades: int = 100_000
+    candles_per_market: int = 30
+    # Share of markets (the newest) that are still open.
+    open_fraction: float = 0.1
+    start: datetime = DEFAULT_START
+    end: datetime = DEFAULT_END
+
+    @property
+    def events(self) -> int:
+        return math.ceil(self.markets / self.markets_per_event)
+
+    @property
+    def series(self) -> int:
+        return math.ceil(self.events / self.events_per_series)
+
+    @property
+    def trade_step(self) -> float:
+        """Seconds between consecutive trades."""
+        return (self.end - self.start).total_seconds() / self.trades
+
+    def series_ticker(self, i: int) -> str:
+        return f"MOCKS{i:04d}"
+
+    def event_ticker(self, i: int) -> str:
+        return f"MOCKE{i:06d}"
+
+    def market_ticker(self, i: int) -> str:
+        return f"MOCKM{i:06d}"
+
+    def series_record(self, i: int) -> dict[str, Any]:
+        return {
+            "ticker": self.series_ticker(i),
+            "title": f"Mock series {i}",
+            "category": ("Sports", "Politics", "Economics", "Weather")[i % 4],
+            "frequency": "daily",
+            "fee_type": "quadratic",
+            "fee_multiplier": 1.0,
+            "tags": ["mock"],
+        }
+
+    def event_record(self, i: int) -> dict[str, Any]:
+        return {
+            "event_ticker": self.event_ticker(i),
+            "series_ticker": self.series_ticker(i // self.events_per_series),
+            "title": f"Mock event {i}",
+            "category": ("Sports", "Politics", "Economics", "Weather")[
+                (i // self.events_per_series) % 4
+            ],
+            "mutually_exclusive": True,
+        }
+
+    @property
+    def market_step(self) -> float:
+        """Seconds between consecutive markets' creation times."""
+        return (self.end - self.start).total_seconds() / (self.markets + 1)
+
+    def market_created(self, i: int) -> float:
+        return self.start.timestamp() + i * self.market_step
+
+    def market_index(self, ticker: str) -> int | None:
+        i = int(ticker[5:]) if ticker.startswith("MOCKM") and ticker[5:].isdigit() else -1
+        return i if 0 <= i < self.markets else None
+
+    def market_record(self, i: int) -> dict[str, Any]:
+        close = self.market_created(i) + self.market_step
+        settled = i < self.markets * (1 - self.open_fraction)
+        return {
+            "ticker": self.market_ticker(i),
+            "event_ticker": self.event_ticker(i // self.markets_per_event),
+            "market_type": "binary",
+            "status": "finalized" if settled else "active",
+            "result": ("yes" if i % 3 == 0 else "no") if settled else "",
+            "created_time": _iso(self.market_created(i)),
+            "open_time": _iso(self.market_created(i)),
+            "close_time": _iso(close),
+            "volume": 1000 + i,
+            "volume_fp": f"{1000 + i}.00",
+            "last_price_dollars": f"{(i % 99 + 1) / 100:.4f}",
+        }
+
+    def trade_time(self, j: int) -> float:
+        """Epoch seconds of trade j; trade 0 is the newest."""
+        return self.end.timestamp() - (j + 1) * self.trade_step
+
+    def trade_record(self, j: int) -> dict[str, Any]:
+        yes = j % 99 + 1
+        return {
+            "trade_id": f"mock-{j:012d}",
+            "ticker": self.trade_ticker(j),
+            "yes_price_dollars": f"{yes / 100:.4f}",
+            "no_price_dollars": f"{(100 - yes) / 100:.4f}",
+            "count_fp": f"{j % 50 + 1}.00",
+            "taker_side": "yes" if j % 2 else "no",
+            "created_time": _iso(self.trade_time(j)),
+        }
+
+    def trade_ticker(self, j: int) -> str:
+        return self.market_ticker(j * 7919 % self.markets)
+
+    def trade_range(self, min_ts: int | None, max_ts: int | None) -> tuple[int, int]:
+        """[first, last) trade indexes with min_ts <= created_time <= max_ts."""
+        end = self.end.timestamp()
+        first = 0
+        last = self.trades
+        if max_ts is not None:
+            first = max(first, math.ceil((end - max_ts) / self.trade_step - 1))
+        if min_ts is not None:
+            last = min(last, math.floor((end - min_ts) / self.trade_step - 1) + 1)
+        return first, max(first, last)
+
+    def candles(self, ticker: str) -> list[dict[str, Any]]:
+        seed = int(ticker[-6:]) if ticker[-6:].isdigit() else 0
+        day = 86_400
+        first = int(self.start.timestamp()) // day * day + day
+        candles = []
+        for k in range(self.candles_per_market):
+            close = (seed + k) % 99 + 1
+            ohlc = {
+                "open": close, "high": min(99, close + 2), "low": max(1, close - 2), "close": close,
+                "open_dollars": f"{close / 100:.4f}",
+                "high_dollars": f"{min(99, close + 2) / 100:.4f}",
+                "low_dollars": f"{max(1, close - 2) / 100:.4f}",
+                "close_dollars": f"{close / 100:.4f}",
+            }
+            candles.append({
+                "end_period_ts": first + k * day,
+                "volume": 10 + k,
+                "volume_fp": f"{10 + k}.00",
+                "open_interest": 100 + k,
+                "open_interest_fp": f"{100 + k}.00",
+                "price": {**ohlc, "mean": close, "mean_dollars": ohlc["close_dollars"],
+                          "previous": close, "previous_dollars": ohlc["close_dollars"]},
+                "yes_bid": {**ohlc},
+                "yes_ask": {**ohlc},
+            })
+        return candles
+
+
+@dataclass
+class FaultProfile:
+    """Failures and delays injected into every response.
+
+    Attributes:
+        latency_ms: Fixed delay before each response.
+        jitter_ms: Extra uniformly random delay, 0 to jitter_ms.
+        rate_limit: Server-side requests per second; excess requests get 429.
+        burst: Token-bucket capacity of the server-side limit.
+        throttle_rate: Probability of a random 429.
+        error_rate: Probability of a random 500/502/503.
+        retry_after: Retry-After seconds sent with 429s, if any.
+    """
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_limit: float | None = None
+    burst: float = 10.0
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: float | None = None
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    records: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"requests": self.requests, "statuses": dict(self.statuses), "records": self.records}
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, UTC).isoformat().replace("+00:00", "Z")
+
+
+class MockKalshiAPI:
+    """ASGI app serving SyntheticData with FaultProfile applied.
+
+    Args:
+        data: Dataset sizes.
+        faults: Injected latency and failures.
+        public_key: RSA public key; if given, requests must be signed.
+        seed: Seed for the random faults.
+    """
+
+    def __init__(
+        self,
+        data: SyntheticData | None = None,
+        faults: FaultProfile | None = None,
+        public_key: Any = None,
+        seed: int = 0,
+    ):
+        self.data = data or SyntheticData()
+        self.faults = faults or FaultProfile()
+        self.public_key = public_key
+        self.stats = ServerStats()
+        self._random = random.Random(seed)
+        self._tokens = self.faults.burst
+        self._updated = time.monotonic()
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        status, body, headers = await self._handle(scope)
+        self.stats.requests += 1
+        self.stats.statuses[status] += 1
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), *headers],
+        })
+        await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+    def _over_rate_limit(self) -> bool:
+        if self.faults.rate_limit is None:
+            return False
+        now = time.monotonic()
+        self._tokens = min(
+            self.faults.burst, self._tokens + (now - self._updated) * self.faults.rate_limit
+        )
+        self._updated = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    def _throttled(self) -> tuple[int, dict, list]:
+        headers = []
+        if self.faults.retry_after is not None:
+            headers.append((b"retry-after", str(self.faults.retry_after).encode()))
+        return 429, {"error": "too many requests"}, headers
+
+    async def _handle(self, scope: dict) -> tuple[int, dict, list]:
+        delay = self.faults.latency_ms + self._random.uniform(0, self.faults.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if self._over_rate_limit() or self._random.random() < self.faults.throttle_rate:
+            return self._throttled()
+        if self._random.random() < self.faults.error_rate:
+            return self._random.choice((500, 502, 503)), {"error": "injected"}, []
+
+        path = scope["path"]
+        if self.public_key is not None and not self._verify(scope, path):
+            return 401, {"error": "invalid signature"}, []
+        if not path.startswith(API_PREFIX):
+            return 404, {"error": "not found"}, []
+        route = path[len(API_PREFIX):].strip("/").split("/")
+        query = {k: v[-1] for k, v in parse_qs(scope["query_string"].decode()).items()}
+        body = self._route(route, query)
+        if body is None:
+            return 404, {"error": "not found"}, []
+        return 200, body, []
+
+    def _verify(self, scope: dict, path: str) -> bool:
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        timestamp = headers.get("kalshi-access-timestamp")
+        signature = headers.get("kalshi-access-signature")
+        if not timestamp or not signature or not headers.get("kalshi-access-key"):
+            return False
+        try:
+            self.public_key.verify(
+                base64.b64decode(signature),
+                f"{timestamp}{scope['method']}{path}".encode(),
+                padding.PSS(
+                    mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.DIGEST_LENGTH
+                ),
+                hashes.SHA256(),
+            )
+        except (InvalidSignature, ValueError):
+            return False
+        return True
+
+    def _route(self, route: list[str], query: dict[str, str]) -> dict | None:
+        d = self.data
+        if route == ["series"]:
+            records = [d.series_record(i) for i in range(d.series)]
+            self.stats.records += len(records)
+            return {"series": records}
+        if route == ["events"]:
+            return self._page("events", d.events, d.event_record, query)
+        if route == ["markets"]:
+            return self._markets(query)
+        if route == ["markets", "trades"]:
+            return self._trades(query)
+        if route[-1] == "candlesticks" and len(route) in (3, 5):
+            candles = d.candles(route[-2])
+            self.stats.records += len(candles)
+            return {"ticker": route[-2], "candlesticks": candles, "cursor": ""}
+        return None
+
+    def _page(self, key: str, total: int, make: Any, query: dict[str, str]) -> dict:
+        limit = min(int(query.get("limit", 100)), MAX_PAGE_SIZE)
+        start = int(query.get("cursor") or 0)
+        stop = min(total, start + limit)
+        records = [make(i) for i in range(start, stop)]
+        self.stats.records += len(records)
+        return {key: records, "cursor": str(stop) if stop < total else ""}
+
+    def _markets(self, query: dict[str, str]) -> dict:
+        d = self.data
+        if "tickers" in query:
+            indexes = [d.market_index(t) for t in query["tickers"].split(",")]
+            records = [d.market_record(i) for i in indexes if i is not None]
+            self.stats.records += len(records)
+            return {"markets": records, "cursor": ""}
+        first = 0
+        if "min_created_ts" in query:
+            first = max(0, math.ceil((int(query["min_created_ts"]) - d.start.timestamp()) / d.market_step))
+        limit = min(int(query.get("limit", 100)), MAX_PAGE_SIZE)
+        start = max(first, int(query.get("cursor") or 0))
+        stop = min(d.markets, start + limit)
+        records = [d.market_record(i) for i in range(start, stop)]
+        self.stats.records += len(records)
+        return {"markets": records, "cursor": str(stop) if stop < d.markets else ""}
+
+    def _trades(self, query: dict[str, str]) -> dict:
+        d = self.data
+        limit = min(int(query.get("limit", 100)), MAX_PAGE_SIZE)
+        min_ts = int(query["min_ts"]) if "min_ts" in query else None
+        max_ts = int(query["max_ts"]) if "max_ts" in query else None
+        first, last = d.trade_range(min_ts, max_ts)
+        j = max(first, int(query.get("cursor") or 0))
+        ticker = query.get("ticker")
+        records = []
+        while j < last and len(records) < limit:
+            if ticker is None or d.trade_ticker(j) == ticker:
+                records.append(d.trade_record(j))
+            j += 1
+        self.stats.records += len(records)
+        return {"trades": records, "cursor": str(j) if j < last else ""}
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Interface to bind.")
+@click.option("--port", type=int, default=8765, help="Port to listen on.")
+@click.option("--markets", type=int, default=1_000, help="Synthetic markets.")
+@click.option("--trades", type=int, default=100_000, help="Synthetic trades.")
+@click.option("--latency-ms", type=float, default=0.0, help="Delay before each response.")
+@click.option("--rate-limit", type=float, default=None, help="Server-side requests per second.")
+@click.option("--error-rate", type=float, default=0.0, help="Probability of a random 5xx.")
+def main(
+    host: str,
+    port: int,
+    markets: int,
+    trades: int,
+    latency_ms: float,
+    rate_limit: float | None,
+    error_rate: float,
+) -> None:
+    """Serve the mock Kalshi API over HTTP (requires uvicorn)."""
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise click.ClickException("Serving over HTTP needs uvicorn (pip install uvicorn)") from e
+    app = MockKalshiAPI(
+        SyntheticData(markets=markets, trades=trades),
+        FaultProfile(latency_ms=latency_ms, rate_limit=rate_limit, error_rate=error_rate),
+    )
+    click.echo(f"Mock Kalshi API at http://{host}:{port}{API_PREFIX}")
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
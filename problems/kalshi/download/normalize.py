@@ -0,0 +1,115 @@
+"""Normalize raw trade records into compact, typed columns.
+
+The API returns prices as dollar strings ("0.6500"), contract counts as
+fixed-point strings ("10.00") and timestamps as ISO strings. Storing them
+as-is forces every query to CAST them on every row. Normalized trades store:
+
+- yes_price_cents / no_price_cents: SMALLINT cents (0-100)
+- contracts: DECIMAL(18, 2), i.e. a fixed-point integer
+- taker_side: dictionary-encoded string
+- created_time: TIMESTAMP WITH TIME ZONE (UTC, microseconds)
+
+normalize_trades() is used by the download pipeline before each chunk is
+written, and by normalize_dataset() to migrate existing files in place.
+"""
+
+import logging
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from download.manifest import sync_manifest
+from download.writer_config import DEFAULT_WRITER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+TRADES_SCHEMA = pa.schema([
+    ("trade_id", pa.string()),
+    ("ticker", pa.string()),
+    ("taker_side", pa.dictionary(pa.int8(), pa.string())),
+    ("yes_price_cents", pa.int16()),
+    ("no_price_cents", pa.int16()),
+    ("contracts", pa.decimal128(18, 2)),
+    ("created_time", pa.timestamp("us", tz="UTC")),
+])
+
+
+def is_normalized(schema: pa.Schema) -> bool:
+    """Return True if a trades file schema already has the normalized columns."""
+    return "yes_price_cents" in schema.names
+
+
+def _preferred(table: pa.Table, preferred: pa.Array | None, fallback_field: str) -> pa.Array:
+    """preferred where set, else the legacy fallback_field column (if any)."""
+    if fallback_field not in table.column_names:
+        return preferred
+    fallback = table.column(fallback_field)
+    if preferred is None:
+        return fallback
+    return pc.coalesce(preferred, pc.cast(fallback, preferred.type))
+
+
+def _cents(table: pa.Table, dollars_field: str, cents_field: str) -> pa.Array:
+    cents = None
+    if dollars_field in table.column_names:
+        dollars = pc.cast(table.column(dollars_field), pa.float64())
+        cents = pc.cast(pc.round(pc.multiply(dollars, 100)), pa.int16())
+    return pc.cast(_preferred(table, cents, cents_field), pa.int16())
+
+
+def normalize_trades(table: pa.Table) -> pa.Table:
+    """Convert a raw trades table (API field names) to TRADES_SCHEMA.
+
+    Prefers the *_dollars / count_fp fields and falls back to the legacy
+    integer yes_price / no_price / count fields where they are absent or null.
+    Tables that are already normalized are returned unchanged.
+    """
+    if is_normalized(table.schema):
+        return table
+
+    count_fp = table.column("count_fp") if "count_fp" in table.column_names else None
+    count = _preferred(table, count_fp, "count")
+    created = pc.cast(table.column("created_time"), pa.timestamp("ns", tz="UTC"))
+    taker_side = pc.dictionary_encode(pc.cast(table.column("taker_side"), pa.string()))
+
+    return pa.Table.from_arrays(
+        [
+            pc.cast(table.column("trade_id"), pa.string()),
+            pc.cast(table.column("ticker"), pa.string()),
+            pc.cast(taker_side, TRADES_SCHEMA.field("taker_side").type),
+            _cents(table, "yes_price_dollars", "yes_price"),
+            _cents(table, "no_price_dollars", "no_price"),
+            pc.cast(pc.cast(count, pa.string()), TRADES_SCHEMA.field("contracts").type),
+            created.cast(TRADES_SCHEMA.field("created_time").type, safe=False),
+        ],
+        schema=TRADES_SCHEMA,
+    )
+
+
+def normalize_dataset(dataset_dir: Path) -> tuple[int, int]:
+    """Rewrite raw trades files under dataset_dir with normalized columns.
+
+    Each file is converted independently and swapped in with os.replace, so an
+    interrupted migration can simply be re-run. The dataset manifest is synced
+    afterwards. Returns (files_converted, rows).
+    """
+    converted = 0
+    rows = 0
+    for path in sorted(dataset_dir.rglob("*.parquet")):
+        if is_normalized(pq.read_schema(path)):
+            continue
+        table = normalize_trades(pq.read_table(path))
+        tmp_path = path.with_suffix(".parquet.tmp")
+        DEFAULT_WRITER_CONFIG.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        converted += 1
+        rows += table.num_rows
+        if converted % 1000 == 0:
+            logger.info("Normalized %d files (%d rows)...", converted, rows)
+    logger.info("Normalized %d files (%d rows) in %s", converted, rows, dataset_dir)
+    if converted:
+        sync_manifest(dataset_dir)
+    return converted, rows
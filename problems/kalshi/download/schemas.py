@@ -0,0 +1,395 @@
+"""Declared Arrow schemas for the raw API records of each dataset.
+
+Building tables with pa.Table.from_pylist infers a schema per chunk, so a
+field that happens to be all-null (or all-integer) in one chunk gets a
+different type than in the next, and DuckDB globs over the files have to
+reconcile them. Every page is instead converted straight to a record batch
+with the dataset's declared schema:
+
+- fields are typed as the API returns them (fixed-point strings stay strings;
+  see normalize.py for the typed trades columns)
+- fields missing from a record are null; fields the schema does not declare
+  are kept as JSON text columns after the declared ones, with a warning
+  naming them so the schema can be extended
+- a value that does not fit its field is coerced if it can be ("12" for an
+  integer) and nulled otherwise; the rest of its column is kept. Arrow
+  truncates a float such as 1.5 into an integer field without complaint,
+  so integer fields are read as float64 and cast with pyarrow.compute once
+  fractions are nulled
+- free-form objects (JSON_FIELDS) are stored as JSON text
+
+Candlesticks keep the API's nested price/yes_bid/yes_ask objects as struct
+columns (CANDLES_RAW_SCHEMA) and are flattened to CANDLES_COLUMNS on write.
+"""
+
+import json
+import logging
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+TRADES_RAW_SCHEMA = pa.schema([
+    ("trade_id", pa.string()),
+    ("ticker", pa.string()),
+    ("yes_price_dollars", pa.string()),
+    ("no_price_dollars", pa.string()),
+    ("count_fp", pa.string()),
+    ("taker_side", pa.string()),
+    ("created_time", pa.string()),
+    # Deprecated integer fields, still returned alongside the fixed-point ones.
+    ("yes_price", pa.int64()),
+    ("no_price", pa.int64()),
+    ("count", pa.int64()),
+])
+
+MARKETS_SCHEMA = pa.schema([
+    ("ticker", pa.string()),
+    ("event_ticker", pa.string()),
+    ("series_ticker", pa.string()),
+    ("market_type", pa.string()),
+    ("title", pa.string()),
+    ("subtitle", pa.string()),
+    ("yes_sub_title", pa.string()),
+    ("no_sub_title", pa.string()),
+    ("category", pa.string()),
+    ("status", pa.string()),
+    ("result", pa.string()),
+    ("created_time", pa.string()),
+    ("updated_time", pa.string()),
+    ("open_time", pa.string()),
+    ("close_time", pa.string()),
+    ("expiration_time", pa.string()),
+    ("expected_expiration_time", pa.string()),
+    ("latest_expiration_time", pa.string()),
+    ("settlement_ts", pa.string()),
+    ("fee_waiver_expiration_time", pa.string()),
+    ("can_close_early", pa.bool_()),
+    ("early_close_condition", pa.string()),
+    ("response_price_units", pa.string()),
+    ("price_level_structure", pa.string()),
+    ("tick_size", pa.int64()),
+    ("risk_limit_cents", pa.int64()),
+    ("yes_bid", pa.int64()),
+    ("yes_ask", pa.int64()),
+    ("no_bid", pa.int64()),
+    ("no_ask", pa.int64()),
+    ("last_price", pa.int64()),
+    ("previous_yes_bid", pa.int64()),
+    ("previous_yes_ask", pa.int64()),
+    ("previous_price", pa.int64()),
+    ("yes_bid_dollars", pa.string()),
+    ("yes_ask_dollars", pa.string()),
+    ("no_bid_dollars", pa.string()),
+    ("no_ask_dollars", pa.string()),
+    ("last_price_dollars", pa.string()),
+    ("previous_yes_bid_dollars", pa.string()),
+    ("previous_yes_ask_dollars", pa.string()),
+    ("previous_price_dollars", pa.string()),
+    ("volume", pa.int64()),
+    ("volume_24h", pa.int64()),
+    ("open_interest", pa.int64()),
+    ("volume_fp", pa.string()),
+    ("volume_24h_fp", pa.string()),
+    ("open_interest_fp", pa.string()),
+    ("liquidity", pa.int64()),
+    ("liquidity_dollars", pa.string()),
+    ("notional_value", pa.int64()),
+    ("notional_value_dollars", pa.string()),
+    ("expiration_value", pa.string()),
+    ("settlement_value", pa.int64()),
+    ("settlement_value_dollars", pa.string()),
+    ("strike_type", pa.string()),
+    ("floor_strike", pa.float64()),
+    ("cap_strike", pa.float64()),
+    ("functional_strike", pa.string()),
+    ("custom_strike", pa.string()),
+    ("rules_primary", pa.string()),
+    ("rules_secondary", pa.string()),
+    ("price_ranges", pa.list_(pa.struct([
+        ("start", pa.string()),
+        ("end", pa.string()),
+        ("step", pa.string()),
+    ]))),
+])
+
+EVENTS_SCHEMA = pa.schema([
+    ("event_ticker", pa.string()),
+    ("series_ticker", pa.string()),
+    ("title", pa.string()),
+    ("sub_title", pa.string()),
+    ("category", pa.string()),
+    ("mutually_exclusive", pa.bool_()),
+    ("collateral_return_type", pa.string()),
+    ("strike_date", pa.string()),
+    ("strike_period", pa.string()),
+    ("price_level_structure", pa.string()),
+    ("available_on_brokers", pa.bool_()),
+])
+
+SERIES_SCHEMA = pa.schema([
+    ("ticker", pa.string()),
+    ("title", pa.string()),
+    ("category", pa.string()),
+    ("frequency", pa.string()),
+    ("fee_type", pa.string()),
+    ("fee_multiplier", pa.float64()),
+    ("tags", pa.list_(pa.string())),
+    ("settlement_sources", pa.list_(pa.struct([
+        ("name", pa.string()),
+        ("url", pa.string()),
+    ]))),
+    ("contract_url", pa.string()),
+    ("contract_terms_url", pa.string()),
+    ("product_metadata", pa.string()),
+    ("additional_prohibitions", pa.list_(pa.string())),
+])
+
+_OHLC_FIELDS = [
+    ("open", pa.int64()),
+    ("high", pa.int64()),
+    ("low", pa.int64()),
+    ("close", pa.int64()),
+    ("open_dollars", pa.string()),
+    ("high_dollars", pa.string()),
+    ("low_dollars", pa.string()),
+    ("close_dollars", pa.string()),
+]
+
+_PRICE_EXTRA_FIELDS = [
+    ("mean", pa.int64()),
+    ("mean_dollars", pa.string()),
+    ("previous", pa.int64()),
+    ("previous_dollars", pa.string()),
+    ("min", pa.int64()),
+    ("min_dollars", pa.string()),
+    ("max", pa.int64()),
+    ("max_dollars", pa.string()),
+]
+
+CANDLES_RAW_SCHEMA = pa.schema([
+    ("end_period_ts", pa.int64()),
+    ("volume", pa.int64()),
+    ("volume_fp", pa.string()),
+    ("open_interest", pa.int64()),
+    ("open_interest_fp", pa.string()),
+    ("price", pa.struct(_OHLC_FIELDS + _PRICE_EXTRA_FIELDS)),
+    ("yes_bid", pa.struct(_OHLC_FIELDS)),
+    ("yes_ask", pa.struct(_OHLC_FIELDS)),
+])
+
+# Column order of the written candle files: identifiers, the top-level
+# fields, OHLC per section, then the price-only statistics.
+CANDLES_COLUMNS = [
+    "ticker",
+    "series_ticker",
+    "period_interval",
+    "end_period_ts",
+    "volume",
+    "volume_fp",
+    "open_interest",
+    "open_interest_fp",
+    *(f"{section}_{name}" for section in ("price", "yes_bid", "yes_ask") for name, _ in _OHLC_FIELDS),
+    *(f"price_{name}" for name, _ in _PRICE_EXTRA_FIELDS),
+]
+
+# Fields whose values are arbitrary JSON objects, stored as JSON text.
+JSON_FIELDS = {
+    "markets": ("custom_strike",),
+    "series": ("product_metadata",),
+}
+
+SCHEMAS = {
+    "trades": TRADES_RAW_SCHEMA,
+    "markets": MARKETS_SCHEMA,
+    "events": EVENTS_SCHEMA,
+    "series": SERIES_SCHEMA,
+    "candles": CANDLES_RAW_SCHEMA,
+}
+
+
+
+def _loading_type(type_: pa.DataType) -> pa.DataType:
+    """type_ with integer types, also those of struct members, replaced by float64."""
+    if pa.types.is_struct(type_):
+        return pa.struct([f.with_type(_loading_type(f.type)) for f in type_])
+    return pa.float64() if pa.types.is_integer(type_) else type_
+
+
+# SCHEMAS as records are first converted (see _cast_loaded).
+_LOADING_SCHEMAS = {
+    name: pa.schema([f.with_type(_loading_type(f.type)) for f in schema])
+    for name, schema in SCHEMAS.items()
+}
+
+_warned_fields: set[tuple[str, str]] = set()
+
+
+def _undeclared_fields(
+    dataset: str, schema: pa.Schema, records: list[dict[str, Any]]
+) -> list[str]:
+    """Fields of records that schema does not declare, warning once per new field."""
+    undeclared = sorted(set().union(*records) - set(schema.names))
+    new = [f for f in undeclared if (dataset, f) not in _warned_fields]
+    if new:
+        _warned_fields.update((dataset, f) for f in new)
+        logger.warning(
+            "Keeping fields not in the %s schema as JSON text: %s", dataset, ", ".join(new)
+        )
+    return undeclared
+
+
+def _encode_json_fields(
+    records: list[dict[str, Any]], fields: tuple[str, ...] | list[str]
+) -> list[dict[str, Any]]:
+    """records with non-string values of fields as JSON text; the inputs are not modified."""
+    if not fields:
+        return records
+    encoded = []
+    for record in records:
+        changes = {
+            field: json.dumps(value, sort_keys=True)
+            for field in fields
+            if (value := record.get(field)) is not None and not isinstance(value, str)
+        }
+        encoded.append({**record, **changes} if changes else record)
+    return encoded
+
+
+def _cast_loaded(array: pa.Array, field: pa.Field) -> pa.Array:
+    """A column converted with _loading_type cast to field's type.
+
+    Non-whole and non-finite values of integer fields are nulled (and
+    logged) first. Raises an Arrow error if a value is out of range.
+    """
+    type_ = field.type
+    if pa.types.is_struct(type_):
+        members = [_cast_loaded(array.field(i), f) for i, f in enumerate(type_)]
+        return pa.StructArray.from_arrays(members, fields=list(type_), mask=array.is_null())
+    if not pa.types.is_integer(type_):
+        return array
+    bad = pc.or_(pc.not_equal(array, pc.floor(array)), pc.invert(pc.is_finite(array)))
+    rejected = pc.sum(bad).as_py()
+    if rejected:
+        logger.warning(
+            "Nulled %d of %d %s values that do not fit %s (e.g. %r)",
+            rejected,
+            len(array),
+            field.name,
+            type_,
+            array.filter(bad)[0].as_py(),
+        )
+        array = pc.if_else(bad, pa.scalar(None, array.type), array)
+    return pc.cast(array, type_)
+
+
+def _coerce(value: Any, type_: pa.DataType) -> Any:
+    """value converted to fit type_; raises ValueError or an Arrow error if it cannot."""
+    if value is None:
+        return None
+    if pa.types.is_string(type_):
+        return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    if isinstance(value, bool) and not pa.types.is_boolean(type_):
+        raise ValueError(f"{value!r} is not a number")
+    if pa.types.is_integer(type_) and isinstance(value, (str, float)):
+        if isinstance(value, str):
+            try:
+                return _coerce(int(value), type_)
+            except ValueError:
+                value = float(value)
+        if not value.is_integer():
+            raise ValueError(f"{value!r} is not a whole number")
+        value = int(value)
+    elif pa.types.is_floating(type_) and isinstance(value, str):
+        value = float(value)
+    elif pa.types.is_boolean(type_) and isinstance(value, str):
+        if value.lower() not in ("true", "false"):
+            raise ValueError(f"{value!r} is not a boolean")
+        value = value.lower() == "true"
+    pa.scalar(value, type=type_)
+    return value
+
+
+def _column(values: list[Any], field: pa.Field) -> pa.Array:
+    """values as a field column, converting or nulling only the values that do not fit.
+
+    Struct values are converted member by member, so a bad member nulls
+    only itself.
+    """
+    try:
+        return _cast_loaded(pa.array(values, type=_loading_type(field.type)), field)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        pass
+    if pa.types.is_struct(field.type):
+        rows = [v if isinstance(v, dict) else None for v in values]
+        bad = [v for v, row in zip(values, rows) if v is not None and row is None]
+        if bad:
+            logger.warning(
+                "Nulled %d of %d %s values that are not objects (e.g. %r)",
+                len(bad),
+                len(values),
+                field.name,
+                bad[0],
+            )
+        members = [
+            _column([row.get(f.name) if row else None for row in rows], f) for f in field.type
+        ]
+        return pa.StructArray.from_arrays(
+            members, fields=list(field.type), mask=pa.array([row is None for row in rows])
+        )
+    coerced = []
+    rejected = []
+    for value in values:
+        try:
+            coerced.append(_coerce(value, field.type))
+        except (ValueError, TypeError, OverflowError, pa.ArrowInvalid, pa.ArrowTypeError):
+            # One unexpected value must not stop a multi-hour download.
+            coerced.append(None)
+            rejected.append(value)
+    if rejected:
+        logger.warning(
+            "Nulled %d of %d %s values that do not fit %s (e.g. %r)",
+            len(rejected),
+            len(values),
+            field.name,
+            field.type,
+            rejected[0],
+        )
+    return pa.array(coerced, type=field.type)
+
+
+def records_to_batch(records: list[dict[str, Any]], dataset: str) -> pa.RecordBatch:
+    """Convert one page of API records to a record batch with dataset's schema.
+
+    Pages that fit the schema are converted in a single call, with integer
+    fields read as float64 and cast by Arrow after fractions are nulled
+    (see _cast_loaded). Only a page with a mistyped value falls back to
+    converting the affected columns one by one, where values are coerced
+    (e.g. "12" to 12) and only those that cannot be are nulled. Undeclared
+    fields follow the declared columns as JSON text. The records
+    themselves are left unchanged.
+    """
+    schema = SCHEMAS[dataset]
+    undeclared = _undeclared_fields(dataset, schema, records)
+    records = _encode_json_fields(records, [*JSON_FIELDS.get(dataset, ()), *undeclared])
+    try:
+        loaded = pa.RecordBatch.from_pylist(records, schema=_LOADING_SCHEMAS[dataset])
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        loaded = None
+    columns = []
+    for i, field in enumerate(schema):
+        column = None
+        if loaded is not None:
+            try:
+                column = _cast_loaded(loaded.column(i), field)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+        if column is None:
+            column = _column([r.get(field.name) for r in records], field)
+        columns.append(column)
+    batch = pa.RecordBatch.from_arrays(columns, schema=schema)
+    for name in undeclared:
+        batch = batch.append_column(name, pa.array([r.get(name) for r in records], pa.string()))
+    return batch
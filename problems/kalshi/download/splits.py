@@ -0,0 +1,313 @@
+"""Materialize temporal train/validation splits as pruned data directories.
+
+Agent runs must not see held-out data, so each run mounts a data directory
+that only contains rows from before its split's cutoff. Splits are
+cumulative:
+
+- train: trades created before validation_start
+- validation: trades created before test_start
+- test: everything; the full data directory stays harness-only
+
+Copying ~5 GB per split is avoided by hard-linking every file whose rows all
+fall inside the split. Only files straddling a cutoff are rewritten with
+DuckDB, and files entirely past the cutoff are left out.
+
+Markets are kept if they opened before the cutoff. Markets that settle after
+it (by settlement_ts, or close_time where that is missing) are rewritten to
+look unsettled (status 'active', no result or settlement value), so outcomes
+decided in held-out months never leak into a split. Their
+price, volume, open-interest and liquidity snapshots were taken at download
+time, after the cutoff, so they are nulled too. Events and series carry no
+outcomes and are linked as-is.
+"""
+
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+import duckdb
+import pyarrow.parquet as pq
+
+from download.manifest import DatasetManifest, sync_manifest
+
+logger = logging.getLogger(__name__)
+
+SPLITS_FILE = "splits.json"
+STAGING_SUFFIX = ".building"
+DATASETS = ("trades", "markets", "events", "series")
+
+# Market snapshot columns recorded at download time, after the cutoff.
+_SNAPSHOT_COLUMNS = (
+    "yes_bid",
+    "yes_ask",
+    "no_bid",
+    "no_ask",
+    "last_price",
+    "previous_yes_bid",
+    "previous_yes_ask",
+    "previous_price",
+    "yes_bid_dollars",
+    "yes_ask_dollars",
+    "no_bid_dollars",
+    "no_ask_dollars",
+    "last_price_dollars",
+    "previous_yes_bid_dollars",
+    "previous_yes_ask_dollars",
+    "previous_price_dollars",
+    "volume",
+    "volume_24h",
+    "open_interest",
+    "volume_fp",
+    "volume_24h_fp",
+    "open_interest_fp",
+    "liquidity",
+    "liquidity_dollars",
+)
+
+# Columns overwritten on markets that are still unsettled at the cutoff.
+UNSETTLED_MARKET_VALUES = {
+    "status": "'active'",
+    "result": "''",
+    "expiration_value": "NULL",
+    "settlement_value": "NULL",
+    "settlement_value_dollars": "NULL",
+    "settlement_ts": "NULL",
+    **dict.fromkeys(_SNAPSHOT_COLUMNS, "NULL"),
+}
+
+
+@dataclass
+class SplitResult:
+    """Summary of one materialized split."""
+
+    name: str
+    cutoff: str
+    linked: int
+    rewritten: int
+    skipped: int
+
+
+def _timestamp(field: str) -> str:
+    return f"CAST({field} AS TIMESTAMPTZ)"
+
+
+def _link(source: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        # Different filesystem; fall back to a copy.
+        shutil.copy2(source, target)
+
+
+def _micros(ts: datetime) -> int:
+    return int(ts.timestamp() * 1_000_000)
+
+
+def _file_bounds(
+    con: duckdb.DuckDBPyConnection, files: list[Path], fields: list[str]
+) -> dict[str, list[int | None]]:
+    """Map each file to [min(field), max(field), ...] in epoch microseconds.
+
+    Files lacking a field (or with only NULLs) get None for its bounds.
+    """
+    file_list = "[" + ", ".join(f"'{p}'" for p in files) + "]"
+    source = f"read_parquet({file_list}, filename = true, union_by_name = true)"
+    present = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+    aggregates = ", ".join(
+        f"epoch_us(min({_timestamp(f)})), epoch_us(max({_timestamp(f)}))"
+        if f in present
+        else "NULL, NULL"
+        for f in fields
+    )
+    rows = con.execute(f"""
+        SELECT filename, {aggregates}
+        FROM {source}
+        GROUP BY filename
+    """).fetchall()
+    return {row[0]: list(row[1:]) for row in rows}
+
+
+def _split_trades(
+    con: duckdb.DuckDBPyConnection,
+    source_dir: Path,
+    out_dir: Path,
+    start: datetime | None,
+    end: datetime,
+    result: SplitResult,
+) -> None:
+    files = sorted(source_dir.rglob("*.parquet"))
+    if not files:
+        return
+    bounds = _file_bounds(con, files, ["created_time"])
+    manifest = DatasetManifest(source_dir).entries()
+    end_us = _micros(end)
+    start_us = _micros(start) if start is not None else None
+    linked_entries = []
+    for path in files:
+        rel = path.relative_to(source_dir)
+        lo, hi = bounds.get(str(path), [None, None])
+        if lo is None or lo >= end_us or (start_us is not None and hi < start_us):
+            result.skipped += 1
+        elif hi < end_us and (start_us is None or lo >= start_us):
+            _link(path, out_dir / rel)
+            result.linked += 1
+            if str(rel) in manifest:
+                linked_entries.append(manifest[str(rel)])
+        else:
+            where = f"{_timestamp('created_time')} < '{end.isoformat()}'"
+            if start is not None:
+                where += f" AND {_timestamp('created_time')} >= '{start.isoformat()}'"
+            (out_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+            con.execute(f"""
+                COPY (SELECT * FROM read_parquet('{path}') WHERE {where})
+                TO '{out_dir / rel}' (FORMAT parquet, COMPRESSION snappy)
+            """)
+            result.rewritten += 1
+
+    # Entries of linked files describe only rows inside the split; the
+    # rewritten files are indexed from scratch.
+    DatasetManifest(out_dir).rewrite(linked_entries)
+    sync_manifest(out_dir)
+
+
+def _split_markets(
+    con: duckdb.DuckDBPyConnection,
+    source_dir: Path,
+    out_dir: Path,
+    end: datetime,
+    result: SplitResult,
+) -> None:
+    # Refresh deltas in markets/_delta/ are split like the base files, so
+    # latest-wins readers see the same markets as in the full data.
+    files = sorted(source_dir.rglob("*.parquet"))
+    if not files:
+        return
+    bounds = _file_bounds(con, files, ["open_time", "close_time", "settlement_ts"])
+    end_us = _micros(end)
+    cutoff = f"'{end.isoformat()}'"
+    for path in files:
+        target = out_dir / path.relative_to(source_dir)
+        open_lo, open_hi, _, close_hi, _, settled_hi = bounds.get(str(path), [None] * 6)
+        if open_lo is not None and open_lo >= end_us:
+            result.skipped += 1
+        elif all(hi is None or hi < end_us for hi in (open_hi, close_hi, settled_hi)):
+            _link(path, target)
+            result.linked += 1
+        else:
+            names = pq.read_schema(path).names
+            settled_at = _timestamp("close_time")
+            if "settlement_ts" in names:
+                settled_at = f"COALESCE({_timestamp('settlement_ts')}, {settled_at})"
+            unsettled_at_cutoff = f"{settled_at} >= {cutoff}"
+            replace = ", ".join(
+                f"CASE WHEN {unsettled_at_cutoff} THEN {value} ELSE {name} END AS {name}"
+                for name, value in UNSETTLED_MARKET_VALUES.items()
+                if name in names
+            )
+            where = f"{_timestamp('open_time')} < {cutoff}" if "open_time" in names else "TRUE"
+            columns = f"* REPLACE ({replace})" if replace else "*"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            con.execute(f"""
+                COPY (
+                    SELECT {columns}
+                    FROM read_parquet('{path}')
+                    WHERE {where}
+                ) TO '{target}' (FORMAT parquet, COMPRESSION snappy)
+            """)
+            result.rewritten += 1
+    sync_manifest(out_dir)
+
+
+def _link_dataset(source_dir: Path, out_dir: Path, result: SplitResult) -> None:
+    for path in sorted(source_dir.rglob("*.parquet")):
+        _link(path, out_dir / path.relative_to(source_dir))
+        result.linked += 1
+    sync_manifest(out_dir)
+
+
+def materialize_split(
+    data_dir: Path,
+    out_dir: Path,
+    name: str,
+    end: datetime,
+    start: datetime | None = None,
+) -> SplitResult:
+    """Write the rows of data_dir visible before end into out_dir.
+
+    The split is built in a staging directory and swapped in, replacing any
+    previous version of it.
+    """
+    staging = out_dir.with_name(out_dir.name + STAGING_SUFFIX)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    result = SplitResult(name=name, cutoff=end.isoformat(), linked=0, rewritten=0, skipped=0)
+    con = duckdb.connect()
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        for dataset in DATASETS:
+            source_dir = data_dir / dataset
+            if not source_dir.exists():
+                continue
+            logger.info("Splitting %s for %s (before %s)...", dataset, name, end.date())
+            target = staging / dataset
+            target.mkdir()
+            if dataset == "trades":
+                _split_trades(con, source_dir, target, start, end, result)
+            elif dataset == "markets":
+                _split_markets(con, source_dir, target, end, result)
+            else:
+                _link_dataset(source_dir, target, result)
+    finally:
+        con.close()
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.rename(staging, out_dir)
+    logger.info(
+        "Split %s: %d files linked, %d rewritten, %d skipped",
+        name,
+        result.linked,
+        result.rewritten,
+        result.skipped,
+    )
+    return result
+
+
+def materialize_splits(
+    data_dir: Path,
+    splits_dir: Path,
+    validation_start: datetime,
+    test_start: datetime,
+    start: datetime | None = None,
+) -> list[SplitResult]:
+    """Write the train and validation splits of data_dir under splits_dir.
+
+    All bounds are UTC; start optionally drops trades before it from both
+    splits. A splits.json describing the cutoffs is written alongside.
+    """
+    if not validation_start < test_start:
+        raise ValueError("validation_start must be before test_start")
+    if start is not None and not start < validation_start:
+        raise ValueError("start must be before validation_start")
+
+    splits_dir.mkdir(parents=True, exist_ok=True)
+    results = [
+        materialize_split(data_dir, splits_dir / "train", "train", validation_start, start),
+        materialize_split(data_dir, splits_dir / "validation", "validation", test_start, start),
+    ]
+    meta = {
+        "start": start.isoformat() if start else None,
+        "validation_start": validation_start.isoformat(),
+        "test_start": test_start.isoformat(),
+        "created_at": datetime.now(UTC).isoformat(),
+        "splits": {r.name: {"cutoff": r.cutoff} for r in results},
+    }
+    (splits_dir / SPLITS_FILE).write_text(json.dumps(meta, indent=2))
+    return results
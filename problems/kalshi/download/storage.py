@@ -1,36 +1,79 @@
 """Chunked Parquet storage for downloaded Kalshi data.
 
 Writes records in chunks (default 10K rows) to numbered Parquet files,
-enabling partial reads with DuckDB glob patterns.
+enabling partial reads with DuckDB glob patterns. Trades are additionally
+partitioned by month into a Hive-style layout (year=YYYY/month=MM/).
+
+Each incoming page is converted once to an Arrow record batch with the
+dataset's declared schema (see download.schemas), on a worker thread so the
+event loop keeps serving requests; chunks are zero-copy slices of the
+buffered batches.
+
+Files are encoded and written on a background thread (see
+download.write_queue); awaiting flush() returns once everything is on disk. Every
+file written is recorded in the dataset's manifest (see download.manifest)
+so readers can prune files without opening them.
 """
 
+import asyncio
 import json
 import logging
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
 import pyarrow as pa
-import pyarrow.parquet as pq
+import pyarrow.compute as pc
+
+from download.checkpoint import CHECKPOINT_FILE, CheckpointStore
+from download.manifest import DatasetManifest
+from download.schemas import records_to_batch
+from download.write_queue import WriteQueue
+from download.writer_config import DEFAULT_WRITER_CONFIG, ParquetWriterConfig
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CHUNK_SIZE = 10_000
 CURSOR_DIR = ".cursors"
 
+# Optional per-chunk conversion applied before a table is written.
+TableTransform = Callable[[pa.Table], pa.Table]
+
 
 class ParquetChunkWriter:
-    """Accumulates records and flushes them to numbered Parquet files."""
+    """Accumulates records and flushes them to numbered Parquet files.
+
+    dataset names the declared schema records are converted with (one of
+    download.schemas.SCHEMAS); without it each page's schema is inferred.
+    If transform is given, each chunk table is passed through it before
+    writing (e.g. download.normalize.normalize_trades). Each written file is
+    appended to manifest, which defaults to one in output_dir. Files are laid
+    out according to writer_config (bloom filters, page index, row groups)
+    and written by write_queue, which defaults to one of its own.
+    """
 
     def __init__(
         self,
         output_dir: Path,
         chunk_size: int = DEFAULT_CHUNK_SIZE,
         name_prefix: str = "part",
+        transform: TableTransform | None = None,
+        manifest: DatasetManifest | None = None,
+        writer_config: ParquetWriterConfig = DEFAULT_WRITER_CONFIG,
+        dataset: str | None = None,
+        write_queue: WriteQueue | None = None,
     ):
         self.output_dir = output_dir
         self.chunk_size = chunk_size
         self.name_prefix = name_prefix
-        self._buffer: list[dict[str, Any]] = []
+        self.transform = transform
+        self.manifest = manifest or DatasetManifest(output_dir)
+        self.writer_config = writer_config
+        self.dataset = dataset
+        self.write_queue = write_queue or WriteQueue(name=f"{name_prefix}-writer")
+        self._batches: list[pa.RecordBatch] = []
+        self._buffered = 0
+        self._written: list[tuple[Path, int]] = []
         self._file_counter = 0
         self._total_written = 0
 
@@ -49,66 +92,226 @@ class ParquetChunkWriter:
                 self._file_counter,
             )
 
-    def add_records(self, records: list[dict[str, Any]]) -> None:
+    async def add_records(self, records: list[dict[str, Any]]) -> None:
         """Add records to the buffer, flushing full chunks to disk."""
-        self._buffer.extend(records)
-        while len(self._buffer) >= self.chunk_size:
-            chunk = self._buffer[: self.chunk_size]
-            self._buffer = self._buffer[self.chunk_size :]
-            self._write_chunk(chunk)
-
-    def flush(self) -> None:
-        """Write any remaining buffered records to disk."""
-        if self._buffer:
-            self._write_chunk(self._buffer)
-            self._buffer = []
-
-    def _write_chunk(self, records: list[dict[str, Any]]) -> None:
-        """Write a list of records as a Parquet file."""
-        table = pa.Table.from_pylist(records)
-        filename = f"{self.name_prefix}_{self._file_counter:06d}.parquet"
-        filepath = self.output_dir / filename
-        pq.write_table(table, filepath, compression="snappy")
-        self._file_counter += 1
-        self._total_written += len(records)
-        logger.debug(
-            "Wrote %d records to %s (total: %d)", len(records), filepath, self._total_written
+        if records:
+            await self.add_batch(await asyncio.to_thread(to_batch, records, self.dataset))
+
+    async def add_batch(self, batch: pa.RecordBatch) -> None:
+        """Add an already converted batch, flushing full chunks to disk."""
+        if not batch.num_rows:
+            return
+        self._batches.append(batch)
+        self._buffered += batch.num_rows
+        if self._buffered < self.chunk_size:
+            return
+        buffered = self._buffered_table()
+        offset = 0
+        while self._buffered - offset >= self.chunk_size:
+            await self._write_chunk(buffered.slice(offset, self.chunk_size))
+            offset += self.chunk_size
+        rest = buffered.slice(offset)
+        self._batches = rest.to_batches()
+        self._buffered = rest.num_rows
+
+    async def flush(self) -> None:
+        """Write any remaining buffered records and wait until all are on disk."""
+        if self._buffered:
+            await self._write_chunk(self._buffered_table())
+        self._batches = []
+        self._buffered = 0
+        await self.write_queue.drain()
+
+    def _buffered_table(self) -> pa.Table:
+        schema = self._batches[0].schema
+        if all(b.schema == schema for b in self._batches):
+            return pa.Table.from_batches(self._batches)
+        # Inferred page schemas may differ (e.g. a field null in one page), as
+        # may declared ones when a page has undeclared fields.
+        return pa.concat_tables(
+            [pa.Table.from_batches([b]) for b in self._batches], promote_options="permissive"
         )
 
+    async def _write_chunk(self, table: pa.Table) -> None:
+        """Queue a chunk table to be written as the next numbered Parquet file."""
+        filepath = self.output_dir / f"{self.name_prefix}_{self._file_counter:06d}.parquet"
+        await self.write_queue.submit(self._write_file, table, filepath)
+        self._written.append((filepath, table.num_rows))
+        self._file_counter += 1
+        self._total_written += table.num_rows
+
+    def _write_file(self, table: pa.Table, filepath: Path) -> None:
+        """Transform, encode and write one chunk (runs on the write queue's thread)."""
+        if self.transform is not None:
+            table = self.transform(table)
+        self.writer_config.write_table(table, filepath)
+        self.manifest.record(filepath, table)
+        logger.debug("Wrote %d records to %s", table.num_rows, filepath)
+
+    def take_written(self) -> list[tuple[Path, int]]:
+        """(path, rows) of files queued since the last call; flush() first to have them on disk."""
+        written, self._written = self._written, []
+        return written
+
     @property
     def total_written(self) -> int:
         return self._total_written
 
 
+def to_batch(records: list[dict[str, Any]], dataset: str | None) -> pa.RecordBatch:
+    """Convert a page of records with dataset's declared schema, or by inference."""
+    if dataset is not None:
+        return records_to_batch(records, dataset)
+    return pa.RecordBatch.from_pylist(records)
+
+
+def month_partition(timestamp: str) -> str:
+    """Return the Hive partition path (year=YYYY/month=MM) for an ISO timestamp."""
+    return f"year={timestamp[:4]}/month={timestamp[5:7]}"
+
+
+class PartitionedChunkWriter:
+    """Routes records into month partitions, one ParquetChunkWriter per partition.
+
+    Partitions are keyed on an ISO timestamp field so DuckDB can prune whole
+    directories for date-bounded queries. All partitions share one manifest
+    in output_dir and one write queue.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        partition_field: str = "created_time",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        name_prefix: str = "part",
+        transform: TableTransform | None = None,
+        writer_config: ParquetWriterConfig = DEFAULT_WRITER_CONFIG,
+        dataset: str | None = None,
+    ):
+        self.output_dir = output_dir
+        self.partition_field = partition_field
+        self.chunk_size = chunk_size
+        self.name_prefix = name_prefix
+        self.transform = transform
+        self.writer_config = writer_config
+        self.dataset = dataset
+        self.manifest = DatasetManifest(output_dir)
+        self.write_queue = WriteQueue(name=f"{name_prefix}-writer")
+        self._writers: dict[str, ParquetChunkWriter] = {}
+
+    def _writer(self, partition: str) -> ParquetChunkWriter:
+        if partition not in self._writers:
+            self._writers[partition] = ParquetChunkWriter(
+                self.output_dir / partition,
+                chunk_size=self.chunk_size,
+                name_prefix=self.name_prefix,
+                transform=self.transform,
+                manifest=self.manifest,
+                writer_config=self.writer_config,
+                dataset=self.dataset,
+                write_queue=self.write_queue,
+            )
+        return self._writers[partition]
+
+    async def add_records(self, records: list[dict[str, Any]]) -> None:
+        """Add records to their month partitions, flushing full chunks to disk."""
+        if not records:
+            return
+        batch = await asyncio.to_thread(to_batch, records, self.dataset)
+        # "YYYY-MM" prefix of each ISO timestamp; pages usually span one month.
+        months = pc.utf8_slice_codeunits(
+            pc.cast(batch.column(self.partition_field), pa.string()), 0, 7
+        )
+        unique = pc.unique(months).to_pylist()
+        if len(unique) == 1:
+            await self._writer(month_partition(unique[0])).add_batch(batch)
+            return
+        for month in unique:
+            group = batch.filter(pc.equal(months, month))
+            await self._writer(month_partition(month)).add_batch(group)
+
+    async def flush(self) -> None:
+        """Write any remaining buffered records in every partition to disk."""
+        for writer in self._writers.values():
+            await writer.flush()
+        await self.write_queue.drain()
+        logger.debug("%s write stats: %s", self.name_prefix, self.write_queue.stats.as_dict())
+
+    def take_written(self) -> list[tuple[Path, int]]:
+        """(path, rows) of files queued since the last call, across partitions."""
+        return [f for w in self._writers.values() for f in w.take_written()]
+
+    @property
+    def total_written(self) -> int:
+        return sum(w.total_written for w in self._writers.values())
+
+
 class CursorStore:
-    """Persist pagination cursors for resumable downloads.
+    """Persist pagination cursors and other download state for resumable downloads.
 
-    Stores cursor state as JSON files in data/.cursors/.
+    Backed by the CheckpointStore in data/.cursors/checkpoints.db. Cursor
+    JSON files left in data/.cursors/ by older versions are imported the
+    first time their key is loaded.
     """
 
     def __init__(self, data_dir: Path):
         self.cursor_dir = data_dir / CURSOR_DIR
-        self.cursor_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoints = CheckpointStore(self.cursor_dir / CHECKPOINT_FILE)
 
-    def _path(self, key: str) -> Path:
+    def _legacy_path(self, key: str) -> Path:
         safe_key = key.replace("/", "__")
         return self.cursor_dir / f"{safe_key}.json"
 
     def save(self, key: str, cursor: str, records_so_far: int = 0) -> None:
         """Save cursor state for a download key."""
-        state = {"cursor": cursor, "records_so_far": records_so_far}
-        self._path(key).write_text(json.dumps(state))
+        self.save_state(key, {"cursor": cursor, "records_so_far": records_so_far})
 
     def load(self, key: str) -> tuple[str | None, int]:
         """Load cursor state. Returns (cursor, records_so_far) or (None, 0)."""
-        path = self._path(key)
-        if path.exists():
-            state = json.loads(path.read_text())
+        state = self.load_state(key)
+        if state is not None:
             return state.get("cursor"), state.get("records_so_far", 0)
         return None, 0
 
+    def checkpoint(
+        self,
+        key: str,
+        state: dict[str, Any],
+        dataset: str,
+        files: list[tuple[Path, int]],
+    ) -> None:
+        """Save state together with the chunk files written since the last checkpoint.
+
+        Call this only after the writer has flushed, so the saved cursor never
+        runs ahead of the data on disk.
+        """
+        self.checkpoints.set_state(key, state)
+        self.checkpoints.record_files(dataset, files)
+        self.checkpoints.commit()
+
+    def save_state(self, key: str, state: dict[str, Any]) -> None:
+        """Save arbitrary JSON state for a key (e.g. a sync high-water mark)."""
+        self.checkpoints.set_state(key, state)
+        self.checkpoints.commit()
+
+    def load_state(self, key: str) -> dict[str, Any] | None:
+        """Load state saved with save_state, or None."""
+        state = self.checkpoints.get_state(key)
+        legacy = self._legacy_path(key)
+        if state is None and legacy.exists():
+            state = json.loads(legacy.read_text())
+            self.save_state(key, state)
+            legacy.unlink()
+        return state
+
     def clear(self, key: str) -> None:
         """Clear cursor state after successful completion."""
-        path = self._path(key)
-        if path.exists():
-            path.unlink()
+        self.finish(key)
+
+    def finish(self, key: str, dataset: str = "", files: list[tuple[Path, int]] | None = None) -> None:
+        """Clear key's state and record the last chunk files in one commit."""
+        self.checkpoints.delete_state(key)
+        if files:
+            self.checkpoints.record_files(dataset, files)
+        self.checkpoints.commit()
+        self._legacy_path(key).unlink(missing_ok=True)
@@ -0,0 +1,260 @@
+"""Request, throughput and write telemetry for the downloaders.
+
+Telemetry is one registry shared by KalshiClient, the candlestick
+AuthenticatedClient and the background WriteQueue of every writer:
+
+- per endpoint: a latency histogram of network time, responses by status,
+  retries (failed attempts with a retryable status or connection error),
+  429s, bytes received and records returned
+- per phase: seconds spent waiting on the rate limiter, signing, on the
+  network, decoding JSON, writing Parquet and blocked on a full write queue
+
+Phase seconds are summed over concurrent requests, so compare them with
+each other rather than with wall time: a large "limiter" share means the
+rate budget is the bottleneck, "network" the API, "write_blocked" the disk.
+
+Components record into TELEMETRY unless given their own registry (the
+benchmark gives each scenario one). It is exported as Prometheus text,
+for a node_exporter textfile collector or a plain scrape, by
+MetricsExporter or by the candlestick status writer, and as a dict in the
+status JSON.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = "metrics.prom"
+# Upper bounds in seconds; one more bucket catches everything slower.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ("limiter", "sign", "network", "decode", "write", "write_blocked")
+RETRYABLE_STATUSES = frozenset({"429", "500", "502", "503", "504", "error"})
+DEFAULT_EXPORT_INTERVAL = 15.0
+
+
+def endpoint_label(path: str) -> str:
+    """Path with market-specific segments removed, e.g. "/candlesticks"."""
+    if path.rstrip("/").endswith("/candlesticks"):
+        return "/candlesticks"
+    return path.rstrip("/") or "/"
+
+
+class Histogram:
+    """Fixed-bucket histogram, in the cumulative form Prometheus expects."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(le, observations at or below le) pairs, ending with +Inf."""
+        bounds = [*(f"{b:g}" for b in self.buckets), "+Inf"]
+        total = 0
+        pairs = []
+        for le, n in zip(bounds, self.counts, strict=True):
+            total += n
+            pairs.append((le, total))
+        return pairs
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the last finite
+        bound if it falls in the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, n in zip(self.buckets, self.counts, strict=False):
+            total += n
+            if total >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+@dataclass
+class EndpointStats:
+    latency: Histogram = field(default_factory=Histogram)
+    responses: Counter = field(default_factory=Counter)
+    retries: int = 0
+    throttled: int = 0
+    bytes_received: int = 0
+    records: int = 0
+
+
+class Telemetry:
+    """Thread-safe registry of download metrics (see the module docstring)."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self._lock = threading.Lock()
+
+    def _endpoint(self, path: str) -> EndpointStats:
+        label = endpoint_label(path)
+        if label not in self.endpoints:
+            self.endpoints[label] = EndpointStats()
+        return self.endpoints[label]
+
+    def record_request(
+        self,
+        path: str,
+        status: int | str,
+        limiter: float = 0.0,
+        sign: float = 0.0,
+        network: float = 0.0,
+        decode: float = 0.0,
+        nbytes: int = 0,
+    ) -> None:
+        """Record one attempt; status is the HTTP status or "error" if none came back."""
+        status = str(status)
+        with self._lock:
+            stats = self._endpoint(path)
+            stats.responses[status] += 1
+            if status != "error":
+                stats.latency.observe(network)
+            if status in RETRYABLE_STATUSES:
+                stats.retries += 1
+            if status == "429":
+                stats.throttled += 1
+            stats.bytes_received += nbytes
+            self.phase_seconds["limiter"] += limiter
+            self.phase_seconds["sign"] += sign
+            self.phase_seconds["network"] += network
+            self.phase_seconds["decode"] += decode
+
+    def record_records(self, path: str, count: int) -> None:
+        with self._lock:
+            self._endpoint(path).records += count
+
+    def record_write(self, seconds: float = 0.0, blocked: float = 0.0) -> None:
+        with self._lock:
+            self.phase_seconds["write"] += seconds
+            self.phase_seconds["write_blocked"] += blocked
+
+    def as_dict(self) -> dict[str, Any]:
+        """Summary for status JSON: latency percentiles in ms, rates per second."""
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            total_phase = sum(self.phase_seconds.values())
+            return {
+                "uptime_seconds": round(uptime, 1),
+                "endpoints": {
+                    label: {
+                        "requests": sum(s.responses.values()),
+                        "retries": s.retries,
+                        "throttled": s.throttled,
+                        "bytes_received": s.bytes_received,
+                        "records": s.records,
+                        "records_per_second": round(s.records / uptime, 1) if uptime > 0 else 0.0,
+                        "mean_ms": round(s.latency.sum / s.latency.count * 1000, 1)
+                        if s.latency.count
+                        else 0.0,
+                        "p50_ms": s.latency.quantile(0.5) * 1000,
+                        "p95_ms": s.latency.quantile(0.95) * 1000,
+                        "p99_ms": s.latency.quantile(0.99) * 1000,
+                    }
+                    for label, s in sorted(self.endpoints.items())
+                },
+                "phase_seconds": {p: round(s, 2) for p, s in self.phase_seconds.items()},
+                "phase_share": {
+                    p: round(s / total_phase, 3) if total_phase else 0.0
+                    for p, s in self.phase_seconds.items()
+                },
+            }
+
+    def prometheus(self, prefix: str = "kalshi_download") -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            return f"{prefix}_{name}"
+
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            name = family("request_duration_seconds", "histogram", "Network time per response.")
+            for label, s in endpoints:
+                for le, count in s.latency.cumulative():
+                    lines.append(f'{name}_bucket{{endpoint="{label}",le="{le}"}} {count}')
+                lines.append(f'{name}_sum{{endpoint="{label}"}} {s.latency.sum:.6f}')
+                lines.append(f'{name}_count{{endpoint="{label}"}} {s.latency.count}')
+            name = family("responses_total", "counter", "Request attempts by status.")
+            for label, s in endpoints:
+                for status, count in sorted(s.responses.items()):
+                    lines.append(f'{name}{{endpoint="{label}",status="{status}"}} {count}')
+            for metric, attr, help_text in (
+                ("retries_total", "retries", "Attempts failed with a retryable status or error."),
+                ("throttled_total", "throttled", "429 responses."),
+                ("received_bytes_total", "bytes_received", "Response bytes received."),
+                ("records_total", "records", "Records returned."),
+            ):
+                name = family(metric, "counter", help_text)
+                for label, s in endpoints:
+                    lines.append(f'{name}{{endpoint="{label}"}} {getattr(s, attr)}')
+            name = family("phase_seconds_total", "counter", "Seconds spent per phase.")
+            for phase, seconds in self.phase_seconds.items():
+                lines.append(f'{name}{{phase="{phase}"}} {seconds:.6f}')
+            name = family("uptime_seconds", "gauge", "Seconds since telemetry started.")
+            lines.append(f"{name} {time.monotonic() - self.started:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """Replace path atomically with the current metrics."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.prometheus())
+        os.replace(tmp, path)
+
+
+TELEMETRY = Telemetry()
+
+
+class MetricsExporter:
+    """Writes telemetry to path every interval seconds inside async with.
+
+    The file is written once more on exit, so it holds the final totals.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        telemetry: Telemetry = TELEMETRY,
+        interval: float = DEFAULT_EXPORT_INTERVAL,
+    ):
+        self.path = path
+        self.telemetry = telemetry
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.telemetry.write_prometheus(self.path)
+
+    async def __aenter__(self) -> Self:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.telemetry.write_prometheus(self.path)
+        logger.debug("Wrote metrics to %s", self.path)
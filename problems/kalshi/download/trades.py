@@ -3,17 +3,129 @@
 This is the largest download (~100M+ trades, 3-5 GB, ~1.5-2 hours).
 Strategy: paginate through all trades globally using the /markets/trades endpoint
 without a ticker filter, which returns trades across all markets in chronological order.
+Trades are written to a month-partitioned layout: trades/year=YYYY/month=MM/,
+with prices, counts and timestamps normalized to typed columns (see normalize.py).
+
+sync_trades tops up an existing dataset: it pages only trades newer than the
+stored high-water mark (via min_ts) and appends them as new chunks.
+
+backfill_trades splits a time range into windows, each paged with its own
+min_ts/max_ts cursor, so a full download runs at the rate limit rather than
+at one request's round-trip latency. Trading volume grows over time, so when
+markets are stored the windows hold equal shares of their volume rather than
+equal spans of time.
 """
 
+import asyncio
 import logging
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from itertools import accumulate, pairwise
 from pathlib import Path
+from typing import Any
+
+import duckdb
+import pyarrow.parquet as pq
 
 from download.client import KalshiClient
-from download.storage import CursorStore, ParquetChunkWriter
+from download.manifest import DatasetManifest, entry_is_current
+from download.markets import markets_table_sql
+from download.normalize import normalize_trades
+from download.storage import CursorStore, PartitionedChunkWriter
 
 logger = logging.getLogger(__name__)
 
 CURSOR_KEY = "trades_global"
+HIGH_WATER_MARK_KEY = "trades_high_water_mark"
+TRADES_CHUNK_SIZE = 10_000
+
+# First trade on Kalshi's public API.
+BACKFILL_START = datetime(2021, 6, 30, tzinfo=UTC)
+DEFAULT_BACKFILL_WINDOWS = 8
+# Equal slices of the backfill range that market volume is summed into.
+VOLUME_PROFILE_BUCKETS = 1024
+
+
+def _trades_writer(output_dir: Path, name_prefix: str = "trades") -> PartitionedChunkWriter:
+    return PartitionedChunkWriter(
+        output_dir,
+        partition_field="created_time",
+        chunk_size=TRADES_CHUNK_SIZE,
+        name_prefix=name_prefix,
+        transform=normalize_trades,
+        dataset="trades",
+    )
+
+
+def _parse_time(value: Any) -> datetime:
+    """Parse an API timestamp string (or stored datetime) into an aware UTC datetime."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=UTC)
+    return datetime.fromisoformat(value).astimezone(UTC)
+
+
+def _footer_max_created_time(path: Path) -> datetime | None:
+    """Largest created_time in a Parquet file, from its row-group statistics."""
+    metadata = pq.ParquetFile(path).metadata
+    if "created_time" not in metadata.schema.names:
+        return None
+    column = metadata.schema.names.index("created_time")
+    latest = None
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(column).statistics
+        if stats is None or not stats.has_min_max:
+            continue
+        value = _parse_time(stats.max)
+        if latest is None or value > latest:
+            latest = value
+    return latest
+
+
+def _file_max_times(output_dir: Path) -> dict[Path, datetime | None]:
+    """Max created_time per trades file, from the manifest or else the footer."""
+    entries = DatasetManifest(output_dir).entries()
+    times: dict[Path, datetime | None] = {}
+    for path in sorted(output_dir.rglob("*.parquet")):
+        entry = entries.get(str(path.relative_to(output_dir)))
+        if entry is not None and entry_is_current(entry, path):
+            value = entry.get("max_created_time")
+            times[path] = _parse_time(value) if value else None
+        else:
+            times[path] = _footer_max_created_time(path)
+    return times
+
+
+def stored_high_water_mark(data_dir: Path) -> datetime | None:
+    """Latest created_time in the stored trades, without scanning their rows."""
+    times = [t for t in _file_max_times(data_dir / "trades").values() if t is not None]
+    return max(times, default=None)
+
+
+def _trade_ids_since(output_dir: Path, since: datetime) -> set[str]:
+    """trade_ids of stored trades in files reaching since or later.
+
+    Only the newest files are read: those a sync appended, plus the file
+    holding the high-water mark itself.
+    """
+    ids: set[str] = set()
+    for path, latest in _file_max_times(output_dir).items():
+        if latest is not None and latest >= since:
+            ids.update(pq.read_table(path, columns=["trade_id"]).column("trade_id").to_pylist())
+    return ids
+
+
+def _record_high_water_mark(cursor_store: CursorStore, latest: datetime) -> None:
+    cursor_store.save_state(
+        HIGH_WATER_MARK_KEY,
+        {"created_time": latest.isoformat(), "recorded_at": datetime.now(UTC).isoformat()},
+    )
+
+
+def load_high_water_mark(data_dir: Path) -> datetime | None:
+    """High-water mark recorded by the last completed download or sync."""
+    state = CursorStore(data_dir).load_state(HIGH_WATER_MARK_KEY)
+    return _parse_time(state["created_time"]) if state else None
 
 
 async def download_trades(client: KalshiClient, data_dir: Path, resume: bool = True) -> int:
@@ -23,7 +135,7 @@ async def download_trades(client: KalshiClient, data_dir: Path, resume: bool = T
     Returns the number of records downloaded in this run.
     """
     output_dir = data_dir / "trades"
-    writer = ParquetChunkWriter(output_dir, chunk_size=10_000, name_prefix="trades")
+    writer = _trades_writer(output_dir)
     cursor_store = CursorStore(data_dir)
 
     resume_cursor = None
@@ -38,18 +150,309 @@ async def download_trades(client: KalshiClient, data_dir: Path, resume: bool = T
 
     logger.info("Downloading historical trades (this will take a while)...")
     total = records_so_far
+    unsaved = 0
+    latest: datetime | None = None
 
     async for batch, cursor in client.get_trades(resume_cursor=resume_cursor):
-        writer.add_records(batch)
+        await writer.add_records(batch)
         total += len(batch)
+        unsaved += len(batch)
+        batch_latest = max(_parse_time(r["created_time"]) for r in batch)
+        latest = batch_latest if latest is None else max(latest, batch_latest)
 
-        if cursor:
-            cursor_store.save(CURSOR_KEY, cursor, total)
+        # Checkpoint once a chunk is on disk, so the cursor never runs ahead
+        # of the data.
+        if cursor and unsaved >= TRADES_CHUNK_SIZE:
+            await writer.flush()
+            cursor_store.checkpoint(
+                CURSOR_KEY,
+                {"cursor": cursor, "records_so_far": total},
+                "trades",
+                writer.take_written(),
+            )
+            unsaved = 0
 
         if total % 100_000 == 0:
             logger.info("Trades progress: %d records downloaded", total)
 
-    writer.flush()
-    cursor_store.clear(CURSOR_KEY)
-    logger.info("Trades download complete: %d total records", total)
+    await writer.flush()
+    cursor_store.finish(CURSOR_KEY, "trades", writer.take_written())
+    # A resumed download may not have seen the newest trades; read them back.
+    latest = stored_high_water_mark(data_dir) if resume_cursor else latest
+    if latest is not None:
+        _record_high_water_mark(cursor_store, latest)
+    logger.info(
+        "Trades download complete: %d total records (writes: %s)",
+        total,
+        writer.write_queue.stats.as_dict(),
+    )
+    return writer.total_written
+
+
+async def sync_trades(client: KalshiClient, data_dir: Path) -> int:
+    """Download trades newer than the stored ones and append them as new chunks.
+
+    The starting point is the high-water mark recorded by the last completed
+    download or sync, falling back to the latest created_time in the dataset
+    manifest (or Parquet footers). The API is paged with min_ts at that
+    second, and trades already stored are dropped by trade_id. The mark only
+    advances once a sync completes, so an interrupted sync simply runs again
+    from the old mark without duplicating what it already wrote.
+
+    Returns the number of new trades written.
+    """
+    output_dir = data_dir / "trades"
+    cursor_store = CursorStore(data_dir)
+
+    since = load_high_water_mark(data_dir)
+    if since is None:
+        since = stored_high_water_mark(data_dir)
+        if since is None:
+            raise ValueError(f"No stored trades in {output_dir}; run a full trades download first")
+        # Pin the starting point before writing anything newer.
+        _record_high_water_mark(cursor_store, since)
+
+    known_ids = _trade_ids_since(output_dir, since)
+    writer = _trades_writer(output_dir)
+    latest = since
+    fetched = 0
+    logger.info("Syncing trades created after %s...", since.isoformat())
+
+    async for batch, _ in client.get_trades(min_ts=int(since.timestamp())):
+        fetched += len(batch)
+        new = [
+            r for r in batch
+            if r["trade_id"] not in known_ids and _parse_time(r["created_time"]) >= since
+        ]
+        if new:
+            await writer.add_records(new)
+            known_ids.update(r["trade_id"] for r in new)
+            latest = max(latest, *(_parse_time(r["created_time"]) for r in new))
+
+    await writer.flush()
+    cursor_store.checkpoints.record_files("trades", writer.take_written())
+    _record_high_water_mark(cursor_store, latest)
+    logger.info(
+        "Trades sync complete: %d new of %d fetched, high-water mark %s",
+        writer.total_written,
+        fetched,
+        latest.isoformat(),
+    )
     return writer.total_written
+
+
+@dataclass(frozen=True)
+class BackfillWindow:
+    """One [start, end) slice of a backfill, paged with its own cursor."""
+
+    start: datetime
+    end: datetime
+
+    @property
+    def label(self) -> str:
+        return f"{self.start:%Y%m%dT%H%M%S}"
+
+    @property
+    def cursor_key(self) -> str:
+        return f"trades_backfill_{self.label}_{self.end:%Y%m%dT%H%M%S}"
+
+    @property
+    def name_prefix(self) -> str:
+        # Must not match "trades_*", or ParquetChunkWriter's file numbering
+        # for the regular download would pick up window files.
+        return f"trades-{self.label}"
+
+
+def market_volume_profile(
+    data_dir: Path, start: datetime, end: datetime, buckets: int = VOLUME_PROFILE_BUCKETS
+) -> list[float] | None:
+    """Stored market volume in each of `buckets` equal slices of [start, end).
+
+    Each market's volume is spread evenly over its open-to-close span, as a
+    proxy for when its trades happened. Returns None if no markets are stored
+    or none traded in the range.
+    """
+    if not any((data_dir / "markets").glob("*.parquet")):
+        return None
+    lo, hi = start.timestamp(), end.timestamp()
+    width = (hi - lo) / buckets
+    rows = duckdb.connect().execute(f"""
+        WITH m AS (
+            SELECT
+                COALESCE(TRY_CAST(volume_fp AS DOUBLE), volume, 0) AS volume,
+                epoch(TRY_CAST(open_time AS TIMESTAMPTZ)) AS open_ts,
+                epoch(TRY_CAST(close_time AS TIMESTAMPTZ)) AS close_ts
+            FROM {markets_table_sql(data_dir)}
+        ),
+        spans AS (
+            SELECT
+                volume / (close_ts - open_ts) AS rate,
+                greatest(open_ts, {lo}) AS a,
+                least(close_ts, {hi}) AS b
+            FROM m
+            WHERE volume > 0 AND close_ts > open_ts AND close_ts > {lo} AND open_ts < {hi}
+        ),
+        slices AS (
+            SELECT
+                rate, a, b,
+                unnest(range(
+                    CAST(floor((a - {lo}) / {width}) AS BIGINT),
+                    CAST(ceil((b - {lo}) / {width}) AS BIGINT)
+                )) AS bucket
+            FROM spans
+        )
+        SELECT
+            bucket,
+            sum(rate * (least(b, {lo} + (bucket + 1) * {width}) - greatest(a, {lo} + bucket * {width})))
+        FROM slices
+        WHERE bucket < {buckets}
+        GROUP BY bucket
+    """).fetchall()
+    profile = [0.0] * buckets
+    for bucket, volume in rows:
+        profile[bucket] = volume
+    return profile if sum(profile) > 0 else None
+
+
+def backfill_windows(
+    start: datetime, end: datetime, windows: int, profile: list[float] | None = None
+) -> list[BackfillWindow]:
+    """Split [start, end) into windows on whole-second boundaries.
+
+    Windows are equal in time, or, given a profile (weights of equal slices
+    of the range, e.g. market_volume_profile), hold equal shares of its
+    weight, interpolated linearly within a slice.
+    """
+    if not start < end:
+        raise ValueError("start must be before end")
+    total = int((end - start).total_seconds())
+    windows = max(1, min(windows, total))
+    if not profile or sum(profile) <= 0:
+        offsets = [total * i // windows for i in range(windows)]
+    else:
+        width = total / len(profile)
+        cumulative = [0.0, *accumulate(profile)]
+        offsets = [0]
+        for i in range(1, windows):
+            target = cumulative[-1] * i / windows
+            k = max(0, bisect_right(cumulative, target) - 1)
+            k = min(k, len(profile) - 1)
+            within = (target - cumulative[k]) / profile[k] if profile[k] else 0.0
+            offsets.append(int((k + within) * width))
+    offsets = sorted(set(offsets))
+    bounds = [start + timedelta(seconds=s) for s in offsets] + [end]
+    return [BackfillWindow(lo, hi) for lo, hi in pairwise(bounds)]
+
+
+def _backfill_plan(
+    data_dir: Path,
+    cursor_store: CursorStore,
+    start: datetime,
+    end: datetime,
+    windows: int,
+    resume: bool,
+) -> list[BackfillWindow]:
+    """Windows of a backfill, reusing the ones saved by an earlier run if resuming.
+
+    Window cursors are keyed on the window bounds, so a resumed backfill must
+    keep its windows even if the stored markets changed since.
+    """
+    key = f"trades_backfill_plan_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}_{windows}"
+    saved = cursor_store.load_state(key) if resume else None
+    if saved:
+        bounds = [datetime.fromisoformat(b) for b in saved["bounds"]]
+        return [BackfillWindow(lo, hi) for lo, hi in pairwise(bounds)]
+    profile = market_volume_profile(data_dir, start, end)
+    slices = backfill_windows(start, end, windows, profile)
+    bounds = [w.start for w in slices] + [end]
+    cursor_store.save_state(key, {"bounds": [b.isoformat() for b in bounds]})
+    return slices
+
+
+async def _backfill_window(
+    client: KalshiClient,
+    output_dir: Path,
+    cursor_store: CursorStore,
+    window: BackfillWindow,
+    resume: bool,
+) -> int:
+    state = cursor_store.load_state(window.cursor_key) if resume else None
+    if state and state.get("done"):
+        logger.info("Backfill window %s already complete", window.label)
+        return 0
+    resume_cursor = state.get("cursor") if state else None
+    total = state.get("records_so_far", 0) if state else 0
+
+    writer = _trades_writer(output_dir, window.name_prefix)
+    unsaved = 0
+    async for batch, cursor in client.get_trades(
+        resume_cursor=resume_cursor,
+        min_ts=int(window.start.timestamp()),
+        max_ts=int(window.end.timestamp()) - 1,
+    ):
+        await writer.add_records(batch)
+        total += len(batch)
+        unsaved += len(batch)
+        # Checkpoint only once everything before the cursor is on disk, so a
+        # resumed window neither loses buffered trades nor writes them twice.
+        if cursor and unsaved >= TRADES_CHUNK_SIZE:
+            await writer.flush()
+            cursor_store.checkpoint(
+                window.cursor_key,
+                {"cursor": cursor, "records_so_far": total},
+                "trades",
+                writer.take_written(),
+            )
+            unsaved = 0
+
+    await writer.flush()
+    cursor_store.checkpoint(
+        window.cursor_key, {"done": True, "records_so_far": total}, "trades", writer.take_written()
+    )
+    logger.info("Backfill window %s complete: %d records", window.label, total)
+    return writer.total_written
+
+
+async def backfill_trades(
+    client: KalshiClient,
+    data_dir: Path,
+    start: datetime = BACKFILL_START,
+    end: datetime | None = None,
+    windows: int = DEFAULT_BACKFILL_WINDOWS,
+    resume: bool = True,
+) -> int:
+    """Download trades in [start, end) as concurrent time windows.
+
+    Windows split stored market volume evenly (see backfill_windows). Each
+    window pages /markets/trades with its own min_ts/max_ts cursor,
+    CursorStore key and chunk file prefix; all windows share the client's
+    rate limiter. An interrupted backfill resumes each window from its last
+    checkpoint and skips windows that finished. If no high-water mark is
+    recorded yet, the newest stored trade becomes the mark for sync_trades.
+
+    Returns the number of records written in this run.
+    """
+    end = end or datetime.now(UTC).replace(microsecond=0)
+    output_dir = data_dir / "trades"
+    cursor_store = CursorStore(data_dir)
+    slices = await asyncio.to_thread(
+        _backfill_plan, data_dir, cursor_store, start, end, windows, resume
+    )
+    logger.info(
+        "Backfilling trades %s to %s in %d windows...",
+        start.isoformat(),
+        end.isoformat(),
+        len(slices),
+    )
+
+    written = await asyncio.gather(
+        *(_backfill_window(client, output_dir, cursor_store, w, resume) for w in slices)
+    )
+    total = sum(written)
+
+    if load_high_water_mark(data_dir) is None:
+        latest = stored_high_water_mark(data_dir)
+        if latest is not None:
+            _record_high_water_mark(cursor_store, latest)
+    logger.info("Trades backfill complete: %d records", total)
+    return total
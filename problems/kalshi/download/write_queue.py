@@ -0,0 +1,136 @@
+"""Background thread for Parquet encoding and disk writes.
+
+The downloaders are coroutines on one event loop; encoding and compressing a
+10K-row chunk synchronously stalls every in-flight request while it runs.
+WriteQueue hands each write to a worker thread (pyarrow releases the GIL
+while encoding and compressing) so fetching and writing overlap. Both ends
+are awaitable, so waiting on the queue never blocks the event loop:
+
+- the queue is bounded, so a disk slower than the network suspends the
+  producer (backpressure) instead of buffering chunks without limit
+- drain() waits until every submitted write is on disk and re-raises the
+  first error from the worker; writers await it before a checkpoint
+- write latency and time spent blocked on a full queue are tracked, and
+  also recorded in download.telemetry
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from download.telemetry import TELEMETRY, Telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING_WRITES = 4
+
+_STOP = object()
+
+
+@dataclass
+class WriteStats:
+    """Counters for the writes run by one WriteQueue."""
+
+    writes: int = 0
+    write_seconds: float = 0.0
+    max_write_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    @property
+    def mean_write_seconds(self) -> float:
+        return self.write_seconds / self.writes if self.writes else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "writes": self.writes,
+            "mean_write_ms": round(self.mean_write_seconds * 1000, 1),
+            "max_write_ms": round(self.max_write_seconds * 1000, 1),
+            "blocked_seconds": round(self.blocked_seconds, 2),
+        }
+
+
+class WriteQueue:
+    """Runs submitted write jobs in order on one worker thread.
+
+    Jobs are queued on an asyncio.Queue and handed one at a time to a
+    single-thread executor by a task on the event loop. The task and thread
+    start on the first submit and exit on drain(), so an idle writer holds
+    neither.
+
+    Args:
+        max_pending: Jobs that may wait in the queue before submit() waits.
+        name: Worker thread name.
+        telemetry: Registry that write and blocked time are recorded in.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = DEFAULT_MAX_PENDING_WRITES,
+        name: str = "writer",
+        telemetry: Telemetry = TELEMETRY,
+    ):
+        self.name = name
+        self.stats = WriteStats()
+        self.telemetry = telemetry
+        self.max_pending = max(1, max_pending)
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._error: BaseException | None = None
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Queue fn(*args), waiting while the queue is full."""
+        self._raise_error()
+        if self._worker is None:
+            # Created here rather than in __init__ so each run binds to the
+            # running loop.
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+            self._worker = asyncio.create_task(self._run(), name=self.name)
+        start = time.perf_counter()
+        await self._queue.put((fn, args))
+        blocked = time.perf_counter() - start
+        self.stats.blocked_seconds += blocked
+        self.telemetry.record_write(blocked=blocked)
+
+    async def drain(self) -> None:
+        """Wait for every queued job, stop the worker and re-raise its first error."""
+        if self._worker is not None:
+            await self._queue.put(_STOP)
+            try:
+                await self._worker
+            finally:
+                self._executor.shutdown(wait=False)
+                self._queue = self._worker = self._executor = None
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError(f"Background write failed in {self.name}") from error
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job is _STOP:
+                return
+            fn, args = job
+            if self._error is not None:
+                continue  # Skip the rest after a failure; drain() reports it.
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._executor, fn, *args)
+            except Exception as e:  # handed to the submitting coroutine by drain()
+                logger.exception("Background write failed in %s", self.name)
+                self._error = e
+                continue
+            elapsed = time.perf_counter() - start
+            self.stats.writes += 1
+            self.stats.write_seconds += elapsed
+            self.stats.max_write_seconds = max(self.stats.max_write_seconds, elapsed)
+            self.telemetry.record_write(seconds=elapsed)
@@ -0,0 +1,98 @@
+"""Parquet writer settings shared by every file the download pipeline writes.
+
+pq.write_table's defaults write one row group per file, no bloom filters and
+no page index, so a point lookup (`WHERE ticker IN (...)`, or the
+`t.ticker = r.ticker` semi-join against resolved markets) has to decode every
+ticker column chunk. ParquetWriterConfig turns on:
+
+- bloom filters on ticker and event_ticker, sized from the chunk's distinct
+  count, so readers can skip row groups that cannot contain a ticker
+- column statistics plus a page index for min/max pruning below the row group
+- a row-group size (rows) instead of one row group per file
+- dictionary encoding for low-cardinality string columns such as tickers, and
+  delta encoding for monotone-ish timestamp columns
+"""
+
+import inspect
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DEFAULT_ROW_GROUP_SIZE = 100_000
+DEFAULT_BLOOM_FILTER_COLUMNS = ("ticker", "event_ticker")
+DEFAULT_DELTA_COLUMNS = ("created_time", "end_period_ts")
+
+# Older pyarrow releases cannot write bloom filters; files are then written without them.
+BLOOM_FILTERS_SUPPORTED = "bloom_filter_options" in inspect.signature(pq.write_table).parameters
+
+
+@dataclass(frozen=True)
+class ParquetWriterConfig:
+    """How Parquet files are laid out and encoded.
+
+    Attributes:
+        compression: Codec for every column.
+        row_group_size: Maximum rows per row group.
+        bloom_filter_columns: Columns that get a bloom filter when present.
+        bloom_filter_fpp: Target false-positive probability of each filter.
+        delta_columns: Columns written with delta encoding instead of a
+            dictionary (DELTA_BINARY_PACKED for integers and timestamps,
+            DELTA_BYTE_ARRAY for strings such as raw ISO timestamps).
+        write_statistics: Write min/max statistics for every column.
+        write_page_index: Write the column and offset indexes.
+    """
+
+    compression: str = "snappy"
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+    bloom_filter_columns: tuple[str, ...] = DEFAULT_BLOOM_FILTER_COLUMNS
+    bloom_filter_fpp: float = 0.05
+    delta_columns: tuple[str, ...] = DEFAULT_DELTA_COLUMNS
+    write_statistics: bool = True
+    write_page_index: bool = True
+
+    def _encodings(self, schema: pa.Schema) -> dict[str, str]:
+        encodings = {}
+        for name in self.delta_columns:
+            if name not in schema.names:
+                continue
+            dtype = schema.field(name).type
+            if pa.types.is_integer(dtype) or pa.types.is_timestamp(dtype):
+                encodings[name] = "DELTA_BINARY_PACKED"
+            elif pa.types.is_string(dtype):
+                encodings[name] = "DELTA_BYTE_ARRAY"
+        return encodings
+
+    def write_kwargs(self, table: pa.Table) -> dict[str, Any]:
+        """Keyword arguments for pq.write_table / pq.ParquetWriter for this table."""
+        encodings = self._encodings(table.schema)
+        kwargs: dict[str, Any] = {
+            "compression": self.compression,
+            "row_group_size": self.row_group_size,
+            "use_dictionary": [n for n in table.schema.names if n not in encodings],
+            "column_encoding": encodings or None,
+            "write_statistics": self.write_statistics,
+            "write_page_index": self.write_page_index,
+        }
+        if BLOOM_FILTERS_SUPPORTED:
+            blooms = {
+                name: {
+                    "ndv": max(1, pc.count_distinct(table.column(name)).as_py()),
+                    "fpp": self.bloom_filter_fpp,
+                }
+                for name in self.bloom_filter_columns
+                if name in table.schema.names
+            }
+            if blooms:
+                kwargs["bloom_filter_options"] = blooms
+        return kwargs
+
+    def write_table(self, table: pa.Table, path: Path) -> None:
+        """Write table to path with these settings."""
+        pq.write_table(table, path, **self.write_kwargs(table))
+
+
+DEFAULT_WRITER_CONFIG = ParquetWriterConfig()
@@ -0,0 +1,12 @@
+"""Shared fixtures for the download tests."""
+
+from typing import Any
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+@pytest.fixture(scope="session")
+def private_key() -> Any:
+    """RSA key for signing AuthenticatedClient requests."""
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
@@ -0,0 +1,278 @@
+"""Tests for the lease queue and workers that shard the candlestick download."""
+
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pyarrow.parquet as pq
+import pytest
+from download import candle_coordinator
+from download.candle_coordinator import (
+    DONE,
+    LEASED,
+    MAX_ATTEMPTS,
+    PENDING,
+    LeaseQueue,
+    aggregate_status,
+    run_worker,
+)
+from download.candle_schedule import DAILY, CandleTask
+from download.candlesticks import COMPLETED_NAMESPACE, STATUS_FILE, ProgressTracker
+from download.checkpoint import CHECKPOINT_FILE, CheckpointStore
+from download.telemetry import Telemetry
+
+DAY = 86400
+# time.time is patched below to move past lease expiries; offsets are from
+# the real clock.
+_real_time = time.time
+
+
+def _task(ticker: str, volume: float = 1.0, days: int = 2) -> CandleTask:
+    return CandleTask(
+        series_ticker="S",
+        ticker=ticker,
+        volume=volume,
+        period_interval=DAILY,
+        start_ts=DAY,
+        end_ts=days * DAY,
+        final=True,
+    )
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> Iterator[LeaseQueue]:
+    queue = LeaseQueue(tmp_path / CHECKPOINT_FILE)
+    yield queue
+    queue.close()
+
+
+def _complete(tmp_path: Path, *tickers: str) -> None:
+    store = CheckpointStore(tmp_path / CHECKPOINT_FILE)
+    store.mark_completed(COMPLETED_NAMESPACE, tickers)
+    store.close()
+
+
+def _expire_leases(monkeypatch: pytest.MonkeyPatch, seconds: float = 1000.0) -> None:
+    later = _real_time() + seconds
+    monkeypatch.setattr(candle_coordinator.time, "time", lambda: later)
+
+
+class TestPlan:
+    def test_units_keep_task_order(self, queue: LeaseQueue) -> None:
+        assert queue.plan([_task(f"M{i}") for i in range(5)], unit_size=2) == 3
+        leases = [queue.lease("w1") for _ in range(3)]
+        assert [[t.ticker for t in lease.tasks] for lease in leases] == [
+            ["M0", "M1"],
+            ["M2", "M3"],
+            ["M4"],
+        ]
+        assert leases[0].tasks[0] == _task("M0")
+
+    def test_replanning_adds_only_new_markets(self, queue: LeaseQueue) -> None:
+        queue.plan([_task("M0"), _task("M1")], unit_size=1)
+        assert queue.plan([_task("M0"), _task("M1"), _task("M2")], unit_size=1) == 1
+        assert queue.unit_summary()[PENDING]["units"] == 3
+
+
+class TestLeases:
+    def test_a_unit_is_leased_to_one_worker(self, queue: LeaseQueue) -> None:
+        queue.plan([_task("M0")])
+        assert queue.lease("w1") is not None
+        assert queue.lease("w2") is None
+
+    def test_expired_lease_goes_to_another_worker(
+        self, queue: LeaseQueue, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        queue.plan([_task("M0")])
+        lease = queue.lease("w1", seconds=60)
+        _expire_leases(monkeypatch)
+        assert queue.lease("w2") == lease
+        assert queue.renew("w1", [lease.unit_id]) == {lease.unit_id}
+        assert queue.renew("w2", [lease.unit_id]) == set()
+
+    def test_renewal_keeps_the_lease(
+        self, queue: LeaseQueue, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        queue.plan([_task("M0")])
+        lease = queue.lease("w1", seconds=60)
+        _expire_leases(monkeypatch, 30)
+        queue.renew("w1", [lease.unit_id], seconds=60)
+        _expire_leases(monkeypatch, 80)
+        assert queue.lease("w2") is None
+
+    def test_unit_fails_after_max_attempts(self, queue: LeaseQueue) -> None:
+        queue.plan([_task("M0")])
+        for _ in range(MAX_ATTEMPTS):
+            lease = queue.lease("w1")
+            queue.release("w1", [lease.unit_id])
+        assert queue.lease("w1") is None
+        summary = queue.unit_summary()
+        assert summary["failed"]["units"] == 1
+        assert summary[PENDING]["units"] == 0
+
+    def test_expired_last_attempt_counts_as_failed(
+        self, queue: LeaseQueue, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        queue.plan([_task("M0")])
+        for i in range(MAX_ATTEMPTS):
+            _expire_leases(monkeypatch, i * 1000.0)
+            queue.lease("w1", seconds=60)
+        assert queue.unit_summary()[LEASED]["units"] == 1
+        _expire_leases(monkeypatch, MAX_ATTEMPTS * 1000.0)
+        assert queue.unit_summary()["failed"]["units"] == 1
+
+    def test_release_returns_only_own_units(self, queue: LeaseQueue) -> None:
+        queue.plan([_task("M0")])
+        lease = queue.lease("w1")
+        queue.release("w2", [lease.unit_id])
+        assert queue.lease("w2") is None
+        queue.release("w1", [lease.unit_id])
+        assert queue.lease("w2") == lease
+
+
+class TestCompletion:
+    def test_unit_is_done_once_every_market_is_committed(
+        self, queue: LeaseQueue, tmp_path: Path
+    ) -> None:
+        queue.plan([_task("M0"), _task("M1")])
+        lease = queue.lease("w1")
+        _complete(tmp_path, "M0")
+        assert queue.complete_finished("w1", [lease]) == []
+        _complete(tmp_path, "M1")
+        assert queue.complete_finished("w2", [lease]) == []
+        assert queue.complete_finished("w1", [lease]) == [lease.unit_id]
+        assert queue.unit_summary()[DONE]["markets"] == 2
+        assert queue.renew("w1", [lease.unit_id]) == {lease.unit_id}
+
+
+def test_aggregate_status_sums_worker_reports(queue: LeaseQueue, tmp_path: Path) -> None:
+    queue.plan([_task("M0", volume=30), _task("M1", volume=10)], unit_size=1)
+    lease = queue.lease("w1")
+    _complete(tmp_path, "M0")
+    queue.complete_finished("w1", [lease])
+    for worker in ("w1", "w2"):
+        tracker = ProgressTracker(total_markets=0, status_file=None)
+        tracker.requests = 5
+        queue.report(worker, tracker.as_dict())
+
+    status = aggregate_status(queue)
+    assert status["status"] == "running"
+    assert (status["total_markets"], status["completed_markets"]) == (2, 1)
+    assert status["volume_percent_complete"] == 75.0
+    assert status["requests"] == 10
+    assert status["units"] == {PENDING: 1, LEASED: 0, DONE: 1, "failed": 0}
+    assert set(status["workers"]) == {"w1", "w2"}
+
+
+def _candles(request: httpx.Request) -> httpx.Response:
+    lo, hi = int(request.url.params["start_ts"]), int(request.url.params["end_ts"])
+    candles = [{"end_period_ts": ts, "volume": 1} for ts in range(lo, hi + 1, DAY)]
+    return httpx.Response(200, json={"candlesticks": candles})
+
+
+def _run_worker(
+    tmp_path: Path,
+    private_key: Any,
+    handler: Any,
+    concurrency: int = 2,
+    heartbeat_seconds: float = candle_coordinator.HEARTBEAT_SECONDS,
+) -> ProgressTracker:
+    return asyncio.run(
+        run_worker(
+            "w1",
+            output_dir=tmp_path,
+            data_dir=tmp_path,
+            rate_limit=1000.0,
+            burst=10.0,
+            concurrency=concurrency,
+            heartbeat_seconds=heartbeat_seconds,
+            api_key_id="test",
+            private_key=private_key,
+            base_url="http://kalshi.test",
+            transport=httpx.MockTransport(handler),
+            telemetry=Telemetry(),
+        )
+    )
+
+
+class TestRunWorker:
+    def test_downloads_every_unit(self, tmp_path: Path, private_key: Any) -> None:
+        queue = LeaseQueue(tmp_path / CHECKPOINT_FILE)
+        queue.plan([_task(f"M{i}") for i in range(3)], unit_size=2)
+
+        tracker = _run_worker(tmp_path, private_key, _candles)
+        assert tracker.completed_markets == 3
+        assert queue.unit_summary()[DONE]["units"] == 2
+        table = pq.read_table(list(tmp_path.glob("candles-w1_*.parquet")))
+        assert sorted(table.column("ticker").to_pylist()) == ["M0", "M0", "M1", "M1", "M2", "M2"]
+        status = json.loads((tmp_path / STATUS_FILE.name).read_text())
+        assert status["status"] == "completed"
+        assert (tmp_path / "metrics-w1.prom").exists()
+        queue.close()
+
+    def test_units_with_failed_markets_are_released(
+        self, tmp_path: Path, private_key: Any
+    ) -> None:
+        queue = LeaseQueue(tmp_path / CHECKPOINT_FILE)
+        queue.plan([_task("M0"), _task("BAD")], unit_size=1)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if "/BAD/" in request.url.path:
+                return httpx.Response(400, json={"error": "bad request"})
+            return _candles(request)
+
+        tracker = _run_worker(tmp_path, private_key, handler)
+        assert (tracker.completed_markets, tracker.failed_markets) == (1, 1)
+        summary = queue.unit_summary()
+        assert summary[DONE]["units"] == 1
+        assert summary[PENDING]["units"] == 1
+        queue.close()
+
+    def test_workers_keep_requests_in_flight(self, tmp_path: Path, private_key: Any) -> None:
+        queue = LeaseQueue(tmp_path / CHECKPOINT_FILE)
+        queue.plan([_task(f"M{i}") for i in range(8)], unit_size=3)
+        in_flight = peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return _candles(request)
+
+        tracker = _run_worker(tmp_path, private_key, handler, concurrency=4)
+        assert tracker.completed_markets == 8
+        # Markets of several units are in flight at once.
+        assert peak == 4
+        assert queue.unit_summary()[DONE]["units"] == 3
+        queue.close()
+
+    def test_heartbeats_run_off_the_event_loop(
+        self, tmp_path: Path, private_key: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        queue = LeaseQueue(tmp_path / CHECKPOINT_FILE)
+        queue.plan([_task(f"M{i}") for i in range(4)], unit_size=1)
+        threads = []
+        write_status = candle_coordinator.write_status
+
+        def recording_write_status(*args: Any) -> None:
+            threads.append(threading.get_ident())
+            write_status(*args)
+
+        monkeypatch.setattr(candle_coordinator, "write_status", recording_write_status)
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.02)
+            return _candles(request)
+
+        tracker = _run_worker(tmp_path, private_key, handler, concurrency=1, heartbeat_seconds=0.01)
+        assert tracker.completed_markets == 4
+        assert len(threads) > 1
+        assert threading.get_ident() not in threads
+        queue.close()
@@ -0,0 +1,176 @@
+"""Tests for candlestick scheduling and windowed market downloads."""
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download.candle_schedule import (
+    DAILY,
+    MAX_CANDLES_PER_REQUEST,
+    MINUTE,
+    CandleTask,
+    load_candle_tasks,
+    resolution,
+    select_coverage,
+)
+from download.candlesticks import (
+    COMPLETED_NAMESPACE,
+    AuthenticatedClient,
+    CandleRequestError,
+    CandleWriter,
+    ProgressTracker,
+    download_market,
+    open_checkpoints,
+    progress_key,
+)
+from download.telemetry import Telemetry
+
+SPAN = MAX_CANDLES_PER_REQUEST * 60
+
+
+def _task(start_ts: int, end_ts: int, period: int = MINUTE, volume: float = 1.0) -> CandleTask:
+    return CandleTask(
+        series_ticker="S",
+        ticker="M",
+        volume=volume,
+        period_interval=period,
+        start_ts=start_ts,
+        end_ts=end_ts,
+        final=True,
+    )
+
+
+class TestWindows:
+    def test_windows_do_not_overlap(self) -> None:
+        windows = _task(0, 2 * SPAN + 120).windows()
+        assert windows == [(0, SPAN - 1), (SPAN, 2 * SPAN - 1), (2 * SPAN, 2 * SPAN + 120)]
+
+    def test_each_window_holds_at_most_the_request_limit(self) -> None:
+        for lo, hi in _task(0, 3 * SPAN).windows():
+            assert len(range(lo, hi + 1, 60)) <= MAX_CANDLES_PER_REQUEST
+
+    def test_windows_cover_every_candle_once(self) -> None:
+        task = _task(600, 2 * SPAN + 600)
+        covered = [ts for lo, hi in task.windows() for ts in range(lo, hi + 1) if ts % 60 == 0]
+        assert covered == list(range(600, task.end_ts + 1, 60))
+
+    def test_resume_starts_at_the_given_window(self) -> None:
+        task = _task(0, 2 * SPAN)
+        assert task.windows(SPAN) == task.windows()[1:]
+        assert task.windows(-5) == task.windows()
+
+
+class TestResolution:
+    def test_minute_candles_for_high_volume_non_sports(self) -> None:
+        assert resolution(2_000_000, "Politics", 1_000_000) == MINUTE
+        assert resolution(2_000_000, "Sports", 1_000_000) == DAILY
+        assert resolution(10, "Politics", 1_000_000) == DAILY
+
+
+class TestSelectCoverage:
+    def test_keeps_shortest_prefix_reaching_target(self) -> None:
+        tasks = [_task(0, 60, volume=v) for v in (50, 30, 15, 5)]
+        assert select_coverage(tasks, 0.8) == tasks[:2]
+        assert select_coverage(tasks, 0.81) == tasks[:3]
+        assert select_coverage(tasks, 1.0) == tasks
+
+
+def test_load_candle_tasks_orders_by_volume(tmp_path: Path) -> None:
+    (tmp_path / "markets").mkdir()
+    (tmp_path / "events").mkdir()
+    pq.write_table(pa.table({
+        "ticker": ["SMALL", "BIG", "OPEN"],
+        "event_ticker": ["E1", "E1", "E2"],
+        "status": ["finalized", "finalized", "active"],
+        "open_time": ["2024-01-01T00:00:30Z"] * 3,
+        "close_time": ["2024-01-03T00:00:00Z", "2024-01-03T00:00:00Z", None],
+        "volume": [10, 5_000_000, 20],
+        "volume_fp": ["10.00", "5000000.00", "20.00"],
+    }), tmp_path / "markets" / "markets_000000.parquet")
+    pq.write_table(pa.table({
+        "event_ticker": ["E1", "E2"],
+        "series_ticker": ["S1", "S2"],
+        "category": ["Politics", "Sports"],
+    }), tmp_path / "events" / "events_000000.parquet")
+
+    tasks = load_candle_tasks(tmp_path)
+    assert [t.ticker for t in tasks] == ["BIG", "OPEN", "SMALL"]
+    big, open_market, small = tasks
+    assert (big.period_interval, small.period_interval) == (MINUTE, DAILY)
+    assert big.start_ts % 60 == 0 and small.start_ts % 86400 == 0
+    assert big.final and not open_market.final
+
+
+def _client(private_key: Any, handler: Any) -> AuthenticatedClient:
+    return AuthenticatedClient(
+        base_url="http://kalshi.test",
+        transport=httpx.MockTransport(handler),
+        api_key_id="test",
+        private_key=private_key,
+        telemetry=Telemetry(),
+    )
+
+
+def _download(
+    tmp_path: Path, private_key: Any, task: CandleTask, handler: Any
+) -> tuple[ProgressTracker, Any]:
+    checkpoints = open_checkpoints(tmp_path)
+    writer = CandleWriter(checkpoints, tmp_path, telemetry=Telemetry())
+    tracker = ProgressTracker(total_markets=1, status_file=None)
+
+    async def run() -> None:
+        async with _client(private_key, handler) as client:
+            await download_market(client, writer, tracker, task)
+        await writer.finish()
+
+    asyncio.run(run())
+    return tracker, checkpoints
+
+
+class TestDownloadMarket:
+    def test_fetches_each_window_once(self, tmp_path: Path, private_key: Any) -> None:
+        task = _task(0, SPAN + 60)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            lo, hi = int(request.url.params["start_ts"]), int(request.url.params["end_ts"])
+            candles = [{"end_period_ts": ts} for ts in range(lo, hi + 1, 60) if ts % 60 == 0]
+            return httpx.Response(200, json={"candlesticks": candles})
+
+        tracker, checkpoints = _download(tmp_path, private_key, task, handler)
+        table = pq.read_table(list(tmp_path.glob("candles_*.parquet")))
+        times = table.column("end_period_ts").to_pylist()
+        assert sorted(times) == list(range(0, SPAN + 61, 60))
+        assert checkpoints.is_completed(COMPLETED_NAMESPACE, "M")
+        assert tracker.completed_markets == 1
+
+    def test_failed_window_is_not_skipped(self, tmp_path: Path, private_key: Any) -> None:
+        task = _task(0, SPAN + 60)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if int(request.url.params["start_ts"]) > 0:
+                return httpx.Response(400, json={"error": "bad request"})
+            return httpx.Response(200, json={"candlesticks": [{"end_period_ts": 60}]})
+
+        tracker, checkpoints = _download(tmp_path, private_key, task, handler)
+        assert not checkpoints.is_completed(COMPLETED_NAMESPACE, "M")
+        assert checkpoints.get_state(progress_key("M")) == {"start_ts": SPAN}
+        assert (tracker.completed_markets, tracker.failed_markets) == (0, 1)
+
+    def test_exhausted_retries_raise(
+        self, private_key: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        async def no_sleep(seconds: float) -> None:
+            pass
+
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+        async def run() -> None:
+            async with _client(private_key, lambda r: httpx.Response(503)) as client:
+                await client.get("/series/S/markets/M/candlesticks", retries=2)
+
+        with pytest.raises(CandleRequestError, match="retries exhausted"):
+            asyncio.run(run())
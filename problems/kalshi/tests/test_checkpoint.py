@@ -0,0 +1,122 @@
+"""Tests for the SQLite checkpoint store and the cursor store built on it."""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from download.checkpoint import CHECKPOINT_FILE, CheckpointStore, import_completed_file
+from download.storage import CURSOR_DIR, CursorStore
+
+
+def _store(tmp_path: Path, wal: bool = True) -> CheckpointStore:
+    return CheckpointStore(tmp_path / "nested" / CHECKPOINT_FILE, wal=wal)
+
+
+def _files(path: Path) -> list[tuple[str, str, int]]:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT dataset, path, rows FROM files ORDER BY path").fetchall()
+
+
+class TestStaging:
+    def test_changes_are_visible_only_to_the_store_until_commit(self, tmp_path: Path) -> None:
+        store = _store(tmp_path)
+        store.set_state("cursor", {"cursor": "abc"})
+        store.mark_completed("candles", ["M1"])
+        assert store.get_state("cursor") == {"cursor": "abc"}
+        assert store.is_completed("candles", "M1")
+
+        other = _store(tmp_path)
+        assert other.get_state("cursor") is None
+        assert not other.is_completed("candles", "M1")
+        assert store.completed("candles") == set()
+
+        store.commit()
+        assert other.get_state("cursor") == {"cursor": "abc"}
+        assert other.completed("candles") == {"M1"}
+
+    def test_close_commits(self, tmp_path: Path) -> None:
+        store = _store(tmp_path, wal=False)
+        store.record_files("trades", [(Path("a.parquet"), 10)])
+        store.close()
+        assert _files(store.path) == [("trades", "a.parquet", 10)]
+
+    def test_delete_state(self, tmp_path: Path) -> None:
+        store = _store(tmp_path)
+        store.set_state("k", {"v": 1})
+        store.commit()
+        store.delete_state("k")
+        assert store.get_state("k") is None
+        store.close()
+        assert _store(tmp_path).get_state("k") is None
+
+    def test_repeated_keys_and_files_are_stored_once(self, tmp_path: Path) -> None:
+        store = _store(tmp_path)
+        store.mark_completed("candles", ["M1", "M1"])
+        store.record_files("trades", [(Path("a.parquet"), 10)])
+        store.commit()
+        store.mark_completed("candles", ["M1"])
+        store.record_files("trades", [(Path("a.parquet"), 12)])
+        store.commit()
+        assert store.completed("candles") == {"M1"}
+        assert _files(store.path) == [("trades", "a.parquet", 12)]
+
+    def test_namespaces_are_separate(self, tmp_path: Path) -> None:
+        store = _store(tmp_path)
+        store.mark_completed("candles", ["M1"])
+        store.commit()
+        assert not store.is_completed("trades", "M1")
+
+    def test_concurrent_writers(self, tmp_path: Path) -> None:
+        store = _store(tmp_path)
+
+        def mark(n: int) -> None:
+            for i in range(50):
+                store.mark_completed("candles", [f"M{n}-{i}"])
+                store.commit()
+
+        threads = [threading.Thread(target=mark, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(store.completed("candles")) == 200
+
+
+def test_import_completed_file(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    legacy = tmp_path / "completed_tickers.txt"
+    legacy.write_text("M1\nM2\n\n")
+    assert import_completed_file(store, "candles", legacy) == 2
+    assert store.completed("candles") == {"M1", "M2"}
+    assert not legacy.exists()
+    assert legacy.with_name("completed_tickers.txt.imported").exists()
+    assert import_completed_file(store, "candles", legacy) == 0
+
+
+class TestCursorStore:
+    def test_cursor_round_trip(self, tmp_path: Path) -> None:
+        CursorStore(tmp_path).save("markets", "c1", records_so_far=500)
+        assert CursorStore(tmp_path).load("markets") == ("c1", 500)
+        assert CursorStore(tmp_path).load("events") == (None, 0)
+
+    def test_checkpoint_records_files_with_the_cursor(self, tmp_path: Path) -> None:
+        cursors = CursorStore(tmp_path)
+        cursors.checkpoint("markets", {"cursor": "c2"}, "markets", [(Path("m.parquet"), 3)])
+        assert cursors.load("markets") == ("c2", 0)
+        assert _files(cursors.checkpoints.path) == [("markets", "m.parquet", 3)]
+
+    def test_finish_clears_the_cursor(self, tmp_path: Path) -> None:
+        cursors = CursorStore(tmp_path)
+        cursors.save("markets", "c1")
+        cursors.finish("markets", "markets", [(Path("m.parquet"), 3)])
+        assert cursors.load("markets") == (None, 0)
+        assert _files(cursors.checkpoints.path) == [("markets", "m.parquet", 3)]
+
+    def test_legacy_cursor_file_is_imported(self, tmp_path: Path) -> None:
+        legacy = tmp_path / CURSOR_DIR / "trades__backfill.json"
+        legacy.parent.mkdir()
+        legacy.write_text(json.dumps({"cursor": "old", "records_so_far": 7}))
+        assert CursorStore(tmp_path).load("trades/backfill") == ("old", 7)
+        assert not legacy.exists()
+        assert CursorStore(tmp_path).load("trades/backfill") == ("old", 7)
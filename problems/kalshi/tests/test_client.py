@@ -0,0 +1,184 @@
+"""Tests for the public API client."""
+
+import asyncio
+from collections.abc import Coroutine
+from typing import Any
+
+import httpx
+import pytest
+from download import candlesticks
+from download import client as client_module
+from download.candlesticks import AuthenticatedClient
+from download.client import KalshiClient, RateLimiter, backoff_seconds, create_http_client
+from download.telemetry import Telemetry
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"series": [{"ticker": "S1"}]})
+
+
+class TestSharedHttpClient:
+    def test_clients_share_one_pool_and_leave_it_open(self) -> None:
+        async def run() -> httpx.AsyncClient:
+            async with create_http_client(transport=httpx.MockTransport(_handler)) as http:
+                for _ in range(2):
+                    async with KalshiClient(
+                        base_url="http://kalshi.test", http_client=http, telemetry=Telemetry()
+                    ) as client:
+                        assert client._client is http
+                        assert await client.get_series() == [{"ticker": "S1"}]
+                assert not http.is_closed
+            return http
+
+        assert asyncio.run(run()).is_closed
+
+    def test_own_pool_is_closed_on_exit(self) -> None:
+        async def run() -> httpx.AsyncClient:
+            async with KalshiClient(
+                base_url="http://kalshi.test",
+                transport=httpx.MockTransport(_handler),
+                telemetry=Telemetry(),
+            ) as client:
+                http = client._client
+                await client.get_series()
+            return http
+
+        assert asyncio.run(run()).is_closed
+
+
+class FakeClock:
+    """Stands in for time.monotonic; sleeps are recorded, not waited out."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(round(seconds, 6))
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(client_module.time, "monotonic", clock)
+    monkeypatch.setattr(client_module.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def _acquire(limiter: RateLimiter, times: int = 1) -> None:
+    for _ in range(times):
+        coro: Coroutine = limiter.acquire()
+        with pytest.raises(StopIteration):
+            coro.send(None)
+
+
+class TestRateLimiter:
+    def test_burst_then_steady_rate(self, clock: FakeClock) -> None:
+        limiter = RateLimiter(10.0, burst=3)
+        _acquire(limiter, 3)
+        assert clock.sleeps == []
+        # Callers arriving together reserve consecutive slots.
+        _acquire(limiter, 3)
+        assert clock.sleeps == [0.1, 0.2, 0.3]
+
+    def test_bucket_refills_up_to_burst(self, clock: FakeClock) -> None:
+        limiter = RateLimiter(10.0, burst=3)
+        _acquire(limiter, 3)
+        clock.now += 60
+        assert limiter.tokens == 3
+        _acquire(limiter, 3)
+        assert clock.sleeps == []
+
+    def test_throttling_halves_the_rate_once_per_second(self, clock: FakeClock) -> None:
+        limiter = RateLimiter(16.0, burst=5, min_rate=3.0)
+        limiter.throttled()
+        limiter.throttled()
+        assert limiter.rate == 8.0
+        assert limiter.tokens == 0.0
+        for _ in range(3):
+            clock.now += 1
+            limiter.throttled()
+        assert limiter.rate == 3.0
+
+    def test_retry_after_holds_every_caller_back(self, clock: FakeClock) -> None:
+        limiter = RateLimiter(10.0, burst=5)
+        limiter.throttled(retry_after=2.0)
+        _acquire(limiter)
+        assert clock.sleeps == [2.2]
+
+    def test_success_restores_the_rate(self, clock: FakeClock) -> None:
+        limiter = RateLimiter(10.0, burst=5, increase=5.0)
+        limiter.throttled()
+        assert limiter.rate == 5.0
+        limiter.succeeded()
+        assert limiter.rate == 6.0
+        for _ in range(20):
+            limiter.succeeded()
+        assert limiter.rate == 10.0
+
+    def test_client_backs_off_on_429(self) -> None:
+        responses = iter([
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json={"series": []}),
+        ])
+
+        async def run() -> float:
+            async with KalshiClient(
+                base_url="http://kalshi.test",
+                rate_limit=20.0,
+                transport=httpx.MockTransport(lambda request: next(responses)),
+                telemetry=Telemetry(),
+            ) as client:
+                assert await client.get_series() == []
+                return client.rate_limiter.rate
+
+        assert asyncio.run(run()) < 20.0
+
+
+class TestRetries:
+    def test_backoff_prefers_retry_after(self) -> None:
+        assert [backoff_seconds(n) for n in (1, 2, 3, 10)] == [1.0, 2.0, 4.0, 60.0]
+        throttled = httpx.Response(429, headers={"Retry-After": "7"})
+        assert backoff_seconds(1, throttled) == 7.0
+        assert backoff_seconds(1, httpx.Response(429, headers={"Retry-After": "600"})) == 60.0
+
+    def test_clients_share_a_rate_limiter(self, private_key: Any) -> None:
+        limiter = RateLimiter(20.0)
+        public = KalshiClient(rate_limiter=limiter, telemetry=Telemetry())
+        signed = AuthenticatedClient(
+            api_key_id="test", private_key=private_key, rate_limiter=limiter, telemetry=Telemetry()
+        )
+        assert public.rate_limiter is signed.rate_limiter is limiter
+
+    def test_authenticated_client_backs_off_on_429(
+        self, private_key: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        sleeps: list[float] = []
+
+        async def sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+
+        monkeypatch.setattr(candlesticks.asyncio, "sleep", sleep)
+        responses = iter([
+            httpx.Response(429),
+            httpx.Response(429),
+            httpx.Response(200, json={"candlesticks": []}),
+        ])
+
+        async def run() -> dict:
+            async with AuthenticatedClient(
+                rate_limit=1000.0,
+                base_url="http://kalshi.test",
+                transport=httpx.MockTransport(lambda request: next(responses)),
+                api_key_id="test",
+                private_key=private_key,
+                telemetry=Telemetry(),
+            ) as client:
+                return await client.get("/series/S/markets/M/candlesticks")
+
+        assert asyncio.run(run()) == {"candlesticks": []}
+        # Limiter waits are milliseconds at this rate; the rest is backoff.
+        assert [s for s in sleeps if s >= 0.5] == [1.0, 2.0]
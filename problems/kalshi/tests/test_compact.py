@@ -0,0 +1,159 @@
+"""Tests for chunk compaction and the flat-to-partitioned migration."""
+
+import os
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download import compact
+from download.compact import BACKUP_SUFFIX, COMPACT_PREFIX, STAGING_SUFFIX, compact_dataset
+from download.manifest import DatasetManifest
+from download.markets import DELTA_DIR, markets_table_sql
+
+
+def _write_chunk(path: Path, trade_ids: list[str], tickers: list[str], times: list[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(
+        pa.table({
+            "trade_id": trade_ids,
+            "ticker": tickers,
+            "yes_price_dollars": ["0.5000"] * len(trade_ids),
+            "created_time": times,
+        }),
+        path,
+    )
+
+
+@pytest.fixture()
+def trades_dir(tmp_path: Path) -> Path:
+    """Flat trade chunks spanning January and February 2024, unsorted."""
+    trades = tmp_path / "trades"
+    _write_chunk(
+        trades / "trades_000000.parquet",
+        ["t1", "t2"],
+        ["M2", "M1"],
+        ["2024-01-05T00:00:00Z", "2024-02-01T00:00:00Z"],
+    )
+    _write_chunk(
+        trades / "trades_000001.parquet",
+        ["t3", "t4"],
+        ["M1", "M1"],
+        ["2024-01-03T00:00:00Z", "2024-01-02T00:00:00Z"],
+    )
+    return trades
+
+
+def _compact(trades_dir: Path) -> compact.CompactionResult:
+    return compact_dataset(trades_dir, partition_field="created_time")
+
+
+def _partition_ids(trades_dir: Path, partition: str) -> list[str]:
+    files = sorted((trades_dir / partition).glob("*.parquet"))
+    return [i for f in files for i in pq.read_table(f).column("trade_id").to_pylist()]
+
+
+class TestCompactDataset:
+    def test_migrates_flat_files_to_month_partitions(self, trades_dir: Path) -> None:
+        result = _compact(trades_dir)
+        assert (result.input_files, result.rows) == (2, 4)
+        assert not list(trades_dir.glob("*.parquet"))
+        assert _partition_ids(trades_dir, "year=2024/month=01") == ["t4", "t3", "t1"]
+        assert _partition_ids(trades_dir, "year=2024/month=02") == ["t2"]
+        outputs = sorted(trades_dir.rglob("*.parquet"))
+        assert all(p.name.startswith(COMPACT_PREFIX) for p in outputs)
+        assert not trades_dir.with_name(trades_dir.name + STAGING_SUFFIX).exists()
+        assert not trades_dir.with_name(trades_dir.name + BACKUP_SUFFIX).exists()
+
+    def test_schema_is_unchanged(self, trades_dir: Path) -> None:
+        schema = pq.read_schema(trades_dir / "trades_000000.parquet")
+        _compact(trades_dir)
+        # Once more, so already partitioned chunks are rewritten too.
+        _write_chunk(
+            trades_dir / "year=2024" / "month=01" / "trades_000002.parquet",
+            ["t5"],
+            ["M0"],
+            ["2024-01-09T00:00:00Z"],
+        )
+        _compact(trades_dir)
+        for path in trades_dir.rglob("*.parquet"):
+            assert pq.read_schema(path).names == schema.names
+
+    def test_syncs_manifest(self, trades_dir: Path) -> None:
+        _compact(trades_dir)
+        entries = DatasetManifest(trades_dir).entries()
+        assert sorted(entries) == sorted(
+            str(p.relative_to(trades_dir)) for p in trades_dir.rglob("*.parquet")
+        )
+        assert sum(e["rows"] for e in entries.values()) == 4
+
+    def test_empty_dataset(self, tmp_path: Path) -> None:
+        (tmp_path / "trades").mkdir()
+        assert _compact(tmp_path / "trades") == compact.CompactionResult(0, 0, 0)
+
+    def test_rewrites_only_partitions_with_new_chunks(self, trades_dir: Path) -> None:
+        _compact(trades_dir)
+        (february,) = (trades_dir / "year=2024" / "month=02").glob("*.parquet")
+        inode = february.stat().st_ino
+        _write_chunk(
+            trades_dir / "year=2024" / "month=01" / "trades_000002.parquet",
+            ["t5"],
+            ["M0"],
+            ["2024-01-09T00:00:00Z"],
+        )
+        result = _compact(trades_dir)
+        assert result.rows == 5
+        assert _partition_ids(trades_dir, "year=2024/month=01") == ["t5", "t4", "t3", "t1"]
+        (february,) = (trades_dir / "year=2024" / "month=02").glob("*.parquet")
+        assert february.stat().st_ino == inode
+
+    def test_market_refresh_deltas_are_not_merged(self, tmp_path: Path) -> None:
+        markets = tmp_path / "markets"
+        markets.mkdir()
+        for i, tickers in enumerate((["M1", "M0"], ["M2"])):
+            pq.write_table(
+                pa.table({"ticker": tickers, "status": ["active"] * len(tickers), "volume": [1] * len(tickers)}),
+                markets / f"markets_00000{i}.parquet",
+            )
+        delta = markets / DELTA_DIR / "delta-20240301T000000.parquet"
+        delta.parent.mkdir()
+        pq.write_table(pa.table({"ticker": ["M0"], "status": ["active"], "volume": [5]}), delta)
+
+        result = compact_dataset(markets, sort_keys=compact.SORT_KEYS["markets"])
+        assert (result.input_files, result.rows) == (2, 3)
+        assert delta.exists()
+        base = duckdb.sql(f"SELECT ticker FROM '{markets}/*.parquet' ORDER BY ticker").fetchall()
+        assert base == [("M0",), ("M1",), ("M2",)]
+        rows = duckdb.sql(f"SELECT ticker, volume FROM {markets_table_sql(tmp_path)} ORDER BY ticker")
+        assert rows.fetchall() == [("M0", 5), ("M1", 1), ("M2", 1)]
+
+
+class TestInterruptedSwap:
+    def test_failed_second_rename_is_recovered(
+        self, trades_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        real_rename = os.rename
+
+        def fail_on_staging(src: Path, dst: Path) -> None:
+            if Path(src).name.endswith(STAGING_SUFFIX):
+                raise OSError("simulated crash")
+            real_rename(src, dst)
+
+        monkeypatch.setattr(compact.os, "rename", fail_on_staging)
+        with pytest.raises(OSError, match="simulated crash"):
+            _compact(trades_dir)
+        assert not trades_dir.exists()
+        assert trades_dir.with_name(trades_dir.name + BACKUP_SUFFIX).exists()
+
+        monkeypatch.undo()
+        result = _compact(trades_dir)
+        assert result.rows == 4
+        assert not trades_dir.with_name(trades_dir.name + BACKUP_SUFFIX).exists()
+
+    def test_leftover_backup_is_removed_when_swap_finished(self, trades_dir: Path) -> None:
+        backup = trades_dir.with_name(trades_dir.name + BACKUP_SUFFIX)
+        _write_chunk(backup / "trades_000000.parquet", ["old"], ["M9"], ["2023-01-01T00:00:00Z"])
+        result = _compact(trades_dir)
+        assert result.rows == 4
+        assert not backup.exists()
@@ -0,0 +1,163 @@
+"""Tests for the on-disk HTTP response cache."""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from download import http_cache
+from download.http_cache import (
+    LOG_FILE,
+    CacheMissError,
+    ResponseCache,
+    cache_key,
+    open_cache,
+)
+
+SETTLED_PAGE = {"markets": [{"ticker": "M1", "status": "finalized"}], "cursor": "c"}
+OPEN_PAGE = {"markets": [{"ticker": "M1", "status": "active"}], "cursor": "c"}
+
+
+def _cache(tmp_path: Path, mode: str = "use") -> ResponseCache:
+    return ResponseCache(tmp_path / "cache", mode)
+
+
+class TestModes:
+    def test_off_by_default(self, tmp_path: Path) -> None:
+        cache = open_cache(tmp_path)
+        assert not cache.enabled
+        cache.put("/series", None, {"series": []})
+        assert cache.get("/series") is None
+        assert not (tmp_path / http_cache.HTTP_CACHE_DIR).exists()
+
+    def test_use_serves_stored_responses(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        assert cache.get("/series") is None
+        cache.put("/series", None, {"series": [1]})
+        assert cache.get("/series") == {"series": [1]}
+        assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "stores": 1}
+
+    def test_replay_miss_raises(self, tmp_path: Path) -> None:
+        with pytest.raises(CacheMissError):
+            _cache(tmp_path, "replay").get("/series")
+
+    def test_record_always_fetches(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path, "record")
+        cache.put("/series", None, {"series": [1]})
+        assert cache.get("/series") is None
+        cache.close()
+        assert _cache(tmp_path, "replay").get("/series") == {"series": [1]}
+
+    def test_rejects_unknown_mode(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="Unknown cache mode"):
+            _cache(tmp_path, "sometimes")
+
+
+class TestPolicies:
+    def test_settled_market_pages_never_expire(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        cache.put("/markets", {"cursor": "a"}, SETTLED_PAGE)
+        (_, _, expires_at) = cache._index[cache_key("/markets", {"cursor": "a"})]
+        assert expires_at == http_cache.NEVER
+
+    def test_determined_markets_are_not_final(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        page = {"markets": [{"ticker": "M1", "status": "determined"}]}
+        cache.put("/markets", {"cursor": "a"}, page)
+        (_, _, expires_at) = cache._index[cache_key("/markets", {"cursor": "a"})]
+        assert expires_at < time.time() + 2 * http_cache.HOUR
+
+    def test_refresh_requests_of_open_markets_are_not_cached(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        cache.put("/markets", {"tickers": "M1"}, OPEN_PAGE)
+        assert cache.get("/markets", {"tickers": "M1"}) is None
+        cache.put("/markets", {"tickers": "M1"}, SETTLED_PAGE)
+        assert cache.get("/markets", {"tickers": "M1"}) == SETTLED_PAGE
+
+    def test_expired_entries_are_refetched(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        cache = _cache(tmp_path)
+        cache.put("/events", {"cursor": "a"}, {"events": []})
+        later = time.time() + 2 * http_cache.HOUR
+        monkeypatch.setattr(http_cache.time, "time", lambda: later)
+        assert cache.get("/events", {"cursor": "a"}) is None
+
+    def test_live_trade_windows_are_not_cached(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        cache.put("/markets/trades", {"max_ts": int(time.time())}, {"trades": []})
+        cache.put("/markets/trades", {"max_ts": 1_600_000_000}, {"trades": [1]})
+        assert cache.get("/markets/trades", {"max_ts": int(time.time())}) is None
+        assert cache.get("/markets/trades", {"max_ts": 1_600_000_000}) == {"trades": [1]}
+
+    def test_candlestick_key_ignores_end_ts(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        path = "/series/S/markets/M/candlesticks"
+        cache.put(path, {"start_ts": 1, "end_ts": 100}, {"candlesticks": [1]}, final=True)
+        assert cache.get(path, {"start_ts": 1, "end_ts": 200}) == {"candlesticks": [1]}
+
+    def test_candlestick_windows_ending_within_a_period_are_not_cached(
+        self, tmp_path: Path
+    ) -> None:
+        cache = _cache(tmp_path)
+        path = "/series/S/markets/M/candlesticks"
+        now = int(time.time())
+        recent = {"start_ts": 1, "end_ts": now - 1800, "period_interval": 60}
+        cache.put(path, recent, {"candlesticks": [1]}, final=True)
+        assert cache.get(path, recent) is None
+        settled = {"start_ts": 1, "end_ts": now - 7200, "period_interval": 60}
+        cache.put(path, settled, {"candlesticks": [2]})
+        assert cache.get(path, settled) == {"candlesticks": [2]}
+
+
+class TestLog:
+    def test_index_survives_reopen(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        cache.put("/series", None, {"series": [1]})
+        cache.put("/series", None, {"series": [2]})
+        cache.close()
+        assert _cache(tmp_path).get("/series") == {"series": [2]}
+
+    def test_torn_final_write_is_truncated(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        cache.put("/series", None, {"series": [1]})
+        cache.put("/events", None, {"events": [1]})
+        cache.close()
+        log = tmp_path / "cache" / LOG_FILE
+        log.write_bytes(log.read_bytes()[:-3])
+        reopened = _cache(tmp_path)
+        assert reopened.get("/series") == {"series": [1]}
+        assert reopened.get("/events") is None
+
+    def test_compact_drops_superseded_entries(self, tmp_path: Path) -> None:
+        cache = _cache(tmp_path)
+        for i in range(5):
+            cache.put("/series", None, {"series": [i]})
+        assert cache.compact() > 0
+        assert cache.get("/series") == {"series": [4]}
+        cache.close()
+        assert _cache(tmp_path).get("/series") == {"series": [4]}
+
+
+def test_async_access_runs_off_the_event_loop(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = _cache(tmp_path)
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+
+        def traced(*args, _method=method):
+            threads.append(threading.get_ident())
+            return _method(*args)
+
+        monkeypatch.setattr(cache, name, traced)
+
+    async def run() -> dict | None:
+        await cache.aput("/series", None, {"series": [1]})
+        return await cache.aget("/series")
+
+    assert asyncio.run(run()) == {"series": [1]}
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
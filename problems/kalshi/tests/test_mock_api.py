@@ -0,0 +1,163 @@
+"""Tests for the mock Kalshi API and the offline benchmark that drives it."""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any
+
+import httpx
+import pytest
+from click.testing import CliRunner
+from download import benchmark
+from download.benchmark import bench_candlesticks, bench_markets, bench_trades
+from download.candlesticks import AuthenticatedClient
+from download.mock_api import API_PREFIX, FaultProfile, MockKalshiAPI, SyntheticData
+from download.telemetry import Telemetry
+
+ORIGIN = "http://mock-kalshi"
+SMALL = SyntheticData(markets=25, trades=1_000, candles_per_market=3)
+NO_FAULTS = FaultProfile()
+
+
+def _get(app: MockKalshiAPI, path: str, **params: Any) -> httpx.Response:
+    async def run() -> httpx.Response:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url=ORIGIN + API_PREFIX
+        ) as client:
+            return await client.get(path, params=params)
+
+    return asyncio.run(run())
+
+
+def _trade_ts(trade: dict) -> float:
+    return datetime.fromisoformat(trade["created_time"]).timestamp()
+
+
+class TestSyntheticData:
+    def test_sizes(self) -> None:
+        assert (SMALL.events, SMALL.series) == (5, 1)
+        assert SMALL.market_index(SMALL.market_ticker(24)) == 24
+        assert SMALL.market_index(SMALL.market_ticker(25)) is None
+        assert SMALL.market_index("OTHER") is None
+
+    def test_trade_range_matches_timestamps(self) -> None:
+        lo = int(SMALL.start.timestamp()) + 10 * 86400
+        hi = lo + 30 * 86400
+        first, last = SMALL.trade_range(lo, hi)
+        inside = [j for j in range(SMALL.trades) if lo <= SMALL.trade_time(j) <= hi]
+        assert list(range(first, last)) == inside
+
+    def test_newest_markets_are_open(self) -> None:
+        statuses = [SMALL.market_record(i)["status"] for i in range(SMALL.markets)]
+        assert statuses.count("active") == 2
+        assert statuses[-1] == "active"
+
+
+class TestRoutes:
+    def test_markets_are_paginated_by_cursor(self) -> None:
+        app = MockKalshiAPI(SMALL)
+        first = _get(app, "/markets", limit=10).json()
+        assert len(first["markets"]) == 10
+        assert first["cursor"] == "10"
+        last = _get(app, "/markets", limit=10, cursor="20").json()
+        assert [m["ticker"] for m in last["markets"]] == [SMALL.market_ticker(i) for i in range(20, 25)]
+        assert last["cursor"] == ""
+        assert app.stats.as_dict() == {"requests": 2, "statuses": {200: 2}, "records": 15}
+
+    def test_markets_by_ticker(self) -> None:
+        tickers = f"{SMALL.market_ticker(3)},UNKNOWN"
+        body = _get(MockKalshiAPI(SMALL), "/markets", tickers=tickers).json()
+        assert [m["ticker"] for m in body["markets"]] == [SMALL.market_ticker(3)]
+
+    def test_trades_are_filtered_by_ticker_and_time(self) -> None:
+        app = MockKalshiAPI(SMALL)
+        ticker = SMALL.market_ticker(7)
+        lo = int(SMALL.start.timestamp()) + 100 * 86400
+        body = _get(app, "/markets/trades", ticker=ticker, min_ts=lo, limit=1000).json()
+        trades = body["trades"]
+        assert trades
+        assert {t["ticker"] for t in trades} == {ticker}
+        assert min(_trade_ts(t) for t in trades) >= lo
+        assert [_trade_ts(t) for t in trades] == sorted((_trade_ts(t) for t in trades), reverse=True)
+
+    def test_candlesticks(self) -> None:
+        ticker = SMALL.market_ticker(1)
+        body = _get(MockKalshiAPI(SMALL), f"/series/S/markets/{ticker}/candlesticks").json()
+        assert len(body["candlesticks"]) == 3
+        assert body["candlesticks"][0]["price"]["close"] == 2
+
+    def test_unknown_route(self) -> None:
+        assert _get(MockKalshiAPI(SMALL), "/portfolio").status_code == 404
+
+
+class TestFaults:
+    def test_server_rate_limit_answers_429(self) -> None:
+        app = MockKalshiAPI(SMALL, FaultProfile(rate_limit=0.001, burst=2, retry_after=1))
+        statuses = [_get(app, "/series").status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        assert _get(app, "/series").headers["retry-after"] == "1"
+
+    def test_injected_errors(self) -> None:
+        app = MockKalshiAPI(SMALL, FaultProfile(error_rate=1.0))
+        assert _get(app, "/series").status_code in (500, 502, 503)
+
+    def test_unsigned_requests_are_rejected(self, private_key: Any) -> None:
+        app = MockKalshiAPI(SMALL, public_key=private_key.public_key())
+        assert _get(app, "/series").status_code == 401
+
+    def test_signed_requests_are_accepted(self, private_key: Any) -> None:
+        app = MockKalshiAPI(SMALL, public_key=private_key.public_key())
+
+        async def run() -> dict:
+            async with AuthenticatedClient(
+                base_url=ORIGIN,
+                transport=httpx.ASGITransport(app=app),
+                api_key_id="test",
+                private_key=private_key,
+                telemetry=Telemetry(),
+            ) as client:
+                return await client.get(f"/series/S/markets/{SMALL.market_ticker(0)}/candlesticks")
+
+        assert len(asyncio.run(run())["candlesticks"]) == 3
+        assert app.stats.statuses == {200: 1}
+
+
+class TestBenchmark:
+    def test_markets(self) -> None:
+        result = asyncio.run(bench_markets(SMALL, NO_FAULTS, rate_limit=1000.0, burst=10.0))
+        assert result.records == SMALL.markets
+        assert result.as_dict()["retry_overhead"] == 0.0
+
+    def test_trade_windows_cover_every_trade_once(self) -> None:
+        result = asyncio.run(bench_trades(SMALL, NO_FAULTS, 1000.0, 10.0, windows=4))
+        assert result.records == SMALL.trades
+        assert result.scenario == "trades windows=4"
+
+    def test_retries_are_counted_as_overhead(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        async def no_sleep(seconds: float) -> None:
+            pass
+
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+        data = SyntheticData(markets=3_000)
+        faults = FaultProfile(error_rate=0.5)
+        result = asyncio.run(bench_markets(data, faults, rate_limit=1000.0, burst=10.0))
+        assert result.records == data.markets
+        assert result.requests > result.ok
+        assert result.as_dict()["retry_overhead"] > 0
+
+    def test_candlesticks(self) -> None:
+        data = SyntheticData(markets=5, candles_per_market=2)
+        result = asyncio.run(bench_candlesticks(data, NO_FAULTS, 1000.0, 10.0, concurrency=2))
+        assert result.records == 10
+        assert result.telemetry["endpoints"]["/candlesticks"]["requests"] == 5
+
+    def test_cli_prints_one_line_per_scenario(self) -> None:
+        result = CliRunner().invoke(
+            benchmark.main,
+            ["--markets", "20", "--trades", "200", "--latency-ms", "0", "--jitter-ms", "0",
+             "--rate-limit", "1000", "--scenario", "markets", "--scenario", "trades"],
+        )
+        assert result.exit_code == 0, result.output
+        lines = [json.loads(line) for line in result.output.splitlines()]
+        assert [line["scenario"] for line in lines] == ["markets", "trades windows=4"]
+        assert [line["records"] for line in lines] == [20, 200]
@@ -0,0 +1,150 @@
+"""Tests for converting API records with the declared dataset schemas."""
+
+import asyncio
+import copy
+import json
+import logging
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download import schemas
+from download.candlesticks import MarketSpan, flatten_candles
+from download.schemas import MARKETS_SCHEMA, SERIES_SCHEMA, records_to_batch
+from download.storage import ParquetChunkWriter
+
+
+@pytest.fixture(autouse=True)
+def _reset_warnings() -> None:
+    schemas._warned_fields.clear()
+
+
+def _market(**fields: object) -> dict:
+    return {"ticker": "M1", "status": "active", "volume": 10, **fields}
+
+
+class TestDeclaredSchema:
+    def test_page_gets_declared_schema(self) -> None:
+        batch = records_to_batch([_market(), _market(ticker="M2")], "markets")
+        assert batch.schema == MARKETS_SCHEMA
+        assert batch.column("volume").to_pylist() == [10, 10]
+        assert batch.column("result").null_count == 2
+
+    def test_all_null_field_keeps_its_type(self) -> None:
+        batch = records_to_batch([_market(volume=None)], "markets")
+        assert batch.schema.field("volume").type == pa.int64()
+
+
+class TestMistypedValues:
+    def test_only_the_bad_value_is_nulled(self, caplog: pytest.LogCaptureFixture) -> None:
+        records = [_market(volume=1), _market(volume="n/a"), _market(volume=3)]
+        with caplog.at_level(logging.WARNING):
+            batch = records_to_batch(records, "markets")
+        assert batch.column("volume").to_pylist() == [1, None, 3]
+        assert batch.column("ticker").to_pylist() == ["M1"] * 3
+        assert "Nulled 1 of 3 volume values" in caplog.text
+
+    def test_convertible_values_are_coerced(self) -> None:
+        records = [
+            _market(volume="12", can_close_early="true", floor_strike="2.5", title=7),
+            _market(volume=4.0, can_close_early=False, floor_strike=1, title="t"),
+        ]
+        batch = records_to_batch(records, "markets")
+        assert batch.column("volume").to_pylist() == [12, 4]
+        assert batch.column("can_close_early").to_pylist() == [True, False]
+        assert batch.column("floor_strike").to_pylist() == [2.5, 1.0]
+        assert batch.column("title").to_pylist() == ["7", "t"]
+
+    def test_fractions_are_not_truncated(self) -> None:
+        batch = records_to_batch([_market(volume=1.5), _market(volume="x")], "markets")
+        assert batch.column("volume").to_pylist() == [None, None]
+
+    def test_fraction_in_an_otherwise_valid_page(self, caplog: pytest.LogCaptureFixture) -> None:
+        records = [_market(volume=1.5), _market(volume=2.0), _market(volume=3)]
+        with caplog.at_level(logging.WARNING):
+            batch = records_to_batch(records, "markets")
+        assert batch.column("volume").to_pylist() == [None, 2, 3]
+        assert "Nulled 1 of 3 volume values" in caplog.text
+
+    def test_non_finite_floats_are_nulled(self) -> None:
+        records = [_market(volume=float("nan")), _market(volume=float("inf")), _market(volume=2)]
+        assert records_to_batch(records, "markets").column("volume").to_pylist() == [None, None, 2]
+
+    def test_booleans_are_not_numbers(self) -> None:
+        batch = records_to_batch([_market(volume=True), _market(volume="x")], "markets")
+        assert batch.column("volume").to_pylist() == [None, None]
+
+
+class TestCandles:
+    def _flatten(self, candles: list[dict]) -> pa.Table:
+        return flatten_candles(candles, [MarketSpan("M", "S", 1, len(candles), None)])
+
+    def test_nested_fraction_nulls_only_that_member(
+        self, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        candles = [
+            {"end_period_ts": 60, "price": {"open": 1.5, "close": 2}, "yes_bid": {"open": 3}},
+            {"end_period_ts": 120, "price": {"open": 4, "close": 5}},
+        ]
+        with caplog.at_level(logging.WARNING):
+            table = self._flatten(candles)
+        assert table.column("price_open").to_pylist() == [None, 4]
+        assert table.column("price_close").to_pylist() == [2, 5]
+        assert table.column("yes_bid_open").to_pylist() == [3, None]
+        assert table.column("ticker").to_pylist() == ["M", "M"]
+        assert "Nulled 1 of 2 open values" in caplog.text
+
+    def test_whole_floats_are_kept(self) -> None:
+        table = self._flatten([{"end_period_ts": 60.0, "volume": 7.0, "price": {"max": 9.0}}])
+        assert table.column("end_period_ts").to_pylist() == [60]
+        assert table.column("volume").to_pylist() == [7]
+        assert table.column("price_max").to_pylist() == [9]
+
+    def test_non_object_section_is_nulled(self) -> None:
+        table = self._flatten([{"end_period_ts": 60, "price": 5}])
+        assert table.column("price_open").to_pylist() == [None]
+
+
+class TestRecordsUnchanged:
+    def test_json_fields_are_encoded_on_a_copy(self) -> None:
+        records = [{"ticker": "S1", "product_metadata": {"b": 1, "a": [2]}}]
+        original = copy.deepcopy(records)
+        batch = records_to_batch(records, "series")
+        assert records == original
+        assert json.loads(batch.column("product_metadata")[0].as_py()) == {"a": [2], "b": 1}
+
+
+class TestUndeclaredFields:
+    def test_kept_as_json_text(self, caplog: pytest.LogCaptureFixture) -> None:
+        records = [
+            _market(new_flag=True, new_info={"k": 1}),
+            _market(new_flag=None, new_info="plain"),
+        ]
+        with caplog.at_level(logging.WARNING):
+            batch = records_to_batch(records, "markets")
+        assert batch.schema.names[: len(MARKETS_SCHEMA)] == MARKETS_SCHEMA.names
+        assert batch.schema.names[len(MARKETS_SCHEMA):] == ["new_flag", "new_info"]
+        assert batch.column("new_flag").to_pylist() == ["true", None]
+        assert batch.column("new_info").to_pylist() == ['{"k": 1}', "plain"]
+        assert "Keeping fields not in the markets schema as JSON text" in caplog.text
+
+    def test_warned_once_per_field(self, caplog: pytest.LogCaptureFixture) -> None:
+        with caplog.at_level(logging.WARNING):
+            records_to_batch([_market(extra=1)], "markets")
+            records_to_batch([_market(extra=2)], "markets")
+        assert caplog.text.count("Keeping fields") == 1
+
+    def test_chunk_mixes_pages_with_and_without_them(self, tmp_path: Path) -> None:
+        writer = ParquetChunkWriter(tmp_path, chunk_size=10, name_prefix="series", dataset="series")
+
+        async def write() -> None:
+            await writer.add_records([{"ticker": "S1"}])
+            await writer.add_records([{"ticker": "S2", "new_field": "x"}])
+            await writer.flush()
+
+        asyncio.run(write())
+        (path,) = tmp_path.glob("series_*.parquet")
+        table = pq.read_table(path)
+        assert table.schema.names == [*SERIES_SCHEMA.names, "new_field"]
+        assert table.column("new_field").to_pylist() == [None, "x"]
@@ -0,0 +1,179 @@
+"""Tests for materializing temporal train/validation splits."""
+
+import json
+import os
+from datetime import UTC, datetime
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download.markets import DELTA_DIR, markets_table_sql
+from download.splits import SPLITS_FILE, UNSETTLED_MARKET_VALUES, materialize_splits
+
+VALIDATION_START = datetime(2024, 2, 1, tzinfo=UTC)
+TEST_START = datetime(2024, 3, 1, tzinfo=UTC)
+
+
+def _write(path: Path, columns: dict[str, list]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.table(columns), path)
+
+
+def _trades(path: Path, trade_ids: list[str], times: list[str]) -> None:
+    _write(path, {"trade_id": trade_ids, "ticker": ["M1"] * len(trade_ids), "created_time": times})
+
+
+def _market(ticker: str, open_time: str, close_time: str) -> dict:
+    return {
+        "ticker": ticker,
+        "status": "finalized",
+        "result": "yes",
+        "open_time": open_time,
+        "close_time": close_time,
+        "settlement_ts": close_time,
+        "settlement_value": 100,
+        "last_price": 99,
+        "yes_bid_dollars": "0.9900",
+        "volume": 5000,
+        "open_interest": 1200,
+    }
+
+
+def _markets(path: Path, markets: list[dict]) -> None:
+    _write(path, {k: [m[k] for m in markets] for k in markets[0]})
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> Path:
+    data = tmp_path / "data"
+    # Entirely in January, straddling the February cutoff, entirely in March.
+    _trades(data / "trades" / "year=2024/month=01/a.parquet", ["a1", "a2"],
+            ["2024-01-02T00:00:00Z", "2024-01-30T00:00:00Z"])
+    _trades(data / "trades" / "b.parquet", ["b1", "b2"],
+            ["2024-01-31T00:00:00Z", "2024-02-02T00:00:00Z"])
+    _trades(data / "trades" / "year=2024/month=03/c.parquet", ["c1"], ["2024-03-05T00:00:00Z"])
+    _markets(data / "markets" / "closed.parquet", [
+        _market("OLD", "2023-12-01T00:00:00Z", "2024-01-15T00:00:00Z"),
+    ])
+    _markets(data / "markets" / "mixed.parquet", [
+        _market("EARLY", "2024-01-01T00:00:00Z", "2024-01-20T00:00:00Z"),
+        _market("LATE", "2024-01-10T00:00:00Z", "2024-02-20T00:00:00Z"),
+        _market("FUTURE", "2024-02-10T00:00:00Z", "2024-02-25T00:00:00Z"),
+    ])
+    _write(data / "events" / "events.parquet", {"event_ticker": ["E1"]})
+    return data
+
+
+@pytest.fixture()
+def splits_dir(data_dir: Path) -> Path:
+    splits = data_dir.parent / "splits"
+    materialize_splits(data_dir, splits, VALIDATION_START, TEST_START)
+    return splits
+
+
+def _ids(dataset_dir: Path) -> list[str]:
+    return sorted(
+        i for p in dataset_dir.rglob("*.parquet")
+        for i in pq.read_table(p).column("trade_id").to_pylist()
+    )
+
+
+def _markets_by_ticker(dataset_dir: Path) -> dict[str, dict]:
+    return {
+        row["ticker"]: row
+        for p in dataset_dir.rglob("*.parquet")
+        for row in pq.read_table(p).to_pylist()
+    }
+
+
+class TestTrades:
+    def test_cutoff_filters_trades(self, splits_dir: Path) -> None:
+        assert _ids(splits_dir / "train" / "trades") == ["a1", "a2", "b1"]
+        assert _ids(splits_dir / "validation" / "trades") == ["a1", "a2", "b1", "b2"]
+
+    def test_files_inside_split_are_hard_linked(self, data_dir: Path, splits_dir: Path) -> None:
+        source = data_dir / "trades" / "year=2024/month=01/a.parquet"
+        linked = splits_dir / "train" / "trades" / "year=2024/month=01/a.parquet"
+        assert os.path.samefile(source, linked)
+        rewritten = splits_dir / "train" / "trades" / "b.parquet"
+        assert not os.path.samefile(data_dir / "trades" / "b.parquet", rewritten)
+
+    def test_start_drops_earlier_trades(self, data_dir: Path, tmp_path: Path) -> None:
+        splits = tmp_path / "from_jan15"
+        start = datetime(2024, 1, 15, tzinfo=UTC)
+        materialize_splits(data_dir, splits, VALIDATION_START, TEST_START, start=start)
+        assert _ids(splits / "train" / "trades") == ["a2", "b1"]
+
+
+class TestMarkets:
+    def test_markets_opened_after_cutoff_are_dropped(self, splits_dir: Path) -> None:
+        assert sorted(_markets_by_ticker(splits_dir / "train" / "markets")) == [
+            "EARLY", "LATE", "OLD",
+        ]
+        assert "FUTURE" in _markets_by_ticker(splits_dir / "validation" / "markets")
+
+    def test_markets_open_at_cutoff_look_unsettled(self, splits_dir: Path) -> None:
+        late = _markets_by_ticker(splits_dir / "train" / "markets")["LATE"]
+        assert (late["status"], late["result"]) == ("active", "")
+        nulled = [c for c in late if c in UNSETTLED_MARKET_VALUES and c not in ("status", "result")]
+        assert sorted(nulled) == [
+            "last_price", "open_interest", "settlement_ts", "settlement_value",
+            "volume", "yes_bid_dollars",
+        ]
+        assert all(late[c] is None for c in nulled)
+
+    def test_markets_closed_before_cutoff_keep_outcomes(self, splits_dir: Path) -> None:
+        markets = _markets_by_ticker(splits_dir / "train" / "markets")
+        assert markets["EARLY"]["result"] == "yes"
+        assert markets["EARLY"]["last_price"] == 99
+        assert markets["OLD"]["volume"] == 5000
+
+    def test_refresh_deltas_are_split(self, data_dir: Path, tmp_path: Path) -> None:
+        _markets(data_dir / "markets" / DELTA_DIR / "delta-20240301T000000.parquet", [
+            _market("LATE", "2024-01-10T00:00:00Z", "2024-02-20T00:00:00Z"),
+            _market("NEW", "2024-01-20T00:00:00Z", "2024-01-25T00:00:00Z"),
+        ])
+        splits = tmp_path / "with_deltas"
+        materialize_splits(data_dir, splits, VALIDATION_START, TEST_START)
+        train = splits / "train"
+        assert (train / "markets" / DELTA_DIR / "delta-20240301T000000.parquet").exists()
+        rows = dict(duckdb.sql(
+            f"SELECT ticker, result FROM {markets_table_sql(train)}"
+        ).fetchall())
+        assert rows == {"OLD": "yes", "EARLY": "yes", "LATE": "", "NEW": "yes"}
+
+    def test_settlement_time_decides_the_outcome(self, data_dir: Path, tmp_path: Path) -> None:
+        settled_late = _market("SETTLED_LATE", "2024-01-01T00:00:00Z", "2024-01-25T00:00:00Z")
+        settled_late["settlement_ts"] = "2024-02-05T00:00:00Z"
+        no_settlement = _market("NO_TS", "2024-01-01T00:00:00Z", "2024-01-25T00:00:00Z")
+        no_settlement["settlement_ts"] = None
+        _markets(data_dir / "markets" / "settled.parquet", [settled_late, no_settlement])
+        splits = tmp_path / "settled"
+        materialize_splits(data_dir, splits, VALIDATION_START, TEST_START)
+        markets = _markets_by_ticker(splits / "train" / "markets")
+        assert markets["SETTLED_LATE"]["result"] == ""
+        assert markets["NO_TS"]["result"] == "yes"
+
+    def test_validation_settles_markets_closed_before_its_cutoff(self, splits_dir: Path) -> None:
+        late = _markets_by_ticker(splits_dir / "validation" / "markets")["LATE"]
+        assert (late["status"], late["result"], late["volume"]) == ("finalized", "yes", 5000)
+
+
+class TestMetadata:
+    def test_writes_splits_file(self, splits_dir: Path) -> None:
+        meta = json.loads((splits_dir / SPLITS_FILE).read_text())
+        assert meta["validation_start"] == VALIDATION_START.isoformat()
+        assert meta["test_start"] == TEST_START.isoformat()
+        assert meta["splits"]["train"]["cutoff"] == VALIDATION_START.isoformat()
+
+    def test_events_are_linked(self, data_dir: Path, splits_dir: Path) -> None:
+        assert os.path.samefile(
+            data_dir / "events" / "events.parquet",
+            splits_dir / "train" / "events" / "events.parquet",
+        )
+
+    def test_rejects_unordered_cutoffs(self, data_dir: Path, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="validation_start"):
+            materialize_splits(data_dir, tmp_path / "bad", TEST_START, VALIDATION_START)
@@ -0,0 +1,103 @@
+"""Tests for the download telemetry registry and its exporters."""
+
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+from download.client import KalshiClient
+from download.telemetry import Histogram, MetricsExporter, Telemetry, endpoint_label
+
+
+def test_endpoint_label_drops_market_segments() -> None:
+    assert endpoint_label("/series/S/markets/M/candlesticks") == "/candlesticks"
+    assert endpoint_label("/markets/") == "/markets"
+    assert endpoint_label("/") == "/"
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self) -> None:
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+        assert histogram.sum == pytest.approx(5.65)
+
+    def test_quantile_is_the_bucket_bound(self) -> None:
+        histogram = Histogram(buckets=(0.1, 1.0))
+        assert histogram.quantile(0.5) == 0.0
+        for value in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(value)
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(0.75) == 1.0
+        assert histogram.quantile(1.0) == 1.0
+
+
+class TestTelemetry:
+    def test_requests_by_status(self) -> None:
+        telemetry = Telemetry()
+        telemetry.record_request("/markets", 200, limiter=1.0, network=0.2, nbytes=100)
+        telemetry.record_request("/markets", 429, network=0.1)
+        telemetry.record_request("/markets", "error", network=5.0)
+        telemetry.record_records("/markets", 50)
+        stats = telemetry.as_dict()["endpoints"]["/markets"]
+        assert stats["requests"] == 3
+        assert (stats["retries"], stats["throttled"]) == (2, 1)
+        assert (stats["bytes_received"], stats["records"]) == (100, 50)
+        # Failed connections have no response time.
+        assert telemetry.endpoints["/markets"].latency.count == 2
+
+    def test_phase_shares(self) -> None:
+        telemetry = Telemetry()
+        telemetry.record_request("/markets", 200, limiter=3.0, network=1.0)
+        telemetry.record_write(seconds=0.5, blocked=0.5)
+        summary = telemetry.as_dict()
+        assert summary["phase_seconds"]["write_blocked"] == 0.5
+        assert summary["phase_share"]["limiter"] == 0.6
+        assert sum(summary["phase_share"].values()) == pytest.approx(1.0)
+
+    def test_prometheus_text(self) -> None:
+        telemetry = Telemetry()
+        telemetry.record_request("/series/S/markets/M/candlesticks", 200, network=0.02)
+        text = telemetry.prometheus()
+        assert "# TYPE kalshi_download_request_duration_seconds histogram" in text
+        assert 'kalshi_download_request_duration_seconds_bucket{endpoint="/candlesticks",le="0.025"} 1' in text
+        assert 'kalshi_download_responses_total{endpoint="/candlesticks",status="200"} 1' in text
+        assert 'kalshi_download_phase_seconds_total{phase="network"} 0.020000' in text
+        assert text.endswith("\n")
+
+    def test_client_records_into_its_registry(self) -> None:
+        telemetry = Telemetry()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"events": [{"event_ticker": "E1"}] * 2})
+
+        async def run() -> None:
+            async with KalshiClient(
+                base_url="http://kalshi.test",
+                transport=httpx.MockTransport(handler),
+                telemetry=telemetry,
+            ) as client:
+                async for _ in client.paginate("/events", "events"):
+                    pass
+
+        asyncio.run(run())
+        stats = telemetry.as_dict()["endpoints"]["/events"]
+        assert stats["requests"] == 1
+        assert stats["records"] == 2
+
+
+def test_exporter_writes_periodically_and_on_exit(tmp_path: Path) -> None:
+    telemetry = Telemetry()
+    path = tmp_path / "metrics" / "metrics.prom"
+
+    async def run() -> bool:
+        async with MetricsExporter(path, telemetry, interval=0.01):
+            await asyncio.sleep(0.05)
+            written = path.exists()
+            telemetry.record_records("/markets", 3)
+        return written
+
+    assert asyncio.run(run())
+    assert 'kalshi_download_records_total{endpoint="/markets"} 3' in path.read_text()
+    assert list(path.parent.iterdir()) == [path]
@@ -0,0 +1,198 @@
+"""Tests for incremental trades sync and the windowed backfill against the mock API."""
+
+import asyncio
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download import trades
+from download.client import KalshiClient
+from download.mock_api import API_PREFIX, MockKalshiAPI, SyntheticData
+from download.telemetry import Telemetry
+from download.trades import (
+    BackfillWindow,
+    backfill_trades,
+    backfill_windows,
+    load_high_water_mark,
+    market_volume_profile,
+    sync_trades,
+)
+
+DATA = SyntheticData(markets=20, trades=600)
+MIDDLE = datetime(2024, 7, 1, tzinfo=UTC)
+
+
+def _run(app: MockKalshiAPI, fn: Any, *args: Any, **kwargs: Any) -> Any:
+    async def run() -> Any:
+        async with KalshiClient(
+            base_url="http://mock-kalshi" + API_PREFIX,
+            rate_limit=10_000.0,
+            burst=100.0,
+            transport=httpx.ASGITransport(app=app),
+            telemetry=Telemetry(),
+        ) as client:
+            return await fn(client, *args, **kwargs)
+
+    return asyncio.run(run())
+
+
+def _stored_ids(data_dir: Path) -> Counter:
+    ids: Counter = Counter()
+    for path in (data_dir / "trades").rglob("*.parquet"):
+        ids.update(pq.read_table(path, columns=["trade_id"]).column("trade_id").to_pylist())
+    return ids
+
+
+def _expected_ids(lo: datetime, hi: datetime) -> set[str]:
+    return {
+        f"mock-{j:012d}"
+        for j in range(DATA.trades)
+        if lo.timestamp() <= DATA.trade_time(j) < hi.timestamp()
+    }
+
+
+class TestSync:
+    def test_fetches_only_trades_after_the_stored_ones(self, tmp_path: Path) -> None:
+        _run(MockKalshiAPI(DATA), backfill_trades, tmp_path, start=DATA.start, end=MIDDLE)
+        stored = _stored_ids(tmp_path)
+        assert set(stored) == _expected_ids(DATA.start, MIDDLE)
+
+        app = MockKalshiAPI(DATA)
+        new = _run(app, sync_trades, tmp_path)
+        ids = _stored_ids(tmp_path)
+        assert new == DATA.trades - len(stored)
+        assert len(ids) == DATA.trades
+        assert max(ids.values()) == 1
+        # Only the pages at or after the high-water mark were requested.
+        assert app.stats.records < DATA.trades
+
+        newest = datetime.fromtimestamp(int(DATA.trade_time(0)), UTC)
+        assert load_high_water_mark(tmp_path) == newest
+        assert _run(MockKalshiAPI(DATA), sync_trades, tmp_path) == 0
+
+    def test_requires_stored_trades(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="No stored trades"):
+            _run(MockKalshiAPI(DATA), sync_trades, tmp_path)
+
+
+class FailAfter:
+    """ASGI wrapper answering 404, which is not retried, after `requests` requests."""
+
+    def __init__(self, app: MockKalshiAPI, requests: int):
+        self.app = app
+        self.requests = requests
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            if self.requests <= 0:
+                await send({"type": "http.response.start", "status": 404, "headers": []})
+                await send({"type": "http.response.body", "body": b"{}"})
+                return
+            self.requests -= 1
+        await self.app(scope, receive, send)
+
+
+class TestBackfillWindows:
+    def test_windows_split_the_range_on_whole_seconds(self) -> None:
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        end = start + timedelta(seconds=10)
+        windows = backfill_windows(start, end, 3)
+        assert [(w.start - start).seconds for w in windows] == [0, 3, 6]
+        assert [w.end for w in windows[:-1]] == [w.start for w in windows[1:]]
+        assert windows[-1].end == end
+
+    def test_at_most_one_window_per_second(self) -> None:
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        assert len(backfill_windows(start, start + timedelta(seconds=2), 8)) == 2
+        with pytest.raises(ValueError, match="start must be before end"):
+            backfill_windows(start, start, 2)
+
+    def test_windows_hold_equal_shares_of_the_profile(self) -> None:
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        end = start + timedelta(days=4)
+        # The last day holds three quarters of the volume, so three windows split it.
+        windows = backfill_windows(start, end, 4, profile=[0.0, 1.0, 1.0, 6.0])
+        assert [(w.end - w.start) / timedelta(hours=1) for w in windows] == [72, 8, 8, 8]
+        assert windows[0].start == start and windows[-1].end == end
+
+    def test_volume_profile_spreads_each_market_over_its_life(self, tmp_path: Path) -> None:
+        (tmp_path / "markets").mkdir()
+        pq.write_table(
+            pa.table({
+                "ticker": ["A", "B"],
+                "status": ["finalized", "finalized"],
+                "open_time": ["2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z"],
+                "close_time": ["2024-01-03T00:00:00Z", "2024-01-04T00:00:00Z"],
+                "volume": [100, 300],
+                "volume_fp": ["100.00", "300.00"],
+            }),
+            tmp_path / "markets" / "markets_000000.parquet",
+        )
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        profile = market_volume_profile(tmp_path, start, start + timedelta(days=4), buckets=4)
+        assert profile == [50.0, 50.0, 300.0, 0.0]
+        assert market_volume_profile(tmp_path / "empty", start, start + timedelta(days=4)) is None
+
+    def test_window_files_do_not_share_the_download_prefix(self) -> None:
+        window = BackfillWindow(datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 2, 1, tzinfo=UTC))
+        assert window.name_prefix == "trades-20240101T000000"
+        assert not window.name_prefix.startswith("trades_")
+
+
+class TestBackfill:
+    def test_windows_together_fetch_every_trade_once(self, tmp_path: Path) -> None:
+        written = _run(MockKalshiAPI(DATA), backfill_trades, tmp_path, DATA.start, DATA.end, 4)
+        ids = _stored_ids(tmp_path)
+        assert written == DATA.trades
+        assert set(ids) == _expected_ids(DATA.start, DATA.end)
+        assert max(ids.values()) == 1
+        prefixes = {p.name.rsplit("_", 1)[0] for p in (tmp_path / "trades").rglob("*.parquet")}
+        assert len(prefixes) == 4
+        newest = datetime.fromtimestamp(int(DATA.trade_time(0)), UTC)
+        assert load_high_water_mark(tmp_path) == newest
+
+    def test_windows_follow_stored_market_volume(self, tmp_path: Path) -> None:
+        markets = [DATA.market_record(i) for i in range(DATA.markets)]
+        markets[-1]["volume_fp"] = "1000000.00"
+        (tmp_path / "markets").mkdir()
+        pq.write_table(pa.Table.from_pylist(markets), tmp_path / "markets" / "markets.parquet")
+
+        written = _run(MockKalshiAPI(DATA), backfill_trades, tmp_path, DATA.start, DATA.end, 4)
+        assert written == DATA.trades
+        assert max(_stored_ids(tmp_path).values()) == 1
+        starts = sorted(
+            datetime.strptime(p.name.split("_")[0], "trades-%Y%m%dT%H%M%S").replace(tzinfo=UTC)
+            for p in (tmp_path / "trades").rglob("*.parquet")
+        )
+        # The last market's lifetime holds nearly all the volume, so three
+        # windows start inside it.
+        last_open = datetime.fromtimestamp(DATA.market_created(DATA.markets - 1), UTC)
+        assert len({s for s in starts if s >= last_open}) == 3
+
+    def test_finished_windows_are_skipped(self, tmp_path: Path) -> None:
+        _run(MockKalshiAPI(DATA), backfill_trades, tmp_path, DATA.start, DATA.end, 2)
+        app = MockKalshiAPI(DATA)
+        assert _run(app, backfill_trades, tmp_path, DATA.start, DATA.end, 2) == 0
+        assert app.stats.requests == 0
+
+    def test_interrupted_window_resumes_from_its_checkpoint(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(trades, "TRADES_CHUNK_SIZE", 100)
+        data = SyntheticData(markets=20, trades=2_500)
+        with pytest.raises(httpx.HTTPStatusError):
+            app = FailAfter(MockKalshiAPI(data), requests=1)
+            _run(app, backfill_trades, tmp_path, data.start, data.end, 1)
+        assert sum(_stored_ids(tmp_path).values()) == 1_000
+
+        app = MockKalshiAPI(data)
+        _run(app, backfill_trades, tmp_path, data.start, data.end, 1)
+        ids = _stored_ids(tmp_path)
+        assert len(ids) == data.trades
+        assert max(ids.values()) == 1
+        assert app.stats.requests == 2
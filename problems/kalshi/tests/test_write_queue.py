@@ -0,0 +1,147 @@
+"""Tests for the background write queue and the chunk writers built on it."""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pyarrow.parquet as pq
+import pytest
+from download import storage
+from download.storage import ParquetChunkWriter, PartitionedChunkWriter
+from download.telemetry import Telemetry
+from download.write_queue import WriteQueue
+
+
+def _queue(max_pending: int = 4) -> WriteQueue:
+    return WriteQueue(max_pending=max_pending, name="test-writer", telemetry=Telemetry())
+
+
+class TestWriteQueue:
+    def test_jobs_run_in_order_on_one_worker_thread(self) -> None:
+        queue = _queue()
+        done: list[tuple[int, int]] = []
+
+        async def run() -> None:
+            for i in range(10):
+                await queue.submit(lambda i=i: done.append((i, threading.get_ident())))
+            await queue.drain()
+
+        asyncio.run(run())
+        assert [i for i, _ in done] == list(range(10))
+        threads = {t for _, t in done}
+        assert len(threads) == 1
+        assert threading.get_ident() not in threads
+        assert queue.stats.writes == 10
+
+    def test_slow_writes_do_not_block_the_event_loop(self) -> None:
+        queue = _queue(max_pending=1)
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        async def run() -> None:
+            beat = asyncio.create_task(ticker())
+            for _ in range(3):
+                await queue.submit(time.sleep, 0.05)
+            await queue.drain()
+            beat.cancel()
+
+        asyncio.run(run())
+        # Three 50ms writes; a blocked loop would not have ticked meanwhile.
+        assert ticks >= 10
+        assert queue.stats.blocked_seconds > 0
+
+    def test_drain_reraises_the_first_error_and_skips_the_rest(self) -> None:
+        queue = _queue()
+        done: list[int] = []
+
+        def fail() -> None:
+            raise OSError("disk full")
+
+        async def run() -> None:
+            await queue.submit(fail)
+            await queue.submit(done.append, 1)
+            await queue.drain()
+
+        with pytest.raises(RuntimeError, match="Background write failed in test-writer") as info:
+            asyncio.run(run())
+        assert isinstance(info.value.__cause__, OSError)
+        assert done == []
+
+    def test_reusable_across_event_loops(self) -> None:
+        queue = _queue()
+        done: list[int] = []
+
+        async def run(value: int) -> None:
+            await queue.submit(done.append, value)
+            await queue.drain()
+
+        asyncio.run(run(1))
+        asyncio.run(run(2))
+        assert done == [1, 2]
+
+
+class TestChunkWriters:
+    def test_full_chunks_are_written_and_the_rest_on_flush(self, tmp_path: Path) -> None:
+        writer = ParquetChunkWriter(tmp_path, chunk_size=4, name_prefix="series", dataset="series")
+
+        async def run() -> None:
+            await writer.add_records([{"ticker": f"S{i}"} for i in range(6)])
+            await writer.add_records([{"ticker": "S6"}])
+            await writer.flush()
+
+        asyncio.run(run())
+        paths = sorted(tmp_path.glob("series_*.parquet"))
+        assert [pq.read_metadata(p).num_rows for p in paths] == [4, 3]
+        assert [(p.name, n) for p, n in writer.take_written()] == [
+            ("series_000000.parquet", 4),
+            ("series_000001.parquet", 3),
+        ]
+        assert writer.total_written == 7
+
+    def test_trades_are_split_into_month_partitions(self, tmp_path: Path) -> None:
+        writer = PartitionedChunkWriter(tmp_path, name_prefix="trades")
+        records = [
+            {"trade_id": "a", "created_time": "2024-01-31T23:59:59Z"},
+            {"trade_id": "b", "created_time": "2024-02-01T00:00:00Z"},
+        ]
+
+        async def run() -> None:
+            await writer.add_records(records)
+            await writer.flush()
+
+        asyncio.run(run())
+        assert sorted(str(p.relative_to(tmp_path)) for p, _ in writer.take_written()) == [
+            "year=2024/month=01/trades_000000.parquet",
+            "year=2024/month=02/trades_000000.parquet",
+        ]
+
+    def test_pages_are_converted_off_the_event_loop(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        threads = []
+        to_batch = storage.to_batch
+
+        def recording_to_batch(*args: object) -> object:
+            threads.append(threading.get_ident())
+            return to_batch(*args)
+
+        monkeypatch.setattr(storage, "to_batch", recording_to_batch)
+        writers = [
+            ParquetChunkWriter(tmp_path / "flat", name_prefix="series", dataset="series"),
+            PartitionedChunkWriter(tmp_path / "trades", name_prefix="trades", dataset="trades"),
+        ]
+
+        async def run() -> None:
+            for writer in writers:
+                await writer.add_records([{"ticker": "S1", "created_time": "2024-01-01T00:00:00Z"}])
+                await writer.flush()
+
+        asyncio.run(run())
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
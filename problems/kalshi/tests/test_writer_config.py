@@ -0,0 +1,58 @@
+"""Tests for the Parquet writer settings used by every downloader."""
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download.writer_config import BLOOM_FILTERS_SUPPORTED, ParquetWriterConfig
+
+TABLE = pa.table({
+    "ticker": ["A", "B"] * 10,
+    "created_time": [f"2024-01-01T00:00:{i:02d}Z" for i in range(20)],
+    "end_period_ts": list(range(20)),
+    "count": list(range(20)),
+})
+
+
+def _metadata(tmp_path: Path, config: ParquetWriterConfig) -> pq.FileMetaData:
+    path = tmp_path / "part.parquet"
+    config.write_table(TABLE, path)
+    return pq.ParquetFile(path).metadata
+
+
+def _column(metadata: pq.FileMetaData, name: str) -> pq.ColumnChunkMetaData:
+    return metadata.row_group(0).column(metadata.schema.names.index(name))
+
+
+def test_row_groups_are_capped(tmp_path: Path) -> None:
+    metadata = _metadata(tmp_path, ParquetWriterConfig(row_group_size=8))
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [8, 8, 4]
+
+
+def test_encodings(tmp_path: Path) -> None:
+    metadata = _metadata(tmp_path, ParquetWriterConfig())
+    assert "RLE_DICTIONARY" in _column(metadata, "ticker").encodings
+    assert "DELTA_BYTE_ARRAY" in _column(metadata, "created_time").encodings
+    assert "DELTA_BINARY_PACKED" in _column(metadata, "end_period_ts").encodings
+
+
+def test_statistics_and_page_index(tmp_path: Path) -> None:
+    ticker = _column(_metadata(tmp_path, ParquetWriterConfig()), "ticker")
+    assert (ticker.statistics.min, ticker.statistics.max) == ("A", "B")
+    assert ticker.has_column_index and ticker.has_offset_index
+
+
+@pytest.mark.skipif(not BLOOM_FILTERS_SUPPORTED, reason="pyarrow cannot write bloom filters")
+def test_bloom_filters_only_on_configured_columns(tmp_path: Path) -> None:
+    metadata = _metadata(tmp_path, ParquetWriterConfig())
+    assert _column(metadata, "ticker").bloom_filter_length > 0
+    assert not _column(metadata, "count").bloom_filter_length
+
+
+def test_bloom_filter_is_sized_from_distinct_values() -> None:
+    kwargs = ParquetWriterConfig(bloom_filter_fpp=0.01).write_kwargs(TABLE)
+    if BLOOM_FILTERS_SUPPORTED:
+        assert kwargs["bloom_filter_options"] == {"ticker": {"ndv": 2, "fpp": 0.01}}
+    else:
+        assert "bloom_filter_options" not in kwargs
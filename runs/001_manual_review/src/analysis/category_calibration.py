@@ -18,14 +18,8 @@ from analysis.base import (
     validate_prices,
     validate_row_count,
 )
-from util.queries import (
-    build_query,
-    categorized_trade_outcomes_sql,
-    get_connection,
-    resolved_markets_sql,
-    trade_outcomes_sql,
-    with_category_sql,
-)
+from util.enriched import enriched_trades_ctes
+from util.queries import build_query, catalog_attached, get_connection
 from util.stats import calibration_error
 
 log = logging.getLogger(__name__)
@@ -49,7 +43,8 @@ def run(
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
     bin_width = 100.0 / n_bins
 
     log.info(
@@ -59,12 +54,7 @@ def run(
         f"{min_category_contracts:,}",
     )
     query = build_query(
-        ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("categorized", with_category_sql(data_dir)),
-            ("trade_outcomes", trade_outcomes_sql(data_dir)),
-            ("cat_trades", categorized_trade_outcomes_sql(data_dir)),
-        ],
+        ctes=enriched_trades_ctes(data_dir, use_catalog=use_catalog),
         select=f"""
             SELECT
                 category,
@@ -75,7 +65,7 @@ def run(
                     / SUM(contracts) * 100 AS win_rate,
                 SUM(contracts) AS total_contracts,
                 COUNT(*) AS trade_count
-            FROM cat_trades
+            FROM enriched_trades
             WHERE taker_price > 0 AND taker_price < 100
             GROUP BY category, bin_start
             ORDER BY category, bin_start
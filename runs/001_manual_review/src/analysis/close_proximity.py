@@ -16,12 +16,8 @@ from analysis.base import (
     ensure_output_dirs,
     validate_row_count,
 )
-from util.queries import (
-    build_query,
-    get_connection,
-    resolved_markets_sql,
-    trade_outcomes_with_timing_sql,
-)
+from util.enriched import enriched_trades_ctes
+from util.queries import build_query, catalog_attached, get_connection
 
 log = logging.getLogger(__name__)
 
@@ -41,13 +37,17 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
 
     log.info("Running close-proximity efficiency analysis...")
     query = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("trade_outcomes_timing", trade_outcomes_with_timing_sql(data_dir)),
+            *enriched_trades_ctes(data_dir, use_catalog=use_catalog),
+            (
+                "trade_outcomes_timing",
+                "SELECT * EXCLUDE (time_bucket) FROM enriched_trades WHERE close_time IS NOT NULL",
+            ),
         ],
         select="""
             SELECT
@@ -17,13 +17,9 @@ from analysis.base import (
     ensure_output_dirs,
     validate_row_count,
 )
+from util.enriched import enriched_trades_ctes
 from util.fees import kalshi_fee_cents
-from util.queries import (
-    build_query,
-    get_connection,
-    resolved_markets_sql,
-    with_fee_type_sql,
-)
+from util.queries import build_query, catalog_attached, get_connection
 from util.strategy import daily_capacity, kelly_fraction, payout_ratio_from_price
 
 log = logging.getLogger(__name__)
@@ -32,46 +28,6 @@ DATASET_DAYS = 1680.0
 MIN_CONTRACTS = 10_000
 
 
-def _full_trade_outcomes_sql(data_dir: Path) -> str:
-    """SQL CTE for trade outcomes with category, fee info, and time bucket.
-
-    Depends on: resolved_markets, markets_with_fees CTEs.
-    """
-    return f"""
-        SELECT
-            t.ticker,
-            t.taker_side,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-            END AS taker_price,
-            CASE WHEN t.taker_side = mf.result THEN 1 ELSE 0 END AS taker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts,
-            mf.category,
-            mf.fee_type,
-            mf.fee_multiplier,
-            CASE
-                WHEN EXTRACT(HOUR FROM CAST(t.created_time AS TIMESTAMPTZ)
-                    AT TIME ZONE 'America/New_York') BETWEEN 20 AND 23
-                THEN 'evening'
-                ELSE 'other'
-            END AS time_bucket,
-            CASE
-                WHEN (CASE WHEN t.taker_side = 'yes'
-                     THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                     ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-                END) >= 60 THEN 'high_price'
-                WHEN (CASE WHEN t.taker_side = 'yes'
-                     THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                     ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-                END) <= 30 THEN 'low_price'
-                ELSE 'mid_price'
-            END AS price_range
-        FROM '{data_dir}/trades/*.parquet' t
-        INNER JOIN markets_with_fees mf ON t.ticker = mf.ticker
-    """
-
-
 def run(
     data_dir: Path,
     output_dir: Path,
@@ -90,16 +46,13 @@ def run(
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
 
     log.info("Running combined filter analysis (top %d, min %d contracts)...", top_n, min_contracts)
 
     query = build_query(
-        ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("markets_with_fees", with_fee_type_sql(data_dir)),
-            ("full_trades", _full_trade_outcomes_sql(data_dir)),
-        ],
+        ctes=enriched_trades_ctes(data_dir, use_catalog=use_catalog),
         select=f"""
             SELECT
                 taker_side,
@@ -113,7 +66,7 @@ def run(
                 AVG(fee_multiplier) AS avg_fee_mult,
                 SUM(contracts) AS total_contracts,
                 COUNT(*) AS trade_count
-            FROM full_trades
+            FROM enriched_trades
             WHERE taker_price > 0 AND taker_price < 100
             GROUP BY taker_side, fee_type, time_bucket, category, price_range
             HAVING SUM(contracts) >= {min_contracts}
@@ -124,11 +77,7 @@ def run(
 
     # Also query marginal (single-filter) edges for independence test
     marginal_query = build_query(
-        ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("markets_with_fees", with_fee_type_sql(data_dir)),
-            ("full_trades", _full_trade_outcomes_sql(data_dir)),
-        ],
+        ctes=enriched_trades_ctes(data_dir, use_catalog=use_catalog),
         select="""
             SELECT
                 SUM(CASE WHEN taker_won = 1 THEN contracts ELSE 0 END)
@@ -136,7 +85,7 @@ def run(
                 SUM(taker_price * contracts) / SUM(contracts) AS overall_avg_price,
                 AVG(fee_multiplier) AS overall_fee_mult,
                 SUM(contracts) AS overall_contracts
-            FROM full_trades
+            FROM enriched_trades
             WHERE taker_price > 0 AND taker_price < 100
         """,
     )
@@ -18,13 +18,9 @@ from analysis.base import (
     ensure_output_dirs,
     validate_row_count,
 )
+from util.enriched import enriched_trades_ctes
 from util.fees import kalshi_fee_cents
-from util.queries import (
-    build_query,
-    get_connection,
-    resolved_markets_sql,
-    with_fee_type_sql,
-)
+from util.queries import build_query, catalog_attached, get_connection
 from util.strategy import daily_capacity, kelly_fraction, payout_ratio_from_price
 
 log = logging.getLogger(__name__)
@@ -33,26 +29,22 @@ DATASET_DAYS = 1680.0
 TARGET_CATEGORIES = ["Economics", "Elections"]
 
 
-def _cat_fee_trades_sql(data_dir: Path) -> str:
+def _cat_fee_trades_sql() -> str:
     """SQL CTE for trade outcomes with category and fee info.
 
-    Depends on: resolved_markets, markets_with_fees CTEs.
+    Depends on: enriched_trades CTE.
     """
     return f"""
         SELECT
-            t.ticker,
-            t.taker_side,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-            END AS taker_price,
-            CASE WHEN t.taker_side = mf.result THEN 1 ELSE 0 END AS taker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts,
-            mf.category,
-            mf.fee_multiplier
-        FROM '{data_dir}/trades/*.parquet' t
-        INNER JOIN markets_with_fees mf ON t.ticker = mf.ticker
-        WHERE mf.category IN ({", ".join(f"'{c}'" for c in TARGET_CATEGORIES)})
+            ticker,
+            taker_side,
+            taker_price,
+            taker_won,
+            contracts,
+            category,
+            fee_multiplier
+        FROM enriched_trades
+        WHERE category IN ({", ".join(f"'{c}'" for c in TARGET_CATEGORIES)})
     """
 
 
@@ -68,7 +60,8 @@ def run(data_dir: Path, output_dir: Path, n_bins: int = 10) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
     bin_width = 100.0 / n_bins
 
     log.info("Running Economics reversal / Elections analysis...")
@@ -76,9 +69,8 @@ def run(data_dir: Path, output_dir: Path, n_bins: int = 10) -> AnalysisResult:
     # --- Query: calibration by category and price bin ---
     query = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("markets_with_fees", with_fee_type_sql(data_dir)),
-            ("cat_fee_trades", _cat_fee_trades_sql(data_dir)),
+            *enriched_trades_ctes(data_dir, use_catalog=use_catalog),
+            ("cat_fee_trades", _cat_fee_trades_sql()),
         ],
         select=f"""
             SELECT
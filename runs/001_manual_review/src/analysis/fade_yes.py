@@ -17,13 +17,9 @@ from analysis.base import (
     ensure_output_dirs,
     validate_row_count,
 )
+from util.enriched import enriched_trades_ctes
 from util.fees import kalshi_fee_cents
-from util.queries import (
-    build_query,
-    get_connection,
-    resolved_markets_sql,
-    with_fee_type_sql,
-)
+from util.queries import build_query, catalog_attached, get_connection
 from util.strategy import daily_capacity, kelly_fraction, payout_ratio_from_price
 
 log = logging.getLogger(__name__)
@@ -36,27 +32,26 @@ MAX_PRICE = 100
 PRICE_BIN_WIDTH = 10
 
 
-def _strategy_trades_sql(data_dir: Path) -> str:
+def _strategy_trades_sql() -> str:
     """SQL CTE for NO-taker trades at >= 60c with fee info and category.
 
-    Depends on: resolved_markets, markets_with_fees CTEs.
+    Depends on: enriched_trades CTE.
     """
     return f"""
         SELECT
-            t.ticker,
-            t.taker_side,
-            CAST(t.no_price_dollars AS DOUBLE) * 100 AS taker_price,
-            CASE WHEN t.taker_side = mf.result THEN 1 ELSE 0 END AS taker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts,
-            t.created_time,
-            mf.category,
-            mf.fee_type,
-            mf.fee_multiplier
-        FROM '{data_dir}/trades/*.parquet' t
-        INNER JOIN markets_with_fees mf ON t.ticker = mf.ticker
-        WHERE t.taker_side = 'no'
-          AND CAST(t.no_price_dollars AS DOUBLE) * 100 >= {MIN_PRICE}
-          AND CAST(t.no_price_dollars AS DOUBLE) * 100 < {MAX_PRICE}
+            ticker,
+            taker_side,
+            taker_price,
+            taker_won,
+            contracts,
+            created_time,
+            category,
+            fee_type,
+            fee_multiplier
+        FROM enriched_trades
+        WHERE taker_side = 'no'
+          AND taker_price >= {MIN_PRICE}
+          AND taker_price < {MAX_PRICE}
     """
 
 
@@ -71,16 +66,16 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
 
     log.info("Running Fade YES strategy analysis (NO-taker >= %dc)...", MIN_PRICE)
 
     # --- Query: aggregate by price bin ---
     query_price = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("markets_with_fees", with_fee_type_sql(data_dir)),
-            ("strategy_trades", _strategy_trades_sql(data_dir)),
+            *enriched_trades_ctes(data_dir, use_catalog=use_catalog),
+            ("strategy_trades", _strategy_trades_sql()),
         ],
         select=f"""
             SELECT
@@ -101,9 +96,8 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
     # --- Query: aggregate by category (top 5) ---
     query_cat = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("markets_with_fees", with_fee_type_sql(data_dir)),
-            ("strategy_trades", _strategy_trades_sql(data_dir)),
+            *enriched_trades_ctes(data_dir, use_catalog=use_catalog),
+            ("strategy_trades", _strategy_trades_sql()),
         ],
         select="""
             SELECT
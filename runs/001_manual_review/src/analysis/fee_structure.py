@@ -18,12 +18,8 @@ from analysis.base import (
     validate_prices,
     validate_row_count,
 )
-from util.queries import (
-    build_query,
-    get_connection,
-    resolved_markets_sql,
-    with_fee_type_sql,
-)
+from util.enriched import enriched_trades_ctes
+from util.queries import build_query, catalog_attached, get_connection
 from util.stats import calibration_error
 
 log = logging.getLogger(__name__)
@@ -37,25 +33,15 @@ FEE_TYPE_COLORS = {
 MIN_CONTRACTS_THRESHOLD = 1_000_000
 
 
-def _fee_trade_outcomes_sql(data_dir: Path) -> str:
+def _fee_trade_outcomes_sql() -> str:
     """SQL for a CTE decomposing trades into taker/maker outcomes with fee type.
 
-    Depends on: markets_with_fees CTE.
+    Depends on: enriched_trades CTE.
     Columns: fee_type, fee_multiplier, taker_price, taker_won, maker_won, contracts
     """
-    return f"""
-        SELECT
-            mf.fee_type,
-            mf.fee_multiplier,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-            END AS taker_price,
-            CASE WHEN t.taker_side = mf.result THEN 1 ELSE 0 END AS taker_won,
-            CASE WHEN t.taker_side != mf.result THEN 1 ELSE 0 END AS maker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts
-        FROM '{data_dir}/trades/*.parquet' t
-        INNER JOIN markets_with_fees mf ON t.ticker = mf.ticker
+    return """
+        SELECT fee_type, fee_multiplier, taker_price, taker_won, maker_won, contracts
+        FROM enriched_trades
     """
 
 
@@ -71,15 +57,15 @@ def run(data_dir: Path, output_dir: Path, n_bins: int = 10) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
     bin_width = 100.0 / n_bins
 
     log.info("Running fee structure analysis (%d bins, width=%.1f)...", n_bins, bin_width)
 
     ctes = [
-        ("resolved_markets", resolved_markets_sql(data_dir)),
-        ("markets_with_fees", with_fee_type_sql(data_dir)),
-        ("fee_trades", _fee_trade_outcomes_sql(data_dir)),
+        *enriched_trades_ctes(data_dir, use_catalog=use_catalog),
+        ("fee_trades", _fee_trade_outcomes_sql()),
     ]
 
     query = build_query(
@@ -20,6 +20,7 @@ from analysis.base import (
 )
 from util.queries import (
     build_query,
+    catalog_attached,
     get_connection,
     resolved_markets_sql,
     trade_outcomes_sql,
@@ -41,13 +42,14 @@ def run(data_dir: Path, output_dir: Path, n_bins: int = 10) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
     bin_width = 100.0 / n_bins
 
     log.info("Running maker/taker decomposition (%d bins)...", n_bins)
     query = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
+            ("resolved_markets", resolved_markets_sql(data_dir, use_catalog)),
             ("trade_outcomes", trade_outcomes_sql(data_dir)),
         ],
         select=f"""
@@ -15,8 +15,11 @@ import pandas as pd
 from analysis.base import AnalysisResult, ensure_output_dirs
 from util.queries import (
     build_query,
+    catalog_attached,
+    dataset_sql,
     get_connection,
     resolved_markets_sql,
+    trades_sql,
     with_category_sql,
 )
 
@@ -45,12 +48,13 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
         AnalysisResult with figure path, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
 
     log.info("Querying market status counts...")
     status_df = con.execute(f"""
         SELECT status, COUNT(*) AS cnt, SUM(CAST(volume_fp AS DOUBLE)) AS vol
-        FROM '{data_dir}/markets/*.parquet'
+        FROM {dataset_sql(data_dir, "markets", use_catalog)}
         GROUP BY status
         ORDER BY vol DESC
     """).df()
@@ -58,7 +62,7 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
     log.info("Querying market result counts...")
     result_df = con.execute(f"""
         SELECT result, COUNT(*) AS cnt
-        FROM '{data_dir}/markets/*.parquet'
+        FROM {dataset_sql(data_dir, "markets", use_catalog)}
         WHERE status = 'finalized'
         GROUP BY result
         ORDER BY COUNT(*) DESC
@@ -70,7 +74,7 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
             COUNT(*) AS trade_count,
             MIN(created_time) AS min_time,
             MAX(created_time) AS max_time
-        FROM '{data_dir}/trades/*.parquet'
+        FROM {trades_sql(data_dir)}
     """).df()
 
     trade_count = int(trade_stats["trade_count"].iloc[0])
@@ -80,8 +84,8 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
     log.info("Querying volume by category...")
     category_query = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("categorized", with_category_sql(data_dir)),
+            ("resolved_markets", resolved_markets_sql(data_dir, use_catalog)),
+            ("categorized", with_category_sql(data_dir, use_catalog)),
         ],
         select="""
             SELECT
@@ -101,8 +105,8 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
     monthly_df = con.execute(f"""
         SELECT
             DATE_TRUNC('month', CAST(created_time AS TIMESTAMP)) AS month,
-            SUM(CAST(count_fp AS DOUBLE)) AS contracts
-        FROM '{data_dir}/trades/*.parquet'
+            SUM(contracts) AS contracts
+        FROM {trades_sql(data_dir)}
         GROUP BY month
         ORDER BY month
     """).df()
@@ -12,7 +12,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from analysis.base import AnalysisResult, ensure_output_dirs, validate_row_count
-from util.queries import build_query, get_connection, resolved_markets_sql, trade_outcomes_sql
+from util.enriched import enriched_trades_ctes
+from util.queries import build_query, catalog_attached, get_connection
 from util.stats import chi_squared_independence
 
 log = logging.getLogger(__name__)
@@ -29,14 +30,12 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
 
     log.info("Running time-of-day query...")
     query = build_query(
-        ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("trade_outcomes", trade_outcomes_sql(data_dir)),
-        ],
+        ctes=enriched_trades_ctes(data_dir, use_catalog=use_catalog),
         select="""
             SELECT
                 EXTRACT(HOUR FROM CAST(created_time AS TIMESTAMPTZ)
@@ -50,7 +49,7 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
                     / SUM(contracts) * 100 AS maker_win_rate,
                 SUM(taker_price * contracts) / SUM(contracts) AS avg_taker_price,
                 COUNT(*) AS trade_count
-            FROM trade_outcomes
+            FROM enriched_trades
             GROUP BY et_hour
             ORDER BY et_hour
         """,
@@ -14,6 +14,7 @@ import pandas as pd
 from analysis.base import AnalysisResult, ensure_output_dirs, validate_row_count
 from util.queries import (
     build_query,
+    catalog_attached,
     get_connection,
     resolved_markets_sql,
     trade_outcomes_sql,
@@ -45,14 +46,15 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
 
     # --- Query 1: Volume by category ---
     log.info("Querying volume by category...")
     category_query = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("categorized", with_category_sql(data_dir)),
+            ("resolved_markets", resolved_markets_sql(data_dir, use_catalog)),
+            ("categorized", with_category_sql(data_dir, use_catalog)),
         ],
         select="""
             SELECT
@@ -73,8 +75,8 @@ def run(data_dir: Path, output_dir: Path) -> AnalysisResult:
     log.info("Querying monthly volume by category...")
     monthly_query = build_query(
         ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("categorized", with_category_sql(data_dir)),
+            ("resolved_markets", resolved_markets_sql(data_dir, use_catalog)),
+            ("categorized", with_category_sql(data_dir, use_catalog)),
             ("trade_outcomes", trade_outcomes_sql(data_dir)),
         ],
         select="""
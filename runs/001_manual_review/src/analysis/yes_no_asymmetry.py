@@ -18,12 +18,8 @@ from analysis.base import (
     validate_prices,
     validate_row_count,
 )
-from util.queries import (
-    build_query,
-    get_connection,
-    resolved_markets_sql,
-    trade_outcomes_sql,
-)
+from util.enriched import enriched_trades_ctes
+from util.queries import build_query, catalog_attached, get_connection
 from util.stats import bonferroni_correct, two_proportion_z_test
 
 log = logging.getLogger(__name__)
@@ -41,15 +37,13 @@ def run(data_dir: Path, output_dir: Path, n_bins: int = 10) -> AnalysisResult:
         AnalysisResult with figure paths, CSV path, and summary text.
     """
     figures_dir, csv_dir = ensure_output_dirs(output_dir)
-    con = get_connection()
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
     bin_width = 100.0 / n_bins
 
     log.info("Running YES/NO asymmetry analysis (%d bins)...", n_bins)
     query = build_query(
-        ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("trade_outcomes", trade_outcomes_sql(data_dir)),
-        ],
+        ctes=enriched_trades_ctes(data_dir, use_catalog=use_catalog),
         select=f"""
             SELECT
                 taker_side,
@@ -60,7 +54,7 @@ def run(data_dir: Path, output_dir: Path, n_bins: int = 10) -> AnalysisResult:
                 SUM(contracts) AS total_contracts,
                 SUM(CASE WHEN taker_won = 1 THEN contracts ELSE 0 END)
                     / SUM(contracts) * 100 AS win_rate
-            FROM trade_outcomes
+            FROM enriched_trades
             WHERE taker_price > 0 AND taker_price < 100
             GROUP BY taker_side, bin_start
             ORDER BY taker_side, bin_start
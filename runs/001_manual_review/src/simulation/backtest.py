@@ -14,12 +14,12 @@ import pandas as pd
 from simulation.metrics import compute_daily_pnl, compute_max_drawdown, compute_profit_factor, compute_sharpe
 from simulation.strategy_def import StrategyFilter, strategy_where_clause
 from util.fees import kalshi_fee_cents
+from util.enriched import enriched_trades_ctes
 from util.queries import (
     build_query,
-    full_trade_outcomes_with_all_dims_sql,
+    catalog_attached,
+    category_tickers,
     get_connection,
-    resolved_markets_sql,
-    with_fee_type_sql,
 )
 
 log = logging.getLogger(__name__)
@@ -44,6 +44,9 @@ def fetch_strategy_trades(
 ) -> pd.DataFrame:
     """Fetch all trades matching a strategy filter from Parquet data.
 
+    Reads the materialized enriched-trades table when it is current
+    (see util.enriched), otherwise joins the raw datasets.
+
     Args:
         data_dir: Path to root data directory.
         strategy: Strategy filter to apply.
@@ -64,12 +67,14 @@ def fetch_strategy_trades(
 
     all_filters = " AND ".join([where] + extra_filters)
 
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
+    # Lets the live join skip trade files holding none of the category's markets.
+    tickers = None
+    if strategy.category != "*":
+        tickers = category_tickers(con, data_dir, strategy.category)
     query = build_query(
-        ctes=[
-            ("resolved_markets", resolved_markets_sql(data_dir)),
-            ("markets_with_fees", with_fee_type_sql(data_dir)),
-            ("full_trades", full_trade_outcomes_with_all_dims_sql(data_dir)),
-        ],
+        ctes=enriched_trades_ctes(data_dir, start_date, end_date, tickers, use_catalog),
         select=f"""
             SELECT
                 ticker,
@@ -80,14 +85,12 @@ def fetch_strategy_trades(
                 created_time,
                 close_time,
                 fee_multiplier
-            FROM full_trades
+            FROM enriched_trades
             WHERE taker_price > 0 AND taker_price < 100
                 AND {all_filters}
             ORDER BY created_time
         """,
     )
-
-    con = get_connection()
     df = con.execute(query).df()
     con.close()
     return df
@@ -130,9 +133,10 @@ def compute_trade_pnl(df: pd.DataFrame) -> pd.DataFrame:
     df["net_pnl"] = df["gross_pnl"] - df["fee"]
 
     # Settlement date: use close_time if available, otherwise created_time
-    df["settle_date"] = pd.to_datetime(
-        df["close_time"].fillna(df["created_time"]), format="ISO8601"
-    ).dt.date
+    # (created_time may be a TIMESTAMPTZ from normalized trades or an ISO string)
+    close_time = pd.to_datetime(df["close_time"], format="ISO8601", utc=True)
+    created_time = pd.to_datetime(df["created_time"], format="ISO8601", utc=True)
+    df["settle_date"] = close_time.fillna(created_time).dt.date
 
     return df
 
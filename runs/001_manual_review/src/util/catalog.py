@@ -0,0 +1,134 @@
+"""Persistent DuckDB catalog over the Parquet datasets.
+
+Every analysis otherwise starts from a fresh in-memory connection that
+re-globs and re-parses the markets, events and series files and re-derives
+resolved markets on each query. The catalog stores these once in
+data/catalog.duckdb:
+
+- tables markets, events, series, market_dim and resolved_markets, with
+  statistics
+- a view trades over the canonical trades projection (queries.trades_sql)
+- a catalog_meta table recording the fingerprint of the source files
+
+queries.get_connection(data_dir) attaches the catalog read-only when the
+fingerprint still matches the Parquet files, so it is always safe to leave a
+stale catalog behind; it is simply ignored until rebuilt.
+
+Usage:
+    uv run python -m util.catalog
+"""
+
+import logging
+import os
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+
+import click
+
+from util.queries import (
+    CATALOG_ALIAS,
+    CATALOG_DATASETS,
+    CATALOG_FILE,
+    CATALOG_VERSION,
+    catalog_fingerprint,
+    dataset_sql,
+    get_connection,
+    market_dim_sql,
+    resolved_markets_sql,
+    trades_sql,
+)
+
+log = logging.getLogger(__name__)
+
+
+def build_catalog(data_dir: Path) -> Path:
+    """Build data_dir/catalog.duckdb from the current Parquet files.
+
+    The catalog is written to a temporary file and swapped in with
+    os.replace, so readers never see a partially built catalog.
+
+    Returns:
+        Path to the catalog file.
+    """
+    if not any((data_dir / "markets").glob("*.parquet")):
+        raise FileNotFoundError(f"No markets Parquet files in {data_dir / 'markets'}")
+
+    path = data_dir / CATALOG_FILE
+    tmp_path = path.with_suffix(".duckdb.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    fingerprint = catalog_fingerprint(data_dir)
+    con = get_connection()
+    try:
+        con.execute(f"ATTACH '{tmp_path}' AS {CATALOG_ALIAS}")
+        for name in CATALOG_DATASETS:
+            if not any((data_dir / name).glob("*.parquet")):
+                log.warning("No %s files in %s; skipping", name, data_dir)
+                continue
+            log.info("Loading %s into catalog...", name)
+            con.execute(f"""
+                CREATE TABLE {CATALOG_ALIAS}.{name} AS
+                SELECT * FROM {dataset_sql(data_dir, name)}
+            """)
+        con.execute(f"""
+            CREATE TABLE {CATALOG_ALIAS}.market_dim AS
+            SELECT * FROM {market_dim_sql(data_dir)}
+        """)
+        con.execute(f"""
+            CREATE TABLE {CATALOG_ALIAS}.resolved_markets AS
+            {resolved_markets_sql(data_dir)}
+            ORDER BY ticker
+        """)
+        if any((data_dir / "trades").rglob("*.parquet")):
+            con.execute(f"""
+                CREATE VIEW {CATALOG_ALIAS}.trades AS
+                SELECT * FROM {trades_sql(data_dir.resolve())}
+            """)
+        con.execute(f"CREATE TABLE {CATALOG_ALIAS}.catalog_meta (key VARCHAR, value VARCHAR)")
+        con.execute(
+            f"INSERT INTO {CATALOG_ALIAS}.catalog_meta VALUES (?, ?), (?, ?), (?, ?)",
+            [
+                "fingerprint",
+                fingerprint,
+                "version",
+                str(CATALOG_VERSION),
+                "built_at",
+                datetime.now(UTC).isoformat(),
+            ],
+        )
+        con.execute("ANALYZE")
+        con.execute(f"CHECKPOINT {CATALOG_ALIAS}")
+        con.execute(f"DETACH {CATALOG_ALIAS}")
+    finally:
+        con.close()
+
+    os.replace(tmp_path, path)
+    log.info("Wrote catalog %s", path)
+    return path
+
+
+@click.command()
+@click.option(
+    "--data-dir",
+    type=click.Path(path_type=Path, exists=True),
+    default=Path("data"),
+    help="Path to the data directory.",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Enable debug logging.")
+def main(data_dir: Path, verbose: bool) -> None:
+    """Build the DuckDB catalog for the data directory."""
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)-8s %(name)s — %(message)s",
+        datefmt="%H:%M:%S",
+        stream=sys.stderr,
+    )
+
+    path = build_catalog(data_dir)
+    click.echo(f"Catalog written to {path}")
+
+
+if __name__ == "__main__":
+    main()
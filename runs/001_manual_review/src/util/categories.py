@@ -3,6 +3,9 @@
 Categories come from two sources:
 1. The `category` field on events (authoritative, covers ~18% of markets by count, ~92% by volume)
 2. Prefix-based inference from event_ticker (for MVE/orphan markets)
+
+Inference is done once per market when util.market_dim builds the market
+dimension table; category_case_sql() remains for ad-hoc SQL.
 """
 
 EVENT_CATEGORIES: list[str] = [
@@ -25,7 +28,7 @@ EVENT_CATEGORIES: list[str] = [
     "World",
 ]
 
-# Maps event_ticker prefixes to categories. Ordered longest-first for correct matching.
+# Maps event_ticker prefixes to categories. The longest matching prefix wins.
 # Covers the major orphan prefixes found in the data (MVE sports markets, standalone tickers).
 PREFIX_TO_CATEGORY: list[tuple[str, str]] = [
     ("KXMVESPORTS", "Sports"),
@@ -55,20 +58,48 @@ PREFIX_TO_CATEGORY: list[tuple[str, str]] = [
 ]
 
 
+class PrefixTrie:
+    """Character trie mapping prefixes to values with longest-prefix lookup.
+
+    Lookup cost depends only on the length of the matched prefix, not on the
+    number of prefixes, unlike a chain of startswith / LIKE tests.
+    """
+
+    def __init__(self, items: list[tuple[str, str]]):
+        self._root: dict = {}
+        for prefix, value in items:
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, value)  # first mapping for a prefix wins
+
+    def longest_match(self, key: str) -> str | None:
+        """Return the value of the longest prefix of key, or None if none match."""
+        node = self._root
+        match = None
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(None, match)
+        return match
+
+
+_PREFIX_TRIE = PrefixTrie(PREFIX_TO_CATEGORY)
+
+
 def infer_category(event_ticker: str) -> str:
     """Infer category from event_ticker prefix. Returns 'Unknown' if no match."""
-    for prefix, category in PREFIX_TO_CATEGORY:
-        if event_ticker.startswith(prefix):
-            return category
-    return "Unknown"
+    return _PREFIX_TRIE.longest_match(event_ticker) or "Unknown"
 
 
 def category_case_sql() -> str:
     """Return a SQL CASE expression for prefix-based category inference.
 
     Intended for use inside a DuckDB query where the column `event_ticker` is in scope.
+    Prefixes are tested longest first, so it agrees with infer_category().
     """
     clauses = []
-    for prefix, category in PREFIX_TO_CATEGORY:
+    for prefix, category in sorted(PREFIX_TO_CATEGORY, key=lambda item: -len(item[0])):
         clauses.append(f"WHEN event_ticker LIKE '{prefix}%' THEN '{category}'")
     return "CASE " + " ".join(clauses) + " ELSE 'Unknown' END"
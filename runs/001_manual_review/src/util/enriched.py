@@ -0,0 +1,378 @@
+"""Materialized enriched-trades table.
+
+Every simulation query joins trades with markets, events and series and then
+derives outcome, time-bucket and price-range columns. This module runs that
+join once (queries.enriched_trades_sql) and stores the result under
+data/enriched_trades/year=YYYY/month=MM/, alongside a manifest recording the
+input files it was built from.
+
+A refresh is incremental when possible: only trade files not seen before are
+joined against all resolved markets, and previously seen trade files are
+joined against markets that settled since the last build. Any other change to
+the inputs (a rewritten trade file, new events or series data, a changed
+result, close time or fee type of an already settled market, a new table
+definition) triggers a full rebuild.
+
+Queries use the materialized table only while its manifest matches the
+current inputs; otherwise enriched_trades_ctes() falls back to the live join.
+
+Usage:
+    uv run python -m util.enriched [--full]
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import click
+import duckdb
+
+from util.fingerprint import dataset_state, fingerprint
+from util.queries import (
+    catalog_attached,
+    enriched_trades_sql,
+    get_connection,
+    partitioned_dataset_sql,
+    resolved_markets_sql,
+    trades_formats,
+    with_fee_type_sql,
+)
+
+log = logging.getLogger(__name__)
+
+ENRICHED_DIR = "enriched_trades"
+MANIFEST_FILE = "_manifest.json"
+RESOLVED_FILE = "_resolved.parquet"
+STAGING_SUFFIX = ".building"
+INPUT_DATASETS = ("trades", "markets", "events", "series")
+
+# Bump whenever enriched_trades_sql changes shape or semantics.
+ENRICHED_VERSION = 3
+
+
+@dataclass
+class RefreshResult:
+    """Summary of an enriched-trades refresh."""
+
+    mode: str  # "full", "incremental" or "current"
+    new_trade_files: int
+    new_markets: int
+    rows_added: int
+
+
+def input_state(data_dir: Path) -> dict[str, dict[str, list[int]]]:
+    """File stats for every input dataset of the enriched table."""
+    return dataset_state(data_dir, INPUT_DATASETS)
+
+
+def inputs_fingerprint(state: dict[str, dict[str, list[int]]]) -> str:
+    """Fingerprint of the full input state; the table is current if it matches."""
+    return fingerprint([ENRICHED_VERSION, state])
+
+
+def _base_fingerprint(data_dir: Path, state: dict[str, dict[str, list[int]]]) -> str:
+    """Fingerprint of the inputs that cannot be refreshed incrementally."""
+    return fingerprint(
+        [
+            ENRICHED_VERSION,
+            sorted(trades_formats(data_dir)),
+            state["events"],
+            state["series"],
+        ]
+    )
+
+
+def enriched_dir(data_dir: Path) -> Path:
+    return data_dir / ENRICHED_DIR
+
+
+def load_manifest(data_dir: Path) -> dict | None:
+    """Return the enriched-table manifest, or None if it was never built."""
+    path = enriched_dir(data_dir) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_manifest(data_dir: Path, manifest: dict) -> None:
+    path = enriched_dir(data_dir) / MANIFEST_FILE
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def is_current(data_dir: Path) -> bool:
+    """Return True if the materialized table reflects the current inputs."""
+    manifest = load_manifest(data_dir)
+    if manifest is None or not manifest.get("outputs"):
+        return False
+    return manifest["fingerprint"] == inputs_fingerprint(input_state(data_dir))
+
+
+def enriched_trades_ctes(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    tickers: list[str] | None = None,
+    use_catalog: bool = False,
+) -> list[tuple[str, str]]:
+    """CTEs ending in an `enriched_trades` CTE (see queries.enriched_trades_sql).
+
+    Scans the materialized table when it is current, otherwise derives the
+    same columns from the raw datasets. start_date/end_date only prune
+    partitions, and tickers only prunes trade files in the live join;
+    callers still filter created_time and ticker for exact results.
+    use_catalog makes the live join read markets from the attached catalog.
+    """
+    if is_current(data_dir):
+        source = partitioned_dataset_sql(enriched_dir(data_dir), start_date, end_date)
+        return [("enriched_trades", f"SELECT * FROM {source}")]
+    log.debug("Enriched trades table missing or stale in %s; using live join", data_dir)
+    return [
+        ("resolved_markets", resolved_markets_sql(data_dir, use_catalog)),
+        ("markets_with_fees", with_fee_type_sql(data_dir, use_catalog)),
+        ("enriched_trades", enriched_trades_sql(data_dir, start_date, end_date, tickers=tickers)),
+    ]
+
+
+def _copy_partitioned(
+    con: duckdb.DuckDBPyConnection,
+    data_dir: Path,
+    select: str,
+    out_dir: Path,
+) -> int:
+    """Write the rows of `select` into month partitions; returns the row count.
+
+    `select` may reference the resolved_markets and markets_with_fees CTEs.
+    """
+    use_catalog = catalog_attached(con)
+    return con.execute(f"""
+        COPY (
+            WITH
+                resolved_markets AS ({resolved_markets_sql(data_dir, use_catalog)}),
+                markets_with_fees AS ({with_fee_type_sql(data_dir, use_catalog)})
+            SELECT
+                *,
+                strftime(created_time, '%Y') AS year,
+                strftime(created_time, '%m') AS month
+            FROM ({select})
+        ) TO '{out_dir}' (
+            FORMAT parquet,
+            COMPRESSION snappy,
+            PARTITION_BY (year, month),
+            FILENAME_PATTERN 'enriched_{{uuid}}',
+            OVERWRITE_OR_IGNORE true
+        )
+    """).fetchone()[0]
+
+
+def _resolved_sql(con: duckdb.DuckDBPyConnection, data_dir: Path) -> str:
+    """The market columns the enriched table takes from each settled market."""
+    use_catalog = catalog_attached(con)
+    return f"""
+        WITH
+            resolved_markets AS ({resolved_markets_sql(data_dir, use_catalog)}),
+            markets_with_fees AS ({with_fee_type_sql(data_dir, use_catalog)})
+        SELECT DISTINCT
+            ticker, event_ticker, result, category, fee_type, fee_multiplier, close_time
+        FROM markets_with_fees
+    """
+
+
+def _write_resolved(con: duckdb.DuckDBPyConnection, data_dir: Path, path: Path) -> None:
+    con.execute(f"""
+        COPY (SELECT * FROM ({_resolved_sql(con, data_dir)}) ORDER BY ticker)
+        TO '{path}' (FORMAT parquet)
+    """)
+
+
+def _changed_markets(data_dir: Path) -> int:
+    """Count markets settled at the last build whose enriched columns changed since."""
+    con = get_connection(data_dir)
+    try:
+        return con.execute(f"""
+            SELECT COUNT(DISTINCT ticker) FROM (
+                SELECT * FROM read_parquet('{enriched_dir(data_dir) / RESOLVED_FILE}')
+                EXCEPT
+                SELECT * FROM ({_resolved_sql(con, data_dir)})
+            )
+        """).fetchone()[0]
+    finally:
+        con.close()
+
+
+def _build_full(data_dir: Path, state: dict[str, dict[str, list[int]]]) -> RefreshResult:
+    target = enriched_dir(data_dir)
+    staging = target.with_name(target.name + STAGING_SUFFIX)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    log.info("Building enriched trades table from %d trade files...", len(state["trades"]))
+    con = get_connection(data_dir)
+    try:
+        rows = _copy_partitioned(con, data_dir, enriched_trades_sql(data_dir), staging)
+        _write_resolved(con, data_dir, staging / RESOLVED_FILE)
+        new_markets = con.execute(
+            f"SELECT COUNT(*) FROM read_parquet('{staging / RESOLVED_FILE}')"
+        ).fetchone()[0]
+    finally:
+        con.close()
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.rename(staging, target)
+    _write_manifest(data_dir, _manifest(data_dir, state, rows))
+    return RefreshResult("full", len(state["trades"]), new_markets, rows)
+
+
+def _manifest(data_dir: Path, state: dict[str, dict[str, list[int]]], rows: int) -> dict:
+    target = enriched_dir(data_dir)
+    return {
+        "version": ENRICHED_VERSION,
+        "fingerprint": inputs_fingerprint(state),
+        "base_fingerprint": _base_fingerprint(data_dir, state),
+        "inputs": state,
+        "outputs": sorted(
+            str(p.relative_to(target)) for p in target.glob("year=*/month=*/*.parquet")
+        ),
+        "rows": rows,
+    }
+
+
+def _can_refresh_incrementally(
+    data_dir: Path, manifest: dict | None, state: dict[str, dict[str, list[int]]]
+) -> bool:
+    if manifest is None or manifest.get("version") != ENRICHED_VERSION:
+        return False
+    if manifest.get("base_fingerprint") != _base_fingerprint(data_dir, state):
+        return False
+    # Previously processed trade files must be untouched (compaction or
+    # normalization rewrites them, which requires a full rebuild).
+    current = state["trades"]
+    if any(current.get(name) != stat for name, stat in manifest["inputs"]["trades"].items()):
+        return False
+    # Their rows were joined against the settled markets as they were then.
+    if manifest["inputs"]["markets"] != state["markets"]:
+        changed = _changed_markets(data_dir)
+        if changed:
+            log.info("%d settled markets changed since the last build", changed)
+            return False
+    return True
+
+
+def _refresh_incremental(
+    data_dir: Path, manifest: dict, state: dict[str, dict[str, list[int]]]
+) -> RefreshResult:
+    target = enriched_dir(data_dir)
+    trades_dir = data_dir / "trades"
+
+    # Drop outputs of a refresh that died before its manifest was written.
+    known = set(manifest["outputs"])
+    for path in target.glob("year=*/month=*/*.parquet"):
+        if str(path.relative_to(target)) not in known:
+            path.unlink()
+
+    seen = manifest["inputs"]["trades"]
+    new_files = [trades_dir / name for name in state["trades"] if name not in seen]
+    old_files = [trades_dir / name for name in seen]
+
+    staging = target.with_name(target.name + STAGING_SUFFIX)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    con = get_connection(data_dir)
+    try:
+        con.execute(f"""
+            CREATE TEMP TABLE new_markets AS
+            SELECT ticker FROM ({_resolved_sql(con, data_dir)})
+            EXCEPT
+            SELECT ticker FROM read_parquet('{target / RESOLVED_FILE}')
+        """)
+        new_markets = con.execute("SELECT COUNT(*) FROM new_markets").fetchone()[0]
+        log.info(
+            "Refreshing enriched trades: %d new trade files, %d newly settled markets",
+            len(new_files),
+            new_markets,
+        )
+
+        selects = []
+        if new_files:
+            selects.append(f"SELECT * FROM ({enriched_trades_sql(data_dir, files=new_files)})")
+        if old_files and new_markets:
+            selects.append(f"""
+                SELECT * FROM ({enriched_trades_sql(data_dir, files=old_files)})
+                WHERE ticker IN (SELECT ticker FROM new_markets)
+            """)
+        rows = 0
+        if selects:
+            rows = _copy_partitioned(con, data_dir, " UNION ALL ".join(selects), staging)
+        _write_resolved(con, data_dir, staging / RESOLVED_FILE)
+    finally:
+        con.close()
+
+    for path in sorted(staging.glob("year=*/month=*/*.parquet")):
+        dest = target / path.relative_to(staging)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, dest)
+    os.replace(staging / RESOLVED_FILE, target / RESOLVED_FILE)
+    shutil.rmtree(staging)
+
+    _write_manifest(data_dir, _manifest(data_dir, state, manifest["rows"] + rows))
+    return RefreshResult("incremental", len(new_files), new_markets, rows)
+
+
+def refresh(data_dir: Path, full: bool = False) -> RefreshResult:
+    """Bring the materialized enriched-trades table up to date.
+
+    Args:
+        data_dir: Path to the root data directory.
+        full: Rebuild from scratch even if an incremental refresh is possible.
+
+    Returns:
+        RefreshResult describing what was (re)built.
+    """
+    state = input_state(data_dir)
+    manifest = load_manifest(data_dir)
+
+    if not full and manifest is not None and manifest["fingerprint"] == inputs_fingerprint(state):
+        log.info("Enriched trades table is current (%d rows)", manifest["rows"])
+        return RefreshResult("current", 0, 0, 0)
+    if not full and _can_refresh_incrementally(data_dir, manifest, state):
+        return _refresh_incremental(data_dir, manifest, state)
+    return _build_full(data_dir, state)
+
+
+@click.command()
+@click.option(
+    "--data-dir",
+    type=click.Path(path_type=Path, exists=True),
+    default=Path("data"),
+    help="Path to the data directory.",
+)
+@click.option("--full", is_flag=True, help="Rebuild from scratch instead of refreshing.")
+@click.option("-v", "--verbose", is_flag=True, help="Enable debug logging.")
+def main(data_dir: Path, full: bool, verbose: bool) -> None:
+    """Build or incrementally refresh the enriched-trades table."""
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)-8s %(name)s — %(message)s",
+        datefmt="%H:%M:%S",
+        stream=sys.stderr,
+    )
+
+    result = refresh(data_dir, full=full)
+    click.echo(
+        f"Enriched trades ({result.mode}): {result.new_trade_files} trade files, "
+        f"{result.new_markets} settled markets, {result.rows_added:,} rows added"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Fingerprints of on-disk Parquet datasets.
+
+Derived artifacts (the DuckDB catalog, the enriched-trades table) record the
+fingerprint of the files they were built from and are only used while it
+still matches. File size and mtime are used instead of content hashes so a
+check costs one stat() per file.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+
+def file_stats(root: Path) -> dict[str, list[int]]:
+    """Map each Parquet file under root (relative path) to [size, mtime_ns]."""
+    stats = {}
+    for path in sorted(root.rglob("*.parquet")):
+        st = path.stat()
+        stats[str(path.relative_to(root))] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def dataset_state(data_dir: Path, names: tuple[str, ...]) -> dict[str, dict[str, list[int]]]:
+    """File stats for each named dataset directory under data_dir."""
+    return {name: file_stats(data_dir / name) for name in names}
+
+
+def fingerprint(payload: object) -> str:
+    """Stable hash of a JSON-serializable payload."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,156 @@
+"""File pruning with the per-file dataset manifests.
+
+The download pipeline records row count, created_time range, ticker range,
+a ticker bloom filter and a schema hash for every Parquet file it writes, in
+<dataset>/_manifest.jsonl (see download.manifest in problems/kalshi). Reading
+that one file lets queries build an explicit file list for a date window or
+a set of tickers without DuckDB opening every footer. Bloom filters are
+probed with download.manifest.bloom_positions, the function that built them.
+
+Files missing from the manifest, or whose size or modification time no
+longer matches their entry, are always kept, so a stale manifest only costs
+pruning, never rows.
+"""
+
+import base64
+import bisect
+import json
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from download.manifest import bloom_positions
+
+log = logging.getLogger(__name__)
+
+MANIFEST_FILE = "_manifest.jsonl"
+
+# Above this many candidate tickers within a file's ticker range, the bloom
+# filter is not consulted and the file is kept.
+BLOOM_CHECK_LIMIT = 32
+
+# Parsed manifests keyed by path, reused while (size, mtime) is unchanged.
+_manifest_cache: dict[Path, tuple[tuple[int, int], dict[str, "FileStats"]]] = {}
+
+
+@dataclass
+class FileStats:
+    """Manifest entry for one Parquet file."""
+
+    path: str
+    size: int
+    rows: int
+    schema_hash: str
+    mtime_ns: int | None = None
+    min_created_time: datetime | None = None
+    max_created_time: datetime | None = None
+    min_ticker: str | None = None
+    max_ticker: str | None = None
+    bloom: str | None = None
+    bloom_bits: int = 0
+    bloom_hashes: int = 0
+
+    @classmethod
+    def from_json(cls, entry: dict) -> "FileStats":
+        stats = cls(**entry)
+        if stats.min_created_time is not None:
+            stats.min_created_time = datetime.fromisoformat(stats.min_created_time)
+            stats.max_created_time = datetime.fromisoformat(stats.max_created_time)
+        return stats
+
+    def describes(self, path: Path) -> bool:
+        """True if the entry is still current for path (same size and mtime)."""
+        stat = path.stat()
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+    def overlaps(self, start: datetime | None, end: datetime | None) -> bool:
+        """True if the file may hold rows in [start, end)."""
+        if self.min_created_time is None:
+            return True
+        if start is not None and self.max_created_time < start:
+            return False
+        return end is None or self.min_created_time < end
+
+    def may_contain(self, tickers: list[str]) -> bool:
+        """True if the file may hold any of tickers (which must be sorted)."""
+        if self.min_ticker is None:
+            return True
+        lo = bisect.bisect_left(tickers, self.min_ticker)
+        hi = bisect.bisect_right(tickers, self.max_ticker)
+        candidates = tickers[lo:hi]
+        if not candidates:
+            return False
+        if self.bloom is None or len(candidates) > BLOOM_CHECK_LIMIT:
+            return True
+        bits = base64.b64decode(self.bloom)
+        return any(
+            all(
+                bits[pos >> 3] >> (pos & 7) & 1
+                for pos in bloom_positions(t, self.bloom_bits, self.bloom_hashes)
+            )
+            for t in candidates
+        )
+
+
+def load_manifest(dataset_dir: Path) -> dict[str, FileStats] | None:
+    """Manifest entries for dataset_dir keyed by relative path, or None if absent."""
+    path = dataset_dir / MANIFEST_FILE
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _manifest_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    entries: dict[str, FileStats] = {}
+    with path.open() as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["path"]] = FileStats.from_json(entry)
+    _manifest_cache[path] = (key, entries)
+    return entries
+
+
+def _parse_bound(date: str | None) -> datetime | None:
+    if not date:
+        return None
+    parsed = datetime.fromisoformat(date)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def prune_files(
+    dataset_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    tickers: list[str] | None = None,
+) -> list[Path] | None:
+    """Files in dataset_dir that may hold rows matching the predicates.
+
+    start_date is inclusive and end_date exclusive, as in trades_sql. Returns
+    None when dataset_dir has no manifest, in which case callers should scan
+    the whole dataset.
+    """
+    manifest = load_manifest(dataset_dir)
+    if manifest is None:
+        return None
+    start = _parse_bound(start_date)
+    end = _parse_bound(end_date)
+    wanted = sorted(set(tickers)) if tickers is not None else None
+
+    kept = []
+    total = 0
+    for path in sorted(dataset_dir.rglob("*.parquet")):
+        total += 1
+        stats = manifest.get(str(path.relative_to(dataset_dir)))
+        if stats is None or not stats.describes(path):
+            kept.append(path)
+        elif stats.overlaps(start, end) and (wanted is None or stats.may_contain(wanted)):
+            kept.append(path)
+    log.debug("Manifest pruning kept %d of %d files in %s", len(kept), total, dataset_dir)
+    return kept
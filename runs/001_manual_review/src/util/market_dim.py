@@ -0,0 +1,201 @@
+"""Market dimension table: one row per market with every per-market attribute.
+
+market_dim joins markets with events and series, infers missing categories
+from ticker prefixes, and stores the result in data/market_dim.parquet:
+
+    ticker, event_ticker, series_ticker, result, status, volume,
+    close_time (epoch seconds), category, fee_type, fee_multiplier
+
+The file carries a fingerprint of the markets, events and series files it was
+built from. It is written only by an explicit build (`make market-dim`, or
+python -m util.market_dim); while it is missing or stale, queries read
+market_dim_view_sql(), which derives the same rows inline.
+
+`kalshi-download markets --refresh` writes re-fetched open and new markets to
+delta files in markets/_delta/ instead of re-downloading everything;
+download.markets.markets_table_sql() merges them over the base files, latest
+wins per ticker.
+
+Usage:
+    uv run python -m util.market_dim
+"""
+
+import logging
+import os
+import sys
+from pathlib import Path
+
+import click
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+from download.markets import markets_table_sql
+
+from util.categories import category_case_sql, infer_category
+from util.fingerprint import dataset_state, fingerprint
+
+log = logging.getLogger(__name__)
+
+MARKET_DIM_FILE = "market_dim.parquet"
+FINGERPRINT_KEY = b"kalshi.fingerprint"
+SOURCE_DATASETS = ("markets", "events", "series")
+
+# Bump whenever the columns or their derivation change.
+MARKET_DIM_VERSION = 1
+
+
+def market_dim_path(data_dir: Path) -> Path:
+    return data_dir / MARKET_DIM_FILE
+
+
+def source_fingerprint(data_dir: Path) -> str:
+    """Fingerprint of the files market_dim is built from."""
+    return fingerprint([MARKET_DIM_VERSION, dataset_state(data_dir, SOURCE_DATASETS)])
+
+
+def is_current(data_dir: Path) -> bool:
+    """Return True if market_dim.parquet exists and matches its source files."""
+    path = market_dim_path(data_dir)
+    if not path.exists():
+        return False
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(FINGERPRINT_KEY) == source_fingerprint(data_dir).encode()
+
+
+def _glob_or_empty(data_dir: Path, name: str, empty_columns: str) -> str:
+    if any((data_dir / name).glob("*.parquet")):
+        return f"read_parquet('{data_dir}/{name}/*.parquet', union_by_name = true)"
+    return f"(SELECT {empty_columns} WHERE FALSE)"
+
+
+def _market_dim_sql(data_dir: Path) -> str:
+    """SQL producing market_dim rows; category is the events category or NULL."""
+    events = _glob_or_empty(
+        data_dir,
+        "events",
+        "NULL::VARCHAR AS event_ticker, NULL::VARCHAR AS category, NULL::VARCHAR AS series_ticker",
+    )
+    series = _glob_or_empty(
+        data_dir,
+        "series",
+        "NULL::VARCHAR AS ticker, NULL::VARCHAR AS fee_type, NULL::DOUBLE AS fee_multiplier",
+    )
+    return f"""
+        WITH
+            markets AS (SELECT * FROM {markets_table_sql(data_dir)}),
+            events AS (
+                SELECT event_ticker, category, series_ticker
+                FROM {events}
+                QUALIFY row_number() OVER (PARTITION BY event_ticker) = 1
+            ),
+            series AS (
+                SELECT ticker, fee_type, CAST(fee_multiplier AS DOUBLE) AS fee_multiplier
+                FROM {series}
+                QUALIFY row_number() OVER (PARTITION BY ticker) = 1
+            )
+        SELECT
+            m.ticker,
+            m.event_ticker,
+            e.series_ticker,
+            m.result,
+            m.status,
+            CAST(m.volume_fp AS DOUBLE) AS volume,
+            CAST(epoch(CAST(m.close_time AS TIMESTAMPTZ)) AS BIGINT) AS close_time,
+            e.category,
+            COALESCE(s.fee_type, 'unknown') AS fee_type,
+            COALESCE(s.fee_multiplier, 1.0) AS fee_multiplier
+        FROM markets m
+        LEFT JOIN events e ON m.event_ticker = e.event_ticker
+        LEFT JOIN series s ON e.series_ticker = s.ticker
+        ORDER BY m.ticker
+    """
+
+
+def market_dim_view_sql(data_dir: Path) -> str:
+    """Table expression deriving market_dim rows inline (use after FROM/JOIN).
+
+    Same rows as market_dim.parquet, with category inference done by the SQL
+    CASE chain per row instead of the trie once per event.
+    """
+    return f"""(
+        SELECT * REPLACE (COALESCE(category, {category_case_sql()}) AS category)
+        FROM ({_market_dim_sql(data_dir)})
+    )"""
+
+
+def build_market_dim(data_dir: Path) -> Path:
+    """Build data_dir/market_dim.parquet from the markets, events and series files.
+
+    Markets whose event has no category get one inferred from event_ticker,
+    computed once per distinct event_ticker with the prefix trie.
+    """
+    path = market_dim_path(data_dir)
+    tmp_path = path.with_suffix(".parquet.tmp")
+    source = source_fingerprint(data_dir)
+
+    con = duckdb.connect()
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        con.execute(f"CREATE TEMP TABLE dim AS {_market_dim_sql(data_dir)}")
+        missing = con.execute(
+            "SELECT DISTINCT event_ticker FROM dim WHERE category IS NULL"
+        ).fetchall()
+        inferred = pd.DataFrame(
+            [(t, infer_category(t or "")) for (t,) in missing],
+            columns=["event_ticker", "category"],
+        )
+        con.register("inferred", inferred)
+        rows = con.execute(f"""
+            COPY (
+                SELECT d.* REPLACE (COALESCE(d.category, i.category, 'Unknown') AS category)
+                FROM dim d
+                LEFT JOIN inferred i ON d.event_ticker IS NOT DISTINCT FROM i.event_ticker
+                ORDER BY d.ticker
+            ) TO '{tmp_path}' (
+                FORMAT parquet,
+                COMPRESSION snappy,
+                KV_METADATA {{'{FINGERPRINT_KEY.decode()}': '{source}'}}
+            )
+        """).fetchone()[0]
+    finally:
+        con.close()
+
+    os.replace(tmp_path, path)
+    log.info("Built market_dim with %d markets (%d event prefixes inferred)", rows, len(missing))
+    return path
+
+
+def ensure_market_dim(data_dir: Path) -> Path:
+    """Return the path to an up-to-date market_dim.parquet, rebuilding if needed."""
+    if not is_current(data_dir):
+        build_market_dim(data_dir)
+    return market_dim_path(data_dir)
+
+
+@click.command()
+@click.option(
+    "--data-dir",
+    type=click.Path(path_type=Path, exists=True),
+    default=Path("data"),
+    help="Path to the data directory.",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Enable debug logging.")
+def main(data_dir: Path, verbose: bool) -> None:
+    """Build the market dimension table."""
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)-8s %(name)s — %(message)s",
+        datefmt="%H:%M:%S",
+        stream=sys.stderr,
+    )
+
+    if is_current(data_dir):
+        click.echo(f"{market_dim_path(data_dir)} is current")
+        return
+    path = build_market_dim(data_dir)
+    click.echo(f"Market dimension table written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,403 @@
 """Reusable DuckDB SQL fragments for Kalshi data analysis.
 
-All queries operate on Parquet files via glob patterns. Prices use the _dollars
-fields (0.00-1.00 scale), converted to cents (0-100) for analysis.
+All queries operate on Parquet files via glob patterns. Prices are expressed in
+cents (0-100) for analysis.
+
+Trades may be stored flat (trades/*.parquet) or month-partitioned
+(trades/year=YYYY/month=MM/*.parquet), or both while a compaction is migrating
+them, and either as raw API fields
+(yes_price_dollars, count_fp, ISO string timestamps) or as normalized typed
+columns (yes_price_cents, contracts, TIMESTAMPTZ created_time). trades_sql()
+hides both differences behind one set of canonical columns.
+
+When the trades directory has a manifest (see util.manifest), date and ticker
+predicates are turned into an explicit list of the files that can match.
+
+Per-market attributes (result, close time, category, fee type) come from the
+market_dim table (see util.market_dim) rather than per-query joins of
+markets, events and series.
+
+If data/catalog.duckdb (see util.catalog) is current, get_connection(data_dir)
+attaches it read-only. Helpers called with use_catalog=True (normally
+use_catalog=catalog_attached(con)) then read market_dim and resolved markets
+from its tables instead of Parquet files.
 """
 
+import logging
 from pathlib import Path
 
 import duckdb
+import pyarrow.parquet as pq
+from download.markets import markets_table_sql
 
-from util.categories import category_case_sql
+from util.fingerprint import dataset_state, fingerprint
+from util.manifest import load_manifest, prune_files
+from util.market_dim import is_current, market_dim_path, market_dim_view_sql
 
+log = logging.getLogger(__name__)
 
-def get_connection() -> duckdb.DuckDBPyConnection:
-    """Create a DuckDB in-memory connection."""
-    return duckdb.connect()
+CATALOG_FILE = "catalog.duckdb"
+CATALOG_ALIAS = "kalshi"
+CATALOG_DATASETS = ("markets", "events", "series")
 
+# Bump whenever the catalog's tables or views change shape.
+CATALOG_VERSION = 3
 
-def resolved_markets_sql(data_dir: Path) -> str:
+
+def catalog_fingerprint(data_dir: Path) -> str:
+    """Fingerprint of the files and layout a catalog for data_dir is built from."""
+    return fingerprint([
+        CATALOG_VERSION,
+        trades_partitioned(data_dir),
+        trades_has_flat_files(data_dir),
+        sorted(trades_formats(data_dir)),
+        dataset_state(data_dir, CATALOG_DATASETS),
+    ])
+
+
+def get_connection(data_dir: Path | None = None) -> duckdb.DuckDBPyConnection:
+    """Create a DuckDB in-memory connection.
+
+    The session time zone is pinned to UTC so TIMESTAMPTZ trade times compare
+    and truncate the same way as the UTC ISO strings they replaced.
+
+    If data_dir has a current catalog it is attached read-only as `kalshi`;
+    pass use_catalog=catalog_attached(con) to the SQL helpers below to read
+    from it. A stale catalog is ignored with a warning.
+    """
+    con = duckdb.connect()
+    con.execute("SET TimeZone = 'UTC'")
+    if data_dir is None:
+        return con
+
+    path = data_dir / CATALOG_FILE
+    if path.exists():
+        con.execute(f"ATTACH '{path}' AS {CATALOG_ALIAS} (READ_ONLY)")
+        built = con.execute(
+            f"SELECT value FROM {CATALOG_ALIAS}.catalog_meta WHERE key = 'fingerprint'"
+        ).fetchone()
+        if built is None or built[0] != catalog_fingerprint(data_dir):
+            log.warning("Catalog %s is stale; rebuild with `make catalog`", path)
+            con.execute(f"DETACH {CATALOG_ALIAS}")
+    return con
+
+
+def catalog_attached(con: duckdb.DuckDBPyConnection) -> bool:
+    """Return True if con has a catalog attached (see get_connection)."""
+    row = con.execute(
+        "SELECT COUNT(*) FROM duckdb_databases() WHERE database_name = ?", [CATALOG_ALIAS]
+    ).fetchone()
+    return row[0] > 0
+
+
+def dataset_sql(data_dir: Path, name: str, use_catalog: bool = False) -> str:
+    """Table expression for a markets/events/series dataset (use after FROM/JOIN).
+
+    Markets have refresh deltas merged in, one row per ticker (see
+    download.markets.markets_table_sql). use_catalog reads the attached catalog's table.
+    """
+    if use_catalog:
+        return f"{CATALOG_ALIAS}.{name}"
+    if name == "markets":
+        return markets_table_sql(data_dir)
+    return f"'{data_dir}/{name}/*.parquet'"
+
+
+def trades_partitioned(data_dir: Path) -> bool:
+    """Return True if trades use the year=YYYY/month=MM/ Hive layout."""
+    return any((data_dir / "trades").glob("year=*"))
+
+
+def trades_has_flat_files(data_dir: Path) -> bool:
+    """Return True if any trades files sit directly in trades/ (the legacy layout)."""
+    return any((data_dir / "trades").glob("*.parquet"))
+
+
+# Column names of each Parquet file read so far: path -> (size, mtime_ns, names).
+_file_columns_cache: dict[str, tuple[int, int, tuple[str, ...]]] = {}
+
+
+def _file_columns(path: Path) -> tuple[str, ...]:
+    """Column names of one Parquet file, read from its footer once per version."""
+    st = path.stat()
+    cached = _file_columns_cache.get(str(path))
+    if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return cached[2]
+    names = tuple(pq.read_schema(path).names)
+    _file_columns_cache[str(path)] = (st.st_size, st.st_mtime_ns, names)
+    return names
+
+
+def trades_columns(data_dir: Path, files: list[Path] | None = None) -> set[str]:
+    """Column names across the trades files (all of them unless files is given).
+
+    Files with a current manifest entry are grouped by schema hash, so only one
+    footer is read per distinct schema. Footers are cached by file size and
+    mtime, so repeated calls only stat unchanged files.
+    """
+    trades_dir = data_dir / "trades"
+    if files is None:
+        files = sorted(trades_dir.rglob("*.parquet"))
+    manifest = load_manifest(trades_dir) or {}
+    columns: set[str] = set()
+    seen_schemas: set[str] = set()
+    for path in files:
+        stats = manifest.get(str(path.relative_to(trades_dir)))
+        if stats is not None and stats.describes(path):
+            if stats.schema_hash in seen_schemas:
+                continue
+            seen_schemas.add(stats.schema_hash)
+        columns.update(_file_columns(path))
+    return columns
+
+
+def trades_formats(data_dir: Path, files: list[Path] | None = None) -> frozenset[str]:
+    """Trade layouts present among the files: "raw" and/or "normalized".
+
+    Both appear while download.normalize is migrating a dataset.
+    """
+    columns = trades_columns(data_dir, files)
+    formats = set()
+    if "yes_price_cents" in columns:
+        formats.add("normalized")
+    if "yes_price_dollars" in columns:
+        formats.add("raw")
+    return frozenset(formats)
+
+
+def trades_normalized(data_dir: Path) -> bool:
+    """Return True if every trades file stores normalized typed columns."""
+    return trades_formats(data_dir) == {"normalized"}
+
+
+def _month_index(date: str) -> int:
+    """Map an ISO date/timestamp string to year * 12 + month."""
+    return int(date[:4]) * 12 + int(date[5:7])
+
+
+def partition_filter_sql(start_date: str | None = None, end_date: str | None = None) -> str:
+    """SQL predicate on the year/month partition columns for a date range.
+
+    start_date is inclusive and end_date exclusive, matching fetch_strategy_trades.
+    Returns "TRUE" when neither bound is given.
+    """
+    filters = []
+    if start_date:
+        filters.append(f"year * 12 + month >= {_month_index(start_date)}")
+    if end_date:
+        last = _month_index(end_date)
+        if end_date[8:10] == "01" and not end_date[10:].strip("T0:.Z "):
+            last -= 1  # exclusive bound on the first of a month excludes that month
+        filters.append(f"year * 12 + month <= {last}")
+    return " AND ".join(filters) or "TRUE"
+
+
+def partitioned_dataset_sql(
+    dataset_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> str:
+    """Table expression over a year=YYYY/month=MM/ dataset, pruned by partition.
+
+    The year/month partition columns are dropped from the output.
+    """
+    return f"""(
+            SELECT * EXCLUDE (year, month)
+            FROM read_parquet(
+                '{dataset_dir}/year=*/month=*/*.parquet',
+                hive_partitioning = true,
+                hive_types = {{'year': INTEGER, 'month': INTEGER}}
+            )
+            WHERE {partition_filter_sql(start_date, end_date)}
+        )"""
+
+
+def _trades_files_sql(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    files: list[Path] | None = None,
+) -> str:
+    """Table expression over the given trades files, or the whole dataset pruned by partition."""
+    if files is not None:
+        file_list = ", ".join(f"'{f}'" for f in files)
+        return f"read_parquet([{file_list}], union_by_name = true)"
+    flat = f"read_parquet('{data_dir}/trades/*.parquet', union_by_name = true)"
+    if not trades_partitioned(data_dir):
+        return flat
+    partitioned = partitioned_dataset_sql(data_dir / "trades", start_date, end_date)
+    if not trades_has_flat_files(data_dir):
+        return partitioned
+    # Flat files not yet migrated by compaction; read in full, callers filter.
+    return f"""(
+            SELECT * FROM {partitioned}
+            UNION ALL BY NAME
+            SELECT * FROM {flat}
+        )"""
+
+
+# Canonical trades columns with no rows, for when no trades file can match.
+EMPTY_TRADES_SQL = """(
+        SELECT
+            NULL::VARCHAR AS trade_id,
+            NULL::VARCHAR AS ticker,
+            NULL::VARCHAR AS taker_side,
+            NULL::DOUBLE AS yes_price,
+            NULL::DOUBLE AS no_price,
+            NULL::DOUBLE AS taker_price,
+            NULL::DOUBLE AS maker_price,
+            NULL::DOUBLE AS contracts,
+            NULL::TIMESTAMPTZ AS created_time
+        WHERE FALSE
+    )"""
+
+
+def trades_sql(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    files: list[Path] | None = None,
+    tickers: list[str] | None = None,
+) -> str:
+    """SQL table expression for trades with canonical columns (use after FROM).
+
+    Columns: trade_id, ticker, taker_side, yes_price, no_price, taker_price,
+             maker_price, contracts, created_time
+    Prices (cents) and contracts are DOUBLE; created_time is TIMESTAMPTZ.
+
+    If the trades manifest exists, start_date/end_date and tickers select the
+    files that may hold matching rows (see util.manifest.prune_files).
+    Otherwise, for the partitioned layout, start_date/end_date are emitted as
+    partition filters so DuckDB skips whole month directories; flat files not
+    yet compacted into partitions are read alongside in full. Either way
+    this only prunes: callers still filter created_time and ticker themselves.
+    If files is given, exactly those trades files are read instead.
+
+    Raw and normalized files may be mixed (see trades_formats); each row is
+    converted from whichever columns its file has. A missing or empty trades
+    directory, or pruning that leaves no files, yields no rows.
+    """
+    if files is None and (start_date or end_date or tickers is not None):
+        files = prune_files(data_dir / "trades", start_date, end_date, tickers)
+    if files == [] or not any((data_dir / "trades").rglob("*.parquet")):
+        return EMPTY_TRADES_SQL
+    source = _trades_files_sql(data_dir, start_date, end_date, files)
+    formats = trades_formats(data_dir, files)
+    normalized = {
+        "yes_price": "CAST(yes_price_cents AS DOUBLE)",
+        "no_price": "CAST(no_price_cents AS DOUBLE)",
+        "contracts": "CAST(contracts AS DOUBLE)",
+    }
+    raw = {
+        "yes_price": "CAST(yes_price_dollars AS DOUBLE) * 100",
+        "no_price": "CAST(no_price_dollars AS DOUBLE) * 100",
+        "contracts": "CAST(count_fp AS DOUBLE)",
+    }
+    if formats == {"normalized"}:
+        columns = normalized
+        created_time = "created_time"
+    elif "normalized" in formats:
+        # Mixed dataset mid-migration: each row has one set of columns, the other is NULL.
+        columns = {name: f"COALESCE({normalized[name]}, {raw[name]})" for name in normalized}
+        created_time = "CAST(created_time AS TIMESTAMPTZ)"
+    else:
+        columns = raw
+        created_time = "CAST(created_time AS TIMESTAMPTZ)"
+    yes_price = columns["yes_price"]
+    no_price = columns["no_price"]
+    contracts = columns["contracts"]
+    return f"""(
+        SELECT
+            trade_id,
+            ticker,
+            CAST(taker_side AS VARCHAR) AS taker_side,
+            {yes_price} AS yes_price,
+            {no_price} AS no_price,
+            CASE WHEN taker_side = 'yes' THEN {yes_price} ELSE {no_price} END AS taker_price,
+            CASE WHEN taker_side = 'yes' THEN {no_price} ELSE {yes_price} END AS maker_price,
+            {contracts} AS contracts,
+            {created_time} AS created_time
+        FROM {source}
+    )"""
+
+
+def market_dim_sql(data_dir: Path, use_catalog: bool = False) -> str:
+    """Table expression for the per-market dimension table (see util.market_dim).
+
+    Reads data/market_dim.parquet while it matches the markets, events and
+    series files, otherwise derives the same rows inline; never writes.
+    use_catalog reads the attached catalog's table.
+    """
+    if use_catalog:
+        return f"{CATALOG_ALIAS}.market_dim"
+    if is_current(data_dir):
+        return f"'{market_dim_path(data_dir)}'"
+    log.debug("market_dim.parquet missing or stale in %s; deriving inline", data_dir)
+    return market_dim_view_sql(data_dir)
+
+
+def category_tickers(
+    con: duckdb.DuckDBPyConnection, data_dir: Path, category: str
+) -> list[str]:
+    """Tickers of every market in category, e.g. for trades_sql(tickers=...)."""
+    market_dim = market_dim_sql(data_dir, use_catalog=catalog_attached(con))
+    rows = con.execute(f"SELECT ticker FROM {market_dim} WHERE category = ?", [category]).fetchall()
+    return [ticker for (ticker,) in rows]
+
+
+def resolved_markets_sql(data_dir: Path, use_catalog: bool = False) -> str:
     """SQL for a CTE of finalized binary markets with known outcomes.
 
     Returns just the CTE body (use with build_query).
     Columns: ticker, event_ticker, result, volume
     """
+    if use_catalog:
+        return f"SELECT * FROM {CATALOG_ALIAS}.resolved_markets"
     return f"""
-        SELECT ticker, event_ticker, result, CAST(volume_fp AS DOUBLE) AS volume
-        FROM '{data_dir}/markets/*.parquet'
+        SELECT ticker, event_ticker, result, volume
+        FROM {market_dim_sql(data_dir)}
         WHERE status = 'finalized' AND result IN ('yes', 'no')
     """
 
 
-def trade_outcomes_sql(data_dir: Path) -> str:
+def trade_outcomes_sql(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> str:
     """SQL for a CTE decomposing trades into taker/maker perspectives.
 
     Depends on: resolved_markets CTE.
+    start_date/end_date only prune trade partitions; see trades_sql.
     Columns: ticker, taker_price, maker_price, taker_won, maker_won, contracts, created_time
     """
     return f"""
         SELECT
             t.ticker,
             t.taker_side,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-            END AS taker_price,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.no_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.yes_price_dollars AS DOUBLE) * 100
-            END AS maker_price,
+            t.taker_price,
+            t.maker_price,
             CASE WHEN t.taker_side = r.result THEN 1 ELSE 0 END AS taker_won,
             CASE WHEN t.taker_side != r.result THEN 1 ELSE 0 END AS maker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts,
+            t.contracts,
             t.created_time
-        FROM '{data_dir}/trades/*.parquet' t
+        FROM {trades_sql(data_dir, start_date, end_date)} t
         INNER JOIN resolved_markets r ON t.ticker = r.ticker
     """
 
 
-def with_category_sql(data_dir: Path) -> str:
+def with_category_sql(data_dir: Path, use_catalog: bool = False) -> str:
     """SQL for a CTE adding category to resolved markets.
 
-    Uses events JOIN when available, falls back to prefix-based inference.
+    Category comes from events when available, else prefix-based inference
+    (precomputed in market_dim).
     Depends on: resolved_markets CTE.
     Columns: ticker, event_ticker, result, volume, category
     """
-    case_sql = category_case_sql()
     return f"""
-        SELECT
-            r.ticker,
-            r.event_ticker,
-            r.result,
-            r.volume,
-            COALESCE(e.category, {case_sql.replace('event_ticker', 'r.event_ticker')}) AS category
+        SELECT r.ticker, r.event_ticker, r.result, r.volume, d.category
         FROM resolved_markets r
-        LEFT JOIN '{data_dir}/events/*.parquet' e ON r.event_ticker = e.event_ticker
+        INNER JOIN {market_dim_sql(data_dir, use_catalog)} d ON r.ticker = d.ticker
     """
 
 
@@ -99,36 +424,40 @@ def categorized_trade_outcomes_sql(data_dir: Path) -> str:
     """
 
 
-def with_fee_type_sql(data_dir: Path) -> str:
+def with_fee_type_sql(data_dir: Path, use_catalog: bool = False) -> str:
     """SQL for a CTE adding fee_type and fee_multiplier to resolved markets.
 
-    Joins resolved_markets → events → series.
+    Series without fee data get fee_type 'unknown' and multiplier 1.0
+    (precomputed in market_dim).
     Depends on: resolved_markets CTE.
-    Columns: ticker, event_ticker, result, volume, category, fee_type, fee_multiplier
+    Columns: ticker, event_ticker, result, volume, category, fee_type, fee_multiplier,
+             close_time (epoch seconds)
     """
-    case_sql = category_case_sql()
     return f"""
         SELECT
             r.ticker,
             r.event_ticker,
             r.result,
             r.volume,
-            COALESCE(e.category, {case_sql.replace('event_ticker', 'r.event_ticker')}) AS category,
-            COALESCE(s.fee_type, 'unknown') AS fee_type,
-            COALESCE(s.fee_multiplier, 1.0) AS fee_multiplier
+            d.category,
+            d.fee_type,
+            d.fee_multiplier,
+            d.close_time
         FROM resolved_markets r
-        LEFT JOIN '{data_dir}/events/*.parquet' e ON r.event_ticker = e.event_ticker
-        LEFT JOIN (
-            SELECT DISTINCT ticker, fee_type, CAST(fee_multiplier AS DOUBLE) AS fee_multiplier
-            FROM '{data_dir}/series/*.parquet'
-        ) s ON e.series_ticker = s.ticker
+        INNER JOIN {market_dim_sql(data_dir, use_catalog)} d ON r.ticker = d.ticker
     """
 
 
-def trade_outcomes_with_timing_sql(data_dir: Path) -> str:
+def trade_outcomes_with_timing_sql(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    use_catalog: bool = False,
+) -> str:
     """SQL for a CTE adding market close_time and hours_to_close to trade outcomes.
 
     Depends on: resolved_markets CTE.
+    start_date/end_date only prune trade partitions; see trades_sql.
     Columns: ticker, taker_side, taker_price, maker_price, taker_won, maker_won,
              contracts, created_time, close_time, hours_to_close
 
@@ -139,75 +468,94 @@ def trade_outcomes_with_timing_sql(data_dir: Path) -> str:
         SELECT
             t.ticker,
             t.taker_side,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-            END AS taker_price,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.no_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.yes_price_dollars AS DOUBLE) * 100
-            END AS maker_price,
+            t.taker_price,
+            t.maker_price,
             CASE WHEN t.taker_side = r.result THEN 1 ELSE 0 END AS taker_won,
             CASE WHEN t.taker_side != r.result THEN 1 ELSE 0 END AS maker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts,
+            t.contracts,
             t.created_time,
-            m.close_time,
-            EXTRACT(EPOCH FROM (
-                CAST(m.close_time AS TIMESTAMP) - CAST(t.created_time AS TIMESTAMP)
-            )) / 3600.0 AS hours_to_close
-        FROM '{data_dir}/trades/*.parquet' t
+            to_timestamp(d.close_time) AS close_time,
+            (d.close_time - epoch(t.created_time)) / 3600.0 AS hours_to_close
+        FROM {trades_sql(data_dir, start_date, end_date)} t
         INNER JOIN resolved_markets r ON t.ticker = r.ticker
-        INNER JOIN '{data_dir}/markets/*.parquet' m ON t.ticker = m.ticker
-        WHERE m.close_time IS NOT NULL
+        INNER JOIN {market_dim_sql(data_dir, use_catalog)} d ON t.ticker = d.ticker
+        WHERE d.close_time IS NOT NULL
     """
 
 
-def full_trade_outcomes_with_all_dims_sql(data_dir: Path) -> str:
-    """SQL CTE for trade outcomes with all filter dimensions.
-
-    Combines category, fee_type, fee_multiplier, time_bucket, price_range,
-    and close_time into a single canonical CTE for simulation queries.
-
-    Depends on: resolved_markets, markets_with_fees CTEs.
-    Columns: ticker, taker_side, taker_price, taker_won, contracts,
-             created_time, close_time, category, fee_type, fee_multiplier,
-             time_bucket, price_range
+def enriched_trades_sql(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    files: list[Path] | None = None,
+    tickers: list[str] | None = None,
+) -> str:
+    """SQL CTE joining trades with every market, event and series dimension.
+
+    This is the definition materialized by util.enriched; most callers should
+    use util.enriched.enriched_trades_ctes() to pick up the materialized copy.
+
+    Depends on: markets_with_fees CTE.
+    start_date/end_date and tickers only prune trade files; see trades_sql.
+    Columns: ticker, event_ticker, taker_side, taker_price, maker_price,
+             taker_won, maker_won, contracts, created_time, close_time,
+             hours_to_close, category, fee_type, fee_multiplier, time_bucket,
+             price_range
     """
     return f"""
         SELECT
             t.ticker,
+            mf.event_ticker,
             t.taker_side,
-            CASE WHEN t.taker_side = 'yes'
-                 THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                 ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-            END AS taker_price,
+            t.taker_price,
+            t.maker_price,
             CASE WHEN t.taker_side = mf.result THEN 1 ELSE 0 END AS taker_won,
-            CAST(t.count_fp AS DOUBLE) AS contracts,
+            CASE WHEN t.taker_side != mf.result THEN 1 ELSE 0 END AS maker_won,
+            t.contracts,
             t.created_time,
-            m.close_time,
+            to_timestamp(mf.close_time) AS close_time,
+            (mf.close_time - epoch(t.created_time)) / 3600.0 AS hours_to_close,
             mf.category,
             mf.fee_type,
             mf.fee_multiplier,
             CASE
-                WHEN EXTRACT(HOUR FROM CAST(t.created_time AS TIMESTAMPTZ)
-                    AT TIME ZONE 'America/New_York') BETWEEN 20 AND 23
+                WHEN EXTRACT(HOUR FROM t.created_time AT TIME ZONE 'America/New_York')
+                    BETWEEN 20 AND 23
                 THEN 'evening'
                 ELSE 'other'
             END AS time_bucket,
             CASE
-                WHEN (CASE WHEN t.taker_side = 'yes'
-                     THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                     ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-                END) >= 60 THEN 'high_price'
-                WHEN (CASE WHEN t.taker_side = 'yes'
-                     THEN CAST(t.yes_price_dollars AS DOUBLE) * 100
-                     ELSE CAST(t.no_price_dollars AS DOUBLE) * 100
-                END) <= 30 THEN 'low_price'
+                WHEN t.taker_price >= 60 THEN 'high_price'
+                WHEN t.taker_price <= 30 THEN 'low_price'
                 ELSE 'mid_price'
             END AS price_range
-        FROM '{data_dir}/trades/*.parquet' t
+        FROM {trades_sql(data_dir, start_date, end_date, files, tickers)} t
         INNER JOIN markets_with_fees mf ON t.ticker = mf.ticker
-        LEFT JOIN '{data_dir}/markets/*.parquet' m ON t.ticker = m.ticker
+    """
+
+
+def full_trade_outcomes_with_all_dims_sql(
+    data_dir: Path,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> str:
+    """SQL CTE for trade outcomes with all filter dimensions.
+
+    Combines category, fee_type, fee_multiplier, time_bucket, price_range,
+    and close_time into a single canonical CTE for simulation queries.
+
+    Depends on: resolved_markets, markets_with_fees CTEs.
+    start_date/end_date only prune trade partitions; see trades_sql.
+    Columns: ticker, taker_side, taker_price, taker_won, contracts,
+             created_time, close_time, category, fee_type, fee_multiplier,
+             time_bucket, price_range
+    """
+    return f"""
+        SELECT
+            ticker, taker_side, taker_price, taker_won, contracts,
+            created_time, close_time, category, fee_type, fee_multiplier,
+            time_bucket, price_range
+        FROM ({enriched_trades_sql(data_dir, start_date, end_date)})
     """
 
 
@@ -0,0 +1,214 @@
+"""Ticker-clustered copy of the trades for per-market access.
+
+The trades dataset is stored in download order (or month partitions sorted
+within each file), so "all trades for market X in time order" is a filtered
+scan over every file. The ticker store keeps a second copy under
+data/trades_by_ticker/:
+
+- trades.arrow: the canonical trades columns (queries.trades_sql) as an
+  uncompressed Arrow IPC file sorted by (ticker, created_time)
+- index.arrow: one row per ticker (the ticker id is the row number) with
+  the offset and length of its rows in trades.arrow
+
+TickerStore memory-maps both files, so looking up a market is a dict lookup
+and the returned table is a zero-copy slice of the mapped file. The index
+records the fingerprint of the trades files it was built from; a stale store
+is refused rather than silently read.
+
+Usage:
+    uv run python -m util.ticker_store
+"""
+
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import click
+import pyarrow as pa
+
+from util.fingerprint import file_stats, fingerprint
+from util.queries import get_connection, trades_sql
+
+log = logging.getLogger(__name__)
+
+STORE_DIR = "trades_by_ticker"
+TRADES_FILE = "trades.arrow"
+INDEX_FILE = "index.arrow"
+STAGING_SUFFIX = ".building"
+FINGERPRINT_KEY = b"kalshi.fingerprint"
+
+# Bump whenever the stored columns or sort order change.
+TICKER_STORE_VERSION = 1
+
+
+def store_dir(data_dir: Path) -> Path:
+    return data_dir / STORE_DIR
+
+
+def source_fingerprint(data_dir: Path) -> str:
+    """Fingerprint of the trades files the store is built from."""
+    return fingerprint([TICKER_STORE_VERSION, file_stats(data_dir / "trades")])
+
+
+def _built_fingerprint(data_dir: Path) -> bytes | None:
+    path = store_dir(data_dir) / INDEX_FILE
+    if not path.exists():
+        return None
+    with pa.memory_map(str(path)) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return metadata.get(FINGERPRINT_KEY)
+
+
+def is_current(data_dir: Path) -> bool:
+    """Return True if the ticker store exists and matches the trades files."""
+    return _built_fingerprint(data_dir) == source_fingerprint(data_dir).encode()
+
+
+def build_ticker_store(data_dir: Path) -> int:
+    """Write data_dir/trades_by_ticker/ from the trades dataset.
+
+    DuckDB sorts the trades (spilling to disk as needed) and the result is
+    streamed into the Arrow file batch by batch. The store is built in a staging
+    directory and swapped in, so readers never see a partial store.
+
+    Returns:
+        Number of trades written.
+    """
+    target = store_dir(data_dir)
+    staging = target.with_name(target.name + STAGING_SUFFIX)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    source = source_fingerprint(data_dir)
+
+    con = get_connection()
+    try:
+        con.execute(f"SET temp_directory = '{data_dir / '.duckdb_tmp'}'")
+        log.info("Sorting trades by (ticker, created_time)...")
+        reader = pa.RecordBatchReader.from_stream(
+            con.sql(f"SELECT * FROM {trades_sql(data_dir)} ORDER BY ticker, created_time, trade_id")
+        )
+        rows = 0
+        with pa.OSFile(str(staging / TRADES_FILE), "wb") as sink:
+            with pa.ipc.new_file(sink, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+
+        # Offsets follow the same ORDER BY ticker as the data file.
+        index = pa.table(
+            con.sql(f"""
+            SELECT
+                ticker,
+                CAST(SUM(n) OVER (ORDER BY ticker) - n AS BIGINT) AS offset,
+                CAST(n AS BIGINT) AS length
+            FROM (SELECT ticker, COUNT(*) AS n FROM {trades_sql(data_dir)} GROUP BY ticker)
+            ORDER BY ticker
+        """)
+        )
+    finally:
+        con.close()
+
+    index = index.replace_schema_metadata({FINGERPRINT_KEY: source.encode()})
+    with pa.OSFile(str(staging / INDEX_FILE), "wb") as sink:
+        with pa.ipc.new_file(sink, index.schema) as writer:
+            writer.write_table(index)
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.rename(staging, target)
+    log.info("Wrote ticker store with %d trades in %d markets", rows, index.num_rows)
+    return rows
+
+
+class TickerStore:
+    """Memory-mapped, read-only view of the ticker store.
+
+    Args:
+        data_dir: Path to the root data directory.
+        check_current: Raise if the store no longer matches the trades files.
+    """
+
+    def __init__(self, data_dir: Path, check_current: bool = True):
+        root = store_dir(data_dir)
+        if not (root / INDEX_FILE).exists():
+            raise FileNotFoundError(f"No ticker store in {root}; build it with `make ticker-store`")
+        if check_current and not is_current(data_dir):
+            raise RuntimeError(f"Ticker store {root} is stale; rebuild with `make ticker-store`")
+
+        self._trades_source = pa.memory_map(str(root / TRADES_FILE))
+        self._trades = pa.ipc.open_file(self._trades_source).read_all()
+        with pa.memory_map(str(root / INDEX_FILE)) as source:
+            index = pa.ipc.open_file(source).read_all()
+        self._tickers: list[str] = index.column("ticker").to_pylist()
+        self._ids = {ticker: i for i, ticker in enumerate(self._tickers)}
+        self._offsets: list[int] = index.column("offset").to_pylist()
+        self._lengths: list[int] = index.column("length").to_pylist()
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._ids
+
+    @property
+    def tickers(self) -> list[str]:
+        """All tickers in the store, sorted; a ticker's position is its id."""
+        return self._tickers
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self._trades.schema
+
+    def ticker_id(self, ticker: str) -> int | None:
+        return self._ids.get(ticker)
+
+    def trades(self, ticker: str) -> pa.Table:
+        """All trades for ticker in created_time order, as a zero-copy slice.
+
+        Unknown tickers return an empty table with the store's schema.
+        """
+        ticker_id = self._ids.get(ticker)
+        if ticker_id is None:
+            return self._trades.slice(0, 0)
+        return self._trades.slice(self._offsets[ticker_id], self._lengths[ticker_id])
+
+    def close(self) -> None:
+        self._trades_source.close()
+
+    def __enter__(self) -> "TickerStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+@click.command()
+@click.option(
+    "--data-dir",
+    type=click.Path(path_type=Path, exists=True),
+    default=Path("data"),
+    help="Path to the data directory.",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Enable debug logging.")
+def main(data_dir: Path, verbose: bool) -> None:
+    """Build the ticker-clustered trades store."""
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)-8s %(name)s — %(message)s",
+        datefmt="%H:%M:%S",
+        stream=sys.stderr,
+    )
+
+    if is_current(data_dir):
+        click.echo(f"Ticker store in {store_dir(data_dir)} is current")
+        return
+    rows = build_ticker_store(data_dir)
+    click.echo(f"Ticker store written to {store_dir(data_dir)} ({rows:,} trades)")
+
+
+if __name__ == "__main__":
+    main()
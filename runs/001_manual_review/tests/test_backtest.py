@@ -125,6 +125,30 @@ class TestFetchStrategyTrades:
         )
         assert len(df) == 1
 
+    def test_date_filtering_partitioned_layout(self, backtest_data_dir: Path) -> None:
+        """Date bounds give the same result on month-partitioned trades."""
+        trades_dir = backtest_data_dir / "trades"
+        flat = trades_dir / "trades_000000.parquet"
+        table = pq.read_table(flat)
+        flat.unlink()
+        months = [t[:7] for t in table.column("created_time").to_pylist()]
+        for month in sorted(set(months)):
+            part_dir = trades_dir / f"year={month[:4]}" / f"month={month[5:7]}"
+            part_dir.mkdir(parents=True)
+            rows = [i for i, m in enumerate(months) if m == month]
+            pq.write_table(table.take(rows), part_dir / "trades_000000.parquet")
+
+        df = fetch_strategy_trades(
+            backtest_data_dir, ELECTIONS_YES_HIGH,
+            end_date="2024-05-02",
+        )
+        assert len(df) == 1
+        df = fetch_strategy_trades(
+            backtest_data_dir, ELECTIONS_YES_HIGH,
+            start_date="2024-06-01",
+        )
+        assert df.empty
+
     def test_empty_result_for_unmatched_filter(self, backtest_data_dir: Path) -> None:
         """Returns empty DataFrame when no trades match."""
         s = StrategyFilter(
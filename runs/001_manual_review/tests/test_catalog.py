@@ -0,0 +1,187 @@
+"""Tests for the persistent DuckDB catalog."""
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from util.catalog import build_catalog
+from util.queries import (
+    CATALOG_FILE,
+    build_query,
+    catalog_attached,
+    get_connection,
+    resolved_markets_sql,
+    trade_outcomes_sql,
+    with_fee_type_sql,
+)
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> Path:
+    """Minimal dataset with markets, trades, events and series."""
+    for name in ("markets", "trades", "events", "series"):
+        (tmp_path / name).mkdir()
+    pq.write_table(
+        pa.table(
+            {
+                "ticker": ["M1", "M2", "M3"],
+                "event_ticker": ["E1", "E1", "E2"],
+                "status": ["finalized", "finalized", "active"],
+                "result": ["yes", "no", ""],
+                "volume_fp": ["100.00", "200.00", "50.00"],
+                "close_time": ["2024-03-01T00:00:00Z"] * 3,
+            }
+        ),
+        tmp_path / "markets" / "markets_000000.parquet",
+    )
+    pq.write_table(
+        pa.table(
+            {
+                "trade_id": ["t1", "t2", "t3"],
+                "ticker": ["M1", "M2", "M3"],
+                "yes_price_dollars": ["0.6500", "0.3000", "0.5000"],
+                "no_price_dollars": ["0.3500", "0.7000", "0.5000"],
+                "count_fp": ["10.00", "20.00", "5.00"],
+                "taker_side": ["yes", "no", "yes"],
+                "created_time": [
+                    "2024-01-01T00:00:00Z",
+                    "2024-01-02T00:00:00Z",
+                    "2024-01-03T00:00:00Z",
+                ],
+            }
+        ),
+        tmp_path / "trades" / "trades_000000.parquet",
+    )
+    pq.write_table(
+        pa.table({"event_ticker": ["E1"], "category": ["Sports"], "series_ticker": ["S1"]}),
+        tmp_path / "events" / "events_000000.parquet",
+    )
+    pq.write_table(
+        pa.table({"ticker": ["S1"], "fee_type": ["quadratic"], "fee_multiplier": [1.0]}),
+        tmp_path / "series" / "series_000000.parquet",
+    )
+    return tmp_path
+
+
+def _fee_rows(data_dir: Path) -> list[tuple]:
+    con = get_connection(data_dir)
+    use_catalog = catalog_attached(con)
+    query = build_query(
+        [
+            ("resolved_markets", resolved_markets_sql(data_dir, use_catalog)),
+            ("markets_with_fees", with_fee_type_sql(data_dir, use_catalog)),
+            ("trade_outcomes", trade_outcomes_sql(data_dir)),
+        ],
+        """
+        SELECT t.ticker, t.taker_won, t.contracts, f.category, f.fee_type
+        FROM trade_outcomes t JOIN markets_with_fees f USING (ticker)
+        ORDER BY t.ticker
+        """,
+    )
+    rows = con.execute(query).fetchall()
+    con.close()
+    return rows
+
+
+class TestBuildCatalog:
+    def test_writes_catalog_file(self, data_dir: Path) -> None:
+        path = build_catalog(data_dir)
+        assert path == data_dir / CATALOG_FILE
+        assert path.exists()
+
+    def test_attaches_current_catalog(self, data_dir: Path) -> None:
+        build_catalog(data_dir)
+        con = get_connection(data_dir)
+        assert catalog_attached(con)
+        assert "kalshi.resolved_markets" in resolved_markets_sql(data_dir, use_catalog=True)
+        tables = {
+            r[0]
+            for r in con.execute(
+                "SELECT table_name FROM information_schema.tables WHERE table_catalog = 'kalshi'"
+            ).fetchall()
+        }
+        assert {"markets", "events", "series", "resolved_markets", "trades"} <= tables
+        con.close()
+
+    def test_queries_match_parquet(self, data_dir: Path) -> None:
+        expected = _fee_rows(data_dir)
+        build_catalog(data_dir)
+        assert _fee_rows(data_dir) == expected
+
+    def test_plain_connection_after_attach_reads_parquet(self, data_dir: Path) -> None:
+        build_catalog(data_dir)
+        get_connection(data_dir).close()
+        con = get_connection()
+        assert not catalog_attached(con)
+        rows = con.execute(
+            f"SELECT ticker FROM ({resolved_markets_sql(data_dir)}) ORDER BY ticker"
+        ).fetchall()
+        assert rows == [("M1",), ("M2",)]
+        con.close()
+
+    def test_catalog_is_read_only(self, data_dir: Path) -> None:
+        build_catalog(data_dir)
+        con = get_connection(data_dir)
+        with pytest.raises(Exception, match="read-only"):
+            con.execute("DELETE FROM kalshi.markets")
+        con.close()
+
+    def test_trades_view(self, data_dir: Path) -> None:
+        build_catalog(data_dir)
+        con = get_connection(data_dir)
+        row = con.execute("SELECT COUNT(*), SUM(contracts) FROM kalshi.trades").fetchone()
+        assert row == (3, 35.0)
+        con.close()
+
+    def test_missing_series_is_empty_table(self, data_dir: Path) -> None:
+        (data_dir / "series" / "series_000000.parquet").unlink()
+        build_catalog(data_dir)
+        rows = _fee_rows(data_dir)
+        assert [r[4] for r in rows] == ["unknown", "unknown"]
+
+    def test_requires_markets(self, tmp_path: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            build_catalog(tmp_path)
+
+
+class TestCatalogVersioning:
+    def test_stale_catalog_is_ignored(self, data_dir: Path) -> None:
+        build_catalog(data_dir)
+        pq.write_table(
+            pa.table(
+                {
+                    "ticker": ["M3"],
+                    "event_ticker": ["E2"],
+                    "status": ["finalized"],
+                    "result": ["yes"],
+                    "volume_fp": ["50.00"],
+                    "close_time": ["2024-03-01T00:00:00Z"],
+                }
+            ),
+            data_dir / "markets" / "markets_000001.parquet",
+        )
+        con = get_connection(data_dir)
+        assert not catalog_attached(con)
+        con.close()
+        rows = _fee_rows(data_dir)
+        assert [r[0] for r in rows] == ["M1", "M2", "M3"]
+
+    def test_rebuild_after_change(self, data_dir: Path) -> None:
+        build_catalog(data_dir)
+        (data_dir / "events" / "events_000000.parquet").unlink()
+        con = get_connection(data_dir)
+        assert not catalog_attached(con)
+        con.close()
+
+        build_catalog(data_dir)
+        con = get_connection(data_dir)
+        assert catalog_attached(con)
+        con.close()
+
+    def test_no_catalog_uses_parquet(self, data_dir: Path) -> None:
+        con = get_connection(data_dir)
+        assert not catalog_attached(con)
+        con.close()
+        assert "kalshi." not in resolved_markets_sql(data_dir)
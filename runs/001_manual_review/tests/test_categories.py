@@ -6,6 +6,7 @@ import pytest
 from util.categories import (
     EVENT_CATEGORIES,
     PREFIX_TO_CATEGORY,
+    PrefixTrie,
     category_case_sql,
     infer_category,
 )
@@ -66,6 +67,35 @@ class TestInferCategory:
         assert infer_category("KXMVEMENTGRAMMYS-26") == "Entertainment"
 
 
+class TestPrefixTrie:
+    def test_longest_prefix_wins(self) -> None:
+        trie = PrefixTrie([("AB", "short"), ("ABCD", "long")])
+        assert trie.longest_match("ABCDE") == "long"
+        assert trie.longest_match("ABCX") == "short"
+
+    def test_no_match(self) -> None:
+        trie = PrefixTrie([("AB", "x")])
+        assert trie.longest_match("A") is None
+        assert trie.longest_match("") is None
+
+    def test_first_mapping_for_duplicate_prefix_wins(self) -> None:
+        trie = PrefixTrie([("AB", "first"), ("AB", "second")])
+        assert trie.longest_match("ABC") == "first"
+
+    @pytest.mark.parametrize(
+        "ticker",
+        ["KXMVEMENTIONS-X", "KXMVEMENTGRAMMYS", "KXBTCD-1", "KXNBAGAME-2", "NOPE", "KX"],
+    )
+    def test_matches_case_sql(self, ticker: str) -> None:
+        """The trie and the SQL CASE expression agree on every ticker."""
+        conn = duckdb.connect()
+        expected = conn.execute(
+            f"SELECT {category_case_sql()} FROM (SELECT ? AS event_ticker)", [ticker]
+        ).fetchone()[0]
+        conn.close()
+        assert infer_category(ticker) == expected
+
+
 class TestCategoryCaseSql:
     def test_returns_case_expression(self) -> None:
         sql = category_case_sql()
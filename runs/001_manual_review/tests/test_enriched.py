@@ -0,0 +1,235 @@
+"""Tests for the materialized enriched-trades table."""
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from simulation.backtest import fetch_strategy_trades
+from simulation.strategy_def import StrategyFilter
+from util.enriched import (
+    ENRICHED_DIR,
+    enriched_trades_ctes,
+    is_current,
+    load_manifest,
+    refresh,
+)
+from util.queries import build_query, get_connection
+
+ENRICHED_SELECT = """
+    SELECT ticker, taker_side, taker_price, maker_price, taker_won, maker_won,
+           contracts, category, fee_type, fee_multiplier, time_bucket, price_range,
+           CAST(created_time AS VARCHAR) AS created_time,
+           CAST(close_time AS VARCHAR) AS close_time
+    FROM enriched_trades
+    ORDER BY ticker, created_time
+"""
+
+
+def _trades(rows: list[tuple[str, str, str, str, str]]) -> pa.Table:
+    """Build a raw trades table from (trade_id, ticker, yes_price, side, created_time)."""
+    return pa.table(
+        {
+            "trade_id": [r[0] for r in rows],
+            "ticker": [r[1] for r in rows],
+            "yes_price_dollars": [r[2] for r in rows],
+            "no_price_dollars": [f"{1 - float(r[2]):.4f}" for r in rows],
+            "count_fp": ["10.00"] * len(rows),
+            "taker_side": [r[3] for r in rows],
+            "created_time": [r[4] for r in rows],
+        }
+    )
+
+
+def _markets(m4_status: str, m4_result: str) -> pa.Table:
+    return pa.table(
+        {
+            "ticker": ["M1", "M2", "M3", "M4"],
+            "event_ticker": ["E1", "E1", "E2", "E2"],
+            "status": ["finalized", "finalized", "finalized", m4_status],
+            "result": ["yes", "no", "yes", m4_result],
+            "volume_fp": ["100.00", "200.00", "150.00", "50.00"],
+            "close_time": ["2024-03-01T00:00:00Z"] * 4,
+        }
+    )
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> Path:
+    """Minimal dataset: M1-M3 settled, M4 still active."""
+    for name in ("markets", "trades", "events", "series"):
+        (tmp_path / name).mkdir()
+    pq.write_table(_markets("active", ""), tmp_path / "markets" / "markets_000000.parquet")
+    pq.write_table(
+        _trades(
+            [
+                ("t1", "M1", "0.6500", "yes", "2024-01-01T21:00:00Z"),
+                ("t2", "M2", "0.3000", "no", "2024-01-15T12:00:00Z"),
+                ("t3", "M3", "0.8000", "yes", "2024-02-03T12:00:00Z"),
+                ("t4", "M4", "0.5000", "yes", "2024-02-04T12:00:00Z"),
+            ]
+        ),
+        tmp_path / "trades" / "trades_000000.parquet",
+    )
+    pq.write_table(
+        pa.table(
+            {
+                "event_ticker": ["E1", "E2"],
+                "category": ["Sports", "Politics"],
+                "series_ticker": ["S1", "S2"],
+            }
+        ),
+        tmp_path / "events" / "events_000000.parquet",
+    )
+    pq.write_table(
+        pa.table(
+            {
+                "ticker": ["S1", "S2"],
+                "fee_type": ["quadratic", "quadratic_with_maker_fees"],
+                "fee_multiplier": [1.0, 0.5],
+            }
+        ),
+        tmp_path / "series" / "series_000000.parquet",
+    )
+    return tmp_path
+
+
+def _enriched_rows(data_dir: Path) -> list[tuple]:
+    con = get_connection()
+    rows = con.execute(build_query(enriched_trades_ctes(data_dir), ENRICHED_SELECT)).fetchall()
+    con.close()
+    return rows
+
+
+class TestFullBuild:
+    def test_not_current_before_build(self, data_dir: Path) -> None:
+        assert not is_current(data_dir)
+        names = [name for name, _ in enriched_trades_ctes(data_dir)]
+        assert names == ["resolved_markets", "markets_with_fees", "enriched_trades"]
+
+    def test_build_matches_live_join(self, data_dir: Path) -> None:
+        live = _enriched_rows(data_dir)
+        result = refresh(data_dir)
+        assert result.mode == "full"
+        assert result.rows_added == 3
+        assert is_current(data_dir)
+        assert [name for name, _ in enriched_trades_ctes(data_dir)] == ["enriched_trades"]
+        assert _enriched_rows(data_dir) == live
+
+    def test_writes_month_partitions(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        partitions = sorted(
+            str(p.relative_to(data_dir / ENRICHED_DIR))
+            for p in (data_dir / ENRICHED_DIR).glob("year=*/month=*")
+        )
+        assert partitions == ["year=2024/month=01", "year=2024/month=02"]
+
+    def test_derived_columns(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        rows = {r[0]: r for r in _enriched_rows(data_dir)}
+        # t1 at 21:00 UTC is 16:00 in New York
+        assert rows["M1"][10] == "other"
+        assert rows["M1"][11] == "high_price"
+        assert rows["M2"][1:6] == ("no", pytest.approx(70.0), pytest.approx(30.0), 1, 0)
+        assert rows["M2"][8:10] == ("quadratic", 1.0)
+        assert rows["M3"][7] == "Politics"
+
+    def test_refresh_without_changes_is_noop(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        result = refresh(data_dir)
+        assert result.mode == "current"
+        assert result.rows_added == 0
+
+
+class TestIncrementalRefresh:
+    def test_new_trade_files(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        pq.write_table(
+            _trades([("t5", "M1", "0.2000", "no", "2024-03-05T12:00:00Z")]),
+            data_dir / "trades" / "trades_000001.parquet",
+        )
+        assert not is_current(data_dir)
+
+        result = refresh(data_dir)
+        assert result.mode == "incremental"
+        assert result.new_trade_files == 1
+        assert result.rows_added == 1
+        assert is_current(data_dir)
+        assert load_manifest(data_dir)["rows"] == 4
+        assert len(_enriched_rows(data_dir)) == 4
+
+    def test_newly_settled_market_picks_up_old_trades(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        pq.write_table(_markets("finalized", "no"), data_dir / "markets" / "markets_000000.parquet")
+
+        result = refresh(data_dir)
+        assert result.mode == "incremental"
+        assert result.new_trade_files == 0
+        assert result.new_markets == 1
+        assert result.rows_added == 1
+        rows = {r[0]: r for r in _enriched_rows(data_dir)}
+        assert rows["M4"][4] == 0  # yes-taker lost
+
+    def test_incremental_matches_full_rebuild(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        pq.write_table(
+            _trades([("t5", "M4", "0.4000", "no", "2024-03-05T12:00:00Z")]),
+            data_dir / "trades" / "trades_000001.parquet",
+        )
+        pq.write_table(
+            _markets("finalized", "yes"), data_dir / "markets" / "markets_000000.parquet"
+        )
+        refresh(data_dir)
+        incremental = _enriched_rows(data_dir)
+
+        refresh(data_dir, full=True)
+        assert _enriched_rows(data_dir) == incremental
+
+    def test_series_change_forces_full_rebuild(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        pq.write_table(
+            pa.table({"ticker": ["S1"], "fee_type": ["flat"], "fee_multiplier": [2.0]}),
+            data_dir / "series" / "series_000001.parquet",
+        )
+        assert refresh(data_dir).mode == "full"
+
+    def test_changed_settled_market_forces_full_rebuild(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        table = _markets("active", "")
+        result = table.column("result").to_pylist()
+        result[0] = "no"
+        table = table.set_column(table.schema.get_field_index("result"), "result", [result])
+        pq.write_table(table, data_dir / "markets" / "markets_000000.parquet")
+
+        assert refresh(data_dir).mode == "full"
+        rows = {r[0]: r for r in _enriched_rows(data_dir)}
+        assert rows["M1"][4] == 0  # yes-taker now lost
+
+    def test_rewritten_trade_file_forces_full_rebuild(self, data_dir: Path) -> None:
+        refresh(data_dir)
+        path = data_dir / "trades" / "trades_000000.parquet"
+        table = pq.read_table(path)
+        pq.write_table(table.slice(0, 2), path)
+
+        result = refresh(data_dir)
+        assert result.mode == "full"
+        assert result.rows_added == 2
+
+
+class TestFetchStrategyTrades:
+    def test_same_trades_from_materialized_table(self, data_dir: Path) -> None:
+        strategy = StrategyFilter(
+            name="All YES",
+            taker_side="yes",
+            category="*",
+            fee_type="*",
+            time_bucket="*",
+            price_min=1.0,
+            price_max=99.0,
+        )
+        live = fetch_strategy_trades(data_dir, strategy)
+        refresh(data_dir)
+        materialized = fetch_strategy_trades(data_dir, strategy)
+        assert list(materialized["ticker"]) == list(live["ticker"]) == ["M1", "M3"]
+        assert list(materialized["taker_price"]) == list(live["taker_price"])
@@ -0,0 +1,234 @@
+"""Tests for manifest-based trades file pruning."""
+
+import base64
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download.manifest import bloom_positions
+
+from simulation.backtest import fetch_strategy_trades
+from simulation.strategy_def import StrategyFilter
+from util.manifest import load_manifest, prune_files
+from util.queries import category_tickers, get_connection, trades_sql
+
+BLOOM_BITS = 256
+BLOOM_HASHES = 7
+
+
+def _bloom(tickers: list[str]) -> str:
+    data = bytearray(BLOOM_BITS // 8)
+    for ticker in tickers:
+        for pos in bloom_positions(ticker, BLOOM_BITS, BLOOM_HASHES):
+            data[pos >> 3] |= 1 << (pos & 7)
+    return base64.b64encode(bytes(data)).decode()
+
+
+def _write_trades(dataset_dir: Path, name: str, rows: list[tuple[str, str, str]]) -> dict:
+    """Write (trade_id, ticker, created_time) rows and return their manifest entry."""
+    path = dataset_dir / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(
+        pa.table(
+            {
+                "trade_id": [r[0] for r in rows],
+                "ticker": [r[1] for r in rows],
+                "yes_price_dollars": ["0.6000"] * len(rows),
+                "no_price_dollars": ["0.4000"] * len(rows),
+                "count_fp": ["10.00"] * len(rows),
+                "taker_side": ["yes"] * len(rows),
+                "created_time": [r[2] for r in rows],
+            }
+        ),
+        path,
+    )
+    tickers = sorted({r[1] for r in rows})
+    times = sorted(r[2].replace("Z", "+00:00") for r in rows)
+    return {
+        "path": name,
+        "size": path.stat().st_size,
+        "mtime_ns": path.stat().st_mtime_ns,
+        "rows": len(rows),
+        "schema_hash": "test",
+        "min_created_time": times[0],
+        "max_created_time": times[-1],
+        "min_ticker": tickers[0],
+        "max_ticker": tickers[-1],
+        "bloom": _bloom(tickers),
+        "bloom_bits": BLOOM_BITS,
+        "bloom_hashes": BLOOM_HASHES,
+    }
+
+
+def _write_manifest(dataset_dir: Path, entries: list[dict]) -> None:
+    with (dataset_dir / "_manifest.jsonl").open("w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> Path:
+    """Three trades files: January (M1, M9), February (M2) and March (M3)."""
+    trades_dir = tmp_path / "trades"
+    entries = [
+        _write_trades(
+            trades_dir,
+            "trades_000000.parquet",
+            [
+                ("t1", "M1", "2024-01-05T00:00:00Z"),
+                ("t2", "M9", "2024-01-20T00:00:00Z"),
+            ],
+        ),
+        _write_trades(trades_dir, "trades_000001.parquet", [("t3", "M2", "2024-02-10T00:00:00Z")]),
+        _write_trades(trades_dir, "trades_000002.parquet", [("t4", "M3", "2024-03-10T00:00:00Z")]),
+    ]
+    _write_manifest(trades_dir, entries)
+
+    (tmp_path / "markets").mkdir()
+    pq.write_table(
+        pa.table(
+            {
+                "ticker": ["M1", "M2", "M3", "M9"],
+                "event_ticker": ["E1", "E2", "E2", "E1"],
+                "status": ["finalized"] * 4,
+                "result": ["yes", "no", "yes", "no"],
+                "volume_fp": ["100.00"] * 4,
+                "close_time": ["2024-12-31T00:00:00Z"] * 4,
+            }
+        ),
+        tmp_path / "markets" / "markets_000000.parquet",
+    )
+    (tmp_path / "events").mkdir()
+    pq.write_table(
+        pa.table(
+            {
+                "event_ticker": ["E1", "E2"],
+                "category": ["Sports", "Politics"],
+                "series_ticker": ["S1", "S2"],
+            }
+        ),
+        tmp_path / "events" / "events_000000.parquet",
+    )
+    return tmp_path
+
+
+def _names(files: list[Path] | None) -> list[str]:
+    assert files is not None
+    return [f.name for f in files]
+
+
+class TestPruneFiles:
+    def test_no_manifest(self, tmp_path: Path) -> None:
+        assert load_manifest(tmp_path) is None
+        assert prune_files(tmp_path, start_date="2024-01-01") is None
+
+    def test_date_window(self, data_dir: Path) -> None:
+        files = prune_files(data_dir / "trades", "2024-02-01", "2024-03-01")
+        assert _names(files) == ["trades_000001.parquet"]
+
+    def test_start_inclusive_end_exclusive(self, data_dir: Path) -> None:
+        files = prune_files(data_dir / "trades", "2024-01-20T00:00:00Z", "2024-03-10")
+        assert _names(files) == ["trades_000000.parquet", "trades_000001.parquet"]
+
+    def test_ticker_range_and_bloom(self, data_dir: Path) -> None:
+        files = prune_files(data_dir / "trades", tickers=["M3"])
+        assert _names(files) == ["trades_000002.parquet"]
+
+    def test_bloom_excludes_ticker_inside_range(self, data_dir: Path) -> None:
+        # M5 sorts between M1 and M9 but is not in the January file.
+        files = prune_files(data_dir / "trades", tickers=["M5"])
+        assert _names(files) == []
+
+    def test_unindexed_and_rewritten_files_are_kept(self, data_dir: Path) -> None:
+        trades_dir = data_dir / "trades"
+        _write_trades(trades_dir, "trades_000003.parquet", [("t5", "M7", "2023-06-01T00:00:00Z")])
+        _write_trades(
+            trades_dir,
+            "trades_000002.parquet",
+            [
+                ("t4", "M3", "2024-03-10T00:00:00Z"),
+                ("t6", "M3", "2024-03-11T00:00:00Z"),
+            ],
+        )
+        files = prune_files(trades_dir, "2024-01-01", "2024-02-01")
+        assert _names(files) == [
+            "trades_000000.parquet",
+            "trades_000002.parquet",
+            "trades_000003.parquet",
+        ]
+
+    def test_same_size_rewrite_is_kept(self, data_dir: Path) -> None:
+        trades_dir = data_dir / "trades"
+        path = trades_dir / "trades_000002.parquet"
+        size, mtime = path.stat().st_size, path.stat().st_mtime_ns
+        _write_trades(trades_dir, path.name, [("t4", "M3", "2024-01-10T00:00:00Z")])
+        os.utime(path, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+        assert path.stat().st_size == size
+        files = prune_files(trades_dir, "2024-01-01", "2024-02-01")
+        assert _names(files) == ["trades_000000.parquet", "trades_000002.parquet"]
+
+    def test_later_entries_win(self, data_dir: Path) -> None:
+        trades_dir = data_dir / "trades"
+        manifest = (trades_dir / "_manifest.jsonl").read_text().splitlines()
+        entry = json.loads(manifest[2])
+        entry["min_created_time"] = entry["max_created_time"] = "2024-01-15T00:00:00+00:00"
+        with (trades_dir / "_manifest.jsonl").open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+        files = prune_files(trades_dir, "2024-01-01", "2024-02-01")
+        assert _names(files) == ["trades_000000.parquet", "trades_000002.parquet"]
+
+
+class TestTradesSqlPruning:
+    def _tickers(self, data_dir: Path, **kwargs) -> list[str]:
+        con = get_connection()
+        rows = con.execute(
+            f"SELECT ticker FROM {trades_sql(data_dir, **kwargs)} ORDER BY trade_id"
+        ).fetchall()
+        con.close()
+        return [r[0] for r in rows]
+
+    def test_date_window_reads_pruned_files(self, data_dir: Path) -> None:
+        sql = trades_sql(data_dir, "2024-02-01", "2024-03-01")
+        assert "trades_000001.parquet" in sql
+        assert "trades_000000.parquet" not in sql
+        assert self._tickers(data_dir, start_date="2024-02-01", end_date="2024-03-01") == ["M2"]
+
+    def test_no_matching_files_is_empty(self, data_dir: Path) -> None:
+        assert self._tickers(data_dir, tickers=["M5"]) == []
+
+    def test_empty_trades_dir(self, data_dir: Path) -> None:
+        for path in (data_dir / "trades").glob("*.parquet"):
+            path.unlink()
+        assert self._tickers(data_dir, tickers=["M1"]) == []
+        assert self._tickers(data_dir) == []
+
+    def test_missing_trades_dir(self, tmp_path: Path) -> None:
+        assert self._tickers(tmp_path, start_date="2024-01-01") == []
+
+    def test_unbounded_reads_everything(self, data_dir: Path) -> None:
+        assert self._tickers(data_dir) == ["M1", "M9", "M2", "M3"]
+
+
+class TestStrategyPruning:
+    def test_category_tickers(self, data_dir: Path) -> None:
+        con = get_connection(data_dir)
+        assert sorted(category_tickers(con, data_dir, "Politics")) == ["M2", "M3"]
+        con.close()
+
+    def test_same_trades_as_full_scan(self, data_dir: Path) -> None:
+        strategy = StrategyFilter(
+            name="Politics YES",
+            taker_side="yes",
+            category="Politics",
+            fee_type="*",
+            time_bucket="*",
+            price_min=1.0,
+            price_max=99.0,
+        )
+        pruned = fetch_strategy_trades(data_dir, strategy)
+        (data_dir / "trades" / "_manifest.jsonl").unlink()
+        full = fetch_strategy_trades(data_dir, strategy)
+        assert list(pruned["ticker"]) == list(full["ticker"]) == ["M2", "M3"]
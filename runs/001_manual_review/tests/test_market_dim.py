@@ -0,0 +1,199 @@
+"""Tests for the market dimension table."""
+
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from download.markets import DELTA_DIR, markets_table_sql
+
+from util.market_dim import (
+    MARKET_DIM_FILE,
+    build_market_dim,
+    ensure_market_dim,
+    is_current,
+    market_dim_view_sql,
+)
+from util.queries import market_dim_sql
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> Path:
+    """Markets with an events category, an inferred category and a duplicate row."""
+    for name in ("markets", "events", "series"):
+        (tmp_path / name).mkdir()
+    pq.write_table(
+        pa.table(
+            {
+                "ticker": ["M1", "M2", "M3", "M3"],
+                "event_ticker": ["E1", "KXBTCD-26FEB10", "KXZZZ-1", "KXZZZ-1"],
+                "status": ["finalized", "finalized", "active", "finalized"],
+                "result": ["yes", "no", "", "yes"],
+                "volume_fp": ["100.00", "200.00", "50.00", "50.00"],
+                "close_time": [
+                    "2024-03-01T00:00:00Z",
+                    "2024-03-02T12:00:00Z",
+                    None,
+                    None,
+                ],
+            }
+        ),
+        tmp_path / "markets" / "markets_000000.parquet",
+    )
+    pq.write_table(
+        pa.table({"event_ticker": ["E1"], "category": ["Sports"], "series_ticker": ["S1"]}),
+        tmp_path / "events" / "events_000000.parquet",
+    )
+    pq.write_table(
+        pa.table(
+            {
+                "ticker": ["S1", "S1"],
+                "fee_type": ["quadratic", "quadratic"],
+                "fee_multiplier": [0.5, 0.5],
+            }
+        ),
+        tmp_path / "series" / "series_000000.parquet",
+    )
+    return tmp_path
+
+
+def _rows(data_dir: Path) -> dict[str, tuple]:
+    con = duckdb.connect()
+    rows = con.execute(f"""
+        SELECT ticker, event_ticker, series_ticker, result, status, close_time,
+               category, fee_type, fee_multiplier
+        FROM '{data_dir / MARKET_DIM_FILE}'
+    """).fetchall()
+    con.close()
+    return {r[0]: r for r in rows}
+
+
+class TestBuildMarketDim:
+    def test_one_row_per_ticker(self, data_dir: Path) -> None:
+        build_market_dim(data_dir)
+        rows = _rows(data_dir)
+        assert sorted(rows) == ["M1", "M2", "M3"]
+        assert rows["M3"][3:5] == ("yes", "finalized")
+
+    def test_event_category_and_fees(self, data_dir: Path) -> None:
+        build_market_dim(data_dir)
+        assert _rows(data_dir)["M1"][2:] == (
+            "S1",
+            "yes",
+            "finalized",
+            1709251200,
+            "Sports",
+            "quadratic",
+            0.5,
+        )
+
+    def test_inferred_category_and_default_fees(self, data_dir: Path) -> None:
+        build_market_dim(data_dir)
+        rows = _rows(data_dir)
+        assert rows["M2"][6:] == ("Crypto", "unknown", 1.0)
+        assert rows["M3"][6] == "Unknown"
+        assert rows["M3"][5] is None
+
+    def test_missing_events_and_series(self, data_dir: Path) -> None:
+        (data_dir / "events" / "events_000000.parquet").unlink()
+        (data_dir / "series" / "series_000000.parquet").unlink()
+        build_market_dim(data_dir)
+        assert _rows(data_dir)["M1"][6:] == ("Unknown", "unknown", 1.0)
+
+
+class TestMarketDimFreshness:
+    def test_not_current_before_build(self, data_dir: Path) -> None:
+        assert not is_current(data_dir)
+
+    def test_ensure_builds_once(self, data_dir: Path) -> None:
+        path = ensure_market_dim(data_dir)
+        mtime = path.stat().st_mtime_ns
+        assert is_current(data_dir)
+        assert ensure_market_dim(data_dir).stat().st_mtime_ns == mtime
+
+    def test_rebuilds_when_events_change(self, data_dir: Path) -> None:
+        ensure_market_dim(data_dir)
+        pq.write_table(
+            pa.table(
+                {
+                    "event_ticker": ["KXZZZ-1"],
+                    "category": ["World"],
+                    "series_ticker": ["S1"],
+                }
+            ),
+            data_dir / "events" / "events_000001.parquet",
+        )
+        assert not is_current(data_dir)
+        ensure_market_dim(data_dir)
+        assert _rows(data_dir)["M3"][6] == "World"
+
+
+class TestMarketDimSql:
+    def test_does_not_write(self, data_dir: Path) -> None:
+        duckdb.sql(f"SELECT COUNT(*) FROM {market_dim_sql(data_dir)}").fetchall()
+        assert not (data_dir / MARKET_DIM_FILE).exists()
+
+    def test_reads_current_file(self, data_dir: Path) -> None:
+        build_market_dim(data_dir)
+        assert MARKET_DIM_FILE in market_dim_sql(data_dir)
+
+    def test_inline_view_matches_file(self, data_dir: Path) -> None:
+        build_market_dim(data_dir)
+        view = duckdb.sql(
+            f"SELECT * FROM {market_dim_view_sql(data_dir)} ORDER BY ticker"
+        ).fetchall()
+        assert (
+            view
+            == duckdb.sql(
+                f"SELECT * FROM '{data_dir / MARKET_DIM_FILE}' ORDER BY ticker"
+            ).fetchall()
+        )
+
+
+def _write_delta(data_dir: Path, name: str, tickers: list[str], statuses: list[str]) -> None:
+    delta_dir = data_dir / "markets" / DELTA_DIR
+    delta_dir.mkdir(exist_ok=True)
+    pq.write_table(
+        pa.table(
+            {
+                "ticker": tickers,
+                "event_ticker": ["E1"] * len(tickers),
+                "status": statuses,
+                "result": ["no" if s == "finalized" else "" for s in statuses],
+                "volume_fp": ["10.00"] * len(tickers),
+                "close_time": [None] * len(tickers),
+            },
+            schema=pa.schema(
+                [
+                    ("ticker", pa.string()),
+                    ("event_ticker", pa.string()),
+                    ("status", pa.string()),
+                    ("result", pa.string()),
+                    ("volume_fp", pa.string()),
+                    ("close_time", pa.string()),
+                ]
+            ),
+        ),
+        delta_dir / f"{name}_000000.parquet",
+    )
+
+
+class TestMarketDeltas:
+    def test_no_deltas_dedups_base(self, data_dir: Path) -> None:
+        rows = duckdb.sql(f"SELECT ticker, status FROM {markets_table_sql(data_dir)}").fetchall()
+        assert sorted(rows) == [("M1", "finalized"), ("M2", "finalized"), ("M3", "finalized")]
+
+    def test_latest_delta_wins(self, data_dir: Path) -> None:
+        _write_delta(data_dir, "delta-20260101T000000", ["M1", "M4"], ["active", "active"])
+        _write_delta(data_dir, "delta-20260102T000000", ["M4"], ["finalized"])
+        sql = f"SELECT ticker, status FROM {markets_table_sql(data_dir)}"
+        rows = dict(duckdb.sql(sql).fetchall())
+        assert rows == {"M1": "active", "M2": "finalized", "M3": "finalized", "M4": "finalized"}
+
+    def test_market_dim_rebuilds_with_delta(self, data_dir: Path) -> None:
+        ensure_market_dim(data_dir)
+        _write_delta(data_dir, "delta-20260101T000000", ["M4"], ["finalized"])
+        assert not is_current(data_dir)
+        ensure_market_dim(data_dir)
+        assert _rows(data_dir)["M4"][3:5] == ("no", "finalized")
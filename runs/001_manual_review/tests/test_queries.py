@@ -7,12 +7,18 @@ import pyarrow as pa
 import pyarrow.parquet as pq
 import pytest
 
+from util import queries
 from util.queries import (
     build_query,
     categorized_trade_outcomes_sql,
     get_connection,
+    partition_filter_sql,
     resolved_markets_sql,
     trade_outcomes_sql,
+    trades_formats,
+    trades_normalized,
+    trades_partitioned,
+    trades_sql,
     with_category_sql,
     with_fee_type_sql,
 )
@@ -24,56 +30,101 @@ def fixture_data_dir(tmp_path: Path) -> Path:
     # Markets
     markets_dir = tmp_path / "markets"
     markets_dir.mkdir()
-    markets = pa.table({
-        "ticker": ["M1", "M2", "M3", "M4", "M5"],
-        "event_ticker": ["E1", "E1", "E2", "E1", "E2"],
-        "status": ["finalized", "finalized", "finalized", "active", "finalized"],
-        "result": ["yes", "no", "yes", "", "42"],
-        "volume_fp": ["100.00", "200.00", "150.00", "50.00", "75.00"],
-    })
+    markets = pa.table(
+        {
+            "ticker": ["M1", "M2", "M3", "M4", "M5"],
+            "event_ticker": ["E1", "E1", "E2", "E1", "E2"],
+            "status": ["finalized", "finalized", "finalized", "active", "finalized"],
+            "result": ["yes", "no", "yes", "", "42"],
+            "volume_fp": ["100.00", "200.00", "150.00", "50.00", "75.00"],
+            "close_time": ["2024-12-31T00:00:00Z"] * 5,
+        }
+    )
     pq.write_table(markets, markets_dir / "markets_000000.parquet")
 
     # Trades
     trades_dir = tmp_path / "trades"
     trades_dir.mkdir()
-    trades = pa.table({
-        "trade_id": ["t1", "t2", "t3"],
-        "ticker": ["M1", "M2", "M3"],
-        "yes_price_dollars": ["0.6500", "0.3000", "0.8000"],
-        "no_price_dollars": ["0.3500", "0.7000", "0.2000"],
-        "count_fp": ["10.00", "20.00", "5.00"],
-        "taker_side": ["yes", "no", "yes"],
-        "created_time": [
-            "2024-01-01T00:00:00Z",
-            "2024-01-02T00:00:00Z",
-            "2024-01-03T00:00:00Z",
-        ],
-    })
+    trades = pa.table(
+        {
+            "trade_id": ["t1", "t2", "t3"],
+            "ticker": ["M1", "M2", "M3"],
+            "yes_price_dollars": ["0.6500", "0.3000", "0.8000"],
+            "no_price_dollars": ["0.3500", "0.7000", "0.2000"],
+            "count_fp": ["10.00", "20.00", "5.00"],
+            "taker_side": ["yes", "no", "yes"],
+            "created_time": [
+                "2024-01-01T00:00:00Z",
+                "2024-01-02T00:00:00Z",
+                "2024-01-03T00:00:00Z",
+            ],
+        }
+    )
     pq.write_table(trades, trades_dir / "trades_000000.parquet")
 
     # Events
     events_dir = tmp_path / "events"
     events_dir.mkdir()
-    events = pa.table({
-        "event_ticker": ["E1", "E2"],
-        "category": ["Sports", "Politics"],
-        "series_ticker": ["S1", "S2"],
-    })
+    events = pa.table(
+        {
+            "event_ticker": ["E1", "E2"],
+            "category": ["Sports", "Politics"],
+            "series_ticker": ["S1", "S2"],
+        }
+    )
     pq.write_table(events, events_dir / "events_000000.parquet")
 
     # Series
     series_dir = tmp_path / "series"
     series_dir.mkdir()
-    series = pa.table({
-        "ticker": ["S1", "S2"],
-        "fee_type": ["quadratic", "quadratic_with_maker_fees"],
-        "fee_multiplier": [1.0, 0.5],
-    })
+    series = pa.table(
+        {
+            "ticker": ["S1", "S2"],
+            "fee_type": ["quadratic", "quadratic_with_maker_fees"],
+            "fee_multiplier": [1.0, 0.5],
+        }
+    )
     pq.write_table(series, series_dir / "series_000000.parquet")
 
     return tmp_path
 
 
+@pytest.fixture()
+def partitioned_data_dir(fixture_data_dir: Path) -> Path:
+    """Same dataset with trades moved into a year=YYYY/month=MM/ layout."""
+    trades_dir = fixture_data_dir / "trades"
+    flat = trades_dir / "trades_000000.parquet"
+    table = pq.read_table(flat)
+    flat.unlink()
+    for i in range(table.num_rows):
+        row = table.slice(i, 1)
+        created = row.column("created_time")[0].as_py()
+        part_dir = trades_dir / f"year={created[:4]}" / f"month={created[5:7]}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(row, part_dir / f"trades_{i:06d}.parquet")
+    return fixture_data_dir
+
+
+@pytest.fixture()
+def normalized_data_dir(fixture_data_dir: Path) -> Path:
+    """Same dataset with trades stored as normalized typed columns."""
+    trades = pa.table(
+        {
+            "trade_id": ["t1", "t2", "t3"],
+            "ticker": ["M1", "M2", "M3"],
+            "taker_side": pa.array(["yes", "no", "yes"]).dictionary_encode(),
+            "yes_price_cents": pa.array([65, 30, 80], type=pa.int16()),
+            "no_price_cents": pa.array([35, 70, 20], type=pa.int16()),
+            "contracts": pa.array(["10.00", "20.00", "5.00"]).cast(pa.decimal128(18, 2)),
+            "created_time": pa.array(
+                ["2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", "2024-01-03T00:00:00Z"]
+            ).cast(pa.timestamp("us", tz="UTC")),
+        }
+    )
+    pq.write_table(trades, fixture_data_dir / "trades" / "trades_000000.parquet")
+    return fixture_data_dir
+
+
 class TestGetConnection:
     def test_returns_working_connection(self) -> None:
         con = get_connection()
@@ -81,6 +132,11 @@ class TestGetConnection:
         assert result == (1,)
         con.close()
 
+    def test_session_time_zone_is_utc(self) -> None:
+        con = get_connection()
+        assert con.execute("SELECT current_setting('TimeZone')").fetchone()[0] == "UTC"
+        con.close()
+
 
 class TestResolvedMarkets:
     def test_filters_finalized_binary_only(self, fixture_data_dir: Path) -> None:
@@ -197,6 +253,170 @@ class TestWithCategory:
         con.close()
 
 
+class TestPartitionFilter:
+    def test_no_bounds(self) -> None:
+        assert partition_filter_sql() == "TRUE"
+
+    def test_start_inclusive(self) -> None:
+        assert partition_filter_sql(start_date="2025-03-15") == "year * 12 + month >= 24303"
+
+    def test_end_on_month_boundary_excludes_month(self) -> None:
+        # 2025-03-01 exclusive → last partition is 2025-02
+        assert partition_filter_sql(end_date="2025-03-01") == "year * 12 + month <= 24302"
+
+    def test_end_mid_month_includes_month(self) -> None:
+        assert partition_filter_sql(end_date="2025-03-02") == "year * 12 + month <= 24303"
+
+
+class TestPartitionedTrades:
+    def test_detects_layout(self, partitioned_data_dir: Path) -> None:
+        assert trades_partitioned(partitioned_data_dir)
+
+    def test_flat_layout_not_partitioned(self, fixture_data_dir: Path) -> None:
+        assert not trades_partitioned(fixture_data_dir)
+
+    def test_reads_all_partitions(self, partitioned_data_dir: Path) -> None:
+        con = duckdb.connect()
+        rows = con.execute(
+            f"SELECT * FROM {trades_sql(partitioned_data_dir)} ORDER BY trade_id"
+        ).df()
+        assert list(rows["trade_id"]) == ["t1", "t2", "t3"]
+        assert "year" not in rows.columns
+        assert "month" not in rows.columns
+        con.close()
+
+    def test_reads_flat_files_left_by_compaction(self, partitioned_data_dir: Path) -> None:
+        trades_dir = partitioned_data_dir / "trades"
+        pq.write_table(
+            pq.read_table(
+                trades_dir / "year=2024" / "month=01" / "trades_000000.parquet"
+            ).set_column(0, "trade_id", pa.array(["t4"])),
+            trades_dir / "trades_000010.parquet",
+        )
+        con = duckdb.connect()
+        rows = con.execute(
+            f"SELECT trade_id FROM {trades_sql(partitioned_data_dir)} ORDER BY trade_id"
+        ).fetchall()
+        assert rows == [("t1",), ("t2",), ("t3",), ("t4",)]
+        con.close()
+
+    def test_date_bounds_prune_partitions(self, partitioned_data_dir: Path) -> None:
+        """All fixture trades are in January 2024; a later window reads nothing."""
+        con = duckdb.connect()
+        sql = trades_sql(partitioned_data_dir, start_date="2024-02-01")
+        assert con.execute(f"SELECT COUNT(*) FROM {sql}").fetchone()[0] == 0
+        sql = trades_sql(partitioned_data_dir, end_date="2024-02-01")
+        assert con.execute(f"SELECT COUNT(*) FROM {sql}").fetchone()[0] == 3
+        con.close()
+
+    def test_trade_outcomes_match_flat_layout(self, partitioned_data_dir: Path) -> None:
+        con = duckdb.connect()
+        query = build_query(
+            [
+                ("resolved_markets", resolved_markets_sql(partitioned_data_dir)),
+                ("trade_outcomes", trade_outcomes_sql(partitioned_data_dir)),
+            ],
+            "SELECT ticker, taker_price FROM trade_outcomes ORDER BY ticker",
+        )
+        rows = con.execute(query).fetchall()
+        assert [r[0] for r in rows] == ["M1", "M2", "M3"]
+        assert rows[0][1] == pytest.approx(65.0)
+        con.close()
+
+
+class TestNormalizedTrades:
+    def test_detects_normalized_schema(
+        self, fixture_data_dir: Path, normalized_data_dir: Path
+    ) -> None:
+        assert trades_normalized(normalized_data_dir)
+
+    def test_raw_schema_not_normalized(self, fixture_data_dir: Path) -> None:
+        assert not trades_normalized(fixture_data_dir)
+
+    def test_trade_outcomes_from_normalized_columns(self, normalized_data_dir: Path) -> None:
+        con = duckdb.connect()
+        query = build_query(
+            [
+                ("resolved_markets", resolved_markets_sql(normalized_data_dir)),
+                ("trade_outcomes", trade_outcomes_sql(normalized_data_dir)),
+            ],
+            "SELECT ticker, taker_price, maker_price, taker_won, contracts "
+            "FROM trade_outcomes ORDER BY ticker",
+        )
+        rows = con.execute(query).fetchall()
+        assert rows[0] == ("M1", pytest.approx(65.0), pytest.approx(35.0), 1, pytest.approx(10.0))
+        assert rows[1] == ("M2", pytest.approx(70.0), pytest.approx(30.0), 1, pytest.approx(20.0))
+        con.close()
+
+    def test_created_time_is_timestamptz(self, normalized_data_dir: Path) -> None:
+        con = get_connection()
+        row = con.execute(
+            "SELECT typeof(created_time), CAST(MIN(created_time) AS VARCHAR) "
+            f"FROM {trades_sql(normalized_data_dir)} GROUP BY 1"
+        ).fetchone()
+        assert row == ("TIMESTAMP WITH TIME ZONE", "2024-01-01 00:00:00+00")
+        con.close()
+
+
+class TestMixedTrades:
+    @pytest.fixture()
+    def mixed_data_dir(self, normalized_data_dir: Path) -> Path:
+        """Normalized trades plus one raw file not yet migrated."""
+        pq.write_table(
+            pa.table(
+                {
+                    "trade_id": ["t4"],
+                    "ticker": ["M3"],
+                    "yes_price_dollars": ["0.2500"],
+                    "no_price_dollars": ["0.7500"],
+                    "count_fp": ["4.00"],
+                    "taker_side": ["no"],
+                    "created_time": ["2024-01-04T00:00:00Z"],
+                }
+            ),
+            normalized_data_dir / "trades" / "trades_000001.parquet",
+        )
+        return normalized_data_dir
+
+    def test_detects_both_formats(self, mixed_data_dir: Path) -> None:
+        assert trades_formats(mixed_data_dir) == {"raw", "normalized"}
+        assert not trades_normalized(mixed_data_dir)
+
+    def test_footers_are_read_once_per_file_version(
+        self, mixed_data_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        reads = []
+        read_schema = pq.read_schema
+        monkeypatch.setattr(queries.pq, "read_schema", lambda p: reads.append(p) or read_schema(p))
+        monkeypatch.setattr(queries, "_file_columns_cache", {})
+        trades_formats(mixed_data_dir)
+        assert len(reads) == 2
+        assert trades_formats(mixed_data_dir) == {"raw", "normalized"}
+        assert len(reads) == 2
+
+        path = mixed_data_dir / "trades" / "trades_000001.parquet"
+        pq.write_table(pq.read_table(path).drop_columns(["count_fp"]), path)
+        trades_formats(mixed_data_dir)
+        assert reads[2:] == [path]
+
+    def test_converts_each_file_from_its_own_columns(self, mixed_data_dir: Path) -> None:
+        con = get_connection()
+        rows = con.execute(f"""
+            SELECT trade_id, yes_price, contracts, typeof(created_time), CAST(created_time AS DATE)
+            FROM {trades_sql(mixed_data_dir)}
+            ORDER BY trade_id
+        """).fetchall()
+        assert [r[:3] for r in rows] == [
+            ("t1", 65.0, 10.0),
+            ("t2", 30.0, 20.0),
+            ("t3", 80.0, 5.0),
+            ("t4", 25.0, 4.0),
+        ]
+        assert {r[3] for r in rows} == {"TIMESTAMP WITH TIME ZONE"}
+        assert str(rows[3][4]) == "2024-01-04"
+        con.close()
+
+
 class TestBuildQuery:
     def test_no_ctes(self) -> None:
         query = build_query([], "SELECT 1")
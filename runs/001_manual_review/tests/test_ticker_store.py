@@ -0,0 +1,105 @@
+"""Tests for the ticker-clustered trades store."""
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from util.queries import get_connection, trades_sql
+from util.ticker_store import TickerStore, build_ticker_store, is_current
+
+
+def _trades(rows: list[tuple[str, str, str]]) -> pa.Table:
+    """Build a raw trades table from (trade_id, ticker, created_time) rows."""
+    return pa.table(
+        {
+            "trade_id": [r[0] for r in rows],
+            "ticker": [r[1] for r in rows],
+            "yes_price_dollars": ["0.6000"] * len(rows),
+            "no_price_dollars": ["0.4000"] * len(rows),
+            "count_fp": ["10.00"] * len(rows),
+            "taker_side": ["yes"] * len(rows),
+            "created_time": [r[2] for r in rows],
+        }
+    )
+
+
+@pytest.fixture()
+def data_dir(tmp_path: Path) -> Path:
+    """Two chronological trades files interleaving three markets."""
+    (tmp_path / "trades").mkdir()
+    pq.write_table(
+        _trades(
+            [
+                ("t1", "M2", "2024-01-01T00:00:00Z"),
+                ("t2", "M1", "2024-01-02T00:00:00Z"),
+                ("t3", "M3", "2024-01-03T00:00:00Z"),
+            ]
+        ),
+        tmp_path / "trades" / "trades_000000.parquet",
+    )
+    pq.write_table(
+        _trades(
+            [
+                ("t4", "M1", "2024-01-04T00:00:00Z"),
+                ("t5", "M2", "2024-01-05T00:00:00Z"),
+                ("t6", "M1", "2024-01-06T00:00:00Z"),
+            ]
+        ),
+        tmp_path / "trades" / "trades_000001.parquet",
+    )
+    return tmp_path
+
+
+class TestTickerStore:
+    def test_per_market_slices(self, data_dir: Path) -> None:
+        assert build_ticker_store(data_dir) == 6
+        with TickerStore(data_dir) as store:
+            assert store.tickers == ["M1", "M2", "M3"]
+            assert store.trades("M1").column("trade_id").to_pylist() == ["t2", "t4", "t6"]
+            assert store.trades("M2").column("trade_id").to_pylist() == ["t1", "t5"]
+            assert store.trades("M3").num_rows == 1
+
+    def test_matches_filtered_scan(self, data_dir: Path) -> None:
+        build_ticker_store(data_dir)
+        con = get_connection()
+        expected = con.execute(
+            f"SELECT trade_id, taker_price, contracts FROM {trades_sql(data_dir)} "
+            "WHERE ticker = 'M1' ORDER BY created_time"
+        ).fetchall()
+        con.close()
+        with TickerStore(data_dir) as store:
+            tape = store.trades("M1").select(["trade_id", "taker_price", "contracts"])
+            assert [tuple(r.values()) for r in tape.to_pylist()] == expected
+
+    def test_slices_are_zero_copy(self, data_dir: Path) -> None:
+        build_ticker_store(data_dir)
+        with TickerStore(data_dir) as store:
+            before = pa.total_allocated_bytes()
+            tape = store.trades("M1")
+            assert pa.total_allocated_bytes() == before
+            assert tape.column("taker_price").to_pylist() == [60.0, 60.0, 60.0]
+
+    def test_unknown_ticker_is_empty(self, data_dir: Path) -> None:
+        build_ticker_store(data_dir)
+        with TickerStore(data_dir) as store:
+            assert "M9" not in store
+            assert store.ticker_id("M9") is None
+            assert store.trades("M9").num_rows == 0
+            assert store.trades("M9").schema == store.schema
+
+    def test_stale_store_is_refused(self, data_dir: Path) -> None:
+        build_ticker_store(data_dir)
+        assert is_current(data_dir)
+        pq.write_table(
+            _trades([("t7", "M4", "2024-01-07T00:00:00Z")]),
+            data_dir / "trades" / "trades_000002.parquet",
+        )
+        assert not is_current(data_dir)
+        with pytest.raises(RuntimeError, match="stale"):
+            TickerStore(data_dir)
+
+    def test_missing_store(self, data_dir: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            TickerStore(data_dir)
@@ -34,6 +34,7 @@ def fixture_data_dir(tmp_path: Path) -> Path:
             "status": ["finalized", "finalized", "finalized", "finalized"],
             "result": ["yes", "no", "no", "yes"],
             "volume_fp": ["100.00", "200.00", "150.00", "50.00"],
+            "close_time": ["2024-12-31T00:00:00Z"] * 4,
         }
     )
     pq.write_table(markets, markets_dir / "markets_000000.parquet")
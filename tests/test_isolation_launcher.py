@@ -14,6 +14,7 @@ from harness.isolation_launcher import (
     RUNNER_IMAGE_FINGERPRINT_LABEL,
     WORKER_DATA_DIR,
     WORKER_RUN_DIR,
+    WORKER_VALIDATION_DATA_DIR,
     BindMount,
     ContainerLaunchSpec,
     ExecutionConfig,
@@ -180,6 +181,36 @@ def test_build_container_launch_spec_mounts_run_and_data(tmp_path: Path) -> None
     assert WORKER_RUN_DIR in cmd
 
 
+def test_build_container_launch_spec_mounts_validation_split(tmp_path: Path) -> None:
+    run_dir = tmp_path / "runs" / "001_test"
+    run_dir.mkdir(parents=True)
+    splits = tmp_path / "problems" / "kalshi" / "splits"
+    for split in ("train", "validation"):
+        (splits / split).mkdir(parents=True)
+    (run_dir / "data").symlink_to((splits / "train").resolve())
+    (run_dir / "data_validation").symlink_to((splits / "validation").resolve())
+
+    spec = build_container_launch_spec(
+        run_dir=run_dir,
+        run_id="001_test",
+        mode="run",
+        loop_cfg=RalphLoopConfig(max_cost_usd=5.0, max_iterations=2),
+        execution=ExecutionConfig(
+            mode="container",
+            runtime="docker",
+            image="kalshi-lab-claude-runner:latest",
+            network="none",
+            use_bypass_permissions=True,
+        ),
+    )
+
+    targets = {m.target: m.source for m in spec.mounts if m.read_only}
+    assert targets[WORKER_DATA_DIR] == (splits / "train").resolve()
+    assert targets[WORKER_VALIDATION_DATA_DIR] == (splits / "validation").resolve()
+    assert str((splits / "validation").resolve()) in targets
+    assert not any(m.source == splits.resolve() for m in spec.mounts)
+
+
 def _event_types(run_dir: Path) -> list[str]:
     events_path = run_dir / "logs" / "events.jsonl"
     if not events_path.exists():
@@ -0,0 +1,76 @@
+"""Tests for run workspace scaffolding."""
+
+import json
+from pathlib import Path
+
+import click
+import pytest
+
+from harness import scaffold
+
+
+@pytest.fixture()
+def lab(tmp_path: Path, monkeypatch) -> Path:
+    """Minimal lab layout with one problem and a runs directory."""
+    problem_dir = tmp_path / "problems" / "kalshi"
+    (problem_dir / "data").mkdir(parents=True)
+    (tmp_path / "runs").mkdir()
+    arch_file = tmp_path / "arch.yaml"
+    arch_file.write_text("name: test\n")
+    monkeypatch.setattr(scaffold, "PROBLEMS_DIR", tmp_path / "problems")
+    monkeypatch.setattr(scaffold, "RUNS_DIR", tmp_path / "runs")
+    monkeypatch.setattr(scaffold, "load_architecture", lambda arch: (arch_file, {"name": arch}))
+    return tmp_path
+
+
+def _materialize_splits(lab: Path) -> Path:
+    splits = lab / "problems" / "kalshi" / "splits"
+    for split in ("train", "validation"):
+        (splits / split).mkdir(parents=True)
+    (splits / "splits.json").write_text(json.dumps({
+        "validation_start": "2025-01-01T00:00:00+00:00",
+        "test_start": "2025-03-01T00:00:00+00:00",
+    }))
+    return splits
+
+
+def test_mounts_train_split_only(lab: Path) -> None:
+    splits = _materialize_splits(lab)
+    run_dir = scaffold.create_run(arch="test", problem="kalshi", name="train_only")
+    assert (run_dir / "data").resolve() == (splits / "train").resolve()
+    assert not (run_dir / "data_validation").exists()
+
+
+def test_mounts_allowed_validation_split(lab: Path) -> None:
+    splits = _materialize_splits(lab)
+    run_dir = scaffold.create_run(
+        arch="test", problem="kalshi", name="with_val", splits=("train", "validation")
+    )
+    assert (run_dir / "data").resolve() == (splits / "train").resolve()
+    assert (run_dir / "data_validation").resolve() == (splits / "validation").resolve()
+    claude_md = (run_dir / ".claude" / "CLAUDE.md").read_text()
+    assert "data_validation/" in claude_md
+    assert "before 2025-01-01" in claude_md
+    assert "before 2025-03-01" in claude_md
+
+
+def test_without_splits_fails(lab: Path) -> None:
+    with pytest.raises(click.ClickException, match="No data splits"):
+        scaffold.create_run(arch="test", problem="kalshi", name="legacy")
+    assert not any((lab / "runs").iterdir())
+
+
+def test_missing_requested_split_fails_before_creating_run(lab: Path) -> None:
+    splits = _materialize_splits(lab)
+    (splits / "validation").rmdir()
+    with pytest.raises(click.ClickException, match="validation"):
+        scaffold.create_run(
+            arch="test", problem="kalshi", name="no_val", splits=("train", "validation")
+        )
+    assert not any((lab / "runs").iterdir())
+
+
+def test_rejects_missing_train_split(lab: Path) -> None:
+    _materialize_splits(lab)
+    with pytest.raises(click.ClickException, match="train"):
+        scaffold.create_run(arch="test", problem="kalshi", name="bad", splits=("validation",))